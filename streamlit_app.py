@@ -1,4447 +1,7509 @@
-
-import streamlit as st
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-from datetime import datetime
-from zoneinfo import ZoneInfo
-
-
-def parse_iso_to_kolkata(dt_str_or_obj):
-    """Parse an ISO string or datetime and return a tz-aware datetime in Asia/Kolkata."""
-    if not dt_str_or_obj:
-        return None
-    if isinstance(dt_str_or_obj, str):
-        try:
-            dt = datetime.fromisoformat(dt_str_or_obj)
-        except Exception:
-            return None
-    else:
-        dt = dt_str_or_obj
-    # Attach timezone if naive or convert to Asia/Kolkata
-    if dt.tzinfo is None:
-        return dt.replace(tzinfo=ZoneInfo("Asia/Kolkata"))
-    else:
-        return dt.astimezone(ZoneInfo("Asia/Kolkata"))
-
-
-def format_ts_for_display(ts, short=False):
-    """Return a safe string representation of a timestamp for UI display.
-
-    - Accepts None, ISO strings, or datetime objects.
-    - If `short` is True, returns a truncated date/time (first 16 chars) to match previous UI.
-    """
-    if not ts:
-        return 'N/A'
-    # If it's already a datetime, format it into a readable string in Asia/Kolkata
-    if isinstance(ts, datetime):
-        try:
-            s = ts.astimezone(ZoneInfo('Asia/Kolkata')).strftime('%Y-%m-%d %H:%M:%S')
-        except Exception:
-            s = ts.strftime('%Y-%m-%d %H:%M:%S')
-    else:
-        # For strings or other types, coerce to str (handles ISO strings from SQLite)
-        s = str(ts)
-    return s[:16] if short else s
-import json
-import base64
-import sqlite3
-import hashlib
-import os
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table, TableStyle, Image
-from reportlab.lib import colors
-from io import BytesIO
-
-# Support for external database (use DATABASE_URL env var for hosted DB)
-# If not provided, the app will use local SQLite file `feedback_streamlit.db`.
-# NOTE: On Streamlit Community Cloud the application filesystem is ephemeral
-# and local SQLite files are not persisted across app restarts or redeploys.
-# To persist data in production, configure a hosted database and set
-# the `DATABASE_URL` environment variable (e.g. Postgres URI).
-DATABASE_URL = os.environ.get('DATABASE_URL')
-
-def generate_application_documentation():
-    """Generate a comprehensive PDF documentation of the application."""
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter, rightMargin=0.5*inch, leftMargin=0.5*inch,
-                           topMargin=0.75*inch, bottomMargin=0.75*inch)
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    # Title style
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#8B3A3A'),
-        spaceAfter=6,
-        alignment=1  # Center
-    )
-    
-    # Heading style
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=14,
-        textColor=colors.HexColor('#1f4788'),
-        spaceAfter=6,
-        spaceBefore=12
-    )
-    
-    # Normal text style
-    normal_style = ParagraphStyle(
-        'CustomNormal',
-        parent=styles['Normal'],
-        fontSize=11,
-        spaceAfter=6,
-        leading=14
-    )
-    
-    # Add title
-    elements.append(Paragraph("VVP Institute of Engineering and Technology", title_style))
-    elements.append(Paragraph("Student Learning Management System - Documentation", heading_style))
-    elements.append(Spacer(1, 0.2*inch))
-    
-    # Overview
-    elements.append(Paragraph("<b>Application Overview</b>", heading_style))
-    elements.append(Paragraph(
-        "The VVP Institute Student Learning Management System (LMS) is a comprehensive platform designed to facilitate "
-        "academic interactions between students, faculty, and administrators. This system provides tools for attendance tracking, "
-        "resource management, testing, and feedback collection.",
-        normal_style
-    ))
-    elements.append(Spacer(1, 0.1*inch))
-    
-    # Key Features
-    elements.append(Paragraph("<b>Key Features</b>", heading_style))
-    features = [
-        "<b>Student Dashboard:</b> Centralized access to attendance, resources, tests, and feedback submission",
-        "<b>Faculty Management:</b> Mark daily attendance, maintain daily lecture records (LER), and upload course materials",
-        "<b>Admin Controls:</b> Manage subjects, faculty, student roster, view analytics, and export data",
-        "<b>Attendance Tracking:</b> Daily attendance recording with monthly rollups and academic-year based calculations",
-        "<b>Online Testing:</b> Create and administer tests with automatic scoring",
-        "<b>Resource Management:</b> Upload and organize assignments, notes, and other course materials",
-        "<b>Feedback System:</b> Comprehensive 10-question faculty feedback form with scheduled submission windows",
-        "<b>Leave Management:</b> Faculty leave requests and tracking with automatic annual reset",
-        "<b>Academic Year Support:</b> Automatic handling of academic years (July 1 - June 30)"
-    ]
-    for feature in features:
-        elements.append(Paragraph(f"• {feature}", normal_style))
-    
-    elements.append(Spacer(1, 0.15*inch))
-    
-    # User Roles
-    elements.append(Paragraph("<b>User Roles and Responsibilities</b>", heading_style))
-    
-    # Students
-    elements.append(Paragraph("<b><u>Students</u></b>", styles['Heading3']))
-    student_features = [
-        "View personal attendance percentage and detailed attendance records",
-        "Access course materials (assignments, notes) organized by year level and semester",
-        "Submit faculty feedback (during scheduled feedback windows)",
-        "Take online tests and view attempts/scores",
-        "Calculate academic credits using the credit calculator",
-        "Download resources uploaded by faculty"
-    ]
-    for feature in student_features:
-        elements.append(Paragraph(f"• {feature}", normal_style))
-    
-    elements.append(Spacer(1, 0.1*inch))
-    
-    # Faculty
-    elements.append(Paragraph("<b><u>Faculty Members</u></b>", styles['Heading3']))
-    faculty_features = [
-        "Mark daily attendance for students",
-        "Record Daily Lecture Entry (LER) with topics, lecture numbers, and syllabus coverage",
-        "Create and manage online tests",
-        "Upload course materials (assignments, notes)",
-        "Request leave with alternative faculty assignment",
-        "View their feedback from students and department statistics"
-    ]
-    for feature in faculty_features:
-        elements.append(Paragraph(f"• {feature}", normal_style))
-    
-    elements.append(Spacer(1, 0.1*inch))
-    
-    # Admin
-    elements.append(Paragraph("<b><u>Administrators</u></b>", styles['Heading3']))
-    admin_features = [
-        "Manage subjects and assign faculty to subjects",
-        "Manage faculty profiles and departments",
-        "Upload and manage student roster (Excel/CSV format)",
-        "View student attendance and generate reports",
-        "View and export feedback data",
-        "Set feedback submission windows",
-        "Manage faculty leaves and absences",
-        "Export Daily LER records",
-        "Access analytics and system statistics"
-    ]
-    for feature in admin_features:
-        elements.append(Paragraph(f"• {feature}", normal_style))
-    
-    elements.append(PageBreak())
-    
-    # Feedback System
-    elements.append(Paragraph("<b>Feedback System - 10-Question Rubric</b>", heading_style))
-    questions = [
-        "1. Has fundamental concepts & subject knowledge",
-        "2. Preparation for Subject is sufficient while coming to class",
-        "3. Sufficient knowledge about current trends/development of subject",
-        "4. Proficient in English & communication skills",
-        "5. Teaching makes class interesting & interactive through student participation",
-        "6. Faculty is punctual in starting and ending classes on time",
-        "7. Has covered the entire syllabus as prescribed by university",
-        "8. Extent of fulfillment of your learning expectations",
-        "9. Behavior with students is appropriate and rational",
-        "10. Motivates students for their study and better career"
-    ]
-    for q in questions:
-        elements.append(Paragraph(f"• {q}", normal_style))
-    
-    elements.append(Spacer(1, 0.15*inch))
-    elements.append(Paragraph("Each question is rated on a scale of 1-10 (1=Strongly Disagree, 10=Strongly Agree).", normal_style))
-    
-    elements.append(Spacer(1, 0.15*inch))
-    
-    # Attendance
-    elements.append(Paragraph("<b>Attendance Tracking</b>", heading_style))
-    elements.append(Paragraph(
-        "• Attendance is tracked daily for each student per faculty member and subject\n"
-        "• Monthly attendance records are automatically aggregated\n"
-        "• Academic Year calculation: July 1 - June 30 (resets annually)\n"
-        "• Students need >= 60% attendance to submit feedback\n"
-        "• Attendance percentage is displayed to students in real-time",
-        normal_style
-    ))
-    
-    elements.append(Spacer(1, 0.15*inch))
-    
-    # Academic Year
-    elements.append(Paragraph("<b>Academic Year System</b>", heading_style))
-    elements.append(Paragraph(
-        "The system follows the Indian academic year calendar:\n"
-        "• Academic Year runs from July 1 to June 30\n"
-        "• Leave balances reset automatically at the start of each academic year\n"
-        "• Reports and statistics are organized by academic year\n"
-        "• Year Level: FY (First Year), SY (Second Year), TY (Third Year), Final Year",
-        normal_style
-    ))
-    
-    elements.append(Spacer(1, 0.15*inch))
-    
-    # Technical Details
-    elements.append(Paragraph("<b>Technical Details</b>", heading_style))
-    elements.append(Paragraph(
-        "• Platform: Streamlit (Python web framework)\n"
-        "• Database: SQLite3\n"
-        "• Timezone: Asia/Kolkata (IST)\n"
-        "• Authentication: Username/Password with SHA256 hashing\n"
-        "• Data Format: ISO 8601 timestamps with timezone awareness",
-        normal_style
-    ))
-    
-    elements.append(Spacer(1, 0.15*inch))
-    
-    # Support & Contact
-    elements.append(Paragraph("<b>Support & Contact</b>", heading_style))
-    elements.append(Paragraph(
-        "For assistance or issues, please contact:\n"
-        "<b>Prof. Amir M. Usman Wagdarikar</b>\n"
-        "Assistant Professor, Electronics and Telecommunication Engineering\n"
-        "VVP Institute of Engineering and Technology, Solapur, Maharashtra, India",
-        normal_style
-    ))
-    
-    elements.append(Spacer(1, 0.2*inch))
-    elements.append(Paragraph(f"<i>Documentation generated on {datetime.now(ZoneInfo('Asia/Kolkata')).strftime('%Y-%m-%d %H:%M:%S')}</i>", normal_style))
-    
-    # Build PDF
-    doc.build(elements)
-    buffer.seek(0)
-    return buffer
-
-# Database setup
-DB_PATH = "feedback_streamlit.db"
-
-# Database connection helper
-# If `DATABASE_URL` environment variable is set (Postgres URI), the app will connect
-# to Postgres via psycopg2 and provide a thin cursor wrapper that accepts `?` placeholders
-# (converted to `%s` for psycopg2). Otherwise it uses local sqlite3.
-def db_connect():
-    """Return a DB-API connection. Uses Postgres if DATABASE_URL is set, else SQLite."""
-    import os
-    import sqlite3
-
-    # Make sure these module-level names exist in your file:
-    # DATABASE_URL (string or None), DB_PATH (path to sqlite file)
-    # e.g. DATABASE_URL = os.environ.get("DATABASE_URL")
-    #      DB_PATH = "feedback_streamlit.db"
-
-    if DATABASE_URL:
-        try:
-            import psycopg2
-        except Exception:
-            raise RuntimeError(
-                "psycopg2 is required when DATABASE_URL is set. "
-                "Add psycopg2-binary to requirements.txt"
-            )
-
-        from urllib.parse import quote_plus, urlparse, unquote_plus, parse_qsl, urlencode
-
-        # Start from the provided DATABASE_URL (or the hardcoded DSN you had)
-        # If you want to prefer the hardcoded one, replace DATABASE_URL below with your dsn variable.
-        dsn = DATABASE_URL.strip()
-
-        # If password contains special chars and the DSN has multiple '@', rebuild with encoded password
-        try:
-            if dsn.count('@') > 1 and '://' in dsn:
-                scheme, rest = dsn.split('://', 1)
-                last_at = rest.rfind('@')
-                auth = rest[:last_at]
-                host_part = rest[last_at+1:]
-                if ':' in auth:
-                    user, pwd = auth.split(':', 1)
-                    pwd_enc = quote_plus(unquote_plus(pwd))
-                    dsn = f"{scheme}://{user}:{pwd_enc}@{host_part}"
-        except Exception:
-            # If something goes wrong with reparsing, keep original dsn
-            pass
-
-        # Remove any channel_binding parameter (it often causes auth failures on some clients)
-        try:
-            parsed = urlparse(dsn)
-            query_pairs = dict(parse_qsl(parsed.query, keep_blank_values=True))
-
-            # Remove channel_binding if present
-            if 'channel_binding' in query_pairs:
-                query_pairs.pop('channel_binding', None)
-
-            # Ensure sslmode=require is present
-            if 'sslmode' not in query_pairs:
-                query_pairs['sslmode'] = 'require'
-
-            # If the host looks like Neon (ep-...), and options endpoint is not present, add it.
-            host = parsed.hostname or ''
-            # Extract endpoint id from host if it starts with 'ep-'
-            endpoint_id = None
-            if host.startswith('ep-'):
-                # host may be like ep-xxxxxxx-pooler.region.aws.neon.tech
-                # endpoint id is the first part up to the first dot or the first '-pooler' piece
-                endpoint_id = host.split('.', 1)[0]
-                # Normalize: if it contains suffixes like '-pooler', strip them
-                if '-pooler' in endpoint_id:
-                    endpoint_id = endpoint_id.split('-pooler', 1)[0]
-
-            # If endpoint_id was found and options not set, add it
-            if endpoint_id and 'options' not in query_pairs:
-                # options must be URL-encoded value like endpoint%3Dep-xxxx
-                # We'll place the unencoded value and let urlencode handle encoding
-                query_pairs['options'] = f"endpoint={endpoint_id}"
-
-            # Rebuild query and DSN
-            new_query = urlencode(query_pairs, doseq=True)
-            # Build new DSN preserving username/password/host/path
-            rebuilt = parsed._replace(query=new_query)
-            dsn = rebuilt.geturl()
-        except Exception:
-            # If parsing fails, fall back to original dsn (still better than nothing)
-            pass
-
-        # Now attempt to connect using the DSN string (psycopg2 accepts DSN string)
-        try:
-            conn = psycopg2.connect(dsn, connect_timeout=10)
-        except Exception:
-            # Re-raise so the caller (Streamlit) logs the full psycopg2 error
-            raise
-
-        # Thin wrapper to convert '?' -> '%s' for queries elsewhere in your app
-        class PGCursorWrapper:
-            def __init__(self, cur):
-                self._cur = cur
-
-            def execute(self, query, params=None):
-                if params is None:
-                    return self._cur.execute(query)
-                q = query.replace('?', '%s')
-                return self._cur.execute(q, params)
-
-            def executemany(self, query, seq_of_params):
-                q = query.replace('?', '%s')
-                return self._cur.executemany(q, seq_of_params)
-
-            def fetchall(self):
-                return self._cur.fetchall()
-
-            def fetchone(self):
-                return self._cur.fetchone()
-
-            def close(self):
-                return self._cur.close()
-
-            @property
-            def rowcount(self):
-                return self._cur.rowcount
-
-            @property
-            def lastrowid(self):
-                """Return last inserted id for Postgres by calling LASTVAL() on the cursor.
-
-                This mirrors sqlite3.Cursor.lastrowid for code that expects it. Returns None
-                if LASTVAL() is not available (e.g., no sequence used yet).
-                """
-                try:
-                    # Use the same cursor/connection session to fetch LASTVAL()
-                    self._cur.execute("SELECT LASTVAL()")
-                    row = self._cur.fetchone()
-                    return row[0] if row else None
-                except Exception:
-                    return None
-
-        class PGConnWrapper:
-            def __init__(self, conn):
-                self._conn = conn
-
-            def cursor(self):
-                return PGCursorWrapper(self._conn.cursor())
-
-            def commit(self):
-                return self._conn.commit()
-
-            def close(self):
-                return self._conn.close()
-
-            def rollback(self):
-                return self._conn.rollback()
-
-        return PGConnWrapper(conn)
-
-    else:
-        # SQLite for local development; allow multithreaded access
-        return sqlite3.connect(DB_PATH, check_same_thread=False)
-
-
-def get_table_columns(table_name):
-    """Return a list of column names for the given table in a portable way.
-
-    Uses PRAGMA for SQLite or information_schema for Postgres.
-    """
-    if DATABASE_URL:
-        conn = db_connect()
-        cur = conn.cursor()
-        try:
-            # information_schema.column_name returns lowercase names on Postgres
-            cur.execute('SELECT column_name FROM information_schema.columns WHERE table_name = %s ORDER BY ordinal_position', (table_name,))
-            rows = cur.fetchall()
-            cols = [r[0] for r in rows]
-        finally:
-            conn.close()
-        return cols
-    else:
-        conn = db_connect()
-        cur = conn.cursor()
-        try:
-            cur.execute(f"PRAGMA table_info({table_name})")
-            rows = cur.fetchall()
-            cols = [r[1] for r in rows]
-        finally:
-            conn.close()
-        return cols
-
-def init_database():
-    """Initialize SQLite database with all tables."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    
-    # Users table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY,
-            username TEXT UNIQUE NOT NULL,
-            password TEXT NOT NULL,
-            role TEXT NOT NULL DEFAULT 'student',
-            faculty_id INTEGER,
-            name TEXT,
-            branch TEXT,
-            class TEXT,
-            FOREIGN KEY(faculty_id) REFERENCES faculty(id)
-        )
-    ''')
-    
-    # Faculty table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS faculty (
-            id INTEGER PRIMARY KEY,
-            name TEXT NOT NULL,
-            department TEXT,
-            year_level TEXT DEFAULT 'FY'
-        )
-    ''')
-
-    # Optional table to map faculty to additional year levels they teach
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS faculty_year_level (
-            id INTEGER PRIMARY KEY,
-            faculty_id INTEGER NOT NULL,
-            year_level TEXT NOT NULL,
-            UNIQUE(faculty_id, year_level),
-            FOREIGN KEY(faculty_id) REFERENCES faculty(id)
-        )
-    ''')
-
-    # Assignment submissions table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS assignment_submissions (
-            id INTEGER PRIMARY KEY,
-            assignment_id INTEGER NOT NULL,
-            student_id INTEGER NOT NULL,
-            submission_file TEXT,
-            submitted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY(assignment_id) REFERENCES faculty_resources(id),
-            FOREIGN KEY(student_id) REFERENCES users(id)
-        )
-    ''')
-
-    conn.commit()
-    # Create useful indexes to speed up common queries (works on both SQLite and Postgres)
-    try:
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_test_attempts_submitted_at ON test_attempts(submitted_at)')
-    except Exception:
-        pass
-    try:
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_feedback_created_at ON feedback(created_at)')
-    except Exception:
-        pass
-    try:
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_subjects_year_level ON subjects(year_level)')
-    except Exception:
-        pass
-    try:
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_faculty_department ON faculty(department)')
-    except Exception:
-        pass
-    try:
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_role ON users(role)')
-    except Exception:
-        pass
-    try:
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_daily_ler_date ON daily_ler(date)')
-    except Exception:
-        pass
-    try:
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_daily_attendance_date ON daily_attendance(date)')
-    except Exception:
-        pass
-    conn.commit()
-
-    # Attendance tracking table (monthly)
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS attendance (
-            id INTEGER PRIMARY KEY,
-            student_id INTEGER NOT NULL,
-            faculty_id INTEGER NOT NULL,
-            subject_id INTEGER NOT NULL,
-            month INTEGER NOT NULL,
-            year INTEGER NOT NULL,
-            academic_year TEXT,
-            classes_attended INTEGER DEFAULT 0,
-            total_classes INTEGER DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY(student_id) REFERENCES users(id),
-            FOREIGN KEY(faculty_id) REFERENCES faculty(id),
-            FOREIGN KEY(subject_id) REFERENCES subjects(id),
-            UNIQUE(student_id, faculty_id, subject_id, month, academic_year)
-        )
-    ''')
-    conn.commit()
-
-    # No default subjects are seeded. Subjects should be added by admin via the Manage Subjects page.
-    # Existing faculty_subject mappings are left unchanged.
-    # Additional tables: feedback scheduling, daily attendance, tests and related tables
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS feedback_schedule (
-            id INTEGER PRIMARY KEY,
-            start_ts TIMESTAMP NOT NULL,
-            end_ts TIMESTAMP NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS daily_attendance (
-            id INTEGER PRIMARY KEY,
-            student_id INTEGER NOT NULL,
-            faculty_id INTEGER NOT NULL,
-            subject_id INTEGER NOT NULL,
-            date DATE NOT NULL,
-            present INTEGER DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(student_id, faculty_id, subject_id, date),
-            FOREIGN KEY(student_id) REFERENCES users(id),
-            FOREIGN KEY(faculty_id) REFERENCES faculty(id),
-            FOREIGN KEY(subject_id) REFERENCES subjects(id)
-        )
-    ''')
-
-    # Daily lecture entry (Daily LER) recorded by faculty
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS daily_ler (
-            id INTEGER PRIMARY KEY,
-            faculty_id INTEGER NOT NULL,
-            subject_id INTEGER NOT NULL,
-            date DATE NOT NULL,
-            time TEXT,
-            topic TEXT,
-            lecture_number TEXT,
-            percent_syllabus REAL,
-            total_present INTEGER,
-            absent_roll_numbers TEXT,
-            sign TEXT,
-            remark TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY(faculty_id) REFERENCES faculty(id),
-            FOREIGN KEY(subject_id) REFERENCES subjects(id)
-        )
-    ''')
-
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS tests (
-            id INTEGER PRIMARY KEY,
-            faculty_id INTEGER NOT NULL,
-            subject_id INTEGER NOT NULL,
-            title TEXT,
-            description TEXT,
-            start_ts TIMESTAMP,
-            end_ts TIMESTAMP,
-            proctored INTEGER DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY(faculty_id) REFERENCES faculty(id),
-            FOREIGN KEY(subject_id) REFERENCES subjects(id)
-        )
-    ''')
-
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS test_questions (
-            id INTEGER PRIMARY KEY,
-            test_id INTEGER NOT NULL,
-            question_text TEXT,
-            choices TEXT,
-            correct_choice INTEGER,
-            marks INTEGER DEFAULT 1,
-            FOREIGN KEY(test_id) REFERENCES tests(id)
-        )
-    ''')
-
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS test_attempts (
-            id INTEGER PRIMARY KEY,
-            test_id INTEGER NOT NULL,
-            student_id INTEGER NOT NULL,
-            answers TEXT,
-            score REAL,
-            started_at TIMESTAMP,
-            submitted_at TIMESTAMP,
-            FOREIGN KEY(test_id) REFERENCES tests(id),
-            FOREIGN KEY(student_id) REFERENCES users(id)
-        )
-    ''')
-
-    # Notices table: Admin and Faculty can post notices for students
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS notices (
-            id INTEGER PRIMARY KEY,
-            title TEXT NOT NULL,
-            content TEXT NOT NULL,
-            target_branch TEXT,
-            target_class TEXT,
-            created_by_role TEXT,
-            created_by_id INTEGER,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-
-    # Faculty leaves: track leaves requested / taken by faculty
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS faculty_leaves (
-            id INTEGER PRIMARY KEY,
-            faculty_id INTEGER NOT NULL,
-            leave_type TEXT NOT NULL,
-            start_date DATE NOT NULL,
-            end_date DATE NOT NULL,
-            is_half_day INTEGER DEFAULT 0,
-            days_count INTEGER DEFAULT 1,
-            alt_faculty TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY(faculty_id) REFERENCES faculty(id)
-        )
-    ''')
-
-    conn.commit()
-    
-    # Add default users if empty
-    cursor.execute("SELECT COUNT(*) FROM users")
-    if cursor.fetchone()[0] == 0:
-        def hash_password(pwd):
-            return hashlib.sha256(pwd.encode()).hexdigest()
-        
-        cursor.execute('INSERT INTO users (username, password, role) VALUES (?, ?, ?)',
-                      ('admin', hash_password('admin123'), 'admin'))
-        cursor.execute('INSERT INTO users (username, password, role, faculty_id) VALUES (?, ?, ?, ?)',
-                      ('rajesh_kumar', hash_password('faculty123'), 'faculty', 1))
-        cursor.execute('INSERT INTO users (username, password, role, faculty_id) VALUES (?, ?, ?, ?)',
-                      ('anita_singh', hash_password('faculty123'), 'faculty', 2))
-        cursor.execute('INSERT INTO users (username, password, role) VALUES (?, ?, ?)',
-                      ('student', hash_password('student123'), 'student'))
-        conn.commit()
-    
-    # Ensure users table has attendance and has_access columns (for existing DBs)
-    cols = get_table_columns('users')
-    if 'attendance' not in cols:
-        try:
-            cursor.execute("ALTER TABLE users ADD COLUMN attendance INTEGER DEFAULT 0")
-        except Exception:
-            pass
-    if 'has_access' not in cols:
-        try:
-            cursor.execute("ALTER TABLE users ADD COLUMN has_access INTEGER DEFAULT 0")
-        except Exception:
-            pass
-    if 'name' not in cols:
-        try:
-            cursor.execute("ALTER TABLE users ADD COLUMN name TEXT")
-        except Exception:
-            pass
-    if 'branch' not in cols:
-        try:
-            cursor.execute("ALTER TABLE users ADD COLUMN branch TEXT")
-        except Exception:
-            pass
-    if 'class' not in cols:
-        try:
-            cursor.execute("ALTER TABLE users ADD COLUMN class TEXT")
-        except Exception:
-            pass
-    if 'roll_number' not in cols:
-        try:
-            cursor.execute("ALTER TABLE users ADD COLUMN roll_number TEXT")
-        except Exception:
-            pass
-    conn.commit()
-    conn.close()
-
-    # If using a Postgres DB, ensure common tables have sequences and id defaults
-    if DATABASE_URL:
-        try:
-            for t in ['users', 'faculty', 'faculty_year_level', 'faculty_resources', 'daily_ler', 'tests', 'test_questions', 'test_attempts', 'notices', 'faculty_leaves', 'subjects', 'feedback_schedule']:
-                try:
-                    ensure_postgres_sequence(t)
-                except Exception:
-                    pass
-        except Exception:
-            # Do not crash application init if sequence setup fails; it's a best-effort fix
-            pass
-
-
-def ensure_postgres_sequence(table_name):
-    """Ensure Postgres serial sequence for table_name is set to max(id) to avoid duplicate-key on insert.
-
-    This is a no-op when not running against Postgres (DATABASE_URL not set).
-    """
-    if not DATABASE_URL:
-        return
-    try:
-        import re
-        conn = db_connect()
-        cur = conn.cursor()
-        # First try to get the sequence linked to the serial column
-        cur.execute("SELECT pg_get_serial_sequence(%s, %s)", (table_name, 'id'))
-        seq = None
-        try:
-            seq = cur.fetchone()[0]
-        except Exception:
-            seq = None
-
-        if not seq:
-            # No serial sequence associated (e.g. table created without serial). Create one.
-            # Sanitize table_name to avoid accidental SQL injection risk for identifiers
-            safe_table = re.sub('[^0-9a-zA-Z_]', '', table_name)
-            seq_name = f"{safe_table}_id_seq"
-            try:
-                cur.execute(f"CREATE SEQUENCE IF NOT EXISTS {seq_name}")
-            except Exception:
-                # fall back if creation fails
-                pass
-            try:
-                cur.execute(f"ALTER SEQUENCE {seq_name} OWNED BY {safe_table}.id")
-            except Exception:
-                pass
-            try:
-                cur.execute(f"ALTER TABLE {safe_table} ALTER COLUMN id SET DEFAULT nextval('{seq_name}')")
-            except Exception:
-                pass
-            # Now set seq to created sequence name for sync below
-            seq = seq_name
-
-        if seq:
-            # Sync sequence to max(id) to avoid duplicates (true -> is_called)
-            try:
-                cur.execute(f"SELECT setval('{seq}', COALESCE((SELECT MAX(id) FROM {table_name}), 1), true)")
-                conn.commit()
-            except Exception:
-                # ignore setval errors
-                pass
-        conn.close()
-    except Exception:
-        try:
-            conn.close()
-        except Exception:
-            pass
-
-    # Ensure feedback table exists with up to 10 question columns (backfill/alter for older DBs)
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS feedback (
-            id INTEGER PRIMARY KEY,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            student_name TEXT,
-            faculty_id INTEGER,
-            subject_id INTEGER,
-            year_level TEXT,
-            q1 INTEGER,
-            q2 INTEGER,
-            q3 INTEGER,
-            q4 INTEGER,
-            q5 INTEGER,
-            q6 INTEGER,
-            q7 INTEGER,
-            q8 INTEGER,
-            q9 INTEGER,
-            q10 INTEGER,
-            overall_rating INTEGER,
-            comments TEXT,
-            FOREIGN KEY(faculty_id) REFERENCES faculty(id),
-            FOREIGN KEY(subject_id) REFERENCES subjects(id)
-        )
-    ''')
-    conn.commit()
-
-    # Add missing columns for older DBs (ensure q1..q10 and rating/comment fields exist)
-    existing_cols = get_table_columns('feedback')
-    required_cols = {
-        'student_name': 'TEXT',
-        'faculty_id': 'INTEGER',
-        'year_level': 'TEXT',
-        'q1': 'INTEGER', 'q2': 'INTEGER', 'q3': 'INTEGER', 'q4': 'INTEGER', 'q5': 'INTEGER',
-        'q6': 'INTEGER', 'q7': 'INTEGER', 'q8': 'INTEGER', 'q9': 'INTEGER', 'q10': 'INTEGER',
-        'overall_rating': 'INTEGER',
-        'comments': 'TEXT'
-    }
-    for col, coltype in required_cols.items():
-        if col not in existing_cols:
-            try:
-                cursor.execute(f'ALTER TABLE feedback ADD COLUMN {col} {coltype}')
-                conn.commit()
-            except Exception:
-                # If ALTER fails (e.g., read-only DB), ignore and continue
-                pass
-    conn.close()
-
-def hash_password(password):
-    """Hash password using SHA256."""
-    return hashlib.sha256(password.encode()).hexdigest()
-
-
-def reset_user_password_with_roll(username, roll_number, new_password):
-    """Reset a user's password after verifying their roll number.
-    Returns True on success, False otherwise."""
-    if not username or not roll_number or not new_password:
-        return False
-    conn = db_connect()
-    cursor = conn.cursor()
-    try:
-        cursor.execute('SELECT id FROM users WHERE username = ? AND roll_number = ? AND role = ?', (username, roll_number, 'student'))
-        row = cursor.fetchone()
-        if not row:
-            # Try any role match if student match not found
-            cursor.execute('SELECT id FROM users WHERE username = ? AND roll_number = ?', (username, roll_number))
-            row = cursor.fetchone()
-            if not row:
-                conn.close()
-                return False
-
-        uid = row[0]
-        cursor.execute('UPDATE users SET password = ? WHERE id = ?', (hash_password(new_password), uid))
-        conn.commit()
-        conn.close()
-        return True
-    except Exception:
-        conn.close()
-        return False
-
-
-def safe_rerun():
-    """Try to rerun the Streamlit app. Fallbacks if API unavailable."""
-    try:
-        # Preferred API (may not exist in some streamlit builds)
-        st.experimental_rerun()
-        return
-    except Exception:
-        pass
-
-    try:
-        # Another possible API alias used in some versions
-        st.rerun()
-        return
-    except Exception:
-        pass
-
-    # Fallback: tweak query params to force a reload
-    try:
-        params = st.experimental_get_query_params()
-        params['_refresh'] = datetime.now().timestamp()
-        st.experimental_set_query_params(**params)
-        return
-    except Exception:
-        pass
-
-    # Last resort: toggle a session_state flag and stop
-    st.session_state['_rerun_toggle'] = not st.session_state.get('_rerun_toggle', False)
-    st.stop()
-
-def verify_login(username, password):
-    """Verify user login credentials."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute('SELECT id, role FROM users WHERE username = ? AND password = ?',
-                  (username, hash_password(password)))
-    result = cursor.fetchone()
-    conn.close()
-    return result
-
-def get_faculty_list():
-    """Get all faculty members."""
-    @st.cache_data(ttl=300)
-    def _cached():
-        conn = db_connect()
-        cursor = conn.cursor()
-        cursor.execute('SELECT id, name, department, year_level FROM faculty ORDER BY name')
-        faculties = cursor.fetchall()
-        conn.close()
-        return faculties
-
-    return _cached()
-
-
-def get_branches():
-    """Return distinct engineering branches (department values)."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute("SELECT DISTINCT department FROM faculty WHERE department IS NOT NULL ORDER BY department")
-    branches = [row[0] for row in cursor.fetchall()]
-    conn.close()
-    return branches
-
-
-def get_year_levels():
-    """Return distinct year levels."""
-    return ['FY', 'SY', 'TY', 'Final Year']
-
-
-def get_faculties_by_branch(branch):
-    """Get faculties filtered by branch/department."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute('SELECT id, name, department, year_level FROM faculty WHERE department = ? ORDER BY name', (branch,))
-    faculties = cursor.fetchall()
-    conn.close()
-    return faculties
-
-
-def get_faculties_by_year(year_level):
-    """Get faculties filtered by year level."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute('SELECT id, name, department, year_level FROM faculty WHERE year_level = ? ORDER BY name', (year_level,))
-    faculties = cursor.fetchall()
-    conn.close()
-    return faculties
-
-
-def get_faculties_by_branch_and_year(branch, year_level):
-    """Get faculties filtered by both branch and year level."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    # Check faculty_year_level table for year level assignment
-    cursor.execute('''
-        SELECT DISTINCT fac.id, fac.name, fac.department, fac.year_level 
-        FROM faculty fac
-        LEFT JOIN faculty_year_level fyl ON fac.id = fyl.faculty_id
-        WHERE fac.department = ? AND (fyl.year_level = ? OR fac.year_level = ?)
-        ORDER BY fac.name
-    ''', (branch, year_level, year_level))
-    faculties = cursor.fetchall()
-    conn.close()
-    return faculties
-
-
-def get_subjects_by_year(year_level):
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute('SELECT id, name, year_level, department, code FROM subjects WHERE year_level = ? ORDER BY name', (year_level,))
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
-
-
-def get_faculties_by_subject(subject_id, branch=None, year_level=None):
-    conn = db_connect()
-    cursor = conn.cursor()
-    query = '''
-        SELECT DISTINCT fac.id, fac.name, fac.department, fac.year_level
-        FROM faculty fac
-        JOIN faculty_subject fs ON fac.id = fs.faculty_id
-        LEFT JOIN faculty_year_level fyl ON fac.id = fyl.faculty_id
-        WHERE fs.subject_id = ?
-    '''
-    params = [subject_id]
-    if year_level:
-        query += ' AND (fyl.year_level = ? OR fac.year_level = ?)'
-        params.append(year_level)
-        params.append(year_level)
-    if branch and branch != 'All':
-        query += ' AND fac.department = ?'
-        params.append(branch)
-    query += ' ORDER BY fac.name'
-    cursor.execute(query, tuple(params))
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
-
-def update_faculty_year_level(faculty_id, new_year_level):
-    """Update faculty's primary year level."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute('UPDATE faculty SET year_level = ? WHERE id = ?', (new_year_level, faculty_id))
-    conn.commit()
-    conn.close()
-
-def add_faculty_year_level(faculty_id, year_level):
-    """Add a year level assignment to faculty."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    try:
-        # Ensure Postgres sequence exists and is synced for faculty_year_level
-        ensure_postgres_sequence('faculty_year_level')
-        cursor.execute('INSERT INTO faculty_year_level (faculty_id, year_level) VALUES (?, ?)', 
-                      (faculty_id, year_level))
-        conn.commit()
-    except sqlite3.IntegrityError:
-        pass  # Already exists
-    conn.close()
-
-def get_faculty_year_levels(faculty_id):
-    """Get all year levels a faculty teaches."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    try:
-        cursor.execute('SELECT year_level FROM faculty_year_level WHERE faculty_id = ? ORDER BY year_level', (faculty_id,))
-        rows = cursor.fetchall()
-    except Exception:
-        # Table might not exist or other DB issue; return empty list
-        rows = []
-    conn.close()
-    return [r[0] for r in rows] if rows else []
-
-def remove_faculty_year_level(faculty_id, year_level):
-    """Remove a year level assignment from faculty."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute('DELETE FROM faculty_year_level WHERE faculty_id = ? AND year_level = ?', 
-                  (faculty_id, year_level))
-    conn.commit()
-    conn.close()
-
-def get_all_faculty():
-    """Get all faculty with their details."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute('SELECT id, name, department, year_level FROM faculty ORDER BY name')
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
-
-def calculate_credit_progress(completed, semester, required):
-    """Calculate total credits after this semester and percentage progress.
-
-    Returns a tuple (total_after_semester, percent_complete).
-    """
-    try:
-        completed = float(completed)
-        semester = float(semester)
-        required = float(required)
-    except Exception:
-        return (0, 0.0)
-
-    total_after = completed + semester
-    percent = (total_after / required) * 100 if required else 0.0
-    return (int(total_after), float(percent))
-
-def add_faculty_resource(faculty_id, subject_id, resource_type, filename, file_path, deadline=None):
-    """Insert a new assignment or notes resource."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    try:
-        ensure_postgres_sequence('faculty_resources')
-        cursor.execute('''
-            INSERT INTO faculty_resources (faculty_id, subject_id, resource_type, filename, file_path, deadline)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (faculty_id, subject_id, resource_type, filename, file_path, deadline))
-        conn.commit()
-        rid = cursor.lastrowid
-        conn.close()
-        return rid
-    except Exception as e:
-        conn.close()
-        return None
-
-def get_faculty_resources(faculty_id, subject_id=None, resource_type=None):
-    """Get resources uploaded by a faculty member."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    query = 'SELECT id, subject_id, resource_type, filename, uploaded_at, deadline FROM faculty_resources WHERE faculty_id = ?'
-    params = [faculty_id]
-    if subject_id:
-        query += ' AND subject_id = ?'
-        params.append(subject_id)
-    if resource_type:
-        query += ' AND resource_type = ?'
-        params.append(resource_type)
-    query += ' ORDER BY uploaded_at DESC'
-    cursor.execute(query, tuple(params))
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
-
-def get_subject_resources_for_student(year_level, department, resource_type=None):
-    """Get resources (assignments/notes) for a student's year level and department."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    query = '''
-        SELECT fr.id, fr.filename, fr.resource_type, s.name, f.name, fr.uploaded_at, fr.deadline
-        FROM faculty_resources fr
-        JOIN subjects s ON fr.subject_id = s.id
-        JOIN faculty f ON fr.faculty_id = f.id
-        WHERE s.year_level = ? AND s.department = ?
-    '''
-    params = [year_level, department]
-    if resource_type:
-        query += ' AND fr.resource_type = ?'
-        params.append(resource_type)
-    query += ' ORDER BY fr.uploaded_at DESC'
-    cursor.execute(query, tuple(params))
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
-
-def delete_subject(subject_id):
-    """Delete a subject and its faculty_subject mappings."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    try:
-        cursor.execute('DELETE FROM faculty_subject WHERE subject_id = ?', (subject_id,))
-        cursor.execute('DELETE FROM subjects WHERE id = ?', (subject_id,))
-        conn.commit()
-        conn.close()
-        return True
-    except Exception:
-        conn.close()
-        return False
-
-def submit_feedback(student_name, faculty_id, subject_id, year_level, q1, q2, q3, q4, q5, q6, q7, q8, q9, q10, overall, comments):
-    """Submit feedback to database with subject tracking (stores up to 10 question ratings)."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO feedback (student_name, faculty_id, subject_id, year_level, q1, q2, q3, q4, q5, q6, q7, q8, q9, q10, overall_rating, comments)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (student_name or 'Anonymous', faculty_id, subject_id, year_level, q1, q2, q3, q4, q5, q6, q7, q8, q9, q10, overall, comments))
-    conn.commit()
-    conn.close()
-    return True
-
-def get_all_feedback():
-    """Get all feedback with faculty names and the specific subject feedback was about."""
-    @st.cache_data(ttl=300)
-    def _cached():
-        conn = db_connect()
-        cursor = conn.cursor()
-        cursor.execute('''
-             SELECT f.id, f.created_at, fac.name, fac.department, fac.year_level, f.student_name,
-                 f.q1, f.q2, f.q3, f.q4, f.q5, f.q6, f.q7, f.q8, f.q9, f.q10, f.overall_rating, f.comments,
-                 COALESCE(s.name, 'Not Specified') as subject
-            FROM feedback f
-            JOIN faculty fac ON f.faculty_id = fac.id
-            LEFT JOIN subjects s ON f.subject_id = s.id
-            ORDER BY f.created_at DESC
-        ''')
-        feedbacks = cursor.fetchall()
-        conn.close()
-        return feedbacks
-
-    return _cached()
-
-def get_faculty_stats():
-    """Get statistics by faculty."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT fac.name, fac.department, fac.year_level, COUNT(f.id) as count, AVG(f.overall_rating) as avg_rating
-        FROM feedback f
-        JOIN faculty fac ON f.faculty_id = fac.id
-        GROUP BY f.faculty_id, fac.name, fac.department, fac.year_level
-        ORDER BY fac.name
-    ''')
-    stats = cursor.fetchall()
-    conn.close()
-    return stats
-
-
-def get_user_by_username(username):
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute('SELECT id, username, role, attendance, has_access FROM users WHERE username = ?', (username,))
-    user = cursor.fetchone()
-    conn.close()
-    return user
-
-
-def get_db_connection():
-    """Compatibility helper for code that expects this function name."""
-    return db_connect()
-
-def get_all_students():
-    @st.cache_data(ttl=300)
-    def _cached():
-        conn = db_connect()
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, username, attendance, has_access FROM users WHERE role = 'student' ORDER BY username")
-        rows = cursor.fetchall()
-        conn.close()
-        return rows
-
-    return _cached()
-
-
-def set_student_access(user_id, value):
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute('UPDATE users SET has_access = ? WHERE id = ?', (1 if value else 0, user_id))
-    conn.commit()
-    conn.close()
-
-
-def update_student_attendance(user_id, attendance):
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute('UPDATE users SET attendance = ? WHERE id = ?', (int(attendance), user_id))
-    conn.commit()
-    conn.close()
-
-def get_faculty_by_user(faculty_user_id):
-    """Get faculty record linked to a faculty user account."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute('SELECT faculty_id FROM users WHERE id = ? AND role = ?', (faculty_user_id, 'faculty'))
-    result = cursor.fetchone()
-    conn.close()
-    return result[0] if result else None
-
-def get_faculty_details(faculty_user_id):
-    """Get complete faculty details including department/branch."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute('SELECT u.faculty_id, f.name, f.department FROM users u JOIN faculty f ON u.faculty_id = f.id WHERE u.id = ? AND u.role = ?', (faculty_user_id, 'faculty'))
-    result = cursor.fetchone()
-    conn.close()
-    return result  # Returns (faculty_id, name, department) or None
-
-def get_faculty_subjects(faculty_id):
-    """Get subjects taught by a faculty member."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute('''SELECT s.id, s.name, s.year_level FROM subjects s
-                      JOIN faculty_subject fs ON s.id = fs.subject_id
-                      WHERE fs.faculty_id = ? ORDER BY s.year_level, s.name''', (faculty_id,))
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
-
-def get_students_by_year_and_branch(year_level=None, branch=None):
-    """Get all students (can filter by year/branch if stored in users table)."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, username FROM users WHERE role = 'student' ORDER BY username")
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
-
-def get_students_by_branch_and_class(branch=None, class_level=None):
-    """Get students filtered by branch and class/year level, including roll_number."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    query = "SELECT id, username, name, roll_number, branch, class FROM users WHERE role = 'student'"
-    params = []
-    
-    if branch and branch != "All":
-        query += " AND branch = ?"
-        params.append(branch)
-    if class_level and class_level != "All":
-        query += " AND class = ?"
-        params.append(class_level)
-    
-    query += " ORDER BY name"
-    cursor.execute(query, params)
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
-
-def save_attendance(student_id, faculty_id, subject_id, month, year, classes_attended, total_classes):
-    """Save or update student attendance record."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    # Compute academic year string from calendar month/year. Academic year runs from July 1 -> June 30.
-    try:
-        m = int(month)
-        y = int(year)
-    except Exception:
-        m = int(month) if month else 1
-        y = int(year) if year else datetime.now(ZoneInfo("Asia/Kolkata")).year
-
-    # Determine academic year start
-    if m >= 7:
-        ay_start = y
-        ay_end = y + 1
-    else:
-        ay_start = y - 1
-        ay_end = y
-    academic_year = f"{ay_start}-{ay_end}"
-
-    cursor.execute('''INSERT OR REPLACE INTO attendance 
-                      (student_id, faculty_id, subject_id, month, year, academic_year, classes_attended, total_classes, updated_at)
-                      VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)''',
-                   (student_id, faculty_id, subject_id, month, year, academic_year, classes_attended, total_classes))
-    conn.commit()
-    conn.close()
-
-def get_attendance_for_month(faculty_id, subject_id, month, year):
-    """Get all attendance records for a faculty's subject for a specific month."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    # Use academic_year mapping so that month/year are interpreted within the academic year (Jul-Jun)
-    try:
-        m = int(month)
-        y = int(year)
-    except Exception:
-        m = int(month) if month else 1
-        y = int(year) if year else datetime.now(ZoneInfo("Asia/Kolkata")).year
-
-    if m >= 7:
-        ay_start = y
-        ay_end = y + 1
-    else:
-        ay_start = y - 1
-        ay_end = y
-    academic_year = f"{ay_start}-{ay_end}"
-
-    cursor.execute('''SELECT student_id, classes_attended, total_classes FROM attendance
-                      WHERE faculty_id = ? AND subject_id = ? AND month = ? AND academic_year = ?
-                      ORDER BY student_id''',
-                   (faculty_id, subject_id, month, academic_year))
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
-
-def get_student_attendance_percentage(student_id):
-    """Calculate overall attendance percentage for a student."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute('''SELECT COALESCE(SUM(classes_attended), 0) as attended, COALESCE(SUM(total_classes), 0) as total
-                      FROM attendance WHERE student_id = ?''', (student_id,))
-    result = cursor.fetchone()
-    conn.close()
-    if result and result[1] > 0:
-        return round((result[0] / result[1]) * 100, 2)
-    return 0
-
-def get_attendance_by_year_and_branch(year_level=None, branch=None):
-    """Get all attendance records with student info, grouped by year/branch."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    query = '''SELECT u.id, u.username, a.classes_attended, a.total_classes, s.name, f.name as faculty_name, f.department
-               FROM attendance a
-               JOIN users u ON a.student_id = u.id
-               JOIN subjects s ON a.subject_id = s.id
-               JOIN faculty f ON a.faculty_id = f.id
-               WHERE 1=1'''
-    params = []
-    if year_level:
-        query += ' AND s.year_level = ?'
-        params.append(year_level)
-    if branch:
-        query += ' AND f.department = ?'
-        params.append(branch)
-    query += ' ORDER BY f.department, s.year_level, u.username'
-    cursor.execute(query, params)
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
-
-
-def get_monthly_attendance_rollup(faculty_id, subject_id, month, year):
-    """Compute a monthly attendance rollup from daily_attendance table for given faculty, subject, month/year."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    # We will count number of present days per student and total distinct dates recorded
-    month_prefix = f"{year:04d}-{month:02d}-"
-    cursor.execute('''SELECT student_id, SUM(present) as classes_attended, COUNT(DISTINCT date) as total_classes
-                      FROM daily_attendance
-                      WHERE faculty_id = ? AND subject_id = ? AND date LIKE ?
-                      GROUP BY student_id
-                      ORDER BY student_id''', (faculty_id, subject_id, month_prefix + '%'))
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
-
-
-def get_present_student_ids_for_date(faculty_id, subject_id, date_str):
-    """Return set of student_ids marked present for a given faculty/subject/date."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute('''SELECT student_id FROM daily_attendance WHERE faculty_id = ? AND subject_id = ? AND date = ? AND present = 1''', (faculty_id, subject_id, date_str))
-    rows = cursor.fetchall()
-    conn.close()
-    return set(r[0] for r in rows)
-
-
-def save_daily_ler(faculty_id, subject_id, date_str, time_str, topic, lecture_number, percent_syllabus, total_present, absent_roll_numbers, sign, remark):
-    """Save a Daily LER entry to the database."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    ensure_postgres_sequence('daily_ler')
-    cursor.execute('''INSERT INTO daily_ler (faculty_id, subject_id, date, time, topic, lecture_number, percent_syllabus, total_present, absent_roll_numbers, sign, remark)
-                      VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', (faculty_id, subject_id, date_str, time_str, topic, str(lecture_number), percent_syllabus, total_present, absent_roll_numbers, sign, remark))
-    conn.commit()
-    lid = cursor.lastrowid
-    conn.close()
-    return lid
-
-
-def get_daily_ler_for_faculty(faculty_id, date_from=None, date_to=None):
-    conn = db_connect()
-    cursor = conn.cursor()
-    if date_from and date_to:
-        cursor.execute('''SELECT dl.id, dl.faculty_id, dl.subject_id, dl.date, dl.time, dl.topic, dl.lecture_number, dl.percent_syllabus, dl.total_present, dl.absent_roll_numbers, dl.sign, dl.remark, dl.created_at, f.name, s.name
-                          FROM daily_ler dl
-                          JOIN faculty f ON dl.faculty_id = f.id
-                          JOIN subjects s ON dl.subject_id = s.id
-                          WHERE dl.faculty_id = ? AND dl.date BETWEEN ? AND ? ORDER BY dl.date DESC''', (faculty_id, date_from, date_to))
-    else:
-        cursor.execute('''SELECT dl.id, dl.faculty_id, dl.subject_id, dl.date, dl.time, dl.topic, dl.lecture_number, dl.percent_syllabus, dl.total_present, dl.absent_roll_numbers, dl.sign, dl.remark, dl.created_at, f.name, s.name
-                          FROM daily_ler dl
-                          JOIN faculty f ON dl.faculty_id = f.id
-                          JOIN subjects s ON dl.subject_id = s.id
-                          WHERE dl.faculty_id = ? ORDER BY dl.date DESC''', (faculty_id,))
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
-
-
-def get_all_daily_ler(date_from=None, date_to=None, faculty_id=None):
-    conn = db_connect()
-    cursor = conn.cursor()
-    query = '''SELECT dl.id, dl.faculty_id, f.name as faculty_name, dl.subject_id, s.name as subject_name, dl.date, dl.time, dl.topic, dl.lecture_number, dl.percent_syllabus, dl.total_present, dl.absent_roll_numbers, dl.sign, dl.remark, dl.created_at
-               FROM daily_ler dl
-               JOIN faculty f ON dl.faculty_id = f.id
-               JOIN subjects s ON dl.subject_id = s.id
-               WHERE 1=1'''
-    params = []
-    if faculty_id:
-        query += ' AND dl.faculty_id = ?'
-        params.append(faculty_id)
-    if date_from and date_to:
-        query += ' AND dl.date BETWEEN ? AND ?'
-        params.append(date_from)
-        params.append(date_to)
-    query += ' ORDER BY dl.date DESC'
-    cursor.execute(query, tuple(params))
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
-
-def get_all_faculty_with_users():
-    """Get all faculty members with their user info."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute('''SELECT f.id, f.name, f.department, u.username 
-                      FROM faculty f
-                      LEFT JOIN users u ON f.id = u.faculty_id AND u.role = 'faculty'
-                      ORDER BY f.name''')
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
-
-
-### New helper functions: feedback scheduling, daily attendance and tests ###
-def schedule_feedback(start_ts, end_ts):
-    """Admin: schedule feedback availability."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    # Ensure Postgres sequence exists for feedback_schedule when running against Postgres
-    try:
-        ensure_postgres_sequence('feedback_schedule')
-    except Exception:
-        pass
-    # Store ISO-8601 timezone-aware strings; start_ts/end_ts should be isoformat strings
-    cursor.execute('INSERT INTO feedback_schedule (start_ts, end_ts) VALUES (?, ?)', (start_ts, end_ts))
-    conn.commit()
-    # Clear cached feedback schedule and feedback lists
-    try:
-        st.cache_data.clear()
-    except Exception:
-        pass
-    conn.close()
-
-def get_current_feedback_schedule():
-    """Return the latest feedback schedule (start_ts, end_ts) or None."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute('SELECT start_ts, end_ts FROM feedback_schedule ORDER BY id DESC LIMIT 1')
-    row = cursor.fetchone()
-    conn.close()
-    return row
-
-def is_feedback_open(now_ts=None):
-    """Return True if there is an active feedback schedule covering now_ts (or current time)."""
-    if now_ts is None:
-        now_ts = datetime.now(ZoneInfo("Asia/Kolkata"))
-    sched = get_current_feedback_schedule()
-    if not sched:
-        return False
-    start_ts, end_ts = sched
-    try:
-        start = parse_iso_to_kolkata(start_ts) if isinstance(start_ts, str) or start_ts else None
-        end = parse_iso_to_kolkata(end_ts) if isinstance(end_ts, str) or end_ts else None
-    except Exception:
-        return False
-    return start <= now_ts <= end
-
-def save_daily_attendance(student_id, faculty_id, subject_id, date_str, present):
-    """Save or update daily attendance for a student on a date (YYYY-MM-DD)."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    # Try to update first
-    cursor.execute('''UPDATE daily_attendance SET present = ?, created_at = CURRENT_TIMESTAMP
-                      WHERE student_id = ? AND faculty_id = ? AND subject_id = ? AND date = ?''',
-                   (1 if present else 0, student_id, faculty_id, subject_id, date_str))
-    if cursor.rowcount == 0:
-        # No row updated, insert new
-        cursor.execute('''INSERT INTO daily_attendance (student_id, faculty_id, subject_id, date, present, created_at)
-                          VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)''',
-                       (student_id, faculty_id, subject_id, date_str, 1 if present else 0))
-    conn.commit()
-    conn.close()
-
-def get_daily_attendance_for_student(student_id, date_str=None):
-    """Return daily attendance records for a student; optionally filter by date (YYYY-MM-DD)."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    if date_str:
-        cursor.execute('SELECT faculty_id, subject_id, date, present FROM daily_attendance WHERE student_id = ? AND date = ? ORDER BY date DESC', (student_id, date_str))
-    else:
-        cursor.execute('SELECT faculty_id, subject_id, date, present FROM daily_attendance WHERE student_id = ? ORDER BY date DESC LIMIT 30', (student_id,))
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
-
-def create_test(faculty_id, subject_id, title, description, start_ts=None, end_ts=None, proctored=False):
-    conn = db_connect()
-    cursor = conn.cursor()
-    # Ensure start_ts and end_ts, when provided, are stored as timezone-aware ISO strings (Asia/Kolkata)
-    try:
-        if start_ts:
-            dt = start_ts if isinstance(start_ts, datetime) else datetime.fromisoformat(start_ts)
-            if dt.tzinfo is None:
-                dt = dt.replace(tzinfo=ZoneInfo("Asia/Kolkata"))
-            start_ts_to_store = dt.isoformat()
-        else:
-            start_ts_to_store = None
-    except Exception:
-        start_ts_to_store = start_ts
-    try:
-        if end_ts:
-            dt2 = end_ts if isinstance(end_ts, datetime) else datetime.fromisoformat(end_ts)
-            if dt2.tzinfo is None:
-                dt2 = dt2.replace(tzinfo=ZoneInfo("Asia/Kolkata"))
-            end_ts_to_store = dt2.isoformat()
-        else:
-            end_ts_to_store = None
-    except Exception:
-        end_ts_to_store = end_ts
-
-    ensure_postgres_sequence('tests')
-    cursor.execute('''INSERT INTO tests (faculty_id, subject_id, title, description, start_ts, end_ts, proctored)
-                      VALUES (?, ?, ?, ?, ?, ?, ?)''', (faculty_id, subject_id, title, description, start_ts_to_store, end_ts_to_store, 1 if proctored else 0))
-    conn.commit()
-    tid = cursor.lastrowid
-    conn.close()
-    return tid
-
-def add_test_question(test_id, question_text, choices_list, correct_index, marks=1):
-    conn = db_connect()
-    cursor = conn.cursor()
-    choices_json = json.dumps(choices_list)
-    ensure_postgres_sequence('test_questions')
-    cursor.execute('''INSERT INTO test_questions (test_id, question_text, choices, correct_choice, marks)
-                      VALUES (?, ?, ?, ?, ?)''', (test_id, question_text, choices_json, int(correct_index), marks))
-    conn.commit()
-    qid = cursor.lastrowid
-    conn.close()
-    return qid
-
-def get_tests_for_student(student_id):
-    """Return tests relevant for a student by matching subject.year_level and department to student's class/branch.
-    Only returns tests whose start_ts/end_ts exist (not filtering by time here)."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute('SELECT branch, class FROM users WHERE id = ?', (student_id,))
-    row = cursor.fetchone()
-    if not row:
-        conn.close()
-        return []
-    branch, class_level = row
-    # expose student_branch variable name for compatibility with other code
-    student_branch = branch
-    # Normalize class_level to FY/SY/TY/Final Year
-    if class_level:
-        cls = str(class_level).strip()
-        if len(cls) == 1 and cls.isdigit():
-            class_level = 'FY' if cls == '1' else 'SY' if cls == '2' else 'TY' if cls == '3' else class_level
-        else:
-            # If class strings like 'FY', 'SY', 'TY' remain as-is
-            class_level = cls
-    # Filter tests by the student's branch/department and class/year level (mapped)
-    # student's class could be 'FY', 'SY', 'TY', 'Final Year'
-    year_map = {'FY': 'FY', 'SY': 'SY', 'TY': 'TY', 'Final Year': 'Final Year'}
-    student_year = year_map.get(class_level, None)
-    if student_branch and student_year:
-        cursor.execute('''SELECT t.id, t.title, t.description, t.start_ts, t.end_ts, t.proctored, s.name, s.year_level, s.department
-                          FROM tests t JOIN subjects s ON t.subject_id = s.id
-                          WHERE (s.department = ? OR s.department IS NULL OR s.department = '') AND (s.year_level = ? OR s.year_level IS NULL OR s.year_level = '')
-                          ORDER BY t.start_ts''', (student_branch, student_year))
-    else:
-        cursor.execute('''SELECT t.id, t.title, t.description, t.start_ts, t.end_ts, t.proctored, s.name, s.year_level, s.department
-                          FROM tests t JOIN subjects s ON t.subject_id = s.id
-                          ORDER BY t.start_ts''')
-    tests = cursor.fetchall()
-    conn.close()
-    return tests
-
-def get_test_questions(test_id):
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute('SELECT id, question_text, choices, correct_choice, marks FROM test_questions WHERE test_id = ? ORDER BY id', (test_id,))
-    rows = cursor.fetchall()
-    conn.close()
-    questions = []
-    for r in rows:
-        qid, text, choices_json, correct, marks = r
-        try:
-            choices = json.loads(choices_json)
-        except Exception:
-            choices = []
-        questions.append({'id': qid, 'text': text, 'choices': choices, 'correct': correct, 'marks': marks})
-    return questions
-
-def submit_test_attempt(test_id, student_id, answers_dict, started_at=None, submitted_at=None):
-    """answers_dict: {question_id: chosen_index}"""
-    questions = get_test_questions(test_id)
-    total_score = 0.0
-    for q in questions:
-        qid = q['id']
-        correct = q['correct']
-        marks = q.get('marks', 1)
-        chosen = answers_dict.get(str(qid)) or answers_dict.get(qid)
-        try:
-            if int(chosen) == int(correct):
-                total_score += marks
-        except Exception:
-            pass
-    conn = db_connect()
-    cursor = conn.cursor()
-    answers_json = json.dumps(answers_dict)
-    # Write a log entry before attempting insert (helps debug missing inserts)
-    try:
-        with open('attempts.log', 'a', encoding='utf-8') as lf:
-            lf.write(f"{datetime.now(ZoneInfo('Asia/Kolkata')).isoformat()} - SUBMIT START - test_id={test_id} student_id={student_id} answers={answers_json}\n")
-    except Exception:
-        pass
-
-    try:
-        ensure_postgres_sequence('test_attempts')
-        cursor.execute('''INSERT INTO test_attempts (test_id, student_id, answers, score, started_at, submitted_at)
-                          VALUES (?, ?, ?, ?, ?, ?)''', (test_id, student_id, answers_json, total_score, started_at, submitted_at))
-        conn.commit()
-        aid = cursor.lastrowid
-        try:
-            with open('attempts.log', 'a', encoding='utf-8') as lf:
-                lf.write(f"{datetime.now(ZoneInfo('Asia/Kolkata')).isoformat()} - SUBMIT SUCCESS - attempt_id={aid} score={total_score}\n")
-        except Exception:
-            pass
-        return {'attempt_id': aid, 'score': total_score}
-    except Exception as e:
-        try:
-            with open('attempts.log', 'a', encoding='utf-8') as lf:
-                lf.write(f"{datetime.now(ZoneInfo('Asia/Kolkata')).isoformat()} - SUBMIT ERROR - test_id={test_id} student_id={student_id} error={str(e)}\n")
-        except Exception:
-            pass
-        raise
-    finally:
-        conn.close()
-
-def get_test_attempts_for_student(student_id, test_id=None):
-    conn = db_connect()
-    cursor = conn.cursor()
-    if test_id:
-        cursor.execute('SELECT id, test_id, score, started_at, submitted_at FROM test_attempts WHERE student_id = ? AND test_id = ? ORDER BY submitted_at DESC', (student_id, test_id))
-    else:
-        cursor.execute('SELECT id, test_id, score, started_at, submitted_at FROM test_attempts WHERE student_id = ? ORDER BY submitted_at DESC', (student_id,))
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
-
-
-def get_test_attempts_for_test(test_id):
-    """Return all attempts for a given test id, joined with student username/name."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute('''SELECT ta.id, ta.test_id, ta.student_id, ta.answers, ta.score, ta.started_at, ta.submitted_at, u.username, u.name
-                      FROM test_attempts ta
-                      LEFT JOIN users u ON ta.student_id = u.id
-                      WHERE ta.test_id = ?
-                      ORDER BY ta.submitted_at DESC''', (test_id,))
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
-
-
-def create_notice(title, content, target_branch=None, target_class=None, created_by_role='admin', created_by_id=None):
-    conn = db_connect()
-    cursor = conn.cursor()
-    ensure_postgres_sequence('notices')
-    cursor.execute('''INSERT INTO notices (title, content, target_branch, target_class, created_by_role, created_by_id)
-                      VALUES (?, ?, ?, ?, ?, ?)''', (title, content, target_branch, target_class, created_by_role, created_by_id))
-    conn.commit()
-    nid = cursor.lastrowid
-    conn.close()
-    return nid
-
-
-def get_notices(target_branch=None, target_class=None, limit=10):
-    conn = db_connect()
-    cursor = conn.cursor()
-    if target_branch and target_class:
-        cursor.execute('''SELECT id, title, content, target_branch, target_class, created_by_role, created_by_id, created_at
-                          FROM notices WHERE (target_branch IS NULL OR target_branch = ?) AND (target_class IS NULL OR target_class = ?)
-                          ORDER BY created_at DESC LIMIT ?''', (target_branch, target_class, limit))
-    elif target_branch:
-        cursor.execute('''SELECT id, title, content, target_branch, target_class, created_by_role, created_by_id, created_at
-                          FROM notices WHERE target_branch IS NULL OR target_branch = ? ORDER BY created_at DESC LIMIT ?''', (target_branch, limit))
-    else:
-        cursor.execute('''SELECT id, title, content, target_branch, target_class, created_by_role, created_by_id, created_at
-                          FROM notices ORDER BY created_at DESC LIMIT ?''', (limit,))
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
-
-
-def submit_faculty_leave(faculty_id, leave_type, start_date, end_date, is_half_day=False, days_count=1, alt_faculty=None):
-    conn = db_connect()
-    cursor = conn.cursor()
-    ensure_postgres_sequence('faculty_leaves')
-    cursor.execute('''INSERT INTO faculty_leaves (faculty_id, leave_type, start_date, end_date, is_half_day, days_count, alt_faculty)
-                      VALUES (?, ?, ?, ?, ?, ?, ?)''', (faculty_id, leave_type, start_date, end_date, 1 if is_half_day else 0, days_count, alt_faculty))
-    conn.commit()
-    lid = cursor.lastrowid
-    conn.close()
-    return lid
-
-
-def get_faculty_leaves(faculty_id=None):
-    conn = db_connect()
-    cursor = conn.cursor()
-    if faculty_id:
-        cursor.execute('''SELECT id, faculty_id, leave_type, start_date, end_date, is_half_day, days_count, alt_faculty, created_at
-                          FROM faculty_leaves WHERE faculty_id = ? ORDER BY created_at DESC''', (faculty_id,))
-    else:
-        cursor.execute('''SELECT id, faculty_id, leave_type, start_date, end_date, is_half_day, days_count, alt_faculty, created_at
-                          FROM faculty_leaves ORDER BY created_at DESC''')
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
-
-
-def get_faculty_leave_usage(faculty_id):
-    conn = db_connect()
-    cursor = conn.cursor()
-    # Compute current academic year range and only count leaves within it so balances reset each academic year
-    start_iso, end_iso, _ = get_academic_year_range_for_date()
-    cursor.execute('''SELECT leave_type, COALESCE(SUM(days_count), 0) as used_days
-                      FROM faculty_leaves
-                      WHERE faculty_id = ? AND created_at BETWEEN ? AND ?
-                      GROUP BY leave_type''', (faculty_id, start_iso, end_iso))
-    rows = cursor.fetchall()
-    conn.close()
-    usage = {r[0]: r[1] for r in rows}
-    return usage
-
-
-def get_all_subjects():
-    """Get all available subjects."""
-    # Cached read-heavy helper
-    @st.cache_data(ttl=300)
-    def _cached():
-        conn = db_connect()
-        cursor = conn.cursor()
-        cursor.execute('SELECT id, name, year_level, department, code FROM subjects ORDER BY year_level, name')
-        rows = cursor.fetchall()
-        conn.close()
-        return rows
-
-    return _cached()
-
-
-def get_academic_year_range_for_date(dt=None):
-    """Return (start_date_iso, end_date_iso, academic_year_str) for the academic year containing dt.
-    Academic year runs from July 1 to June 30 next year."""
-    if dt is None:
-        dt = datetime.now(ZoneInfo("Asia/Kolkata"))
-    # Ensure dt is date/datetime
-    if isinstance(dt, datetime):
-        cur_date = dt.date()
-    else:
-        cur_date = dt
-
-    year = cur_date.year
-    # If month >= July, academic year starts this year
-    if cur_date.month >= 7:
-        start_year = year
-        end_year = year + 1
-    else:
-        start_year = year - 1
-        end_year = year
-
-    start_date = datetime(start_year, 7, 1, tzinfo=ZoneInfo("Asia/Kolkata")).isoformat()
-    # End of academic year: June 30 at 23:59:59
-    end_date = datetime(end_year, 6, 30, 23, 59, 59, tzinfo=ZoneInfo("Asia/Kolkata")).isoformat()
-    academic_year = f"{start_year}-{end_year}"
-    return start_date, end_date, academic_year
-
-def get_faculty_subjects_with_ids(faculty_id):
-    """Get subject IDs assigned to a faculty."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute('SELECT subject_id FROM faculty_subject WHERE faculty_id = ?', (faculty_id,))
-    rows = cursor.fetchall()
-    conn.close()
-    return [row[0] for row in rows]
-
-def assign_subject_to_faculty(faculty_id, subject_id):
-    """Assign a subject to a faculty member."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    try:
-        cursor.execute('INSERT INTO faculty_subject (faculty_id, subject_id) VALUES (?, ?)', (faculty_id, subject_id))
-        conn.commit()
-        conn.close()
-        return True
-    except Exception:
-        conn.close()
-        return False
-
-def add_subject(name, year_level, department=None, code=None):
-    """Insert a new subject into the subjects table."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    # Ensure Postgres sequence exists for subjects (no-op on SQLite)
-    try:
-        ensure_postgres_sequence('subjects')
-    except Exception:
-        pass
-    try:
-        cursor.execute('INSERT INTO subjects (name, year_level, department, code) VALUES (?, ?, ?, ?)', (name, year_level, department, code))
-        conn.commit()
-        sid = cursor.lastrowid if hasattr(cursor, 'lastrowid') else None
-        # Clear cached subject/faculty lists so UI reflects new data quickly
-        try:
-            st.cache_data.clear()
-        except Exception:
-            pass
-        conn.close()
-        return sid
-    except sqlite3.IntegrityError:
-        # Known duplicate/constraint failure: return None so caller can show friendly message
-        conn.close()
-        # Clear caches to ensure UI consistency
-        try:
-            st.cache_data.clear()
-        except Exception:
-            pass
-        return None
-    except Exception:
-        # Re-raise unexpected exceptions so callers (UI) can show the real error
-        conn.close()
-        raise
-
-def remove_subject_from_faculty(faculty_id, subject_id):
-    """Remove a subject assignment from a faculty member."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    try:
-        cursor.execute('DELETE FROM faculty_subject WHERE faculty_id = ? AND subject_id = ?',
-                      (faculty_id, subject_id))
-        conn.commit()
-        conn.close()
-        return True
-    except Exception:
-        conn.close()
-        return False
-
-# Initialize database
-init_database()
-
-# Session state management
-if 'logged_in' not in st.session_state:
-    st.session_state.logged_in = False
-    st.session_state.username = None
-    st.session_state.role = None
-    st.session_state.user_id = None
-
-# Sidebar navigation
-with st.sidebar:
-    # Sidebar title kept concise now (main header moved to main page)
-    st.title("🎓 VVPIET Student LMS")
-    # Persistence warning for Streamlit Community Cloud deployments
-    if not DATABASE_URL:
-        st.warning(
-            "Using local SQLite database (`feedback_streamlit.db`).\n"
-            "On Streamlit Community Cloud this storage is ephemeral: registered users and uploads may disappear after app restarts or redeploys.\n"
-            "To persist data across restarts, configure an external database (e.g., Postgres) and set the `DATABASE_URL` environment variable in your app settings."
-        )
-    
-    if st.session_state.logged_in:
-        st.success(f"Logged in as: **{st.session_state.username}** ({st.session_state.role})")
-        
-        if st.button("🚪 Logout", use_container_width=True):
-            st.session_state.logged_in = False
-            st.session_state.username = None
-            st.session_state.role = None
-            safe_rerun()
-        
-        st.divider()
-        
-        # Navigation based on role
-        if st.session_state.role == 'student':
-            feedback_open = is_feedback_open()
-            # Student navigation: always show all tabs, but the feedback form itself is gated by feedback window
-            student_tabs = ["🏠 Dashboard", "📝 Submit Feedback", "📥 Download Resources", "📊 My Attendance", "💰 Credit Calculator", "🧪 Tests", "ℹ️ About"]
-            page = st.radio("Navigation", student_tabs)
-        elif st.session_state.role == 'faculty':
-            page = st.radio("Navigation", ["📅 Mark Attendance", "🧾 Daily Attendance", "📒 Daily LER", "📚 Upload Resources", "🧪 Create Test", "📄 Faculty Leaves", "ℹ️ About"])
-        else:  # admin
-            page = st.radio("Navigation", ["📊 Dashboard", "👥 Student Attendance", "📚 Manage Subjects", "👨‍🏫 Manage Faculty", "📈 Analytics", "📋 Export Data", "🗂️ Faculty Leaves", "🐛 Debug: Test Attempts", "ℹ️ About"])
-    else:
-        page = st.radio("Navigation", ["🔐 Login", "📝 Register"])
-
-# If a UI flow set `nav_to_page` (button click), honor it and navigate there
-if 'nav_to_page' in st.session_state:
-    page = st.session_state.pop('nav_to_page')
-
-# Main content area
-# Main page header (logo + college name), centered
-with st.container():
-    left_col, mid_col, right_col = st.columns([1, 6, 1])
-    with left_col:
-        st.image("college_logo.jpg", width=84)
-    with mid_col:
-        st.markdown('<div style="text-align:center; font-weight:bold; color:#8B3A3A; font-size:20px;">VVP institute of engineering and technology, Solapur, Maharashtra, India</div>', unsafe_allow_html=True)
-    st.markdown("---")
-
-if not st.session_state.logged_in:
-    if page == "🔐 Login":
-        st.title("🔐 Login")
-        
-        with st.form("login_form"):
-            username = st.text_input("Username")
-            password = st.text_input("Password", type="password")
-            submit = st.form_submit_button("Login", use_container_width=True)
-        
-        if submit:
-            result = verify_login(username, password)
-            if result:
-                st.session_state.logged_in = True
-                st.session_state.username = username
-                st.session_state.user_id = result[0]
-                st.session_state.role = result[1]
-                st.success("Login successful! 🎉")
-                safe_rerun()
-            else:
-                st.error("Invalid username or password ❌")
-        
-        # Demo credentials removed from the public main page for security.
-        # Administrators can provide credentials to users directly.
-        st.info("Contact your administrator to obtain login credentials.")
-
-        with st.expander("Forgot Password?"):
-            st.write("Reset your password by verifying your roll number.")
-            with st.form("forgot_password_form"):
-                fp_username = st.text_input("Username")
-                fp_roll = st.text_input("Roll Number / PRN")
-                fp_new = st.text_input("New Password", type="password")
-                fp_confirm = st.text_input("Confirm New Password", type="password")
-                fp_submit = st.form_submit_button("Reset Password")
-
-            if fp_submit:
-                if not fp_username or not fp_roll or not fp_new:
-                    st.error("Please provide username, roll number/PRN, and the new password.")
-                elif fp_new != fp_confirm:
-                    st.error("Passwords do not match.")
-                else:
-                    ok = reset_user_password_with_roll(fp_username.strip(), fp_roll.strip(), fp_new)
-                    if ok:
-                        st.success("Password reset successful. Please login with your new password.")
-                    else:
-                        st.error("Password reset failed. Ensure username and roll number/PRN match our records, or contact admin.")
-    
-    elif page == "📝 Register":
-        st.title("📝 Register")
-        
-        reg_type = st.radio("Select Registration Type:", ["Student", "Faculty"], horizontal=True)
-        
-        if reg_type == "Student":
-            st.subheader("Student Registration")
-            with st.form("student_register_form"):
-                name = st.text_input("Full Name *")
-                roll_number = st.text_input("Roll Number *")
-                new_username = st.text_input("Choose Username *")
-                new_password = st.text_input("Choose Password *", type="password")
-                confirm_password = st.text_input("Confirm Password *", type="password")
-                
-                branches = get_branches()
-                if not branches:
-                    branches = ["General"]
-                selected_branch = st.selectbox("Branch *", options=branches)
-                
-                class_options = ["FY", "SY", "TY", "Final Year"]
-                selected_class = st.selectbox("Class/Year Level *", options=class_options)
-                
-                submit = st.form_submit_button("Register as Student", use_container_width=True)
-            
-            if submit:
-                if not name or not roll_number or not new_username or not new_password:
-                    st.error("Please fill all required fields")
-                elif new_password != confirm_password:
-                    st.error("Passwords don't match!")
-                elif len(new_password) < 6:
-                    st.error("Password must be at least 6 characters")
-                else:
-                    conn = db_connect()
-                    cursor = conn.cursor()
-                    try:
-                        # Ensure users sequence/default exists on Postgres before inserting a new student
-                        ensure_postgres_sequence('users')
-                        cursor.execute('INSERT INTO users (username, password, role, name, roll_number, branch, class) VALUES (?, ?, ?, ?, ?, ?, ?)',
-                                      (new_username, hash_password(new_password), 'student', name, roll_number, selected_branch, selected_class))
-                        conn.commit()
-                        st.success("✓ Student registration successful! Please login.")
-                    except sqlite3.IntegrityError:
-                        st.error("Username already exists!")
-                    conn.close()
-        
-        else:  # Faculty registration
-            st.subheader("Faculty Registration")
-            
-            with st.form("faculty_register_form"):
-                name = st.text_input("Full Name *")
-                new_username = st.text_input("Choose Username *")
-                new_password = st.text_input("Choose Password *", type="password")
-                confirm_password = st.text_input("Confirm Password *", type="password")
-                
-                branches = get_branches()
-                if not branches:
-                    branches = ["General"]
-                selected_branch = st.selectbox("Department/Branch *", options=branches)
-                
-                # Add year level selection for faculty (allow multiple selections)
-                year_levels = get_year_levels()
-                if not year_levels:
-                    year_levels = ['FY', 'SY', 'TY', 'Final Year']
-                selected_year_levels = st.multiselect("Year Levels Teaching * (Select one or more)", options=year_levels)
-                
-                submit = st.form_submit_button("Register as Faculty", use_container_width=True)
-            
-            if submit:
-                if not name or not new_username or not new_password:
-                    st.error("Please fill all required fields")
-                elif new_password != confirm_password:
-                    st.error("Passwords don't match!")
-                elif len(new_password) < 6:
-                    st.error("Password must be at least 6 characters")
-                elif not selected_year_levels:
-                    st.error("Please select at least one year level")
-                else:
-                    conn = db_connect()
-                    cursor = conn.cursor()
-                    try:
-                        # Check if username already exists
-                        cursor.execute('SELECT id FROM users WHERE username = ?', (new_username,))
-                        if cursor.fetchone():
-                            st.error("Username already exists! Please choose a different username.")
-                            conn.close()
-                        else:
-                            # Create a new faculty record with the first selected year level as default
-                            faculty_record_name = f"{name}"
-                            try:
-                                cursor.execute('INSERT INTO faculty (name, department, year_level) VALUES (?, ?, ?)',
-                                              (faculty_record_name, selected_branch, selected_year_levels[0]))
-                                conn.commit()
-                                fac_id = cursor.lastrowid
-                            except Exception as e:
-                                # If a duplicate key error happens (commonly from Postgres sequences being behind),
-                                # try to sync sequence and retry once
-                                msg = str(e).lower()
-                                if 'duplicate key value violates unique constraint' in msg or 'duplicate key value' in msg or 'unique constraint' in msg:
-                                    ensure_postgres_sequence('faculty')
-                                    try:
-                                        cursor.execute('INSERT INTO faculty (name, department, year_level) VALUES (?, ?, ?)',
-                                                      (faculty_record_name, selected_branch, selected_year_levels[0]))
-                                        conn.commit()
-                                        fac_id = cursor.lastrowid
-                                    except Exception:
-                                        # If still failing, re-raise to be caught by outer handler
-                                        raise
-                                else:
-                                    raise
-                            
-                            # Add all selected year levels to faculty_year_level table
-                            # Ensure sequence/default exists on Postgres before inserting
-                            ensure_postgres_sequence('faculty_year_level')
-                            for year_level in selected_year_levels:
-                                cursor.execute('INSERT INTO faculty_year_level (faculty_id, year_level) VALUES (?, ?)',
-                                             (fac_id, year_level))
-                            conn.commit()
-                            
-                            # Create the user account linked to faculty
-                            try:
-                                cursor.execute('INSERT INTO users (username, password, role, faculty_id, name, branch) VALUES (?, ?, ?, ?, ?, ?)',
-                                              (new_username, hash_password(new_password), 'faculty', fac_id, name, selected_branch))
-                                conn.commit()
-                            except Exception as e:
-                                msg = str(e).lower()
-                                if 'duplicate key value violates unique constraint' in msg or 'duplicate key value' in msg or 'unique constraint' in msg:
-                                    # Sync users sequence and retry once
-                                    ensure_postgres_sequence('users')
-                                    try:
-                                        cursor.execute('INSERT INTO users (username, password, role, faculty_id, name, branch) VALUES (?, ?, ?, ?, ?, ?)',
-                                                      (new_username, hash_password(new_password), 'faculty', fac_id, name, selected_branch))
-                                        conn.commit()
-                                    except Exception:
-                                        raise
-                                else:
-                                    raise
-                            st.success("✓ Faculty registration successful! Please login.")
-                            conn.close()
-                    except sqlite3.IntegrityError as e:
-                        if 'UNIQUE constraint failed: faculty.name' in str(e):
-                            st.error("A faculty with this name already exists. Please use a different name or contact admin.")
-                        else:
-                            st.error(f"Registration error: {str(e)}")
-                        conn.close()
-                    except Exception as e:
-                        st.error(f"Error during registration: {str(e)}")
-                        conn.close()
-
-else:
-    # Student pages
-    if st.session_state.role == 'student':
-        if page == "🏠 Dashboard":
-            st.title("Student Dashboard")
-            # student's branch and class info
-            user = get_user_by_username(st.session_state.username) if st.session_state.username else None
-            user_id = user[0] if user else None
-            conn = db_connect()
-            cursor = conn.cursor()
-            cursor.execute('SELECT id, username, name, branch, class FROM users WHERE id = ? AND role = ?', (user_id, 'student'))
-            student_info = cursor.fetchone()
-            conn.close()
-            if not student_info:
-                st.error("Student information not found")
-            else:
-                student_id, student_username, student_name, student_branch, student_class = student_info
-                st.info(f"**Your Branch:** {student_branch} | **Your Class:** {student_class}")
-
-                # Notices board - expander
-                notices = get_notices(target_branch=student_branch, target_class=student_class)
-                if notices:
-                    with st.expander("📢 Notices"):
-                        for n in notices[:5]:
-                            nid, title, content, tbranch, tclass, cb_role, cb_id, created_at = n
-                            created_disp = format_ts_for_display(created_at, short=True)
-                            st.markdown(f"**{title}** — *{created_disp}*")
-                            st.write(content)
-                            st.markdown("---")
-                else:
-                    st.info("No notices available at the moment.")
-
-                # Recent Test Attempts - show immediately after submission
-                st.markdown("---")
-                st.subheader("🧪 My Recent Test Attempts")
-                recent_attempts = get_test_attempts_for_student(student_id)
-                if recent_attempts:
-                    st.success(f"✓ You have {len(recent_attempts)} attempt(s) recorded")
-                    attempt_rows = []
-                    # Batch fetch test titles for all attempt test_ids to avoid N queries in a loop
-                    ttid_set = {att[1] for att in recent_attempts}
-                    if ttid_set:
-                        placeholders = ','.join('?' for _ in ttid_set)
-                        conn = db_connect()
-                        cur = conn.cursor()
-                        cur.execute(f'SELECT id, title FROM tests WHERE id IN ({placeholders})', tuple(ttid_set))
-                        title_rows = cur.fetchall()
-                        conn.close()
-                        title_map = {r[0]: r[1] for r in title_rows}
-                    else:
-                        title_map = {}
-
-                    for att in recent_attempts:
-                        aid, ttid, score, started_at, submitted_at = att
-                        test_title = title_map.get(ttid, 'Unknown Test')
-                        attempt_rows.append({
-                            'attempt_id': aid,
-                            'test': test_title,
-                            'score': score,
-                            'submitted_at': format_ts_for_display(submitted_at, short=True)
-                        })
-                    df_attempts = pd.DataFrame(attempt_rows)
-                    st.dataframe(df_attempts, use_container_width=True, hide_index=True)
-                else:
-                    st.info("No test attempts recorded yet. Take a test to see your results here!")
-
-                # Assignments & Notes placeholder
-                st.markdown("---")
-                st.subheader("📚 Assignments & Notes")
-                student_year_level = 'SY' if student_class and student_class[0] == '2' else 'FY' if student_class and student_class[0] == '1' else 'TY' if student_class and student_class[0] == '3' else 'Final Year'
-                resources = get_subject_resources_for_student(student_year_level, student_branch)
-                if resources:
-                    st.info(f"Resources available for {student_year_level} — click to open the 'Download Resources' page.")
-                    if st.button("Open Assignments & Notes"):
-                        st.session_state['nav_to_page'] = "📥 Download Resources"
-                        safe_rerun()
-                else:
-                    st.info("No assignments/notes available at the moment.")
-
-                # Attendance placeholder
-                st.markdown("---")
-                st.subheader("📊 Attendance")
-                user_attendance_pct = get_student_attendance_percentage(user_id) if user_id else 0
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.metric("Overall Attendance (%)", f"{user_attendance_pct:.1f}%")
-                with col2:
-                    if user_attendance_pct >= 60:
-                        st.success("Eligible for feedback submission")
-                    else:
-                        st.info("Not eligible for feedback submission yet")
-                if st.button("Open Attendance Details"):
-                    st.session_state['nav_to_page'] = "📊 My Attendance"
-                    safe_rerun()
-                # Active tests quick access
-                st.markdown("---")
-                st.subheader("🧪 Active Tests")
-                active_tests = get_tests_for_student(student_id)
-                active = []
-                for t in active_tests:
-                    tid, title, desc, start_ts, end_ts, proctored, subj_name, year_level, dept = t
-                    now = datetime.now(ZoneInfo("Asia/Kolkata"))
-                    try:
-                        start = parse_iso_to_kolkata(start_ts) if start_ts else None
-                        end = parse_iso_to_kolkata(end_ts) if end_ts else None
-                    except Exception:
-                        start = None
-                        end = None
-                    if (not start or now >= start) and (not end or now <= end):
-                        active.append((tid, title, subj_name))
-                if active:
-                    for tid, title, subj_name in active:
-                        col1, col2 = st.columns([6, 1])
-                        with col1:
-                            st.write(f"**{title}** — {subj_name}")
-                        with col2:
-                            if st.button(f"Take", key=f"ctake_{tid}"):
-                                st.session_state['active_test_id'] = tid
-                                st.session_state['nav_to_page'] = "🧪 Take Test"
-                                safe_rerun()
-                else:
-                    st.info("No active tests at the moment.")
-
-        elif page == "📝 Submit Feedback":
-            st.title("Student Dashboard")
-            
-            # Get student's branch from users table
-            user = get_user_by_username(st.session_state.username) if st.session_state.username else None
-            user_id = user[0] if user else None
-            
-            # Get complete student info including branch and class
-            conn = db_connect()
-            cursor = conn.cursor()
-            cursor.execute('SELECT id, username, name, branch, class FROM users WHERE id = ? AND role = ?', (user_id, 'student'))
-            student_info = cursor.fetchone()
-            conn.close()
-            
-            if not student_info:
-                st.error("Student information not found")
-            else:
-                student_id, student_username, student_name, student_branch, student_class = student_info
-                
-                # Display student's branch and class
-                st.info(f"**Your Branch:** {student_branch} | **Your Class:** {student_class}")
-
-
-                # Credit Calculator quick-access placeholder
-                st.markdown("---")
-                st.subheader("💰 Credit Calculator (Quick Access)")
-                colc1, colc2 = st.columns([3,1])
-                with colc1:
-                    st.write("Open the Credit Calculator to calculate semester/degree progress based on your category and class.")
-                with colc2:
-                    if st.button("Open Calculator"):
-                        st.session_state['nav_to_page'] = "💰 Credit Calculator"
-                        safe_rerun()
-
-
-                # Show feedback schedule status
-                # (Tab is now hidden if not open, but keep info for safety)
-                if not is_feedback_open():
-                    sched = get_current_feedback_schedule()
-                    if sched:
-                        st.warning(f"Feedback will be open from {sched[0]} to {sched[1]}. You can submit feedback during that window.")
-                    else:
-                        st.info("Feedback is not scheduled currently. Contact admin for when feedback will be open.")
-
-                # Submit Feedback Page
-                st.subheader("Submit Faculty Feedback")
-
-                # Compute student year level from student_class
-                # student_class contains values like "FY", "SY", "TY", "Final Year", or numeric "1", "2", "3", "4"
-                student_year_level = 'FY'  # Default
-                if student_class:
-                    class_str = str(student_class).strip().upper()
-                    # Check for string values first
-                    if class_str == 'FY' or class_str == 'FIRST YEAR':
-                        student_year_level = 'FY'
-                    elif class_str == 'SY' or class_str == 'SECOND YEAR':
-                        student_year_level = 'SY'
-                    elif class_str == 'TY' or class_str == 'THIRD YEAR':
-                        student_year_level = 'TY'
-                    elif class_str == 'FINAL YEAR' or class_str == 'FYR' or class_str == 'FOURTH YEAR':
-                        student_year_level = 'Final Year'
-                    # Check for numeric values
-                    elif class_str == '1':
-                        student_year_level = 'FY'
-                    elif class_str == '2':
-                        student_year_level = 'SY'
-                    elif class_str == '3':
-                        student_year_level = 'TY'
-                    elif class_str == '4':
-                        student_year_level = 'Final Year'
-                    # Check first character if numeric
-                    elif class_str and class_str[0].isdigit():
-                        first_digit = class_str[0]
-                        if first_digit == '1':
-                            student_year_level = 'FY'
-                        elif first_digit == '2':
-                            student_year_level = 'SY'
-                        elif first_digit == '3':
-                            student_year_level = 'TY'
-                        elif first_digit == '4':
-                            student_year_level = 'Final Year'
-
-                # Check if feedback is open - if closed, show message only
-                if not is_feedback_open():
-                    sched = get_current_feedback_schedule()
-                    if sched:
-                        st.error(f"❌ Feedback submission is currently **CLOSED**")
-                        st.warning(f"Feedback was open from:\n**{sched[0]}** to **{sched[1]}**\n\nThis window has now ended. You can only submit feedback during the scheduled window.")
-                    else:
-                        st.error("❌ Feedback submission is currently **CLOSED**")
-                        st.info("Feedback is not scheduled currently. Contact admin for when feedback will be open.")
-                else:
-                    # Feedback window is OPEN - show the form
-                    st.success(f"✅ Feedback window is **OPEN**! Showing subjects and faculty for: **{student_year_level}**")
-                    
-                    # Get student's attendance percentage
-                    user_attendance_pct = get_student_attendance_percentage(user_id) if user_id else 0
-                    user_has_access = user_attendance_pct >= 60 if user_id else False
-
-                    # Get subjects for this year level AND filter by student's branch
-                    subjects = get_subjects_by_year(student_year_level)
-                    # Filter subjects to only those matching the student's branch
-                    filtered_subjects = [s for s in subjects if s[3] == student_branch] if subjects else []
-                    subject_options = [s[1] for s in filtered_subjects]
-                    subject_options = ["All"] + subject_options
-                    selected_subject = st.selectbox("Select Subject (optional)", options=subject_options, key="fb_subject")
-
-                    if selected_subject and selected_subject != "All":
-                        subj = next((s for s in filtered_subjects if s[1] == selected_subject), None)
-                        if subj:
-                            # Get faculties by subject, filtered by student's branch and year level
-                            faculties = get_faculties_by_subject(subj[0], branch=student_branch, year_level=student_year_level)
-                        else:
-                            faculties = []
-                    else:
-                        # Get all faculties from student's branch and year level
-                        faculties = get_faculties_by_branch_and_year(student_branch, student_year_level)
-
-                        # Deduplicate faculties by ID
-                        seen_faculty_ids = set()
-                        unique_faculties = []
-                        for fac in faculties:
-                            fac_id = fac[0]
-                            if fac_id not in seen_faculty_ids:
-                                seen_faculty_ids.add(fac_id)
-                                unique_faculties.append(fac)
-
-                        # Create faculty dictionary
-                        faculty_dict = {f'{f[1]} ({f[2]}) [ID: {f[0]}]': f[0] for f in unique_faculties}
-
-                        # Feedback form or access message
-                        if not user_has_access:
-                            st.warning(f"❌ Access Denied: You need >= 60% attendance to submit feedback.\n\n**Your Current Attendance:** {user_attendance_pct:.1f}%\n\nPlease contact your faculty/admin for attendance information.")
-                        else:
-                            st.success(f"✅ Your attendance: {user_attendance_pct:.1f}% - You have access to submit feedback")
-                            
-                            if not faculty_dict:
-                                st.warning(f"No faculty found in {student_branch} for year level {student_year_level}")
-                            else:
-                                with st.form("feedback_form"):
-                                    feedback_student_name = st.text_input("Your Name (optional)", value=student_name or "")
-                                    
-                                    # Select subject first
-                                    selected_subject = st.selectbox(
-                                        "Select Subject *",
-                                        options=subject_options,
-                                        key="fb_subject_form"
-                                    )
-                                    
-                                    # Get faculties for the selected subject
-                                    if selected_subject and selected_subject != "All":
-                                        subj = next((s for s in filtered_subjects if s[1] == selected_subject), None)
-                                        if subj:
-                                            subject_id = subj[0]
-                                            faculties_for_subject = get_faculties_by_subject(subj[0], branch=student_branch, year_level=student_year_level)
-                                            faculty_dict_filtered = {f'{f[1]} ({f[2]}) [ID: {f[0]}]': f[0] for f in faculties_for_subject}
-                                        else:
-                                            faculty_dict_filtered = {}
-                                            subject_id = None
-                                    else:
-                                        faculty_dict_filtered = faculty_dict
-                                        subject_id = None
-                                    
-                                    selected_faculty = st.selectbox(
-                                        "Select Faculty *",
-                                        options=faculty_dict_filtered.keys() if faculty_dict_filtered else [],
-                                        key="fb_faculty_form"
-                                    )
-
-                                    st.markdown("### Rate the following aspects (1-10)")
-                                    st.markdown("Please answer the following questions by rating from 1 (Strongly Disagree) to 10 (Strongly Agree):")
-                                    st.divider()
-                                    
-                                    # Display questions sequentially with styling
-                                    st.markdown("<span style='color:#1f4788; font-size:16px'><b>1. Has fundamental concepts & subject knowledge</b></span>", unsafe_allow_html=True)
-                                    q1 = st.number_input("Rating", min_value=1, max_value=10, value=5, step=1, key="q1")
-                                    st.write("")
-                                    
-                                    st.markdown("<span style='color:#1f4788; font-size:16px'><b>2. Preparation for Subject is sufficient while coming to class</b></span>", unsafe_allow_html=True)
-                                    q2 = st.number_input("Rating", min_value=1, max_value=10, value=5, step=1, key="q2")
-                                    st.write("")
-                                    
-                                    st.markdown("<span style='color:#1f4788; font-size:16px'><b>3. Sufficient knowledge about current trends/development of subject</b></span>", unsafe_allow_html=True)
-                                    q3 = st.number_input("Rating", min_value=1, max_value=10, value=5, step=1, key="q3")
-                                    st.write("")
-                                    
-                                    st.markdown("<span style='color:#1f4788; font-size:16px'><b>4. Proficient in English & communication skills</b></span>", unsafe_allow_html=True)
-                                    q4 = st.number_input("Rating", min_value=1, max_value=10, value=5, step=1, key="q4")
-                                    st.write("")
-                                    
-                                    st.markdown("<span style='color:#1f4788; font-size:16px'><b>5. Teaching makes class interesting & interactive through student participation</b></span>", unsafe_allow_html=True)
-                                    q5 = st.number_input("Rating", min_value=1, max_value=10, value=5, step=1, key="q5")
-                                    st.write("")
-                                    
-                                    st.markdown("<span style='color:#1f4788; font-size:16px'><b>6. Faculty is punctual in starting and ending classes on time</b></span>", unsafe_allow_html=True)
-                                    q6 = st.number_input("Rating", min_value=1, max_value=10, value=5, step=1, key="q6")
-                                    st.write("")
-                                    
-                                    st.markdown("<span style='color:#1f4788; font-size:16px'><b>7. Has covered the entire syllabus as prescribed by university</b></span>", unsafe_allow_html=True)
-                                    q7 = st.number_input("Rating", min_value=1, max_value=10, value=5, step=1, key="q7")
-                                    st.write("")
-                                    
-                                    st.markdown("<span style='color:#1f4788; font-size:16px'><b>8. Extent of fulfillment of your learning expectations</b></span>", unsafe_allow_html=True)
-                                    q8 = st.number_input("Rating", min_value=1, max_value=10, value=5, step=1, key="q8")
-                                    st.write("")
-                                    
-                                    st.markdown("<span style='color:#1f4788; font-size:16px'><b>9. Behavior with students is appropriate and rational</b></span>", unsafe_allow_html=True)
-                                    q9 = st.number_input("Rating", min_value=1, max_value=10, value=5, step=1, key="q9")
-                                    st.write("")
-                                    
-                                    st.markdown("<span style='color:#1f4788; font-size:16px'><b>10. Motivates students for their study and better career</b></span>", unsafe_allow_html=True)
-                                    q10 = st.number_input("Rating", min_value=1, max_value=10, value=5, step=1, key="q10")
-                                    st.divider()
-                                    
-                                    st.markdown("<span style='color:#d9534f; font-size:16px'><b>Overall Rating for this Faculty</b></span>", unsafe_allow_html=True)
-                                    overall = st.number_input("Overall Rating", min_value=1, max_value=10, value=5, step=1)
-                                    comments = st.text_area("Additional Comments (optional)", height=100)
-                                    submitted = st.form_submit_button("Submit Feedback", use_container_width=True)
-
-                                if submitted:
-                                    faculty_id = faculty_dict_filtered.get(selected_faculty, faculty_dict.get(selected_faculty))
-                                    if not subject_id and selected_subject and selected_subject != "All":
-                                        subj = next((s for s in subjects if s[1] == selected_subject and s[3] == student_branch), None)
-                                        subject_id = subj[0] if subj else None
-                                    
-                                    if submit_feedback(feedback_student_name, faculty_id, subject_id, student_year_level,
-                                                       int(q1), int(q2), int(q3), int(q4), int(q5), int(q6), int(q7), int(q8), int(q9), int(q10),
-                                                       int(overall), comments):
-                                        st.success("✓ Feedback submitted successfully!")
-                                        st.balloons()
-                                    else:
-                                        st.error("Error submitting feedback")
-                
-        elif page == "📥 Download Resources":
-            st.title("📥 Download Resources")
-            # Get student's info
-            user = get_user_by_username(st.session_state.username) if st.session_state.username else None
-            user_id = user[0] if user else None
-            conn = db_connect()
-            cursor = conn.cursor()
-            cursor.execute('SELECT id, username, name, branch, class FROM users WHERE id = ? AND role = ?', (user_id, 'student'))
-            student_info = cursor.fetchone()
-            conn.close()
-            if not student_info:
-                st.error("Student information not found")
-            else:
-                student_id, student_username, student_name, student_branch, student_class = student_info
-                
-                # Map student class to year level and semesters
-                class_to_year = {
-                    'FY': ('FY', ['Semester 1', 'Semester 2']),
-                    'SY': ('SY', ['Semester 3', 'Semester 4']),
-                    'TY': ('TY', ['Semester 5', 'Semester 6']),
-                    'Final Year': ('Final Year', ['Semester 7', 'Semester 8'])
-                }
-                
-                student_year_level, semesters = class_to_year.get(student_class, (student_class, []))
-                
-                st.info(f"**Student:** {student_name} | **Class:** {student_year_level} | **Branch:** {student_branch}")
-                st.markdown("---")
-                
-                # Get all subjects for this year level and branch
-                conn = db_connect()
-                cursor = conn.cursor()
-                cursor.execute('''SELECT DISTINCT id, name, year_level, department 
-                                  FROM subjects 
-                                  WHERE year_level = ? AND (department = ? OR department IS NULL OR department = '')
-                                  ORDER BY name''', (student_year_level, student_branch))
-                subjects = cursor.fetchall()
-                conn.close()
-                
-                if not subjects:
-                    st.info(f"No subjects found for {student_year_level} in {student_branch}")
-                else:
-                    # Display semester-wise organization
-                    st.subheader("📚 Subjects by Semester")
-                    st.write(f"Available semesters for {student_year_level}: {', '.join(semesters)}")
-                    st.markdown("---")
-                    
-                    # Display all subjects
-                    subject_tabs = st.tabs([f"All Subjects ({len(subjects)})"] + [s for s in semesters])
-                    
-                    with subject_tabs[0]:  # All Subjects tab
-                        st.subheader("All Subjects")
-                        for subject_id, subject_name, year_level, department in subjects:
-                            with st.expander(f"📖 {subject_name}"):
-                                # Get resources for this subject
-                                resources = get_subject_resources_for_student(year_level, student_branch)
-                                subject_resources = [r for r in resources if r[3] == subject_name] if resources else []
-                                
-                                if subject_resources:
-                                    st.write(f"**Resources ({len(subject_resources)}):**")
-                                    
-                                    # Group by faculty
-                                    by_faculty = {}
-                                    for res in subject_resources:
-                                        res_id, filename, res_type, subject_n, faculty_name, uploaded_at, deadline = res
-                                        if faculty_name not in by_faculty:
-                                            by_faculty[faculty_name] = []
-                                        by_faculty[faculty_name].append((res_id, filename, res_type, uploaded_at, deadline))
-                                    
-                                    for faculty_name, items in by_faculty.items():
-                                        with st.expander(f"👨‍🏫 {faculty_name} ({len(items)})"):
-                                            for res_id, filename, res_type, uploaded_at, deadline in items:
-                                                col1, col2 = st.columns([4, 1])
-                                                col1.write(f"📄 {filename}")
-                                                col1.caption(f"Type: {res_type.capitalize()} | Uploaded: {uploaded_at}")
-                                                if deadline and res_type == "assignment":
-                                                    col1.caption(f"⏰ Deadline: {deadline}")
-                                                col2.download_button(
-                                                    label="⬇️",
-                                                    data=open(f"faculty_resources/{filename}", "rb").read() if os.path.exists(f"faculty_resources/{filename}") else b"",
-                                                    file_name=filename,
-                                                    key=f"download_{res_id}_{filename}"
-                                                )
-                                else:
-                                    st.info(f"No resources available yet for {subject_name}")
-                    
-                    # Semester tabs (for future use - placeholder)
-                    for sem_idx, semester in enumerate(semesters, start=1):
-                        with subject_tabs[sem_idx]:
-                            st.subheader(f"{semester} - Subjects & Resources")
-                            st.info(f"Resources will be organized by {semester} once more data is added.")
-                    
-                    st.markdown("---")
-                    st.subheader("👨‍🏫 Faculty List")
-                    st.write(f"The following faculties have uploaded resources for your {student_year_level}:")
-                    
-                    # Get all faculties teaching subjects for this year/branch
-                    conn = db_connect()
-                    cursor = conn.cursor()
-                    cursor.execute('''SELECT DISTINCT f.id, f.name, f.department 
-                                      FROM faculty f
-                                      JOIN faculty_subject fs ON f.id = fs.faculty_id
-                                      JOIN subjects s ON fs.subject_id = s.id
-                                      WHERE s.year_level = ? AND (s.department = ? OR s.department IS NULL OR s.department = '')
-                                      ORDER BY f.name''', (student_year_level, student_branch))
-                    faculties = cursor.fetchall()
-                    conn.close()
-                    
-                    if faculties:
-                        for fac_id, fac_name, fac_dept in faculties:
-                            # Count resources from this faculty for this year/branch
-                            resources_for_fac = get_subject_resources_for_student(student_year_level, student_branch)
-                            fac_resource_count = len([r for r in resources_for_fac if r[4] == fac_name]) if resources_for_fac else 0
-                            
-                            with st.expander(f"👨‍🏫 {fac_name} ({fac_dept}) — {fac_resource_count} resource(s)"):
-                                # Get their subjects
-                                conn = db_connect()
-                                cursor = conn.cursor()
-                                cursor.execute('''SELECT DISTINCT s.name 
-                                                  FROM subjects s
-                                                  JOIN faculty_subject fs ON s.id = fs.subject_id
-                                                  WHERE fs.faculty_id = ? AND s.year_level = ?
-                                                  ORDER BY s.name''', (fac_id, student_year_level))
-                                fac_subjects = cursor.fetchall()
-                                conn.close()
-                                
-                                if fac_subjects:
-                                    st.write(f"**Teaches:** {', '.join([s[0] for s in fac_subjects])}")
-                                st.write(f"**Department:** {fac_dept}")
-                    else:
-                        st.info(f"No faculties assigned to {student_year_level} in {student_branch} yet.")
-
-        elif page == "📊 My Attendance":
-            st.title("📊 My Attendance")
-            user = get_user_by_username(st.session_state.username) if st.session_state.username else None
-            user_id = user[0] if user else None
-            if not user_id:
-                st.error("User information not found")
-            else:
-                user_attendance_pct = get_student_attendance_percentage(user_id) if user_id else 0
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.metric("Overall Attendance", f"{user_attendance_pct:.1f}%")
-                with col2:
-                    if user_attendance_pct >= 60:
-                        st.success("✅ Eligible for feedback submission")
-                    else:
-                        st.error(f"❌ Need {60 - user_attendance_pct:.1f}% more attendance")
-                # Get attendance details
-                conn = db_connect()
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT a.month, a.year, a.classes_attended, a.total_classes, s.name, f.name
-                    FROM attendance a
-                    JOIN subjects s ON a.subject_id = s.id
-                    JOIN faculty f ON a.faculty_id = f.id
-                    WHERE a.student_id = ?
-                    ORDER BY a.year DESC, a.month DESC
-                ''', (user_id,))
-                attendance_records = cursor.fetchall()
-                conn.close()
-                if attendance_records:
-                    st.subheader("Attendance Details")
-                    attendance_data = []
-                    for month, year, attended, total, subject, faculty in attendance_records:
-                        pct = (attended / total * 100) if total > 0 else 0
-                        attendance_data.append({
-                            'Month': month,
-                            'Year': year,
-                            'Subject': subject,
-                            'Faculty': faculty,
-                            'Attended': attended,
-                            'Total': total,
-                            'Percentage': f"{pct:.1f}%"
-                        })
-                    df = pd.DataFrame(attendance_data)
-                    st.dataframe(df, use_container_width=True, hide_index=True)
-                else:
-                    st.info("No attendance records found")
-        
-        elif page == "🧪 Tests":
-            st.title("🧪 Available Tests")
-            user = get_user_by_username(st.session_state.username) if st.session_state.username else None
-            user_id = user[0] if user else None
-            if not user_id:
-                st.error("User information not found")
-            else:
-                tests = get_tests_for_student(user_id)
-                if not tests:
-                    st.info("No tests available for your class/branch at this time.")
-                else:
-                    for t in tests:
-                        tid, title, desc, start_ts, end_ts, proctored, subj_name, year_level, dept = t
-                        st.subheader(f"{title} — {subj_name}")
-                        st.write(desc or "No description")
-                        st.write(f"Start: {start_ts} | End: {end_ts} | Proctored: {'Yes' if proctored else 'No'}")
-                        # Check if test is active
-                        now = datetime.now(ZoneInfo("Asia/Kolkata"))
-                        try:
-                            start = parse_iso_to_kolkata(start_ts) if start_ts else None
-                            end = parse_iso_to_kolkata(end_ts) if end_ts else None
-                        except Exception:
-                            start = None
-                            end = None
-
-                        can_take = True
-                        if start and now < start:
-                            can_take = False
-                        if end and now > end:
-                            can_take = False
-
-                        if can_take:
-                            if not start:
-                                st.info("This test has no start time set — contact faculty or admin.")
-                            elif not end and now >= start:
-                                # If no end time, allow taking after start
-                                pass
-                            # Navigation-based start. Clicking Start Test opens the test page.
-                            if st.button(f"Start Test: {title}", key=f"start_test_{tid}"):
-                                st.session_state['active_test_id'] = tid
-                                st.session_state['nav_to_page'] = "🧪 Take Test"
-                                safe_rerun()
-                        else:
-                            st.info("This test is not currently available (check schedule)")
-        elif page == "🧪 Take Test":
-            st.title("🧪 Take Test")
-            test_id = st.session_state.get('active_test_id')
-            if not test_id:
-                st.info("No test selected. Go to 'Tests' to choose a test.")
-            else:
-                # Load test details
-                conn = db_connect()
-                cursor = conn.cursor()
-                cursor.execute('''SELECT t.id, t.title, t.description, t.start_ts, t.end_ts, t.proctored, s.name, s.year_level, s.department
-                                  FROM tests t JOIN subjects s ON t.subject_id = s.id
-                                  WHERE t.id = ?''', (test_id,))
-                trow = cursor.fetchone()
-                conn.close()
-                if not trow:
-                    st.error("Test not found")
-                else:
-                    tid, title, desc, start_ts, end_ts, proctored, subj_name, year_level, dept = trow
-                    st.subheader(f"{title} — {subj_name}")
-                    st.write(desc or "No description")
-                    now = datetime.now(ZoneInfo("Asia/Kolkata"))
-                    try:
-                        start = parse_iso_to_kolkata(start_ts) if start_ts else None
-                        end = parse_iso_to_kolkata(end_ts) if end_ts else None
-                    except Exception:
-                        start = None
-                        end = None
-
-                    # Availability checks
-                    if start and now < start:
-                        st.warning(f"This test will be available from {start.isoformat()}")
-                    elif end and now > end:
-                        st.warning("This test window has closed.")
-                    else:
-                        # Already attempted?
-                        attempts = get_test_attempts_for_student(st.session_state.user_id, tid)
-                        if attempts:
-                            st.info("You have already attempted this test. Your recent score:")
-                            for att in attempts:
-                                aid, ttid, score, started_at, submitted_at = att
-                                st.write(f"Attempt {aid}: Score {score} — Submitted: {submitted_at}")
-                            # Optional: Allow retake if needed
-                            if st.button("Retake Test", key=f"retake_{tid}"):
-                                # Let student retake by continuing to show questions
-                                pass
-                        # Render questions
-                        questions = get_test_questions(tid)
-                        if not questions:
-                            st.info("No questions have been added to this test yet. Contact the faculty to add questions.")
-                        else:
-                            answers = {}
-                            with st.form(f"attempt_form_{tid}"):
-                                st.write(f"Test: {title}")
-                                for q in questions:
-                                    opts = q['choices'] or []
-                                    sel = st.radio(q['text'], options=list(range(len(opts))), format_func=lambda i, opts=opts: opts[i] if i < len(opts) else "", key=f"q_{q['id']}_{tid}")
-                                    answers[str(q['id'])] = sel
-                                submitted = st.form_submit_button("Submit Test")
-                                if submitted:
-                                    submitted_at_iso = datetime.now(ZoneInfo("Asia/Kolkata")).isoformat()
-                                    started_at_iso = submitted_at_iso
-                                    res = submit_test_attempt(tid, st.session_state.user_id, answers, started_at=started_at_iso, submitted_at=submitted_at_iso)
-                                    st.success(f"Test submitted. Score: {res['score']}")
-
-                                    # Verify the attempt was saved to the database and show confirmation
-                                    try:
-                                        conn = db_connect()
-                                        cur = conn.cursor()
-                                        cur.execute('SELECT id, test_id, student_id, score, started_at, submitted_at FROM test_attempts WHERE id = ?', (res.get('attempt_id'),))
-                                        saved = cur.fetchone()
-                                        conn.close()
-                                        if saved:
-                                            aid_db, t_db, s_db, score_db, started_db, submitted_db = saved
-                                            st.info(f"Saved attempt record — ID: {aid_db} | Score: {score_db} | Submitted: {submitted_db}")
-                                    except Exception:
-                                        pass
-
-                                    # Prepare CSV summary for the student's attempt so they can download it immediately
-                                    try:
-                                        student_username = None
-                                        conn = db_connect()
-                                        cur = conn.cursor()
-                                        cur.execute('SELECT username, name FROM users WHERE id = ?', (st.session_state.user_id,))
-                                        u = cur.fetchone()
-                                        conn.close()
-                                        if u:
-                                            student_username = u[0]
-                                        attempt_row = {
-                                            'attempt_id': res.get('attempt_id'),
-                                            'test_id': tid,
-                                            'student_id': st.session_state.user_id,
-                                            'student_username': student_username,
-                                            'score': res.get('score'),
-                                            'started_at': started_at_iso,
-                                            'submitted_at': submitted_at_iso,
-                                            'answers': json.dumps(answers)
-                                        }
-                                        df_attempt = pd.DataFrame([attempt_row])
-                                        csv_bytes = df_attempt.to_csv(index=False).encode('utf-8')
-                                        st.download_button("Download Your Attempt (CSV)", data=csv_bytes, file_name=f"test_{tid}_attempt_{res.get('attempt_id')}.csv", mime='text/csv')
-                                    except Exception:
-                                        pass
-
-        elif page == "💰 Credit Calculator":
-            st.title("💰 Credit Calculator")
-            
-            # Get student's info
-            user = get_user_by_username(st.session_state.username) if st.session_state.username else None
-            user_id = user[0] if user else None
-            
-            conn = db_connect()
-            cursor = conn.cursor()
-            cursor.execute('SELECT id, username, name, branch, class FROM users WHERE id = ? AND role = ?', (user_id, 'student'))
-            student_info = cursor.fetchone()
-            conn.close()
-            
-            if not student_info:
-                st.error("Student information not found")
-            else:
-                student_id, student_username, student_name, student_branch, student_class = student_info
-                st.info(f"**{student_name}** ({student_branch} - {student_class})")
-                
-                st.markdown("---")
-                st.subheader("Calculate Your Credit Progress")
-                
-                # Step 1: Select Category and Class
-                col1, col2 = st.columns(2)
-                with col1:
-                    category = st.selectbox("Select Category", ["From First Year", "From Direct Second Year"], key="credit_category")
-                with col2:
-                    class_select = st.selectbox("Select Class", ["FY", "SY", "TY", "B.Tech"], key="credit_class")
-                
-                st.markdown("---")
-                
-                # Credit calculation by category & class
-                def _clean_key(s: str) -> str:
-                    return s.replace(" ", "_").replace(".", "_")
-
-                sems = None
-                factor = 0.0
-                label = ""
-                # TY - Direct Second Year -> sem 3 & 4 with 60% threshold
-                if class_select == "TY" and category == "From Direct Second Year":
-                    sems = [3, 4]
-                    factor = 0.60
-                    label = "Semester 3 & 4"
-                # TY - From First Year -> sem 1,2,3,4 with 80% threshold
-                elif class_select == "TY" and category == "From First Year":
-                    sems = [1, 2, 3, 4]
-                    factor = 0.80
-                    label = "Semester 1 - 4"
-                # B.Tech - Direct Second Year -> sem 3,4,5,6 with 80% threshold
-                elif class_select == "B.Tech" and category == "From Direct Second Year":
-                    sems = [3, 4, 5, 6]
-                    factor = 0.80
-                    label = "Semester 3 - 6"
-                # B.Tech - From First Year -> sem 1-6 with 86% threshold
-                elif class_select == "B.Tech" and category == "From First Year":
-                    sems = [1, 2, 3, 4, 5, 6]
-                    factor = 0.86
-                    label = "Semester 1 - 6"
-                # SY - From First Year -> sem 1 & 2 with 60% threshold
-                elif class_select == "SY" and category == "From First Year":
-                    sems = [1, 2]
-                    factor = 0.60
-                    label = "Semester 1 & 2"
-                # FY - From First Year -> sem 1 & 2 (assuming same thresholds as SY)
-                elif class_select == "FY" and category == "From First Year":
-                    sems = [1, 2]
-                    factor = 0.60
-                    label = "Semester 1 & 2"
-                else:
-                    sems = None
-
-                if sems:
-                    st.subheader(label + " Credits")
-                    totals = {}
-                    earned = {}
-
-                    # Render sem inputs in pairs per row for clarity
-                    for i in range(0, len(sems), 2):
-                        cols = st.columns(2)
-                        for j in range(2):
-                            if i + j < len(sems):
-                                sem = sems[i + j]
-                                with cols[j]:
-                                    st.write(f"**Semester {sem}**")
-                                    t_key_raw = f"sem{sem}_total_{class_select}_{category}"
-                                    e_key_raw = f"sem{sem}_earned_{class_select}_{category}"
-                                    t_key = _clean_key(t_key_raw)
-                                    e_key = _clean_key(e_key_raw)
-                                    totals[sem] = st.number_input(f"Sem {sem} - Total Credits (as per syllabus)", min_value=0, value=0, step=1, key=t_key)
-                                    earned[sem] = st.number_input(f"Sem {sem} - Credits Earned", min_value=0, value=0, step=1, key=e_key)
-
-                    if st.button("Calculate Credits", use_container_width=True, type="primary"):
-                        total_sem_credits = sum(totals.values())
-                        total_earned = sum(earned.values())
-                        threshold = total_sem_credits * factor
-                        percentage = (total_earned / total_sem_credits * 100) if total_sem_credits > 0 else 0
-                        promoted = total_earned >= threshold
-
-                        st.divider()
-                        col1, col2, col3 = st.columns(3)
-                        with col1:
-                            st.metric("Total Credits (Selected Semesters)", f"{total_sem_credits}")
-                        with col2:
-                            st.metric("Credits Earned", f"{total_earned}")
-                        with col3:
-                            st.metric("Progress", f"{percentage:.1f}%")
-
-                        st.progress(min(percentage / 100, 1.0))
-                        st.info(f"Promotion threshold: {factor * 100:.0f}% ({threshold:.1f} credits)")
-                        if promoted:
-                            st.success("🎉 Promoted - You have reached the required credits.")
-                        else:
-                            remaining = max(threshold - total_earned, 0)
-                            st.warning(f"⚠️ Not promoted - You need {remaining:.1f} more credits to reach {factor * 100:.0f}%")
-                else:
-                    st.info("Please select a valid combination of category and class to view credit details.")
-
-# Faculty pages
-    elif st.session_state.role == 'faculty':
-        if page == "ℹ️ About":
-            st.title("About This System")
-            st.markdown("""
-            ### VVPIET Student Learning Management System
-            
-            This system allows students to provide structured feedback to faculty members.
-            
-            **Features:**
-            - Rate faculty on multiple dimensions (1-10 scale)
-            - 5 specific evaluation criteria
-            - Overall rating
-            - Anonymous feedback option
-            
-            **Questions:**
-            1. Teaching Quality and Delivery
-            2. Course Content Clarity and Organization
-            3. Communication and Interaction Skills
-            4. Quality of Feedback and Evaluation
-            5. Subject Knowledge and Expertise
-            """)
-
-        elif page == "📅 Mark Attendance":
-            st.title("📅 Mark Student Attendance — Monthly (Deprecated)")
-            st.markdown("The monthly attendance entry was replaced by a daily attendance workflow.")
-            st.warning("Please use the '🧾 Daily Attendance' page to mark students present/absent. Monthly rollups and downloads are available there.")
-            if st.button("Go to Daily Attendance", use_container_width=True):
-                st.session_state['nav_to_page'] = "🧾 Daily Attendance"
-                safe_rerun()
-        
-        elif page == "🧾 Daily Attendance":
-            st.title("🧾 Daily Attendance - Faculty")
-            faculty_info = get_faculty_details(st.session_state.user_id)
-            if not faculty_info:
-                st.error("Faculty information not found")
-            else:
-                faculty_id, faculty_name, faculty_branch = faculty_info
-                st.info(f"**You are:** {faculty_name} ({faculty_branch})")
-                subjects = get_faculty_subjects(faculty_id)
-                if not subjects:
-                    st.info("No subjects assigned. Please ask admin to assign subjects.")
-                else:
-                    subj_map = {f"{s[1]} ({s[2]})": s for s in subjects}
-                    subj_choice = st.selectbox("Select Subject", options=list(subj_map.keys()))
-                    selected_subj = subj_map[subj_choice]
-                    selected_subj_id = selected_subj[0]
-                    selected_year = selected_subj[2]
-                    att_date = st.date_input("Attendance Date")
-                    students = get_students_by_branch_and_class(branch=faculty_branch, class_level=selected_year)
-                    if not students:
-                        st.info("No students found for this subject/branch.")
-                    else:
-                        st.markdown("**Daily Attendance Sheet — Mark present for each student:**")
-                        # Render a simple tabular view: Roll Number, Name, Present checkbox
-                        with st.form("daily_attendance_form"):
-                            cols = st.columns([2, 2, 4, 2])
-                            cols[0].write("**Roll Number**")
-                            cols[1].write("**Username**")
-                            cols[2].write("**Student Name**")
-                            cols[3].write("**Present**")
-                            present_ids = []
-                            # Use a predictable key per student to preserve checkbox state during reruns
-                            for s in students:
-                                sid = s[0]
-                                username = s[1] or ''
-                                name = s[2] or ''
-                                roll = s[3] or 'N/A'
-                                c1, c2, c3, c4 = st.columns([2, 2, 4, 2])
-                                c1.write(f"{roll}")
-                                c2.write(f"{username}")
-                                c3.write(f"{name}")
-                                checked = c4.checkbox("", key=f"att_{selected_subj_id}_{att_date.isoformat()}_{sid}")
-                                if checked:
-                                    present_ids.append(sid)
-
-                            submit_att = st.form_submit_button("Save Daily Attendance")
-                            if submit_att:
-                                date_str = att_date.isoformat()
-                                # Save daily records
-                                for s in students:
-                                    sid = s[0]
-                                    is_present = sid in present_ids
-                                    save_daily_attendance(sid, faculty_id, selected_subj_id, date_str, is_present)
-
-                                # After saving daily attendance, compute monthly rollup and persist into
-                                # the monthly `attendance` table so students' overall attendance
-                                # percentage (stored in users.attendance) is updated and visible to admin.
-                                month = att_date.month
-                                year = att_date.year
-                                try:
-                                    rollup_rows = get_monthly_attendance_rollup(faculty_id, selected_subj_id, month, year)
-                                    # rollup_rows: list of (student_id, classes_attended, total_classes)
-                                    for student_id, classes_attended, total_classes in rollup_rows:
-                                        # Persist monthly attendance per student/subject/faculty
-                                        save_attendance(student_id, faculty_id, selected_subj_id, month, year, classes_attended, total_classes)
-
-                                        # Recompute the student's overall attendance percentage and update users.attendance
-                                        try:
-                                            pct = get_student_attendance_percentage(student_id)
-                                            update_student_attendance(student_id, pct)
-                                        except Exception:
-                                            # Non-fatal: continue updating other students
-                                            pass
-                                except Exception:
-                                    # If rollup fails, we still saved daily records; notify faculty
-                                    st.warning("Saved daily records but failed to compute monthly rollup. Admins can regenerate reports.")
-
-                                st.success("Daily attendance saved and monthly rollup updated.")
-                        # Monthly download portal
-                        st.divider()
-                        st.subheader("📥 Monthly Attendance Report")
-                        colm1, colm2 = st.columns(2)
-                        with colm1:
-                            dl_month = st.number_input("Report Month", min_value=1, max_value=12, value=att_date.month)
-                        with colm2:
-                            dl_year = st.number_input("Report Year", min_value=2020, max_value=2030, value=att_date.year)
-                        if st.button("Generate Monthly CSV", use_container_width=True):
-                            rows = get_monthly_attendance_rollup(faculty_id, selected_subj_id, dl_month, dl_year)
-                            if not rows:
-                                st.info("No attendance records found for this month.")
-                            else:
-                                # Build CSV with roll_number
-                                csv_data = []
-                                import io
-                                for student_id, classes_attended, total_classes in rows:
-                                    conn = db_connect()
-                                    cur = conn.cursor()
-                                    cur.execute('SELECT username, name, roll_number FROM users WHERE id = ?', (student_id,))
-                                    u = cur.fetchone()
-                                    conn.close()
-                                    username = u[0] if u else 'unknown'
-                                    name = u[1] if u else 'unknown'
-                                    roll = u[2] if u and len(u) > 2 else 'N/A'
-                                    pct = (classes_attended / total_classes * 100) if total_classes > 0 else 0
-                                    csv_data.append({'roll_number': roll, 'username': username, 'name': name, 'classes_attended': classes_attended, 'total_classes': total_classes, 'percentage': f"{pct:.1f}%"})
-                                df = pd.DataFrame(csv_data)
-                                csv_bytes = df.to_csv(index=False).encode('utf-8')
-                                st.download_button("Download CSV", data=csv_bytes, file_name=f"attendance_{selected_subj[1]}_{dl_year}_{dl_month}.csv")
-        
-        elif page == "📒 Daily LER":
-            st.title("📒 Daily LER (Lecture Entry Register)")
-            faculty_info = get_faculty_details(st.session_state.user_id)
-            if not faculty_info:
-                st.error("Faculty information not found")
-            else:
-                faculty_id, faculty_name, faculty_branch = faculty_info
-                st.info(f"**You are:** {faculty_name} ({faculty_branch})")
-                subjects = get_faculty_subjects(faculty_id)
-                if not subjects:
-                    st.info("No subjects assigned. Please ask admin to assign subjects.")
-                else:
-                    subj_map = {f"{s[1]} ({s[2]})": s for s in subjects}
-                    subj_choice = st.selectbox("Select Subject", options=list(subj_map.keys()))
-                    selected_subj = subj_map[subj_choice]
-                    selected_subj_id = selected_subj[0]
-                    selected_year = selected_subj[2]
-
-                    ler_date = st.date_input("Lecture Date")
-                    # Manual time entry: do NOT auto-fill system time. Faculty should enter time themselves.
-                    ler_time_str = st.text_input("Lecture Time (optional) — enter as HH:MM (24-hour)", value="", placeholder="e.g., 10:30")
-
-                    # Determine students for this subject/branch
-                    students = get_students_by_branch_and_class(branch=faculty_branch, class_level=selected_year)
-                    date_str = ler_date.isoformat()
-
-                    # Compute present ids from daily_attendance table and absent roll numbers
-                    present_ids = get_present_student_ids_for_date(faculty_id, selected_subj_id, date_str)
-                    total_present = len(present_ids)
-                    absent_rolls = []
-                    if students:
-                        for s in students:
-                            sid = s[0]
-                            roll = s[3] or ''
-                            if sid not in present_ids:
-                                absent_rolls.append(str(roll))
-                    absent_rolls_str = ", ".join([r for r in absent_rolls if r])
-
-                    st.markdown("**Auto-filled attendance summary (from Daily Attendance):**")
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        st.metric("Total Present", f"{total_present}")
-                    with col2:
-                        st.write("**Absent Roll Numbers**")
-                        st.text_area("Absent Roll Numbers (auto)", value=absent_rolls_str, height=80, key=f"ler_absent_{selected_subj_id}_{date_str}")
-
-                    st.markdown("---")
-                    with st.form("daily_ler_form"):
-                        topic = st.text_input("Subject Topic Covered")
-                        lecture_number = st.text_input("Lecture Number (e.g., Lecture 5)")
-                        percent_syllabus = st.number_input("% of Syllabus Covered", min_value=0.0, max_value=100.0, value=0.0, step=0.5)
-                        sign = st.text_input("Sign (Faculty Name / Initials)", value=faculty_name)
-                        remark = st.text_area("Remark (optional)")
-                        submit_ler = st.form_submit_button("Save Daily LER Entry")
-
-                    if submit_ler:
-                        # Use manually entered time string (if provided) rather than system time
-                        time_str = ler_time_str.strip() if ler_time_str else ''
-                        lid = save_daily_ler(faculty_id, selected_subj_id, date_str, time_str, topic, lecture_number, float(percent_syllabus), int(total_present), absent_rolls_str, sign, remark)
-                        if lid:
-                            st.success(f"Daily LER entry saved (ID: {lid})")
-                        else:
-                            st.error("Failed to save Daily LER entry")
-        elif page == "📚 Upload Resources":
-            st.title("📚 Upload Assignments & Notes")
-            # Get faculty info
-            faculty_info = get_faculty_details(st.session_state.user_id)
-            if not faculty_info:
-                st.error("Faculty information not found")
-            else:
-                faculty_id, faculty_name, faculty_branch = faculty_info
-                # Get subjects taught by this faculty
-                all_subjects = get_all_subjects()
-                faculty_year_levels = get_faculty_year_levels(faculty_id)
-                faculty_subjects = [s for s in all_subjects if s[3] == faculty_branch and s[2] in faculty_year_levels] if all_subjects else []
-                if not faculty_subjects:
-                    st.warning(f"You have no subjects assigned yet. Contact admin to assign subjects.")
-                else:
-                    st.subheader("Upload Assignment or Notes")
-                    # Faculty: Create Notice feature
-                    with st.expander("📢 Create Notice (Faculty)"):
-                        n_title = st.text_input("Notice Title (Faculty)", key="fac_notice_title")
-                        n_content = st.text_area("Notice Content (Faculty)", key="fac_notice_content")
-                        branches = get_branches() or ["All"]
-                        target_branch = st.selectbox("Target Branch (All to show to all)", options=["All"] + branches, key="fac_notice_branch")
-                        target_class = st.selectbox("Target Class (All to show to all)", options=["All", "FY", "SY", "TY", "Final Year"], key="fac_notice_class")
-                        if st.button("Publish Notice (Faculty)", use_container_width=True):
-                            tb = None if target_branch == "All" else target_branch
-                            tc = None if target_class == "All" else target_class
-                            nid = create_notice(n_title, n_content, target_branch=tb, target_class=tc, created_by_role='faculty', created_by_id=faculty_id)
-                            if nid:
-                                st.success("Notice published successfully")
-                            else:
-                                st.error("Failed to publish notice")
-                    # Select subject
-                    subject_options = {f"{s[1]} ({s[2]})": s[0] for s in faculty_subjects}
-                    selected_subject_name = st.selectbox("Select Subject *", options=list(subject_options.keys()))
-                    selected_subject_id = subject_options[selected_subject_name]
-                    # Select resource type
-                    resource_type = st.radio("Resource Type *", options=["Assignment", "Notes"], horizontal=True)
-                    # Upload file
-                    uploaded_file = st.file_uploader(f"Upload {resource_type} File", type=['pdf', 'docx', 'doc', 'txt', 'pptx', 'zip'])
-                    # For assignments, add deadline
-                    deadline = None
-                    if resource_type == "Assignment":
-                        st.subheader("Assignment Deadline (Optional)")
-                        deadline_date = st.date_input("Deadline Date")
-                        deadline_time = st.time_input("Deadline Time")
-                        if deadline_date and deadline_time:
-                            from datetime import datetime
-                            deadline = datetime.combine(deadline_date, deadline_time).isoformat()
-                    if st.button("Upload", use_container_width=True):
-                        if not uploaded_file:
-                            st.error("Please select a file to upload")
-                        else:
-                            # Save file to local directory
-                            import os
-                            upload_dir = "faculty_resources"
-                            os.makedirs(upload_dir, exist_ok=True)
-                            file_path = os.path.join(upload_dir, uploaded_file.name)
-                            try:
-                                with open(file_path, "wb") as f:
-                                    f.write(uploaded_file.getbuffer())
-                                # Add to database
-                                rid = add_faculty_resource(
-                                    faculty_id, 
-                                    selected_subject_id,
-                                    resource_type.lower(),
-                                    uploaded_file.name,
-                                    file_path,
-                                    deadline
-                                )
-                                if rid:
-                                    st.success(f"✓ {resource_type} uploaded successfully!")
-                                else:
-                                    st.error("Error saving to database")
-                            except Exception as e:
-                                st.error(f"Error uploading file: {str(e)}")
-                    # Show uploaded resources
-                    st.divider()
-                    st.subheader("Your Uploaded Resources")
-                    resources = get_faculty_resources(faculty_id)
-                    if resources:
-                        for res in resources:
-                            res_id, subj_id, res_type, filename, uploaded_at, deadline = res
-                            subj_name = next((s[1] for s in all_subjects if s[0] == subj_id), "Unknown")
-                            col1, col2 = st.columns([4, 1])
-                            col1.write(f"📄 {filename} ({res_type.capitalize()}) — {subj_name}")
-                            if deadline:
-                                col1.caption(f"Deadline: {deadline}")
-                            col1.caption(f"Uploaded: {uploaded_at}")
-                    else:
-                        st.info("No resources uploaded yet")
-        
-        elif page == "🧪 Create Test":
-            st.title("🧪 Create Test - Faculty")
-            faculty_info = get_faculty_details(st.session_state.user_id)
-            if not faculty_info:
-                st.error("Faculty information not found")
-            else:
-                faculty_id, faculty_name, faculty_branch = faculty_info
-                st.info(f"**You are:** {faculty_name} ({faculty_branch})")
-                subjects = get_faculty_subjects(faculty_id)
-                if not subjects:
-                    st.info("No subjects assigned. Please ask admin to assign subjects.")
-                else:
-                    subj_map = {f"{s[1]} ({s[2]})": s for s in subjects}
-                    subj_choice = st.selectbox("Select Subject for Test", options=list(subj_map.keys()))
-                    selected_subj = subj_map[subj_choice]
-                    selected_subj_id = selected_subj[0]
-                    with st.form("create_test_form"):
-                        title = st.text_input("Test Title")
-                        description = st.text_area("Description (optional)")
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            start_date = st.date_input("Start date")
-                            start_time = st.time_input("Start time")
-                        with col2:
-                            end_date = st.date_input("End date")
-                            end_time = st.time_input("End time")
-                        proctored = st.checkbox("Proctored?", value=False)
-                        create_btn = st.form_submit_button("Create Test")
-                    if create_btn:
-                        start_dt = datetime.combine(start_date, start_time).replace(tzinfo=ZoneInfo("Asia/Kolkata"))
-                        end_dt = datetime.combine(end_date, end_time).replace(tzinfo=ZoneInfo("Asia/Kolkata"))
-                        start_ts = start_dt.isoformat()
-                        end_ts = end_dt.isoformat()
-                        if end_dt <= start_dt:
-                            st.error("End date/time must be after start date/time")
-                        else:
-                            test_id = create_test(faculty_id, selected_subj_id, title, description, start_ts, end_ts, proctored)
-                            if test_id:
-                                st.success(f"Test created (ID: {test_id}). You can now add questions.")
-                            else:
-                                st.error("Failed to create test.")
-                    st.markdown("---")
-                    st.subheader("Add Questions to a Test")
-                    conn = db_connect()
-                    cursor = conn.cursor()
-                    cursor.execute('SELECT id, title FROM tests WHERE faculty_id = ? ORDER BY created_at DESC', (faculty_id,))
-                    faculty_tests = cursor.fetchall()
-                    conn.close()
-                    if faculty_tests:
-                        test_options = {f"{t[1]} [ID: {t[0]}]": t[0] for t in faculty_tests}
-                        sel_display = st.selectbox("Select Test to add questions", options=list(test_options.keys()))
-                        sel_test_id = test_options[sel_display]
-                        with st.form("add_question_form"):
-                            q_text = st.text_area("Question Text")
-                            c1 = st.text_input("Choice 1")
-                            c2 = st.text_input("Choice 2")
-                            c3 = st.text_input("Choice 3")
-                            c4 = st.text_input("Choice 4")
-                            correct = st.selectbox("Correct Choice", options=[0,1,2,3], format_func=lambda i: f"Choice {i+1}")
-                            marks = st.number_input("Marks", min_value=1, value=1)
-                            add_q = st.form_submit_button("Add Question")
-                        if add_q:
-                            choices = [c1, c2, c3, c4]
-                            add_test_question(sel_test_id, q_text, choices, correct, marks)
-                            st.success("Question added to test.")
-                        st.markdown("---")
-                        st.subheader("View Attempts for a Test")
-                        # Allow faculty to select one of their tests and view/download attempts
-                        attempts_test_display = st.selectbox("Select Test to view attempts", options=list(test_options.keys()), key="attempts_test_select")
-                        attempts_test_id = test_options[attempts_test_display]
-                        
-                        # Debug: Show which test is selected
-                        st.caption(f"Selected Test ID: {attempts_test_id}")
-                        
-                        attempts = get_test_attempts_for_test(attempts_test_id)
-                        if not attempts:
-                            st.info("ℹ️ No attempts submitted for this test yet. Students who have taken this test will appear here.")
-                            st.info("**Note:** Make sure the test is active (within start/end time) for students to take it.")
-                        else:
-                            st.success(f"✓ {len(attempts)} attempt(s) found")
-                            # Build DataFrame for display and download
-                            rows = []
-                            for a in attempts:
-                                aid, ttid, sid, answers_json, score, started_at, submitted_at, username, name = a
-                                rows.append({
-                                    'attempt_id': aid,
-                                    'test_id': ttid,
-                                    'student_id': sid,
-                                    'username': username,
-                                    'name': name,
-                                    'score': score,
-                                    'started_at': started_at,
-                                    'submitted_at': submitted_at,
-                                    'answers': answers_json
-                                })
-                            df_attempts = pd.DataFrame(rows)
-                            st.dataframe(df_attempts, use_container_width=True, hide_index=True)
-                            csv_bytes = df_attempts.to_csv(index=False).encode('utf-8')
-                            st.download_button("Download Attempts CSV", data=csv_bytes, file_name=f"test_{attempts_test_id}_attempts.csv", mime='text/csv')
-                    else:
-                        st.info("No tests created yet. Create a test above.")
-
-        elif page == "📄 Faculty Leaves":
-            st.title("📄 Faculty Leave Records")
-            faculty_info = get_faculty_details(st.session_state.user_id)
-            if not faculty_info:
-                st.error("Faculty information not found")
-            else:
-                faculty_id, faculty_name, faculty_branch = faculty_info
-                st.info(f"**You are:** {faculty_name} ({faculty_branch})")
-
-                # Show current usage / balances (CL=12, SL=6; DL/CO are not limited by default)
-                usage = get_faculty_leave_usage(faculty_id)
-                CL_used = usage.get('CL', 0)
-                SL_used = usage.get('SL', 0)
-                CL_total = 12
-                SL_total = 6
-                st.subheader("Leave Balances")
-                col1, col2 = st.columns(2)
-                col1.metric("CL", f"{CL_total - CL_used} remaining (used: {CL_used})")
-                col2.metric("SL", f"{SL_total - SL_used} remaining (used: {SL_used})")
-
-                # Leave request form
-                st.subheader("Request Leave")
-                with st.form("request_leave_form"):
-                    leave_type = st.selectbox("Leave Type", options=["CL", "SL", "CO", "DL"])
-                    duration_type = st.selectbox("Duration", options=["Half Day", "Full Day", "2 Days", "3 Days"])
-                    start_date = st.date_input("Start Date")
-                    end_date = st.date_input("End Date", value=start_date)
-                    is_half = True if duration_type == "Half Day" else False
-                    days_count = 0.5 if duration_type == "Half Day" else 1 if duration_type == "Full Day" else 2 if duration_type == "2 Days" else 3
-                    alt_faculty = st.text_input("Alternative Faculty (Name) - Optional")
-                    submit_leave = st.form_submit_button("Submit Leave")
-
-                if submit_leave:
-                    # Convert to strings for database
-                    # Use the faculty table id (faculty_id) — not the users table id
-                    res = submit_faculty_leave(faculty_id, leave_type, start_date.isoformat(), end_date.isoformat(), is_half_day=is_half, days_count=days_count, alt_faculty=alt_faculty)
-                    if res:
-                        st.success("Leave request submitted")
-                    else:
-                        st.error("Failed to submit leave request")
-
-                # Show leave history
-                leaves = get_faculty_leaves(faculty_id)
-                if leaves:
-                    st.subheader("Leave Requests History")
-                    for l in leaves:
-                        lid, fid, ltype, sdate, edate, is_half_day, dcount, alt, created_at = l
-                        st.write(f"{ltype} — {sdate} to {edate} — {dcount} days — Alt: {alt or 'N/A'} — Requested at {created_at}")
-                else:
-                    st.info("No leave requests found.")
-
-        elif page == "ℹ️ About":
-            st.title("About This System - Faculty View")
-            faculty_info = get_faculty_details(st.session_state.user_id)
-            if faculty_info:
-                faculty_id, faculty_name, faculty_branch = faculty_info
-                st.info(f"**Faculty Name:** {faculty_name}\n**Branch:** {faculty_branch}")
-                subjects = get_faculty_subjects(faculty_id)
-                if subjects:
-                    st.subheader("📚 Your Assigned Subjects")
-                    for subj in subjects:
-                        st.write(f"- {subj[1]} ({subj[2]})")
-                else:
-                    st.warning("No subjects assigned to you yet. Contact admin.")
-            st.markdown("""
-            ### VVPIET Student LMS - Faculty Features
-            **Your Responsibilities:**
-            - Mark student attendance for your subjects monthly
-            - View feedback received from students
-            - Track student performance through attendance data
-            **How to use:**
-            1. Go to "Mark Attendance" tab
-            2. Select your subject and class
-            3. Enter attendance data for each student in your branch
-            4. Save the records
-            Students with 60%+ attendance can submit feedback.
-            """)
-    
-    # Admin pages
-    elif st.session_state.role == 'admin':
-        if page == "📊 Dashboard":
-            st.title("📊 Admin Dashboard")
-            
-            feedbacks = get_all_feedback()
-            stats = get_faculty_stats()
-            
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.metric("Total Feedbacks", len(feedbacks))
-            with col2:
-                # overall_rating is at index 11 in feedback tuples
-                avg_overall = np.mean([f[11] for f in feedbacks if f[11]]) if feedbacks else 0
-                st.metric("Average Rating", f"{avg_overall:.2f}/10")
-            with col3:
-                st.metric("Faculty Count", len(stats))
-            
-            st.divider()
-            # Admin: Feedback scheduling UI
-            st.divider()
-            st.subheader("🗓️ Feedback Scheduling")
-            current_sched = get_current_feedback_schedule()
-            if current_sched:
-                st.info(f"Current feedback window: {current_sched[0]} to {current_sched[1]}")
-            else:
-                st.info("No feedback scheduled currently.")
-
-            with st.expander("Schedule new feedback window"):
-                col_s1, col_s2 = st.columns(2)
-                with col_s1:
-                    start_date = st.date_input("Start date")
-                    start_time = st.time_input("Start time")
-                with col_s2:
-                    end_date = st.date_input("End date", value=start_date)
-                    end_time = st.time_input("End time", value=start_time)
-
-                if st.button("Schedule Feedback", use_container_width=True):
-                    tz = ZoneInfo("Asia/Kolkata")
-                    start_dt = datetime.combine(start_date, start_time).replace(tzinfo=tz).isoformat()
-                    end_dt = datetime.combine(end_date, end_time).replace(tzinfo=tz).isoformat()
-                    schedule_feedback(start_dt, end_dt)
-                    st.success("Feedback scheduled successfully.")
-                    safe_rerun()
-
-            st.subheader("📈 Faculty Statistics")
-            
-            if stats:
-                df_stats = pd.DataFrame(stats, columns=['Faculty', 'Department', 'Year Level', 'Responses', 'Avg Rating'])
-                st.dataframe(df_stats, use_container_width=True, hide_index=True)
-            else:
-                st.info("No feedback data available yet")
-            
-            st.divider()
-            st.subheader("📋 Recent Submissions")
-
-            if feedbacks:
-                for fb in feedbacks[:10]:  # Show last 10
-                    # fb indices: 0:id,1:created_at,2:fac_name,3:department,4:year_level,5:student_name,
-                    # 6:q1,7:q2,8:q3,9:q4,10:q5,11:q6,12:q7,13:q8,14:q9,15:q10,16:overall,17:comments,18:subject
-                    created_disp = format_ts_for_display(fb[1], short=True)
-                    with st.expander(f"{fb[2]} ({fb[4]}) - {created_disp} (Overall: {fb[16]}/10)"):
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            st.write(f"**Faculty:** {fb[2]}")
-                            st.write(f"**Department:** {fb[3]}")
-                            st.write(f"**Year Level:** {fb[4]}")
-                            st.write(f"**Subject:** {fb[18]}")
-                            st.write(f"**Student:** {fb[5]}")
-                            st.write(f"**Date:** {format_ts_for_display(fb[1])}")
-                        with col2:
-                            st.write(f"**Ratings:**")
-                            st.write(f"1. Fundamental Concepts & Subject Knowledge: {fb[6]}/10")
-                            st.write(f"2. Preparation for Subject: {fb[7]}/10")
-                            st.write(f"3. Knowledge of current trends/development: {fb[8]}/10")
-                            st.write(f"4. Proficient in English & communication: {fb[9]}/10")
-                            st.write(f"5. Teaching makes class interesting & interactive: {fb[10]}/10")
-                            st.write(f"6. Punctuality of faculty: {fb[11]}/10")
-                            st.write(f"7. Coverage of syllabus as prescribed: {fb[12]}/10")
-                            st.write(f"8. Fulfillment of your learning expectations: {fb[13]}/10")
-                            st.write(f"9. Behavior with students appropriate/rational: {fb[14]}/10")
-                            st.write(f"10. Motivates students for study & career: {fb[15]}/10")
-                        st.write(f"**Overall Rating:** {fb[16]}/10")
-                        st.write(f"**Comments:** {fb[17] or 'None'}")
-            else:
-                st.info("No feedback submitted yet")
-
-            # Student Access Control
-            st.divider()
-            st.subheader("🔒 Student Access Control")
-            st.caption("Grant submission access to students who meet attendance threshold")
-            students = get_all_students()
-            if students:
-                if st.button("Grant access to eligible students (attendance >= 60%)"):
-                    count = 0
-                    for s in students:
-                        if s[2] is not None and s[2] >= 60:
-                            set_student_access(s[0], True)
-                            count += 1
-                    st.success(f"Granted access to {count} student(s)")
-                    students = get_all_students()
-
-                # Show table and per-student controls
-                for s in students:
-                    sid, sname, satt, shas = s
-                    cols = st.columns([3,2,2])
-                    cols[0].write(f"**{sname}**")
-                    cols[1].write(f"Attendance: {satt}%")
-                    # checkbox to toggle access
-                    new_access = cols[2].checkbox("Has Access", value=bool(shas), key=f"access_{sid}")
-                    if new_access != bool(shas):
-                        set_student_access(sid, new_access)
-                        safe_rerun()
-            else:
-                st.info("No student accounts found")
-            
-            # Attendance by Faculty (admin view)
-            st.divider()
-            st.subheader("📚 Attendance by Faculty")
-            faculties_all = get_faculty_list()
-            fac_options = [f"{f[1]} ({f[2]})" for f in faculties_all] if faculties_all else []
-            fac_select = st.selectbox("Select Faculty to view students", options=["All"] + fac_options)
-
-            if fac_select and fac_select != "All":
-                fid = next((f[0] for f in faculties_all if f"{f[1]} ({f[2]})" == fac_select), None)
-                if fid:
-                    conn = get_db_connection()
-                    cur = conn.cursor()
-                    cur.execute("SELECT DISTINCT student_name FROM feedback WHERE faculty_id = ?", (fid,))
-                    rows = cur.fetchall()
-                    conn.close()
-            
-            # Admin: Daily LER export
-            st.divider()
-            st.subheader("📒 Daily LER Records")
-            all_fac = get_all_faculty()
-            fac_options = [f"{f[1]} ({f[2]}) [ID:{f[0]}]" for f in all_fac] if all_fac else []
-            sel_fac = st.selectbox("Filter by Faculty", options=["All"] + fac_options)
-            colf1, colf2 = st.columns(2)
-            with colf1:
-                date_from = st.date_input("From Date", value=None)
-            with colf2:
-                date_to = st.date_input("To Date", value=None)
-
-            if st.button("Generate Daily LER CSV"):
-                fid_filter = None
-                if sel_fac and sel_fac != "All":
-                    # parse id from selection
-                    try:
-                        fid_filter = int(sel_fac.split("ID:")[-1].rstrip(']'))
-                    except Exception:
-                        fid_filter = None
-
-                dfrom = date_from.isoformat() if date_from else None
-                dto = date_to.isoformat() if date_to else None
-                rows_ler = get_all_daily_ler(date_from=dfrom, date_to=dto, faculty_id=fid_filter)
-                if not rows_ler:
-                    st.info("No Daily LER records found for the selected filters.")
-                else:
-                    # Build DataFrame
-                    df_rows = []
-                    for r in rows_ler:
-                        (lid, faculty_id_r, faculty_name, subject_id_r, subject_name, date_r, time_r, topic_r, lecture_number_r, percent_syllabus_r, total_present_r, absent_rolls_r, sign_r, remark_r, created_at_r) = r
-                        df_rows.append({
-                            'id': lid,
-                            'faculty_id': faculty_id_r,
-                            'faculty_name': faculty_name,
-                            'subject_id': subject_id_r,
-                            'subject_name': subject_name,
-                            'date': date_r,
-                            'time': time_r,
-                            'topic': topic_r,
-                            'lecture_number': lecture_number_r,
-                            'percent_syllabus': percent_syllabus_r,
-                            'total_present': total_present_r,
-                            'absent_roll_numbers': absent_rolls_r,
-                            'sign': sign_r,
-                            'remark': remark_r,
-                            'created_at': created_at_r
-                        })
-                    df_ler = pd.DataFrame(df_rows)
-                    csv_bytes = df_ler.to_csv(index=False).encode('utf-8')
-                    st.download_button("📥 Download Daily LER CSV", data=csv_bytes, file_name=f"daily_ler_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv", mime='text/csv')
-            
-        elif page == "🗂️ Faculty Leaves":
-            st.title("🗂️ Faculty Leave Management")
-            faculties_all = get_faculty_list()
-            if faculties_all:
-                fac_options = [f"{f[1]} ({f[2]})" for f in faculties_all]
-                sel = st.selectbox("Select Faculty", options=["All"] + fac_options)
-                if sel and sel != "All":
-                    fid = next((f[0] for f in faculties_all if f"{f[1]} ({f[2]})" == sel), None)
-                    if fid:
-                        leaves = get_faculty_leaves(fid)
-                        if not leaves:
-                            st.info("No leave records for this faculty.")
-                        else:
-                            st.subheader("Leave Records")
-                            for l in leaves:
-                                lid, fid, ltype, sdate, edate, is_half_day, days_count, alt, created_at = l
-                                st.write(f"{ltype} — {sdate} to {edate} — {days_count} days — Alt: {alt or 'N/A'} — Requested at: {created_at}")
-                            # Download CSV
-                            df = pd.DataFrame(leaves, columns=['id', 'faculty_id', 'leave_type', 'start_date', 'end_date', 'is_half_day', 'days_count', 'alt_faculty', 'created_at'])
-                            csv_bytes = df.to_csv(index=False).encode('utf-8')
-                            st.download_button("Download Leaves CSV", data=csv_bytes, file_name=f"faculty_{fid}_leaves.csv")
-                else:
-                    # Show all leaves across all faculty with download option
-                    all_leaves = get_faculty_leaves()
-                    if not all_leaves:
-                        st.info("No leave records found")
-                    else:
-                        df_all = pd.DataFrame(all_leaves, columns=['id', 'faculty_id', 'leave_type', 'start_date', 'end_date', 'is_half_day', 'days_count', 'alt_faculty', 'created_at'])
-                        # Join faculty names for readability
-                        fac_map = {f[0]: f[1] for f in faculties_all}
-                        df_all['faculty_name'] = df_all['faculty_id'].map(fac_map)
-                        st.dataframe(df_all[['faculty_name','leave_type','start_date','end_date','days_count','alt_faculty','created_at']], use_container_width=True, hide_index=True)
-                        csv_bytes = df_all.to_csv(index=False).encode('utf-8')
-                        st.download_button("Download All Faculty Leaves CSV", data=csv_bytes, file_name=f"faculty_leaves_all.csv", mime='text/csv')
-            else:
-                st.info("No faculty records found")
-
-            # Admin: Notices creation
-            st.divider()
-            st.subheader("📢 Notices")
-            with st.expander("Create new notice"):
-                n_title = st.text_input("Notice Title")
-                n_content = st.text_area("Notice Content")
-                branches = get_branches() or ["All"]
-                target_branch = st.selectbox("Target Branch (All to show to all)", options=["All"] + branches)
-                target_class = st.selectbox("Target Class (All to show to all)", options=["All", "FY", "SY", "TY", "Final Year"])
-                if st.button("Publish Notice", use_container_width=True):
-                    tb = None if target_branch == "All" else target_branch
-                    tc = None if target_class == "All" else target_class
-                    nid = create_notice(n_title, n_content, target_branch=tb, target_class=tc, created_by_role='admin', created_by_id=st.session_state.user_id)
-                    if nid:
-                        st.success("Notice published successfully")
-                    else:
-                        st.error("Failed to publish notice")
-
-                    if not rows:
-                        st.info("No feedback entries for this faculty yet.")
-                    else:
-                        total_att = 0
-                        count_att = 0
-                        st.markdown("Students who submitted feedback for this faculty:")
-                        for r in rows:
-                            sname = r[0]
-                            user = get_user_by_username(sname)
-                            if user:
-                                uid = user[0]
-                                attendance = user[3] if len(user) > 3 and user[3] is not None else 0
-                                cols = st.columns([3,2,2])
-                                cols[0].write(f"**{sname}**")
-                                new_att = cols[1].number_input("Attendance (%)", min_value=0, max_value=100, value=int(attendance), key=f"att_{uid}")
-                                if cols[2].button("Save", key=f"save_att_{uid}"):
-                                    update_student_attendance(uid, int(new_att))
-                                    st.success("Attendance updated")
-                                    safe_rerun()
-                                total_att += int(attendance)
-                                count_att += 1
-                            else:
-                                st.write(f"- {sname} (not registered)")
-
-                        if count_att:
-                            avg_att = total_att / count_att
-                            st.metric("Average Attendance (these students)", f"{avg_att:.1f}%")
-        
-        elif page == "👥 Student Attendance":
-            st.title("👥 Student Attendance Records")
-            st.markdown("View student attendance by year level and branch")
-            
-            # Admin: upload student roster (Excel)
-            st.subheader("Upload Student Roster (Excel)")
-            branches = get_branches() or []
-            if branches:
-                upload_branch = st.selectbox("Select Branch for these students", options=branches)
-            else:
-                upload_branch = st.text_input("Branch (enter department)")
-
-            uploaded_file = st.file_uploader("Upload Excel (.xls/.xlsx) with columns: sr. no., roll no., PRN number, name, class", type=['xls', 'xlsx', 'csv'])
-            if uploaded_file is not None:
-                try:
-                    # use pandas to read; allow csv as fallback
-                    if str(uploaded_file.name).lower().endswith('.csv'):
-                        df = pd.read_csv(uploaded_file)
-                    else:
-                        df = pd.read_excel(uploaded_file)
-
-                    # Normalize column names
-                    cols = {c.lower().strip(): c for c in df.columns}
-                    # Identify required columns
-                    col_name = None
-                    col_roll = None
-                    col_prn = None
-                    col_class = None
-                    for lc, orig in cols.items():
-                        if 'name' in lc and not col_name:
-                            col_name = orig
-                        if 'roll' in lc and not col_roll:
-                            col_roll = orig
-                        if 'prn' in lc and not col_prn:
-                            col_prn = orig
-                        if 'class' in lc and not col_class:
-                            col_class = orig
-
-                    if not col_name or not col_class:
-                        st.error('Uploaded file must contain at least student name and class columns.')
-                    else:
-                        # If branch was selected, apply to all rows
-                        df['branch'] = upload_branch
-                        # Use roll/prn where available
-                        if col_roll:
-                            df['roll_number'] = df[col_roll].astype(str)
-                        else:
-                            df['roll_number'] = df[col_prn].astype(str) if col_prn else ''
-                        df['prn'] = df[col_prn].astype(str) if col_prn else ''
-                        df['student_name'] = df[col_name].astype(str)
-                        df['class'] = df[col_class].astype(str)
-
-                        # Sort by class
-                        df_sorted = df.sort_values(by=['class', 'student_name'])
-
-                        st.info(f"Preview: {len(df_sorted)} rows — will be assigned to branch: {upload_branch}")
-                        st.dataframe(df_sorted.head(50))
-
-                        if st.button('Import Students from Excel'):
-                            inserted = 0
-                            updated = 0
-                            for _, row in df_sorted.iterrows():
-                                name = str(row.get('student_name') or '').strip()
-                                roll = str(row.get('roll_number') or '').strip()
-                                prn = str(row.get('prn') or '').strip()
-                                cls = str(row.get('class') or '').strip()
-                                branch_val = str(row.get('branch') or upload_branch or '').strip()
-
-                                if not name:
-                                    continue
-
-                                # Determine username: prefer PRN, then roll, then generated
-                                username_candidate = prn or roll or None
-                                conn = db_connect()
-                                cur = conn.cursor()
-                                user_id = None
-                                if roll:
-                                    cur.execute('SELECT id FROM users WHERE roll_number = ? AND role = ?', (roll, 'student'))
-                                    r = cur.fetchone()
-                                    if r:
-                                        user_id = r[0]
-                                if not user_id and username_candidate:
-                                    cur.execute('SELECT id FROM users WHERE username = ? AND role = ?', (username_candidate, 'student'))
-                                    r = cur.fetchone()
-                                    if r:
-                                        user_id = r[0]
-
-                                if user_id:
-                                    # Update existing
-                                    try:
-                                        cur.execute('''UPDATE users SET name = ?, branch = ?, class = ?, roll_number = ? WHERE id = ?''', (name, branch_val, cls, roll, user_id))
-                                        conn.commit()
-                                        updated += 1
-                                    except Exception:
-                                        pass
-                                else:
-                                    # Create a new student user. Ensure unique username
-                                    base_username = username_candidate or (roll or name.replace(' ', '_')).lower()
-                                    username = base_username
-                                    i = 1
-                                    while True:
-                                        try:
-                                            pw = hash_password('student123')
-                                            cur.execute('INSERT INTO users (username, password, role, name, roll_number, branch, class) VALUES (?, ?, ?, ?, ?, ?, ?)', (username, pw, 'student', name, roll, branch_val, cls))
-                                            conn.commit()
-                                            inserted += 1
-                                            break
-                                        except sqlite3.IntegrityError:
-                                            # username exists, try suffix
-                                            username = f"{base_username}_{i}"
-                                            i += 1
-                                        except Exception:
-                                            break
-                                conn.close()
-
-                            st.success(f"Import finished — inserted: {inserted}, updated: {updated}")
-                except Exception as e:
-                    st.error(f"Failed to read uploaded file: {str(e)}")
-
-            col1, col2 = st.columns(2)
-            year_levels = ['All', 'FY', 'SY', 'TY', 'Final Year']
-            branches = ['All'] + get_branches()
-            
-            with col1:
-                selected_year_filter = st.selectbox("Filter by Year Level", options=year_levels)
-            with col2:
-                selected_branch_filter = st.selectbox("Filter by Branch", options=branches)
-            
-            year_param = selected_year_filter if selected_year_filter != 'All' else None
-            branch_param = selected_branch_filter if selected_branch_filter != 'All' else None
-            
-            attendance_records = get_attendance_by_year_and_branch(year_level=year_param, branch=branch_param)
-            
-            if attendance_records:
-                # Group and display
-                st.subheader(f"Attendance Records - {selected_year_filter} | {selected_branch_filter}")
-                
-                # Create display DataFrame
-                display_data = []
-                for record in attendance_records:
-                    sid, student_name, attended, total, subject, faculty, branch = record
-                    if total > 0:
-                        percentage = round((attended / total) * 100, 2)
-                    else:
-                        percentage = 0
-                    
-                    display_data.append({
-                        'Student ID': sid,
-                        'Student Name': student_name,
-                        'Subject': subject,
-                        'Faculty': faculty,
-                        'Branch': branch,
-                        'Classes Attended': attended,
-                        'Total Classes': total,
-                        'Attendance %': percentage
-                    })
-                
-                if display_data:
-                    df = pd.DataFrame(display_data)
-                    
-                    # Display as table
-                    st.dataframe(df, use_container_width=True, hide_index=True)
-                    
-                    # Summary statistics
-                    st.divider()
-                    st.subheader("Summary Statistics")
-                    col1, col2, col3 = st.columns(3)
-                    
-                    avg_attendance = df['Attendance %'].mean() if len(df) > 0 else 0
-                    eligible_count = len(df[df['Attendance %'] >= 60])
-                    total_count = len(df)
-                    
-                    with col1:
-                        st.metric("Average Attendance", f"{avg_attendance:.1f}%")
-                    with col2:
-                        st.metric("Eligible for Feedback (>=60%)", f"{eligible_count}/{total_count}")
-                    with col3:
-                        st.metric("Ineligible (<60%)", f"{total_count - eligible_count}/{total_count}")
-                    
-                    # Filter by attendance status
-                    st.divider()
-                    st.subheader("Filtered View")
-                    status_filter = st.radio("Show Students with:", options=["All", ">=60% Attendance (Eligible)", "<60% Attendance (Ineligible)"], horizontal=True)
-                    
-                    if status_filter == ">=60% Attendance (Eligible)":
-                        filtered_df = df[df['Attendance %'] >= 60]
-                    elif status_filter == "<60% Attendance (Ineligible)":
-                        filtered_df = df[df['Attendance %'] < 60]
-                    else:
-                        filtered_df = df
-                    
-                    st.dataframe(filtered_df, use_container_width=True, hide_index=True)
-                    
-                    # Download option
-                    csv = filtered_df.to_csv(index=False)
-                    st.download_button(
-                        label="📥 Download as CSV",
-                        data=csv,
-                        file_name=f"attendance_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                        mime="text/csv"
-                    )
-                else:
-                    st.info("No attendance records found")
-            else:
-                st.info("No attendance data available. Faculty members need to mark attendance first.")
-        
-        elif page == "📚 Manage Subjects":
-            st.title("📚 Assign Subjects to Faculty")
-            st.markdown("Manage which subjects each faculty member teaches")
-            
-            faculties = get_all_faculty_with_users()
-            subjects = get_all_subjects()
-
-            # Add Subject to DB form (always available to admin)
-            st.subheader("Add Subject to Database")
-            st.caption("Create a new subject record. Subjects are not pre-populated by default.")
-
-            branches = get_branches()
-            if branches:
-                add_branch = st.selectbox("Department/Branch *", options=branches)
-            else:
-                add_branch = st.text_input("Department/Branch *")
-
-            add_year_levels = get_year_levels()
-            if not add_year_levels:
-                add_year_levels = ['FY', 'SY', 'TY', 'Final Year']
-            add_year = st.selectbox("Class/Year Level *", options=add_year_levels)
-
-            add_subject_name = st.text_input("Subject Name *")
-            add_subject_code = st.text_input("Subject Code (optional)")
-
-            if st.button("Add Subject to DB", use_container_width=True):
-                if not add_subject_name or not add_branch or not add_year:
-                    st.error("Please provide Subject Name, Department and Class/Year Level")
-                else:
-                    try:
-                        sid = add_subject(add_subject_name.strip(), add_year, add_branch.strip(), add_subject_code.strip() if add_subject_code else None)
-                        if sid:
-                            st.success(f"✓ Subject '{add_subject_name}' added (ID: {sid})")
-                            subjects = get_all_subjects()
-                        else:
-                            st.error("Error adding subject. It may already exist or violate a constraint.")
-                    except Exception as e:
-                        st.error(f"Error adding subject: {str(e)}")
-
-            st.divider()
-
-            # Remove Subject from DB
-            st.subheader("Remove Subject from Database")
-            st.caption("Delete a subject record and all its faculty assignments")
-            
-            if subjects:
-                subject_options = {f"{s[1]} ({s[2]}) [Code: {s[4] or 'N/A'}]": s[0] for s in subjects}
-                remove_subject_display = st.selectbox("Select subject to delete *", options=list(subject_options.keys()), key="remove_subj")
-                
-                if st.button("Delete Subject", use_container_width=True, key="btn_delete_subj"):
-                    remove_subj_id = subject_options[remove_subject_display]
-                    if delete_subject(remove_subj_id):
-                        st.success(f"✓ Subject deleted successfully")
-                        subjects = get_all_subjects()
-                        st.rerun()
-                    else:
-                        st.error("Error deleting subject")
-            else:
-                st.info("No subjects in database to remove")
-
-            st.divider()
-
-            st.subheader("Assign Subjects to Faculty")
-            st.caption("Link subjects to each faculty member for feedback collection")
-            
-            if not faculties:
-                st.warning("No faculty members found in the system")
-            else:
-                # Create two columns: faculty selection and subject management
-                col1, col2 = st.columns([2, 3])
-
-                with col1:
-                    st.subheader("Select Faculty")
-                    faculty_names = [f"{f[1]} ({f[2]})" for f in faculties]
-                    selected_faculty_display = st.selectbox("Choose a faculty member:", options=faculty_names)
-                    selected_faculty_id = next((f[0] for f in faculties if f"{f[1]} ({f[2]})" == selected_faculty_display), None)
-
-                if selected_faculty_id:
-                    with col2:
-                        st.subheader("Assigned Subjects")
-                        assigned_subject_ids = get_faculty_subjects_with_ids(selected_faculty_id)
-
-                        # Display assigned subjects
-                        assigned_subjects = [s for s in subjects if s[0] in assigned_subject_ids] if subjects else []
-                        if assigned_subjects:
-                            for subj in assigned_subjects:
-                                col1_sub, col2_sub = st.columns([4, 1])
-                                # subj: (id, name, year_level, department, code)
-                                subj_display = f"{subj[1]} ({subj[2]})"
-                                if subj[3]:
-                                    subj_display += f" — {subj[3]}"
-                                if subj[4]:
-                                    subj_display += f" [{subj[4]}]"
-                                col1_sub.write(f"✓ {subj_display}")
-                                if col2_sub.button("Remove", key=f"remove_{subj[0]}"):
-                                    remove_subject_from_faculty(selected_faculty_id, subj[0])
-                                    st.success(f"Removed '{subj[1]}' from {selected_faculty_display}")
-                                    st.rerun()
-                        else:
-                            st.info("No subjects assigned yet")
-
-                    # Add new subject section
-                    st.divider()
-                    st.subheader("Assign Existing Subject to Faculty")
-
-                    available_subjects = [s for s in subjects if s[0] not in assigned_subject_ids] if subjects else []
-                    if available_subjects:
-                        subject_options = {f"{s[1]} ({s[2]})": s[0] for s in available_subjects}
-                        selected_subject_display = st.selectbox("Select subject to add:", options=list(subject_options.keys()))
-
-                        if st.button("Assign Subject", use_container_width=True):
-                            selected_subject_id = subject_options[selected_subject_display]
-                            if assign_subject_to_faculty(selected_faculty_id, selected_subject_id):
-                                st.success(f"✓ '{selected_subject_display}' assigned to {selected_faculty_display}")
-                                st.rerun()
-                    else:
-                        st.info("No subjects available in the database. Use 'Add Subject to Database' above to create subjects.")
-        
-        elif page == "👨‍🏫 Manage Faculty":
-            st.title("👨‍🏫 Manage Faculty Year Levels")
-            
-            all_faculty = get_all_faculty()
-            
-            if all_faculty:
-                st.subheader("Faculty Teaching Schedule")
-                st.caption("Manage which year levels each faculty teaches")
-                
-                # Create a dataframe for better display
-                faculty_df = pd.DataFrame(all_faculty, columns=['ID', 'Name', 'Department', 'Primary Year'])
-                
-                # Display current faculty
-                st.write("**Current Faculty:**")
-                st.dataframe(faculty_df, use_container_width=True, hide_index=True)
-                
-                st.divider()
-                
-                # Manage faculty year levels
-                st.subheader("Add/Remove Year Level Assignments")
-                
-                faculty_options = {f"{f[1]} ({f[2]}) [ID: {f[0]}]": f[0] for f in all_faculty}
-                
-                selected_faculty_display = st.selectbox("Select Faculty *", options=faculty_options.keys())
-                selected_faculty_id = faculty_options[selected_faculty_display]
-                
-                # Show current year level assignments for this faculty
-                current_levels = get_faculty_year_levels(selected_faculty_id)
-                st.info(f"**Currently teaches:** {', '.join(current_levels) if current_levels else 'None assigned'}")
-                
-                year_levels = get_year_levels()
-                if not year_levels:
-                    year_levels = ['FY', 'SY', 'TY', 'Final Year']
-                
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    st.subheader("Add Year Level")
-                    year_to_add = st.selectbox("Select Year Level to Add *", options=[y for y in year_levels if y not in current_levels])
-                    if st.button("Add Year Level", use_container_width=True):
-                        add_faculty_year_level(selected_faculty_id, year_to_add)
-                        st.success(f"✓ Added {year_to_add} to faculty's teaching schedule")
-                        st.rerun()
-                
-                with col2:
-                    st.subheader("Remove Year Level")
-                    if current_levels:
-                        year_to_remove = st.selectbox("Select Year Level to Remove *", options=current_levels)
-                        if st.button("Remove Year Level", use_container_width=True):
-                            remove_faculty_year_level(selected_faculty_id, year_to_remove)
-                            st.success(f"✓ Removed {year_to_remove} from faculty's teaching schedule")
-                            st.rerun()
-                    else:
-                        st.info("No year levels assigned yet")
-        
-        elif page == "📈 Analytics":
-            st.title("📈 Analytics & Visualizations")
-            
-            feedbacks = get_all_feedback()
-            stats = get_faculty_stats()
-            
-            if feedbacks:
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    st.subheader("Rating Distribution")
-                    ratings = [f[11] for f in feedbacks if f[11]]
-                    fig, ax = plt.subplots(figsize=(8, 5))
-                    ax.hist(ratings, bins=10, color='#238636', edgecolor='black')
-                    ax.set_xlabel('Overall Rating')
-                    ax.set_ylabel('Count')
-                    ax.set_title('Distribution of Ratings (1-10)')
-                    ax.grid(axis='y', alpha=0.3)
-                    st.pyplot(fig)
-                
-                with col2:
-                    st.subheader("Average Rating by Faculty")
-                    if stats:
-                        faculties = [s[0] for s in stats]
-                        avg_ratings = [s[4] if s[4] else 0 for s in stats]
-                        
-                        fig, ax = plt.subplots(figsize=(8, 5))
-                        colors = plt.cm.RdYlGn(np.linspace(0.3, 0.9, len(faculties)))
-                        ax.barh(faculties, avg_ratings, color=colors, edgecolor='black')
-                        ax.set_xlabel('Average Rating (out of 10)')
-                        ax.set_title('Faculty Performance')
-                        ax.set_xlim(0, 10)
-                        for i, v in enumerate(avg_ratings):
-                            ax.text(v, i, f' {v:.2f}', va='center')
-                        st.pyplot(fig)
-                
-                st.divider()
-                st.subheader("Question-wise Analysis")
-                
-                q1_vals = [f[6] for f in feedbacks if f[6]]
-                q2_vals = [f[7] for f in feedbacks if f[7]]
-                q3_vals = [f[8] for f in feedbacks if f[8]]
-                q4_vals = [f[9] for f in feedbacks if f[9]]
-                q5_vals = [f[10] for f in feedbacks if f[10]]
-                
-                avg_data = {
-                    'Teaching Quality': np.mean(q1_vals) if q1_vals else 0,
-                    'Course Content': np.mean(q2_vals) if q2_vals else 0,
-                    'Communication': np.mean(q3_vals) if q3_vals else 0,
-                    'Feedback Quality': np.mean(q4_vals) if q4_vals else 0,
-                    'Subject Knowledge': np.mean(q5_vals) if q5_vals else 0,
-                }
-                
-                fig, ax = plt.subplots(figsize=(10, 5))
-                questions = list(avg_data.keys())
-                averages = list(avg_data.values())
-                ax.bar(questions, averages, color='#1f6feb', edgecolor='black')
-                ax.set_ylabel('Average Rating (out of 10)')
-                ax.set_title('Average Ratings by Question')
-                ax.set_ylim(0, 10)
-                for i, v in enumerate(averages):
-                    ax.text(i, v, f'{v:.2f}', ha='center', va='bottom')
-                plt.xticks(rotation=45, ha='right')
-                st.pyplot(fig)
-            else:
-                st.info("No feedback data available for analysis")
-        
-        elif page == "📋 Export Data":
-            st.title("📋 Export Feedback Data")
-            
-            feedbacks = get_all_feedback()
-            
-            if feedbacks:
-                # get_all_feedback returns: id, created_at, fac_name, department, year_level, student_name,
-                # q1, q2, q3, q4, q5, q6, q7, q8, q9, q10, overall_rating, comments, subject (19 columns)
-                df = pd.DataFrame(feedbacks, columns=[
-                    'ID', 'Date', 'Faculty', 'Department', 'Year Level', 'Student',
-                    'Q1: Fundamental Concepts & Subject Knowledge', 'Q2: Preparation for Subject',
-                    'Q3: Knowledge of current trends/development', 'Q4: Proficient in English & communication',
-                    'Q5: Teaching makes class interesting & interactive', 'Q6: Punctuality of faculty',
-                    'Q7: Coverage of syllabus as prescribed', 'Q8: Fulfillment of your learning expectations',
-                    'Q9: Behavior with students appropriate/rational', 'Q10: Motivates students for study & career',
-                    'Overall Rating', 'Comments', 'Subject'
-                ])
-                
-                # Remove ID column for export
-                df_export = df.drop(columns=['ID'])
-                
-                csv = df_export.to_csv(index=False)
-                st.download_button(
-                    label="📥 Download as CSV",
-                    data=csv,
-                    file_name=f"feedback_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                    mime="text/csv",
-                    use_container_width=True
-                )
-                
-                st.divider()
-                st.subheader("Preview")
-                st.dataframe(df_export, use_container_width=True, hide_index=True)
-            else:
-                st.info("No feedback data available to export")
-        
-        elif page == "🐛 Debug: Test Attempts":
-            st.title("🐛 Debug: All Test Attempts")
-            st.caption("Admin-only view: inspect all test attempts in the system")
-            
-            # First, show all tests in the system
-            st.subheader("📋 All Tests in System")
-            conn = db_connect()
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT t.id, t.title, t.faculty_id, f.name, t.start_ts, t.end_ts
-                FROM tests t
-                LEFT JOIN faculty f ON t.faculty_id = f.id
-                ORDER BY t.created_at DESC
-            ''')
-            all_tests = cursor.fetchall()
-            if all_tests:
-                test_rows = []
-                for tid, ttitle, fid, fname, start, end in all_tests:
-                    test_rows.append({
-                        'test_id': tid,
-                        'title': ttitle or 'N/A',
-                        'faculty_id': fid,
-                        'faculty_name': fname or 'Unknown',
-                        'start_ts': start or 'N/A',
-                        'end_ts': end or 'N/A'
-                    })
-                df_tests = pd.DataFrame(test_rows)
-                st.dataframe(df_tests, use_container_width=True, hide_index=True)
-            else:
-                st.info("No tests created yet.")
-            
-            st.divider()
-            
-            # Query all attempts across all tests
-            st.subheader("🧪 All Test Attempts")
-            # Limit number of attempts fetched by default to avoid loading very large datasets into memory/UI
-            limit = 500
-            load_all = st.session_state.get('_load_all_attempts', False)
-            if load_all:
-                cursor.execute('''
-                SELECT ta.id, ta.test_id, ta.student_id, ta.answers, ta.score, ta.started_at, ta.submitted_at, 
-                    u.username, u.name, u.roll_number, t.title
-                FROM test_attempts ta
-                LEFT JOIN users u ON ta.student_id = u.id
-                LEFT JOIN tests t ON ta.test_id = t.id
-                ORDER BY ta.submitted_at DESC
-                ''')
-            else:
-                cursor.execute(f'''
-                SELECT ta.id, ta.test_id, ta.student_id, ta.answers, ta.score, ta.started_at, ta.submitted_at, 
-                    u.username, u.name, u.roll_number, t.title
-                FROM test_attempts ta
-                LEFT JOIN users u ON ta.student_id = u.id
-                LEFT JOIN tests t ON ta.test_id = t.id
-                ORDER BY ta.submitted_at DESC
-                LIMIT {limit}
-                ''')
-            all_attempts = cursor.fetchall()
-            conn.close()
-            
-            if not all_attempts:
-                st.info("ℹ️ No test attempts found in the system. Students need to take tests for attempts to appear here.")
-            # Admin helper: allow seeding a demo attempt for a selected test and student
-            st.divider()
-            st.subheader("🔧 Admin: Seed Demo Attempt")
-            try:
-                conn2 = db_connect()
-                cur2 = conn2.cursor()
-                cur2.execute("SELECT id, username, name FROM users WHERE role = 'student' ORDER BY id")
-                student_rows = cur2.fetchall()
-                cur2.execute('SELECT id, title FROM tests ORDER BY id')
-                test_rows = cur2.fetchall()
-                conn2.close()
-            except Exception:
-                student_rows = []
-                test_rows = []
-
-            if student_rows and test_rows:
-                student_map = {f"{s[1]} ({s[2] or 'NoName'}) [ID:{s[0]}]": s[0] for s in student_rows}
-                test_map = {f"{t[1] or 'NoTitle'} [ID:{t[0]}]": t[0] for t in test_rows}
-                sel_student = st.selectbox("Select student for demo attempt", options=list(student_map.keys()))
-                sel_test = st.selectbox("Select test for demo attempt", options=list(test_map.keys()))
-                if st.button("Seed demo attempt for selected test"):
-                    sid = student_map[sel_student]
-                    tid = test_map[sel_test]
-                    demo_answers = {}
-                    # Build a minimal answers dict based on available questions
-                    qs = get_test_questions(tid)
-                    for q in qs:
-                        # choose first option (index 0) as demo answer
-                        demo_answers[str(q['id'])] = 0
-                    try:
-                        now_iso = datetime.now(ZoneInfo('Asia/Kolkata')).isoformat()
-                        r = submit_test_attempt(tid, sid, demo_answers, started_at=now_iso, submitted_at=now_iso)
-                        st.success(f"Seeded demo attempt — attempt_id: {r.get('attempt_id')} score: {r.get('score')}")
-                        # Refresh view by rerunning (so attempts list updates)
-                        safe_rerun()
-                    except Exception as e:
-                        st.error(f"Failed to seed demo attempt: {str(e)}")
-            else:
-                st.metric("Total Attempts", len(all_attempts))
-                # Option to load all attempts (may be slow for very large datasets)
-                col_l1, col_l2 = st.columns([3,1])
-                with col_l2:
-                    if st.button("Load all attempts (may be slow)"):
-                        st.session_state['_load_all_attempts'] = True
-                        safe_rerun()
-                st.divider()
-                
-                # Build DataFrame for display
-                rows = []
-                for att in all_attempts:
-                    attempt_id, test_id, student_id, answers_json, score, started_at, submitted_at, username, name, roll_number, test_title = att
-                    rows.append({
-                        'attempt_id': attempt_id,
-                        'test_id': test_id,
-                        'test_title': test_title or 'N/A',
-                        'student_id': student_id,
-                        'username': username or 'Unknown',
-                        'name': name or 'Unknown',
-                        'roll_number': roll_number or 'N/A',
-                        'score': score or 0,
-                        'submitted_at': format_ts_for_display(submitted_at),
-                        'answers_json': answers_json or ''
-                    })
-
-                df_attempts = pd.DataFrame(rows)
-                
-                # Display options
-                col1, col2 = st.columns(2)
-                with col1:
-                    search_field = st.selectbox("Search by:", options=['All', 'Test Title', 'Username', 'Roll Number'])
-                with col2:
-                    search_term = st.text_input("Search term")
-                
-                # Filter results
-                if search_term:
-                    if search_field == 'Test Title':
-                        df_filtered = df_attempts[df_attempts['test_title'].str.contains(search_term, case=False, na=False)]
-                    elif search_field == 'Username':
-                        df_filtered = df_attempts[df_attempts['username'].str.contains(search_term, case=False, na=False)]
-                    elif search_field == 'Roll Number':
-                        df_filtered = df_attempts[df_attempts['roll_number'].str.contains(search_term, case=False, na=False)]
-                    else:
-                        df_filtered = df_attempts
-                else:
-                    df_filtered = df_attempts
-                
-                st.subheader(f"Attempts ({len(df_filtered)} of {len(df_attempts)})")
-                
-                # Display table (skip if no rows)
-                if df_filtered.empty:
-                    st.info("No attempts match the current filters.")
-                else:
-                    # Safely select the display columns (ensure they exist)
-                    expected_cols = ['attempt_id', 'test_title', 'username', 'name', 'roll_number', 'score', 'submitted_at']
-                    present_cols = [c for c in expected_cols if c in df_filtered.columns]
-                    if not present_cols:
-                        st.warning("No displayable attempt columns available.")
-                    else:
-                        display_df = df_filtered[present_cols]
-                        st.dataframe(display_df, use_container_width=True, hide_index=True)
-                
-                # Download options
-                st.divider()
-                st.subheader("Export")
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    csv_bytes = df_filtered.to_csv(index=False).encode('utf-8')
-                    st.download_button(
-                        label="📥 Download Filtered (CSV)",
-                        data=csv_bytes,
-                        file_name=f"test_attempts_filtered_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                        mime='text/csv',
-                        use_container_width=True
-                    )
-                
-                with col2:
-                    csv_all = df_attempts.to_csv(index=False).encode('utf-8')
-                    st.download_button(
-                        label="📥 Download All (CSV)",
-                        data=csv_all,
-                        file_name=f"test_attempts_all_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                        mime='text/csv',
-                        use_container_width=True
-                    )
-                
-                # Detailed view (only if there are filtered attempts)
-                if not df_filtered.empty:
-                    st.divider()
-                    st.subheader("Detailed Attempt View")
-                    selected_attempt_id = st.selectbox("Select attempt to view details:", options=df_filtered['attempt_id'].tolist())
-                    
-                    if selected_attempt_id:
-                        selected_row = df_filtered[df_filtered['attempt_id'] == selected_attempt_id].iloc[0]
-                        st.write(f"**Attempt ID:** {selected_row['attempt_id']}")
-                        st.write(f"**Test:** {selected_row.get('test_title', 'N/A')} (ID: {selected_row.get('test_id', 'N/A')})")
-                        st.write(f"**Student:** {selected_row.get('name', 'N/A')} (Roll: {selected_row.get('roll_number', 'N/A')}, Username: {selected_row.get('username', 'N/A')})")
-                        st.write(f"**Score:** {selected_row.get('score', 'N/A')}")
-                        st.write(f"**Submitted at:** {selected_row.get('submitted_at', 'N/A')}")
-                        
-                        # Show answers in expandable section
-                        with st.expander("View Answers (JSON)"):
-                            st.code(selected_row.get('answers_json', ''), language='json')
-        
-        elif page == "ℹ️ About":
-            st.title("About This System")
-            st.markdown("""
-            ### Faculty Feedback Collection System
-            
-            **Admin Features:**
-            - View all feedback submissions
-            - Generate analytics and charts
-            - Export feedback data as CSV
-            - Monitor faculty performance
-            
-            **System Capabilities:**
-            - Multi-dimensional faculty evaluation
-            - 10-point rating scale
-            - Real-time statistics
-            - Data visualization with charts
-            """)
-            
-            st.divider()
-            st.subheader("📄 Documentation")
-            st.write("Download comprehensive documentation of the application including features, user roles, and technical details.")
-            
-            try:
-                pdf_buffer = generate_application_documentation()
-                st.download_button(
-                    label="📥 Download Application Documentation (PDF)",
-                    data=pdf_buffer,
-                    file_name=f"LMS_Documentation_{datetime.now(ZoneInfo('Asia/Kolkata')).strftime('%Y%m%d_%H%M%S')}.pdf",
-                    mime="application/pdf",
-                    use_container_width=True
-                )
-            except Exception as e:
-                st.error(f"Error generating documentation: {str(e)}")
-
-# Global footer: prepared by line shown on all pages at the bottom
-st.markdown("---")
-st.markdown(
-    "<div style='text-align:center; font-size:12px; color:#fff; background-color:#1f4788; padding:12px; border-radius:5px;'>"
-    "<strong style='color:#fff;'>Prepared by: Prof. Amir M. Usman Wagdarikar</strong><br>"
-    "<span style='color:#e0e0e0;'>Asst. Prof. Electronics and Telecommunication Engineering, VVP Institute of Engineering and technology, Solapur</span>"
-    "</div>",
-    unsafe_allow_html=True
-)
+
+import streamlit as st
+import pandas as pd
+import numpy as np
+import matplotlib.pyplot as plt
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+
+def parse_iso_to_kolkata(dt_str_or_obj):
+    """Parse an ISO string or datetime and return a tz-aware datetime in Asia/Kolkata."""
+    if not dt_str_or_obj:
+        return None
+    if isinstance(dt_str_or_obj, str):
+        try:
+            dt = datetime.fromisoformat(dt_str_or_obj)
+        except Exception:
+            return None
+    else:
+        dt = dt_str_or_obj
+    # Attach timezone if naive or convert to Asia/Kolkata
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=ZoneInfo("Asia/Kolkata"))
+    else:
+        return dt.astimezone(ZoneInfo("Asia/Kolkata"))
+
+
+def format_ts_for_display(ts, short=False):
+    """Return a safe string representation of a timestamp for UI display.
+
+    - Accepts None, ISO strings, or datetime objects.
+    - If `short` is True, returns a truncated date/time (first 16 chars) to match previous UI.
+    """
+    if not ts:
+        return 'N/A'
+    # If it's already a datetime, format it into a readable string in Asia/Kolkata
+    if isinstance(ts, datetime):
+        try:
+            s = ts.astimezone(ZoneInfo('Asia/Kolkata')).strftime('%Y-%m-%d %H:%M:%S')
+        except Exception:
+            s = ts.strftime('%Y-%m-%d %H:%M:%S')
+    else:
+        # For strings or other types, coerce to str (handles ISO strings from SQLite)
+        s = str(ts)
+    return s[:16] if short else s
+import json
+import base64
+import csv
+import sqlite3
+import hashlib
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from reportlab.lib.pagesizes import letter, A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table, TableStyle, Image
+from reportlab.lib import colors
+from io import BytesIO, StringIO
+
+# Support for external database (use DATABASE_URL env var for hosted DB)
+# If not provided, the app will use local SQLite file `feedback_streamlit.db`.
+# NOTE: On Streamlit Community Cloud the application filesystem is ephemeral
+# and local SQLite files are not persisted across app restarts or redeploys.
+# To persist data in production, configure a hosted database and set
+# the `DATABASE_URL` environment variable (e.g. Postgres URI).
+DATABASE_URL = os.environ.get('DATABASE_URL')
+
+def generate_application_documentation():
+    """Generate a comprehensive PDF documentation of the application."""
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter, rightMargin=0.5*inch, leftMargin=0.5*inch,
+                           topMargin=0.75*inch, bottomMargin=0.75*inch)
+    elements = []
+    styles = getSampleStyleSheet()
+    
+    # Title style
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        textColor=colors.HexColor('#8B3A3A'),
+        spaceAfter=6,
+        alignment=1  # Center
+    )
+    
+    # Heading style
+    heading_style = ParagraphStyle(
+        'CustomHeading',
+        parent=styles['Heading2'],
+        fontSize=14,
+        textColor=colors.HexColor('#1f4788'),
+        spaceAfter=6,
+        spaceBefore=12
+    )
+    
+    # Normal text style
+    normal_style = ParagraphStyle(
+        'CustomNormal',
+        parent=styles['Normal'],
+        fontSize=11,
+        spaceAfter=6,
+        leading=14
+    )
+    
+    # Add title
+    elements.append(Paragraph("VVP Institute of Engineering and Technology", title_style))
+    elements.append(Paragraph("Student Learning Management System - Documentation", heading_style))
+    elements.append(Spacer(1, 0.2*inch))
+    
+    # Overview
+    elements.append(Paragraph("<b>Application Overview</b>", heading_style))
+    elements.append(Paragraph(
+        "The VVP Institute Student Learning Management System (LMS) is a comprehensive platform designed to facilitate "
+        "academic interactions between students, faculty, and administrators. This system provides tools for attendance tracking, "
+        "resource management, testing, and feedback collection.",
+        normal_style
+    ))
+    elements.append(Spacer(1, 0.1*inch))
+    
+    # Key Features
+    elements.append(Paragraph("<b>Key Features</b>", heading_style))
+    features = [
+        "<b>Student Dashboard:</b> Centralized access to attendance, resources, tests, and feedback submission",
+        "<b>Faculty Management:</b> Mark daily attendance, maintain daily lecture records (LER), and upload course materials",
+        "<b>Admin Controls:</b> Manage subjects, faculty, student roster, view analytics, and export data",
+        "<b>Attendance Tracking:</b> Daily attendance recording with monthly rollups and academic-year based calculations",
+        "<b>Online Testing:</b> Create and administer tests with automatic scoring",
+        "<b>Resource Management:</b> Upload and organize assignments, notes, and other course materials",
+        "<b>Feedback System:</b> Comprehensive 10-question faculty feedback form with scheduled submission windows",
+        "<b>Leave Management:</b> Faculty leave requests and tracking with automatic annual reset",
+        "<b>Academic Year Support:</b> Automatic handling of academic years (July 1 - June 30)"
+    ]
+    for feature in features:
+        elements.append(Paragraph(f"• {feature}", normal_style))
+    
+    elements.append(Spacer(1, 0.15*inch))
+    
+    # User Roles
+    elements.append(Paragraph("<b>User Roles and Responsibilities</b>", heading_style))
+    
+    # Students
+    elements.append(Paragraph("<b><u>Students</u></b>", styles['Heading3']))
+    student_features = [
+        "View personal attendance percentage and detailed attendance records",
+        "Access course materials (assignments, notes) organized by year level and semester",
+        "Submit faculty feedback (during scheduled feedback windows)",
+        "Take online tests and view attempts/scores",
+        "Calculate academic credits using the credit calculator",
+        "Download resources uploaded by faculty"
+    ]
+    for feature in student_features:
+        elements.append(Paragraph(f"• {feature}", normal_style))
+    
+    elements.append(Spacer(1, 0.1*inch))
+    
+    # Faculty
+    elements.append(Paragraph("<b><u>Faculty Members</u></b>", styles['Heading3']))
+    faculty_features = [
+        "Mark daily attendance for students",
+        "Record Daily Lecture Entry (LER) with topics, lecture numbers, and syllabus coverage",
+        "Create and manage online tests",
+        "Upload course materials (assignments, notes)",
+        "Request leave with alternative faculty assignment",
+        "View their feedback from students and department statistics"
+    ]
+    for feature in faculty_features:
+        elements.append(Paragraph(f"• {feature}", normal_style))
+    
+    elements.append(Spacer(1, 0.1*inch))
+    
+    # Admin
+    elements.append(Paragraph("<b><u>Administrators</u></b>", styles['Heading3']))
+    admin_features = [
+        "Manage subjects and assign faculty to subjects",
+        "Manage faculty profiles and departments",
+        "Upload and manage student roster (Excel/CSV format)",
+        "View student attendance and generate reports",
+        "View and export feedback data",
+        "Set feedback submission windows",
+        "Manage faculty leaves and absences",
+        "Export Daily LER records",
+        "Access analytics and system statistics"
+    ]
+    for feature in admin_features:
+        elements.append(Paragraph(f"• {feature}", normal_style))
+    
+    elements.append(PageBreak())
+    
+    # Feedback System
+    elements.append(Paragraph("<b>Feedback System - 10-Question Rubric</b>", heading_style))
+    questions = [
+        "1. Has fundamental concepts & subject knowledge",
+        "2. Preparation for Subject is sufficient while coming to class",
+        "3. Sufficient knowledge about current trends/development of subject",
+        "4. Proficient in English & communication skills",
+        "5. Teaching makes class interesting & interactive through student participation",
+        "6. Faculty is punctual in starting and ending classes on time",
+        "7. Has covered the entire syllabus as prescribed by university",
+        "8. Extent of fulfillment of your learning expectations",
+        "9. Behavior with students is appropriate and rational",
+        "10. Motivates students for their study and better career"
+    ]
+    for q in questions:
+        elements.append(Paragraph(f"• {q}", normal_style))
+    
+    elements.append(Spacer(1, 0.15*inch))
+    elements.append(Paragraph("Each question is rated on a scale of 1-10 (1=Strongly Disagree, 10=Strongly Agree).", normal_style))
+    
+    elements.append(Spacer(1, 0.15*inch))
+    
+    # Attendance
+    elements.append(Paragraph("<b>Attendance Tracking</b>", heading_style))
+    elements.append(Paragraph(
+        "• Attendance is tracked daily for each student per faculty member and subject\n"
+        "• Monthly attendance records are automatically aggregated\n"
+        "• Academic Year calculation: July 1 - June 30 (resets annually)\n"
+        "• Students need >= 60% attendance to submit feedback\n"
+        "• Attendance percentage is displayed to students in real-time",
+        normal_style
+    ))
+    
+    elements.append(Spacer(1, 0.15*inch))
+    
+    # Academic Year
+    elements.append(Paragraph("<b>Academic Year System</b>", heading_style))
+    elements.append(Paragraph(
+        "The system follows the Indian academic year calendar:\n"
+        "• Academic Year runs from July 1 to June 30\n"
+        "• Leave balances reset automatically at the start of each academic year\n"
+        "• Reports and statistics are organized by academic year\n"
+        "• Year Level: FY (First Year), SY (Second Year), TY (Third Year), Final Year",
+        normal_style
+    ))
+    
+    elements.append(Spacer(1, 0.15*inch))
+    
+    # Technical Details
+    elements.append(Paragraph("<b>Technical Details</b>", heading_style))
+    elements.append(Paragraph(
+        "• Platform: Streamlit (Python web framework)\n"
+        "• Database: SQLite3\n"
+        "• Timezone: Asia/Kolkata (IST)\n"
+        "• Authentication: Username/Password with SHA256 hashing\n"
+        "• Data Format: ISO 8601 timestamps with timezone awareness",
+        normal_style
+    ))
+    
+    elements.append(Spacer(1, 0.15*inch))
+    
+    # Support & Contact
+    elements.append(Paragraph("<b>Support & Contact</b>", heading_style))
+    elements.append(Paragraph(
+        "For assistance or issues, please contact:\n"
+        "<b>Prof. Amir M. Usman Wagdarikar</b>\n"
+        "Assistant Professor, Electronics and Telecommunication Engineering\n"
+        "VVP Institute of Engineering and Technology, Solapur, Maharashtra, India",
+        normal_style
+    ))
+    
+    elements.append(Spacer(1, 0.2*inch))
+    elements.append(Paragraph(f"<i>Documentation generated on {datetime.now(ZoneInfo('Asia/Kolkata')).strftime('%Y-%m-%d %H:%M:%S')}</i>", normal_style))
+    
+    # Build PDF
+    doc.build(elements)
+    buffer.seek(0)
+    return buffer
+
+# Database setup
+DB_PATH = "feedback_streamlit.db"
+
+# Connection pool tuning. Streamlit re-executes this script on every widget
+# interaction, so connections are pooled process-wide (see `_get_pg_pool` and
+# `_get_sqlite_local`) instead of being opened and torn down per helper call.
+DB_POOL_MIN = int(os.environ.get('DB_POOL_MIN', '1'))
+DB_POOL_MAX = int(os.environ.get('DB_POOL_MAX', '10'))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '10'))
+DB_POOL_MAX_IDLE = float(os.environ.get('DB_POOL_MAX_IDLE', '300'))
+DB_POOL_HEALTHCHECK_AFTER = float(os.environ.get('DB_POOL_HEALTHCHECK_AFTER', '30'))
+# Idle SQLite connections kept per thread (nested db_connect() calls need more than one)
+SQLITE_IDLE_PER_THREAD = 2
+
+# Query instrumentation: statements slower than DB_SLOW_QUERY_MS (execute + fetch) are
+# appended to DB_SLOW_QUERY_LOG. Set DB_SLOW_QUERY_MS=0 to turn the log off.
+DB_SLOW_QUERY_MS = float(os.environ.get('DB_SLOW_QUERY_MS', '250'))
+DB_SLOW_QUERY_LOG = os.environ.get('DB_SLOW_QUERY_LOG', 'slow_queries.log')
+
+# Write-behind feedback queue: submissions are appended (fsync'd) to FEEDBACK_QUEUE_JOURNAL
+# and inserted by a background thread in transactions of up to FEEDBACK_QUEUE_MAX_BATCH rows,
+# no later than FEEDBACK_QUEUE_MAX_DELAY_MS after they were queued.
+FEEDBACK_QUEUE_JOURNAL = os.environ.get('FEEDBACK_QUEUE_JOURNAL', 'feedback_queue.journal')
+FEEDBACK_QUEUE_MAX_BATCH = int(os.environ.get('FEEDBACK_QUEUE_MAX_BATCH', '200'))
+FEEDBACK_QUEUE_MAX_DELAY_MS = float(os.environ.get('FEEDBACK_QUEUE_MAX_DELAY_MS', '500'))
+
+# Test submissions go through the same write-behind pipeline. At most
+# TEST_ATTEMPT_QUEUE_MAX_PENDING attempts wait in memory; a submit that finds the queue
+# full waits up to TEST_ATTEMPT_QUEUE_SUBMIT_TIMEOUT_S and then writes directly.
+TEST_ATTEMPT_QUEUE_JOURNAL = os.environ.get('TEST_ATTEMPT_QUEUE_JOURNAL', 'test_attempt_queue.journal')
+TEST_ATTEMPT_QUEUE_MAX_BATCH = int(os.environ.get('TEST_ATTEMPT_QUEUE_MAX_BATCH', '200'))
+TEST_ATTEMPT_QUEUE_MAX_DELAY_MS = float(os.environ.get('TEST_ATTEMPT_QUEUE_MAX_DELAY_MS', '250'))
+TEST_ATTEMPT_QUEUE_MAX_PENDING = int(os.environ.get('TEST_ATTEMPT_QUEUE_MAX_PENDING', '2000'))
+TEST_ATTEMPT_QUEUE_SUBMIT_TIMEOUT_S = float(os.environ.get('TEST_ATTEMPT_QUEUE_SUBMIT_TIMEOUT_S', '5'))
+
+# Background exports: each process keeps its finished files in its own subdirectory of
+# EXPORT_JOB_DIR, built by EXPORT_JOB_WORKERS threads. Another process's subdirectory is
+# only removed once it has been idle for EXPORT_JOB_RETENTION_S.
+EXPORT_JOB_DIR = os.environ.get('EXPORT_JOB_DIR', 'export_jobs')
+EXPORT_JOB_WORKERS = int(os.environ.get('EXPORT_JOB_WORKERS', '2'))
+EXPORT_JOB_RETENTION_S = float(os.environ.get('EXPORT_JOB_RETENTION_S', str(24 * 3600)))
+
+# Faculty uploads are stored once per distinct content under
+# RESOURCE_STORE_DIR/<sha256[:2]>/<sha256> and shared by every row with that hash.
+RESOURCE_STORE_DIR = os.environ.get('RESOURCE_STORE_DIR', 'faculty_resources')
+RESOURCE_CHUNK_SIZE = 1 << 20
+
+
+def _build_pg_dsn(database_url):
+    """Normalise DATABASE_URL into a DSN psycopg2 accepts (password quoting, sslmode, Neon endpoint)."""
+    from urllib.parse import quote_plus, urlparse, unquote_plus, parse_qsl, urlencode
+
+    dsn = database_url.strip()
+
+    # If password contains special chars and the DSN has multiple '@', rebuild with encoded password
+    try:
+        if dsn.count('@') > 1 and '://' in dsn:
+            scheme, rest = dsn.split('://', 1)
+            last_at = rest.rfind('@')
+            auth = rest[:last_at]
+            host_part = rest[last_at+1:]
+            if ':' in auth:
+                user, pwd = auth.split(':', 1)
+                pwd_enc = quote_plus(unquote_plus(pwd))
+                dsn = f"{scheme}://{user}:{pwd_enc}@{host_part}"
+    except Exception:
+        # If something goes wrong with reparsing, keep original dsn
+        pass
+
+    # Remove any channel_binding parameter (it often causes auth failures on some clients)
+    try:
+        parsed = urlparse(dsn)
+        query_pairs = dict(parse_qsl(parsed.query, keep_blank_values=True))
+
+        # Remove channel_binding if present
+        if 'channel_binding' in query_pairs:
+            query_pairs.pop('channel_binding', None)
+
+        # Ensure sslmode=require is present
+        if 'sslmode' not in query_pairs:
+            query_pairs['sslmode'] = 'require'
+
+        # If the host looks like Neon (ep-...), and options endpoint is not present, add it.
+        host = parsed.hostname or ''
+        # Extract endpoint id from host if it starts with 'ep-'
+        endpoint_id = None
+        if host.startswith('ep-'):
+            # host may be like ep-xxxxxxx-pooler.region.aws.neon.tech
+            # endpoint id is the first part up to the first dot or the first '-pooler' piece
+            endpoint_id = host.split('.', 1)[0]
+            # Normalize: if it contains suffixes like '-pooler', strip them
+            if '-pooler' in endpoint_id:
+                endpoint_id = endpoint_id.split('-pooler', 1)[0]
+
+        # If endpoint_id was found and options not set, add it
+        if endpoint_id and 'options' not in query_pairs:
+            # options must be URL-encoded value like endpoint%3Dep-xxxx
+            # We'll place the unencoded value and let urlencode handle encoding
+            query_pairs['options'] = f"endpoint={endpoint_id}"
+
+        # Rebuild query and DSN
+        new_query = urlencode(query_pairs, doseq=True)
+        # Build new DSN preserving username/password/host/path
+        rebuilt = parsed._replace(query=new_query)
+        dsn = rebuilt.geturl()
+    except Exception:
+        # If parsing fails, fall back to original dsn (still better than nothing)
+        pass
+
+    return dsn
+
+
+# Statements issued on this thread are appended here while `capture_queries()` is active
+_query_capture = threading.local()
+
+
+def _capture_query(query, params):
+    statements = getattr(_query_capture, 'statements', None)
+    if statements is not None:
+        statements.append((query, params))
+
+
+class capture_queries:
+    """Context manager collecting every (query, params) executed on this thread.
+
+    Used by the index advisor to see exactly which statements a helper issues.
+    """
+
+    def __enter__(self):
+        self.statements = []
+        self._previous = getattr(_query_capture, 'statements', None)
+        _query_capture.statements = self.statements
+        return self.statements
+
+    def __exit__(self, *exc):
+        _query_capture.statements = self._previous
+        return False
+
+
+class QueryStats:
+    """Process-wide query statistics shared by every session (see `_get_query_stats`).
+
+    Keeps count/latency/row aggregates per (calling helper, statement) and per page,
+    and appends statements slower than `slow_ms` to the slow-query log.
+    """
+
+    def __init__(self, slow_ms=250.0, slow_log=None):
+        self.slow_ms = slow_ms
+        self.slow_log = slow_log
+        self._lock = threading.Lock()
+        self._statements = {}
+        self._pages = {}
+
+    def record(self, helper, query, ms, rows, page=None):
+        statement = ' '.join(query.split())
+        with self._lock:
+            agg = self._statements.get((helper, statement))
+            if agg is None:
+                agg = self._statements[(helper, statement)] = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0}
+            agg['count'] += 1
+            agg['total_ms'] += ms
+            agg['max_ms'] = max(agg['max_ms'], ms)
+            agg['rows'] += rows
+        if self.slow_log and self.slow_ms > 0 and ms >= self.slow_ms:
+            try:
+                with open(self.slow_log, 'a', encoding='utf-8') as lf:
+                    lf.write(f"{datetime.now(ZoneInfo('Asia/Kolkata')).isoformat()} - {ms:.1f} ms - rows={rows} - "
+                             f"helper={helper} - page={page or '-'} - {statement}\n")
+            except Exception:
+                pass
+
+    def record_page(self, page, queries, ms):
+        with self._lock:
+            agg = self._pages.get(page)
+            if agg is None:
+                agg = self._pages[page] = {'renders': 0, 'queries': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                                           'last_queries': 0, 'last_ms': 0.0}
+            agg['renders'] += 1
+            agg['queries'] += queries
+            agg['total_ms'] += ms
+            agg['max_ms'] = max(agg['max_ms'], ms)
+            agg['last_queries'] = queries
+            agg['last_ms'] = ms
+
+    def top_statements(self, limit=20, order_by='total_ms'):
+        """Return the `limit` worst statements by `order_by` (total_ms, max_ms or count)."""
+        with self._lock:
+            rows = [dict(helper=h, query=q, **agg) for (h, q), agg in self._statements.items()]
+        rows.sort(key=lambda r: r[order_by], reverse=True)
+        return rows[:limit]
+
+    def page_summaries(self):
+        with self._lock:
+            rows = [dict(page=p, **agg) for p, agg in self._pages.items()]
+        rows.sort(key=lambda r: r['total_ms'], reverse=True)
+        return rows
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+            self._pages.clear()
+
+
+@st.cache_resource
+def _get_query_stats():
+    return QueryStats(DB_SLOW_QUERY_MS, DB_SLOW_QUERY_LOG)
+
+
+# Per-thread accounting for the page currently being rendered (see begin_page_render)
+_page_render = threading.local()
+
+
+def begin_page_render(page):
+    """Start counting this thread's queries towards `page`."""
+    _page_render.page = page
+    _page_render.queries = 0
+    _page_render.ms = 0.0
+
+
+def end_page_render():
+    """Record the current page render's totals; returns (page, queries, ms) or None."""
+    page = getattr(_page_render, 'page', None)
+    if page is None:
+        return None
+    _page_render.page = None
+    _get_query_stats().record_page(page, _page_render.queries, _page_render.ms)
+    return page, _page_render.queries, _page_render.ms
+
+
+# Frames that issue SQL on behalf of another helper; attribution skips past them
+_INSTRUMENTATION_PASSTHROUGH = frozenset({'insert_returning_id', 'get_table_columns', '_try_ddl'})
+
+
+def _calling_helper():
+    """Name the app function that issued the current statement."""
+    frame = sys._getframe(3)
+    while frame is not None:
+        code = frame.f_code
+        # co_qualname turns cached inner functions (get_x.<locals>._cached) into get_x
+        name = getattr(code, 'co_qualname', code.co_name).split('.<locals>')[0]
+        if name not in _INSTRUMENTATION_PASSTHROUGH:
+            return 'page' if name == '<module>' else name
+        frame = frame.f_back
+    return 'unknown'
+
+
+class InstrumentedCursor:
+    """Base for the backend cursor wrappers: times every statement and its fetches.
+
+    A statement's record (latency of execute plus fetches, rows returned or affected,
+    calling helper) is flushed to QueryStats and the current page render when the
+    next statement starts or the cursor is closed or garbage collected.
+    Subclasses implement `_execute` and `_executemany`.
+    """
+
+    def __init__(self, cur):
+        self._cur = cur
+        self._pending = None
+
+    def _flush(self):
+        pending, self._pending = self._pending, None
+        if pending is None:
+            return
+        query, helper, ms, rows = pending
+        if getattr(_page_render, 'page', None) is not None:
+            _page_render.queries += 1
+            _page_render.ms += ms
+        try:
+            _get_query_stats().record(helper, query, ms, rows, getattr(_page_render, 'page', None))
+        except Exception:
+            pass
+
+    def _timed(self, run, query, params):
+        self._flush()
+        _capture_query(query, params)
+        helper = _calling_helper()
+        t0 = time.perf_counter()
+        try:
+            return run()
+        finally:
+            try:
+                affected = max(self._cur.rowcount, 0)
+            except Exception:
+                affected = 0
+            self._pending = [query, helper, (time.perf_counter() - t0) * 1000, affected]
+
+    def _fetched(self, run, count):
+        t0 = time.perf_counter()
+        result = run()
+        if self._pending is not None:
+            self._pending[2] += (time.perf_counter() - t0) * 1000
+            n = count(result)
+            # Postgres reports a SELECT's row count up front; SQLite only as rows are fetched
+            self._pending[3] = max(self._pending[3], n) if DATABASE_URL else self._pending[3] + n
+        return result
+
+    def execute(self, query, params=None):
+        return self._timed(lambda: self._execute(query, params), query, params)
+
+    def executemany(self, query, seq_of_params):
+        return self._timed(lambda: self._executemany(query, seq_of_params), query, None)
+
+    def fetchall(self):
+        return self._fetched(self._cur.fetchall, len)
+
+    def fetchone(self):
+        return self._fetched(self._cur.fetchone, lambda row: 0 if row is None else 1)
+
+    def fetchmany(self, size):
+        return self._fetched(lambda: self._cur.fetchmany(size), len)
+
+    @property
+    def description(self):
+        return self._cur.description
+
+    def close(self):
+        self._flush()
+        return self._cur.close()
+
+    @property
+    def rowcount(self):
+        return self._cur.rowcount
+
+    def __del__(self):
+        try:
+            self._flush()
+        except Exception:
+            pass
+
+
+# Thin wrapper to convert '?' -> '%s' for queries elsewhere in the app
+class PGCursorWrapper(InstrumentedCursor):
+    def _execute(self, query, params):
+        if params is None:
+            return self._cur.execute(query)
+        q = query.replace('?', '%s')
+        return self._cur.execute(q, params)
+
+    def _executemany(self, query, seq_of_params):
+        q = query.replace('?', '%s')
+        return self._cur.executemany(q, seq_of_params)
+
+    @property
+    def lastrowid(self):
+        """Return last inserted id for Postgres by calling LASTVAL() on the cursor.
+
+        This mirrors sqlite3.Cursor.lastrowid for code that expects it. Returns None
+        if LASTVAL() is not available (e.g., no sequence used yet). Prefer
+        `insert_returning_id()`, which avoids the extra round trip.
+        """
+        try:
+            # Use the same cursor/connection session to fetch LASTVAL()
+            self._cur.execute("SELECT LASTVAL()")
+            row = self._cur.fetchone()
+            return row[0] if row else None
+        except Exception:
+            return None
+
+
+class PGConnWrapper:
+    """Postgres connection checked out of `PGConnectionPool`.
+
+    `close()` hands the underlying connection back to the pool (rolling back any
+    uncommitted work) instead of closing the socket, so callers keep the usual
+    connect/close pattern.
+    """
+
+    def __init__(self, conn, pool=None):
+        self._conn = conn
+        self._pool = pool
+
+    def cursor(self, name=None):
+        """Pass `name` for a server-side cursor that streams rows on fetchmany()."""
+        return PGCursorWrapper(self._conn.cursor(name=name) if name else self._conn.cursor())
+
+    def commit(self):
+        return self._conn.commit()
+
+    def rollback(self):
+        return self._conn.rollback()
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        if self._pool is not None:
+            self._pool.release(conn)
+        else:
+            conn.close()
+
+    def __del__(self):
+        # Safety net for helpers that return early without closing
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class PGConnectionPool:
+    """Thread-safe, bounded pool of psycopg2 connections shared by the whole process.
+
+    Idle connections are reused LIFO. Connections idle for longer than `max_idle`
+    seconds are evicted (down to `minconn`), and connections idle for longer than
+    `healthcheck_after` seconds are pinged with `SELECT 1` before being handed out.
+    When all `maxconn` connections are busy, `acquire()` waits up to `timeout`
+    seconds before raising RuntimeError.
+    """
+
+    def __init__(self, dsn, minconn=1, maxconn=10, timeout=10.0, max_idle=300.0, healthcheck_after=30.0):
+        try:
+            import psycopg2
+        except Exception:
+            raise RuntimeError(
+                "psycopg2 is required when DATABASE_URL is set. "
+                "Add psycopg2-binary to requirements.txt"
+            )
+        self._psycopg2 = psycopg2
+        self._dsn = dsn
+        self.minconn = max(0, minconn)
+        self.maxconn = max(1, maxconn)
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.healthcheck_after = healthcheck_after
+        self._idle = []  # (conn, last_used) pairs, oldest first
+        self._in_use = 0
+        self._cond = threading.Condition()
+
+    def _connect(self):
+        return self._psycopg2.connect(self._dsn, connect_timeout=10)
+
+    @staticmethod
+    def _discard(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _evict_idle(self, now):
+        while len(self._idle) > self.minconn and now - self._idle[0][1] > self.max_idle:
+            conn, _ = self._idle.pop(0)
+            self._discard(conn)
+
+    def _is_healthy(self, conn, idle_for):
+        if conn.closed:
+            return False
+        if idle_for < self.healthcheck_after:
+            return True
+        try:
+            cur = conn.cursor()
+            cur.execute('SELECT 1')
+            cur.fetchone()
+            cur.close()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def acquire(self):
+        """Check out a connection, returned as a `PGConnWrapper`."""
+        deadline = time.monotonic() + self.timeout
+        conn = None
+        idle_for = 0.0
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._evict_idle(now)
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    idle_for = now - last_used
+                    self._in_use += 1
+                    break
+                if self._in_use < self.maxconn:
+                    self._in_use += 1
+                    break
+                remaining = deadline - now
+                if remaining <= 0:
+                    raise RuntimeError(f"Database connection pool exhausted ({self.maxconn} connections in use)")
+                self._cond.wait(remaining)
+
+        # Health check / connect outside the lock so slow network I/O does not block other threads
+        try:
+            if conn is not None and not self._is_healthy(conn, idle_for):
+                self._discard(conn)
+                conn = None
+            if conn is None:
+                conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        return PGConnWrapper(conn, self)
+
+    def release(self, conn):
+        """Return a raw connection to the pool, discarding it if it is broken."""
+        try:
+            if not conn.closed:
+                # Never leak an open (or aborted) transaction to the next borrower
+                conn.rollback()
+        except Exception:
+            self._discard(conn)
+        with self._cond:
+            self._in_use -= 1
+            if not conn.closed:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {'in_use': self._in_use, 'idle': len(self._idle), 'max': self.maxconn}
+
+
+@st.cache_resource
+def _get_pg_pool():
+    """Process-wide Postgres pool (DSN is normalised once, not per query)."""
+    return PGConnectionPool(
+        _build_pg_dsn(DATABASE_URL),
+        minconn=DB_POOL_MIN,
+        maxconn=DB_POOL_MAX,
+        timeout=DB_POOL_TIMEOUT,
+        max_idle=DB_POOL_MAX_IDLE,
+        healthcheck_after=DB_POOL_HEALTHCHECK_AFTER,
+    )
+
+
+class SQLiteCursorWrapper(InstrumentedCursor):
+    """sqlite3 cursor routed through the same statement hooks as PGCursorWrapper."""
+
+    def _execute(self, query, params):
+        return self._cur.execute(query, params if params is not None else ())
+
+    def _executemany(self, query, seq_of_params):
+        return self._cur.executemany(query, seq_of_params)
+
+    @property
+    def lastrowid(self):
+        return self._cur.lastrowid
+
+
+class SQLiteConnWrapper:
+    """Reusable SQLite connection handed out by db_connect().
+
+    `close()` rolls back any uncommitted work and parks the connection on the
+    calling thread's idle list, so the next db_connect() on that thread skips
+    opening the database file again.
+    """
+
+    def __init__(self, conn, idle):
+        self._conn = conn
+        self._idle = idle
+
+    def cursor(self, name=None):
+        # sqlite3 cursors already step through results lazily; `name` is accepted for parity
+        return SQLiteCursorWrapper(self._conn.cursor())
+
+    def commit(self):
+        return self._conn.commit()
+
+    def rollback(self):
+        return self._conn.rollback()
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except Exception:
+            conn.close()
+            return
+        if len(self._idle) < SQLITE_IDLE_PER_THREAD:
+            self._idle.append(conn)
+        else:
+            conn.close()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+@st.cache_resource
+def _get_sqlite_local():
+    """Thread-local holder for reusable SQLite connections (one idle list per thread)."""
+    return threading.local()
+
+
+# Database connection helper
+# If `DATABASE_URL` environment variable is set (Postgres URI), connections are drawn
+# from a process-wide pool and wrapped so `?` placeholders are accepted (converted to
+# `%s` for psycopg2). Otherwise a reusable thread-local sqlite3 connection is returned.
+def db_connect():
+    """Return a DB-API connection. Uses Postgres if DATABASE_URL is set, else SQLite.
+
+    Callers must still call `close()`; it returns the connection for reuse.
+    """
+    if DATABASE_URL:
+        return _get_pg_pool().acquire()
+
+    local = _get_sqlite_local()
+    idle = getattr(local, 'idle', None)
+    if idle is None:
+        idle = local.idle = []
+    if idle:
+        conn = idle.pop()
+    else:
+        # SQLite for local development; allow multithreaded access
+        conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    return SQLiteConnWrapper(conn, idle)
+
+
+def insert_returning_id(cursor, query, params=()):
+    """Execute a single-row INSERT and return the new row's id in one round trip.
+
+    Appends `RETURNING id` on Postgres (no separate LASTVAL() query, and safe behind
+    a transaction pooler); uses sqlite3's `cursor.lastrowid` on SQLite. Sequences
+    are repaired once by the schema bootstrap, not before each insert.
+    """
+    if DATABASE_URL:
+        cursor.execute(query.rstrip().rstrip(';') + ' RETURNING id', params)
+        row = cursor.fetchone()
+        return row[0] if row else None
+    cursor.execute(query, params)
+    return cursor.lastrowid
+
+
+def get_table_columns(table_name, cursor=None):
+    """Return a list of column names for the given table in a portable way.
+
+    Uses PRAGMA for SQLite or information_schema for Postgres. Pass `cursor` to
+    reuse an open connection (e.g. inside a migration) instead of opening one.
+    """
+    conn = None
+    if cursor is None:
+        conn = db_connect()
+        cursor = conn.cursor()
+    try:
+        if DATABASE_URL:
+            # information_schema.column_name returns lowercase names on Postgres
+            cursor.execute('SELECT column_name FROM information_schema.columns WHERE table_name = ? ORDER BY ordinal_position', (table_name,))
+            cols = [r[0] for r in cursor.fetchall()]
+        else:
+            cursor.execute(f"PRAGMA table_info({table_name})")
+            cols = [r[1] for r in cursor.fetchall()]
+    finally:
+        if conn is not None:
+            conn.close()
+    return cols
+
+
+def _try_ddl(cursor, statement):
+    """Run a best-effort DDL statement, ignoring failures.
+
+    On Postgres a failed statement aborts the whole transaction, so the statement
+    is fenced with a savepoint that is rolled back on error.
+    """
+    if DATABASE_URL:
+        cursor.execute('SAVEPOINT try_ddl')
+        try:
+            cursor.execute(statement)
+        except Exception:
+            cursor.execute('ROLLBACK TO SAVEPOINT try_ddl')
+            return False
+        cursor.execute('RELEASE SAVEPOINT try_ddl')
+        return True
+    try:
+        cursor.execute(statement)
+        return True
+    except Exception:
+        return False
+
+
+def _migration_0001_baseline(cursor):
+    """Baseline schema: every table, index and column backfill init_database() used to run."""
+    # Users table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY,
+            username TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            role TEXT NOT NULL DEFAULT 'student',
+            faculty_id INTEGER,
+            name TEXT,
+            branch TEXT,
+            class TEXT,
+            FOREIGN KEY(faculty_id) REFERENCES faculty(id)
+        )
+    ''')
+
+    # Faculty table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS faculty (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            department TEXT,
+            year_level TEXT DEFAULT 'FY'
+        )
+    ''')
+
+    # Optional table to map faculty to additional year levels they teach
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS faculty_year_level (
+            id INTEGER PRIMARY KEY,
+            faculty_id INTEGER NOT NULL,
+            year_level TEXT NOT NULL,
+            UNIQUE(faculty_id, year_level),
+            FOREIGN KEY(faculty_id) REFERENCES faculty(id)
+        )
+    ''')
+
+    # Subjects and their faculty assignments (previously only created by reset_db_with_years.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS subjects (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            year_level TEXT NOT NULL,
+            department TEXT,
+            code TEXT
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS faculty_subject (
+            faculty_id INTEGER NOT NULL,
+            subject_id INTEGER NOT NULL,
+            PRIMARY KEY (faculty_id, subject_id),
+            FOREIGN KEY(faculty_id) REFERENCES faculty(id),
+            FOREIGN KEY(subject_id) REFERENCES subjects(id)
+        )
+    ''')
+
+    # Assignments and notes uploaded by faculty
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS faculty_resources (
+            id INTEGER PRIMARY KEY,
+            faculty_id INTEGER NOT NULL,
+            subject_id INTEGER NOT NULL,
+            resource_type TEXT NOT NULL,
+            filename TEXT NOT NULL,
+            file_path TEXT NOT NULL,
+            uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            deadline TIMESTAMP,
+            FOREIGN KEY(faculty_id) REFERENCES faculty(id),
+            FOREIGN KEY(subject_id) REFERENCES subjects(id)
+        )
+    ''')
+
+    # Assignment submissions table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS assignment_submissions (
+            id INTEGER PRIMARY KEY,
+            assignment_id INTEGER NOT NULL,
+            student_id INTEGER NOT NULL,
+            submission_file TEXT,
+            submitted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(assignment_id) REFERENCES faculty_resources(id),
+            FOREIGN KEY(student_id) REFERENCES users(id)
+        )
+    ''')
+
+    # Attendance tracking table (monthly)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS attendance (
+            id INTEGER PRIMARY KEY,
+            student_id INTEGER NOT NULL,
+            faculty_id INTEGER NOT NULL,
+            subject_id INTEGER NOT NULL,
+            month INTEGER NOT NULL,
+            year INTEGER NOT NULL,
+            academic_year TEXT,
+            classes_attended INTEGER DEFAULT 0,
+            total_classes INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(student_id) REFERENCES users(id),
+            FOREIGN KEY(faculty_id) REFERENCES faculty(id),
+            FOREIGN KEY(subject_id) REFERENCES subjects(id),
+            UNIQUE(student_id, faculty_id, subject_id, month, academic_year)
+        )
+    ''')
+
+    # No default subjects are seeded. Subjects should be added by admin via the Manage Subjects page.
+    # Existing faculty_subject mappings are left unchanged.
+    # Additional tables: feedback scheduling, daily attendance, tests and related tables
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS feedback_schedule (
+            id INTEGER PRIMARY KEY,
+            start_ts TIMESTAMP NOT NULL,
+            end_ts TIMESTAMP NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS daily_attendance (
+            id INTEGER PRIMARY KEY,
+            student_id INTEGER NOT NULL,
+            faculty_id INTEGER NOT NULL,
+            subject_id INTEGER NOT NULL,
+            date DATE NOT NULL,
+            present INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(student_id, faculty_id, subject_id, date),
+            FOREIGN KEY(student_id) REFERENCES users(id),
+            FOREIGN KEY(faculty_id) REFERENCES faculty(id),
+            FOREIGN KEY(subject_id) REFERENCES subjects(id)
+        )
+    ''')
+
+    # Daily lecture entry (Daily LER) recorded by faculty
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS daily_ler (
+            id INTEGER PRIMARY KEY,
+            faculty_id INTEGER NOT NULL,
+            subject_id INTEGER NOT NULL,
+            date DATE NOT NULL,
+            time TEXT,
+            topic TEXT,
+            lecture_number TEXT,
+            percent_syllabus REAL,
+            total_present INTEGER,
+            absent_roll_numbers TEXT,
+            sign TEXT,
+            remark TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(faculty_id) REFERENCES faculty(id),
+            FOREIGN KEY(subject_id) REFERENCES subjects(id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tests (
+            id INTEGER PRIMARY KEY,
+            faculty_id INTEGER NOT NULL,
+            subject_id INTEGER NOT NULL,
+            title TEXT,
+            description TEXT,
+            start_ts TIMESTAMP,
+            end_ts TIMESTAMP,
+            proctored INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(faculty_id) REFERENCES faculty(id),
+            FOREIGN KEY(subject_id) REFERENCES subjects(id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS test_questions (
+            id INTEGER PRIMARY KEY,
+            test_id INTEGER NOT NULL,
+            question_text TEXT,
+            choices TEXT,
+            correct_choice INTEGER,
+            marks INTEGER DEFAULT 1,
+            FOREIGN KEY(test_id) REFERENCES tests(id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS test_attempts (
+            id INTEGER PRIMARY KEY,
+            test_id INTEGER NOT NULL,
+            student_id INTEGER NOT NULL,
+            answers TEXT,
+            score REAL,
+            started_at TIMESTAMP,
+            submitted_at TIMESTAMP,
+            FOREIGN KEY(test_id) REFERENCES tests(id),
+            FOREIGN KEY(student_id) REFERENCES users(id)
+        )
+    ''')
+
+    # Notices table: Admin and Faculty can post notices for students
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS notices (
+            id INTEGER PRIMARY KEY,
+            title TEXT NOT NULL,
+            content TEXT NOT NULL,
+            target_branch TEXT,
+            target_class TEXT,
+            created_by_role TEXT,
+            created_by_id INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Faculty leaves: track leaves requested / taken by faculty
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS faculty_leaves (
+            id INTEGER PRIMARY KEY,
+            faculty_id INTEGER NOT NULL,
+            leave_type TEXT NOT NULL,
+            start_date DATE NOT NULL,
+            end_date DATE NOT NULL,
+            is_half_day INTEGER DEFAULT 0,
+            days_count INTEGER DEFAULT 1,
+            alt_faculty TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(faculty_id) REFERENCES faculty(id)
+        )
+    ''')
+
+    # Feedback table with up to 10 question columns
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS feedback (
+            id INTEGER PRIMARY KEY,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            student_name TEXT,
+            faculty_id INTEGER,
+            subject_id INTEGER,
+            year_level TEXT,
+            q1 INTEGER,
+            q2 INTEGER,
+            q3 INTEGER,
+            q4 INTEGER,
+            q5 INTEGER,
+            q6 INTEGER,
+            q7 INTEGER,
+            q8 INTEGER,
+            q9 INTEGER,
+            q10 INTEGER,
+            overall_rating INTEGER,
+            comments TEXT,
+            FOREIGN KEY(faculty_id) REFERENCES faculty(id),
+            FOREIGN KEY(subject_id) REFERENCES subjects(id)
+        )
+    ''')
+
+    # Ensure users table has attendance and has_access columns (for existing DBs)
+    user_cols = get_table_columns('users', cursor)
+    for col, coltype in [('attendance', 'INTEGER DEFAULT 0'), ('has_access', 'INTEGER DEFAULT 0'),
+                         ('name', 'TEXT'), ('branch', 'TEXT'), ('class', 'TEXT'), ('roll_number', 'TEXT')]:
+        if col not in user_cols:
+            _try_ddl(cursor, f"ALTER TABLE users ADD COLUMN {col} {coltype}")
+
+    # Add missing columns for older DBs (ensure q1..q10 and rating/comment fields exist)
+    feedback_cols = get_table_columns('feedback', cursor)
+    required_cols = {
+        'student_name': 'TEXT',
+        'faculty_id': 'INTEGER',
+        'subject_id': 'INTEGER',
+        'year_level': 'TEXT',
+        'q1': 'INTEGER', 'q2': 'INTEGER', 'q3': 'INTEGER', 'q4': 'INTEGER', 'q5': 'INTEGER',
+        'q6': 'INTEGER', 'q7': 'INTEGER', 'q8': 'INTEGER', 'q9': 'INTEGER', 'q10': 'INTEGER',
+        'overall_rating': 'INTEGER',
+        'comments': 'TEXT'
+    }
+    for col, coltype in required_cols.items():
+        if col not in feedback_cols:
+            _try_ddl(cursor, f'ALTER TABLE feedback ADD COLUMN {col} {coltype}')
+
+    # Subjects created by reset_db_with_years.py lack the department/code columns
+    subject_cols = get_table_columns('subjects', cursor)
+    for col in ('department', 'code'):
+        if col not in subject_cols:
+            _try_ddl(cursor, f'ALTER TABLE subjects ADD COLUMN {col} TEXT')
+
+    # Create useful indexes to speed up common queries (works on both SQLite and Postgres)
+    for statement in [
+        'CREATE INDEX IF NOT EXISTS idx_test_attempts_submitted_at ON test_attempts(submitted_at)',
+        'CREATE INDEX IF NOT EXISTS idx_feedback_created_at ON feedback(created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_subjects_year_level ON subjects(year_level)',
+        'CREATE INDEX IF NOT EXISTS idx_faculty_department ON faculty(department)',
+        'CREATE INDEX IF NOT EXISTS idx_users_role ON users(role)',
+        'CREATE INDEX IF NOT EXISTS idx_daily_ler_date ON daily_ler(date)',
+        'CREATE INDEX IF NOT EXISTS idx_daily_attendance_date ON daily_attendance(date)',
+    ]:
+        _try_ddl(cursor, statement)
+
+    # Add default users if empty
+    cursor.execute("SELECT COUNT(*) FROM users")
+    if cursor.fetchone()[0] == 0:
+        cursor.execute('INSERT INTO users (username, password, role) VALUES (?, ?, ?)',
+                      ('admin', hash_password('admin123'), 'admin'))
+        cursor.execute('INSERT INTO users (username, password, role, faculty_id) VALUES (?, ?, ?, ?)',
+                      ('rajesh_kumar', hash_password('faculty123'), 'faculty', 1))
+        cursor.execute('INSERT INTO users (username, password, role, faculty_id) VALUES (?, ?, ?, ?)',
+                      ('anita_singh', hash_password('faculty123'), 'faculty', 2))
+        cursor.execute('INSERT INTO users (username, password, role) VALUES (?, ?, ?)',
+                      ('student', hash_password('student123'), 'student'))
+
+    # If using a Postgres DB, ensure common tables have sequences and id defaults
+    if DATABASE_URL:
+        for t in ['users', 'faculty', 'faculty_year_level', 'faculty_resources', 'daily_ler', 'tests', 'test_questions', 'test_attempts', 'notices', 'faculty_leaves', 'subjects', 'feedback_schedule', 'feedback']:
+            ensure_postgres_sequence(t, cursor)
+
+
+def _migration_0002_attendance_summary(cursor):
+    """Per-student attendance totals kept in step with `attendance` by row triggers.
+
+    Each insert/update/delete on `attendance` applies its delta to the student's
+    summary row, so reading a student's overall percentage is a primary-key lookup
+    instead of a SUM over every monthly row.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS attendance_summary (
+            student_id INTEGER PRIMARY KEY,
+            attended INTEGER NOT NULL DEFAULT 0,
+            total INTEGER NOT NULL DEFAULT 0,
+            pct REAL NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(student_id) REFERENCES users(id)
+        )
+    ''')
+
+    # Apply (attended, total) deltas for one student; pct is derived from the new totals
+    seed = 'INSERT INTO attendance_summary (student_id) VALUES ({sid}) ON CONFLICT (student_id) DO NOTHING'
+    apply = '''UPDATE attendance_summary
+               SET attended = attended + ({da}), total = total + ({dt}),
+                   pct = CASE WHEN total + ({dt}) > 0
+                              THEN ROUND(100.0 * (attended + ({da})) / (total + ({dt})), 2) ELSE 0 END,
+                   updated_at = CURRENT_TIMESTAMP
+               WHERE student_id = {sid}'''
+    add_new = apply.format(sid='NEW.student_id', da='COALESCE(NEW.classes_attended, 0)', dt='COALESCE(NEW.total_classes, 0)')
+    sub_old = apply.format(sid='OLD.student_id', da='-COALESCE(OLD.classes_attended, 0)', dt='-COALESCE(OLD.total_classes, 0)')
+    seed_new = seed.format(sid='NEW.student_id')
+
+    if DATABASE_URL:
+        cursor.execute(f'''
+            CREATE OR REPLACE FUNCTION attendance_summary_apply() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                    {sub_old};
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                    {seed_new};
+                    {add_new};
+                END IF;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        ''')
+        cursor.execute('DROP TRIGGER IF EXISTS trg_attendance_summary ON attendance')
+        cursor.execute('''
+            CREATE TRIGGER trg_attendance_summary
+            AFTER INSERT OR UPDATE OR DELETE ON attendance
+            FOR EACH ROW EXECUTE FUNCTION attendance_summary_apply()
+        ''')
+    else:
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_attendance_summary_ins AFTER INSERT ON attendance
+            BEGIN {seed_new}; {add_new}; END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_attendance_summary_upd AFTER UPDATE ON attendance
+            BEGIN {sub_old}; {seed_new}; {add_new}; END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_attendance_summary_del AFTER DELETE ON attendance
+            BEGIN {sub_old}; END
+        ''')
+
+    # Backfill from existing monthly rows
+    cursor.execute('DELETE FROM attendance_summary')
+    cursor.execute('''
+        INSERT INTO attendance_summary (student_id, attended, total, pct, updated_at)
+        SELECT student_id, COALESCE(SUM(classes_attended), 0), COALESCE(SUM(total_classes), 0),
+               CASE WHEN COALESCE(SUM(total_classes), 0) > 0
+                    THEN ROUND(100.0 * SUM(classes_attended) / SUM(total_classes), 2) ELSE 0 END,
+               CURRENT_TIMESTAMP
+        FROM attendance
+        GROUP BY student_id
+    ''')
+
+
+def _migration_0003_lecture_sessions(cursor):
+    """One row per lecture actually held, so monthly total_classes is a stored count."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS lecture_sessions (
+            faculty_id INTEGER NOT NULL,
+            subject_id INTEGER NOT NULL,
+            date DATE NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (faculty_id, subject_id, date),
+            FOREIGN KEY(faculty_id) REFERENCES faculty(id),
+            FOREIGN KEY(subject_id) REFERENCES subjects(id)
+        )
+    ''')
+    # Every date that already has daily attendance was a held lecture
+    cursor.execute('''
+        INSERT INTO lecture_sessions (faculty_id, subject_id, date)
+        SELECT DISTINCT faculty_id, subject_id, date FROM daily_attendance WHERE 1 = 1
+        ON CONFLICT DO NOTHING
+    ''')
+    # Monthly rollups filter on faculty/subject plus a half-open date range
+    _try_ddl(cursor, 'CREATE INDEX IF NOT EXISTS idx_daily_attendance_fac_subj_date ON daily_attendance(faculty_id, subject_id, date)')
+
+
+def _migration_0004_faculty_teaching(cursor):
+    """Denormalized who-teaches-what table backing the feedback form's faculty picker."""
+    # subject_id NULL marks "teaches this year level in this branch" (the form's "All" option)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS faculty_teaching (
+            faculty_id INTEGER NOT NULL,
+            subject_id INTEGER,
+            branch TEXT,
+            year_level TEXT NOT NULL,
+            faculty_name TEXT,
+            FOREIGN KEY(faculty_id) REFERENCES faculty(id),
+            FOREIGN KEY(subject_id) REFERENCES subjects(id)
+        )
+    ''')
+    _try_ddl(cursor, 'CREATE INDEX IF NOT EXISTS idx_faculty_teaching_lookup ON faculty_teaching(branch, year_level, subject_id, faculty_name)')
+    _try_ddl(cursor, 'CREATE INDEX IF NOT EXISTS idx_faculty_teaching_faculty ON faculty_teaching(faculty_id)')
+    refresh_faculty_teaching(cursor)
+
+
+def _migration_0005_feedback_aggregates(cursor):
+    """Running feedback totals per (faculty, subject, academic year), kept current by submit_feedback()."""
+    # subject_id 0 stands for "Not Specified" so it can sit in the primary key
+    totals = ',\n'.join(f'            {col} INTEGER NOT NULL DEFAULT 0' for col in FEEDBACK_AGGREGATE_COLUMNS)
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS feedback_aggregates (
+            faculty_id INTEGER NOT NULL,
+            subject_id INTEGER NOT NULL DEFAULT 0,
+            academic_year TEXT NOT NULL,
+{totals},
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (faculty_id, subject_id, academic_year),
+            FOREIGN KEY(faculty_id) REFERENCES faculty(id)
+        )
+    ''')
+
+    # Backfill from existing submissions
+    cursor.execute('DELETE FROM feedback_aggregates')
+    cursor.execute(f'''
+        SELECT faculty_id, subject_id, created_at, {', '.join(FEEDBACK_SCORE_COLUMNS)}
+        FROM feedback WHERE faculty_id IS NOT NULL
+    ''')
+    groups = {}
+    for row in cursor.fetchall():
+        key = (row[0], row[1], feedback_academic_year(row[2]))
+        groups.setdefault(key, []).append(row[3:])
+    apply_feedback_aggregates(cursor, [(fid, sid, ay, scores) for (fid, sid, ay), scores in groups.items()])
+
+
+def _migration_0006_feedback_submission_id(cursor):
+    """Client-generated submission ids so replaying the feedback queue journal is idempotent."""
+    if 'submission_id' not in get_table_columns('feedback', cursor):
+        _try_ddl(cursor, 'ALTER TABLE feedback ADD COLUMN submission_id TEXT')
+    _try_ddl(cursor, 'CREATE UNIQUE INDEX IF NOT EXISTS idx_feedback_submission_id ON feedback(submission_id)')
+
+
+def _migration_0007_feedback_comment_search(cursor):
+    """Full-text index over feedback.comments (see `search_feedback_comments`).
+
+    SQLite gets an external-content FTS5 table kept in sync by triggers; Postgres gets a
+    generated tsvector column with a GIN index. If FTS5 is not compiled into SQLite the
+    search falls back to LIKE.
+    """
+    if DATABASE_URL:
+        if 'comments_tsv' not in get_table_columns('feedback', cursor):
+            _try_ddl(cursor, '''ALTER TABLE feedback ADD COLUMN comments_tsv tsvector
+                                GENERATED ALWAYS AS (to_tsvector('english', COALESCE(comments, ''))) STORED''')
+        _try_ddl(cursor, 'CREATE INDEX IF NOT EXISTS idx_feedback_comments_tsv ON feedback USING GIN (comments_tsv)')
+        return
+
+    if not _try_ddl(cursor, '''CREATE VIRTUAL TABLE IF NOT EXISTS feedback_fts
+                               USING fts5(comments, content='feedback', content_rowid='id', tokenize='porter unicode61')'''):
+        return
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_feedback_fts_ins AFTER INSERT ON feedback
+        BEGIN INSERT INTO feedback_fts (rowid, comments) VALUES (NEW.id, NEW.comments); END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_feedback_fts_del AFTER DELETE ON feedback
+        BEGIN INSERT INTO feedback_fts (feedback_fts, rowid, comments) VALUES ('delete', OLD.id, OLD.comments); END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_feedback_fts_upd AFTER UPDATE OF comments ON feedback
+        BEGIN
+            INSERT INTO feedback_fts (feedback_fts, rowid, comments) VALUES ('delete', OLD.id, OLD.comments);
+            INSERT INTO feedback_fts (rowid, comments) VALUES (NEW.id, NEW.comments);
+        END
+    ''')
+    cursor.execute("INSERT INTO feedback_fts (feedback_fts) VALUES ('rebuild')")
+
+
+def _migration_0008_resource_content_hash(cursor):
+    """content_hash/size_bytes on faculty_resources; existing files are copied into the content store."""
+    columns = get_table_columns('faculty_resources', cursor)
+    if 'content_hash' not in columns:
+        _try_ddl(cursor, 'ALTER TABLE faculty_resources ADD COLUMN content_hash TEXT')
+    if 'size_bytes' not in columns:
+        _try_ddl(cursor, 'ALTER TABLE faculty_resources ADD COLUMN size_bytes INTEGER')
+    cursor.execute('SELECT DISTINCT file_path FROM faculty_resources WHERE content_hash IS NULL')
+    for (file_path,) in cursor.fetchall():
+        if not file_path or not os.path.isfile(file_path):
+            continue
+        with open(file_path, 'rb') as source:
+            digest, size, stored_path = store_resource_content(source)
+        cursor.execute('UPDATE faculty_resources SET content_hash = ?, size_bytes = ?, file_path = ? WHERE file_path = ?',
+                       (digest, size, stored_path, file_path))
+
+
+def _migration_0009_test_attempt_submission_id(cursor):
+    """Client-generated submission ids so replaying the test attempt queue journal is idempotent."""
+    if 'submission_id' not in get_table_columns('test_attempts', cursor):
+        _try_ddl(cursor, 'ALTER TABLE test_attempts ADD COLUMN submission_id TEXT')
+    _try_ddl(cursor, 'CREATE UNIQUE INDEX IF NOT EXISTS idx_test_attempts_submission_id ON test_attempts(submission_id)')
+
+
+def _migration_0010_attempt_answers(cursor):
+    """One row per answered question of each test attempt, backfilled from test_attempts.answers."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS attempt_answers (
+            attempt_id INTEGER NOT NULL,
+            question_id INTEGER NOT NULL,
+            chosen INTEGER NOT NULL,
+            correct INTEGER NOT NULL,
+            PRIMARY KEY (attempt_id, question_id),
+            FOREIGN KEY(attempt_id) REFERENCES test_attempts(id),
+            FOREIGN KEY(question_id) REFERENCES test_questions(id)
+        )
+    ''')
+    backfill_attempt_answers(cursor)
+
+
+def _migration_0011_remove_migrated_resource_originals(cursor):
+    """Delete pre-0008 upload files that 0008 copied into the content store.
+
+    A top-level file in RESOURCE_STORE_DIR is removed only when no faculty_resources or
+    assignment_submissions row references it and a stored copy with its hash exists.
+    """
+    if not os.path.isdir(RESOURCE_STORE_DIR):
+        return
+    cursor.execute('SELECT file_path FROM faculty_resources UNION SELECT submission_file FROM assignment_submissions')
+    referenced = {os.path.normpath(path) for (path,) in cursor.fetchall() if path}
+    for name in os.listdir(RESOURCE_STORE_DIR):
+        path = os.path.join(RESOURCE_STORE_DIR, name)
+        if name.startswith('.') or not os.path.isfile(path) or os.path.normpath(path) in referenced:
+            continue
+        sha = hashlib.sha256()
+        with open(path, 'rb') as source:
+            for chunk in iter(lambda: source.read(RESOURCE_CHUNK_SIZE), b''):
+                sha.update(chunk)
+        if os.path.isfile(resource_store_path(sha.hexdigest())):
+            os.remove(path)
+
+
+# Versioned schema migrations: (version, description, migrate(cursor)).
+# Append new entries with the next version number; never edit an applied one.
+# Each migration runs exactly once per database and is recorded in `schema_version`.
+SCHEMA_MIGRATIONS = [
+    (1, 'baseline tables, indexes and column backfills', _migration_0001_baseline),
+    (2, 'attendance_summary table maintained by triggers on attendance', _migration_0002_attendance_summary),
+    (3, 'lecture_sessions table and (faculty_id, subject_id, date) index on daily_attendance', _migration_0003_lecture_sessions),
+    (4, 'faculty_teaching lookup table for the feedback form', _migration_0004_faculty_teaching),
+    (5, 'feedback_aggregates running totals per faculty/subject/academic year', _migration_0005_feedback_aggregates),
+    (6, 'feedback.submission_id for idempotent write-behind inserts', _migration_0006_feedback_submission_id),
+    (7, 'full-text index over feedback.comments', _migration_0007_feedback_comment_search),
+    (8, 'faculty_resources.content_hash and size_bytes for the content-addressed upload store', _migration_0008_resource_content_hash),
+    (9, 'test_attempts.submission_id for idempotent write-behind inserts', _migration_0009_test_attempt_submission_id),
+    (10, 'attempt_answers table for per-question statistics', _migration_0010_attempt_answers),
+    (11, 'remove legacy upload files already copied into the content store', _migration_0011_remove_migrated_resource_originals),
+]
+SCHEMA_VERSION = SCHEMA_MIGRATIONS[-1][0]
+
+# Declarative index catalog: (index name, table, columns). Applied with CREATE INDEX
+# IF NOT EXISTS by every schema bootstrap, so adding an entry here is all it takes
+# to ship a new index on both backends. Columns already led by a PRIMARY KEY or
+# UNIQUE constraint (e.g. attendance.student_id, faculty_year_level.faculty_id)
+# are covered by that constraint's index and deliberately not repeated.
+# Check coverage with run_index_advisor().
+INDEX_CATALOG = [
+    ('idx_users_role', 'users', ('role',)),
+    ('idx_users_branch_class', 'users', ('branch', 'class')),
+    ('idx_users_roll_number', 'users', ('roll_number',)),
+    ('idx_users_faculty_id', 'users', ('faculty_id',)),
+    ('idx_faculty_department', 'faculty', ('department',)),
+    ('idx_faculty_year_level', 'faculty', ('year_level',)),
+    ('idx_subjects_year_level', 'subjects', ('year_level',)),
+    ('idx_subjects_department_year', 'subjects', ('department', 'year_level')),
+    ('idx_faculty_subject_subject', 'faculty_subject', ('subject_id',)),
+    ('idx_faculty_resources_faculty_subject', 'faculty_resources', ('faculty_id', 'subject_id')),
+    ('idx_faculty_resources_subject', 'faculty_resources', ('subject_id',)),
+    ('idx_faculty_resources_content_hash', 'faculty_resources', ('content_hash',)),
+    ('idx_attendance_faculty_subject_month', 'attendance', ('faculty_id', 'subject_id', 'month', 'academic_year')),
+    ('idx_daily_attendance_date', 'daily_attendance', ('date',)),
+    ('idx_daily_attendance_fac_subj_date', 'daily_attendance', ('faculty_id', 'subject_id', 'date')),
+    ('idx_daily_ler_date', 'daily_ler', ('date',)),
+    ('idx_daily_ler_faculty_date', 'daily_ler', ('faculty_id', 'date')),
+    ('idx_tests_subject', 'tests', ('subject_id',)),
+    ('idx_test_questions_test', 'test_questions', ('test_id',)),
+    ('idx_test_attempts_submitted_at', 'test_attempts', ('submitted_at',)),
+    ('idx_test_attempts_student_test', 'test_attempts', ('student_id', 'test_id')),
+    ('idx_test_attempts_test', 'test_attempts', ('test_id', 'submitted_at')),
+    ('idx_attempt_answers_question_chosen', 'attempt_answers', ('question_id', 'chosen')),
+    ('idx_feedback_created_at', 'feedback', ('created_at',)),
+    ('idx_feedback_faculty', 'feedback', ('faculty_id',)),
+    ('idx_notices_target', 'notices', ('target_branch', 'target_class', 'created_at')),
+    ('idx_notices_created_at', 'notices', ('created_at',)),
+    ('idx_faculty_leaves_faculty', 'faculty_leaves', ('faculty_id', 'created_at')),
+]
+
+
+def apply_index_catalog(cursor):
+    """Create any INDEX_CATALOG entries missing from the database (idempotent)."""
+    created = []
+    for name, table, columns in INDEX_CATALOG:
+        if _try_ddl(cursor, f"CREATE INDEX IF NOT EXISTS {name} ON {table}({', '.join(columns)})"):
+            created.append(name)
+    return created
+
+
+# Arbitrary key for pg_advisory_xact_lock so concurrent app processes migrate one at a time
+SCHEMA_MIGRATION_LOCK_KEY = 724011
+
+
+def run_schema_migrations():
+    """Apply pending migrations from SCHEMA_MIGRATIONS and record them in `schema_version`,
+    then create any missing INDEX_CATALOG indexes.
+
+    Returns the list of versions applied by this call (empty when already up to date).
+    """
+    conn = db_connect()
+    cursor = conn.cursor()
+    applied = []
+    try:
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                description TEXT,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        conn.commit()
+        cursor.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version')
+        current = cursor.fetchone()[0] or 0
+        for version, description, migrate in SCHEMA_MIGRATIONS:
+            if version <= current:
+                continue
+            if DATABASE_URL:
+                # Serialise with other processes and re-check inside the lock
+                cursor.execute('SELECT pg_advisory_xact_lock(?)', (SCHEMA_MIGRATION_LOCK_KEY,))
+                cursor.execute('SELECT 1 FROM schema_version WHERE version = ?', (version,))
+                if cursor.fetchone():
+                    conn.commit()
+                    continue
+            migrate(cursor)
+            cursor.execute('INSERT INTO schema_version (version, description) VALUES (?, ?)', (version, description))
+            conn.commit()
+            applied.append(version)
+        apply_index_catalog(cursor)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return applied
+
+
+@st.cache_resource
+def _bootstrap_schema(db_target, schema_version, index_catalog):
+    """Run migrations and the index catalog once per process for a given database and schema version."""
+    return run_schema_migrations()
+
+
+def init_database():
+    """Bring the database schema up to date.
+
+    Streamlit re-executes the script on every interaction; the DDL itself only runs
+    the first time per process (and again only when SCHEMA_VERSION or INDEX_CATALOG changes).
+    """
+    _bootstrap_schema(DATABASE_URL or DB_PATH, SCHEMA_VERSION, tuple(INDEX_CATALOG))
+
+
+def ensure_postgres_sequence(table_name, cursor=None):
+    """Ensure Postgres serial sequence for table_name is set to max(id) to avoid duplicate-key on insert.
+
+    Pass `cursor` to run inside the caller's transaction (the caller commits).
+    This is a no-op when not running against Postgres (DATABASE_URL not set).
+    """
+    if not DATABASE_URL:
+        return
+    import re
+    # Sanitize table_name to avoid accidental SQL injection risk for identifiers
+    safe_table = re.sub('[^0-9a-zA-Z_]', '', table_name)
+    conn = None
+    if cursor is None:
+        conn = db_connect()
+        cursor = conn.cursor()
+    try:
+        # First try to get the sequence linked to the serial column
+        seq = None
+        cursor.execute('SAVEPOINT ensure_seq')
+        try:
+            cursor.execute("SELECT pg_get_serial_sequence(?, ?)", (safe_table, 'id'))
+            row = cursor.fetchone()
+            seq = row[0] if row else None
+            cursor.execute('RELEASE SAVEPOINT ensure_seq')
+        except Exception:
+            cursor.execute('ROLLBACK TO SAVEPOINT ensure_seq')
+            return
+
+        if not seq:
+            # No serial sequence associated (e.g. table created without serial). Create one.
+            seq_name = f"{safe_table}_id_seq"
+            _try_ddl(cursor, f"CREATE SEQUENCE IF NOT EXISTS {seq_name}")
+            _try_ddl(cursor, f"ALTER SEQUENCE {seq_name} OWNED BY {safe_table}.id")
+            _try_ddl(cursor, f"ALTER TABLE {safe_table} ALTER COLUMN id SET DEFAULT nextval('{seq_name}')")
+            # Now set seq to created sequence name for sync below
+            seq = seq_name
+
+        # Sync sequence to max(id) to avoid duplicates (true -> is_called)
+        _try_ddl(cursor, f"SELECT setval('{seq}', COALESCE((SELECT MAX(id) FROM {safe_table}), 1), true)")
+        if conn is not None:
+            conn.commit()
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+def hash_password(password):
+    """Hash password using SHA256."""
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+def reset_user_password_with_roll(username, roll_number, new_password):
+    """Reset a user's password after verifying their roll number.
+    Returns True on success, False otherwise."""
+    if not username or not roll_number or not new_password:
+        return False
+    conn = db_connect()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('SELECT id FROM users WHERE username = ? AND roll_number = ? AND role = ?', (username, roll_number, 'student'))
+        row = cursor.fetchone()
+        if not row:
+            # Try any role match if student match not found
+            cursor.execute('SELECT id FROM users WHERE username = ? AND roll_number = ?', (username, roll_number))
+            row = cursor.fetchone()
+            if not row:
+                conn.close()
+                return False
+
+        uid = row[0]
+        cursor.execute('UPDATE users SET password = ? WHERE id = ?', (hash_password(new_password), uid))
+        conn.commit()
+        conn.close()
+        return True
+    except Exception:
+        conn.close()
+        return False
+
+
+def safe_rerun():
+    """Try to rerun the Streamlit app. Fallbacks if API unavailable."""
+    try:
+        # Preferred API (may not exist in some streamlit builds)
+        st.experimental_rerun()
+        return
+    except Exception:
+        pass
+
+    try:
+        # Another possible API alias used in some versions
+        st.rerun()
+        return
+    except Exception:
+        pass
+
+    # Fallback: tweak query params to force a reload
+    try:
+        params = st.experimental_get_query_params()
+        params['_refresh'] = datetime.now().timestamp()
+        st.experimental_set_query_params(**params)
+        return
+    except Exception:
+        pass
+
+    # Last resort: toggle a session_state flag and stop
+    st.session_state['_rerun_toggle'] = not st.session_state.get('_rerun_toggle', False)
+    st.stop()
+
+def perf_panel_requested():
+    """True when the URL carries `?perf` (opens the hidden admin query-stats panel)."""
+    try:
+        return 'perf' in st.query_params
+    except Exception:
+        pass
+    try:
+        return 'perf' in st.experimental_get_query_params()
+    except Exception:
+        return False
+
+def verify_login(username, password):
+    """Verify user login credentials."""
+    conn = db_connect()
+    cursor = conn.cursor()
+    cursor.execute('SELECT id, role FROM users WHERE username = ? AND password = ?',
+                  (username, hash_password(password)))
+    result = cursor.fetchone()
+    conn.close()
+    return result
+
+class CacheTagVersions:
+    """Per-table version counters for tag-based invalidation of st.cache_data helpers.
+
+    A cached helper passes the versions of the tables it reads as an argument, so a
+    write that bumps one table only changes the cache key of helpers tagged with it;
+    everything else stays warm. Superseded entries simply age out with their TTL.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = {}
+
+    def get(self, tables):
+        with self._lock:
+            return tuple(self._versions.get(t, 0) for t in tables)
+
+    def bump(self, tables):
+        with self._lock:
+            for t in tables:
+                self._versions[t] = self._versions.get(t, 0) + 1
+
+
+@st.cache_resource
+def _get_cache_tag_versions():
+    return CacheTagVersions()
+
+
+def cache_tag_versions(*tables):
+    """Cache-key component for a helper that reads `tables`."""
+    return _get_cache_tag_versions().get(tables)
+
+
+def invalidate_tables(*tables):
+    """Invalidate cached helpers tagged with any of `tables` (call after committing a write)."""
+    _get_cache_tag_versions().bump(tables)
+
+
+def _name_key(row):
+    return row[1] or ''
+
+
+class ReferenceSnapshot:
+    """In-memory copy of the reference tables with lookup indexes.
+
+    Holds subjects, faculty, faculty_year_level and faculty_subject, indexed as
+    subject -> faculties, faculty -> subjects and (branch, year) -> subjects, so
+    picker widgets resolve without issuing joins. Rows keep the tuple shapes the
+    SQL helpers returned. Built by `get_reference_snapshot()`; treat as read-only.
+    """
+
+    def __init__(self, subjects, faculty, faculty_year_levels, faculty_subjects):
+        self.subjects = {row[0]: row for row in subjects}  # (id, name, year_level, department, code)
+        self.faculty = {row[0]: row for row in faculty}    # (id, name, department, year_level)
+        self.faculty_sorted = sorted(faculty, key=_name_key)
+        self.branches = sorted({row[2] for row in faculty if row[2] is not None})
+
+        self.extra_years_by_faculty = {}
+        for fid, year_level in faculty_year_levels:
+            self.extra_years_by_faculty.setdefault(fid, set()).add(year_level)
+
+        self.subject_ids_by_faculty = {}
+        self.faculty_ids_by_subject = {}
+        for fid, sid in faculty_subjects:
+            self.subject_ids_by_faculty.setdefault(fid, set()).add(sid)
+            self.faculty_ids_by_subject.setdefault(sid, set()).add(fid)
+
+        self.subjects_by_year = {}
+        self.subjects_by_branch_year = {}
+        for row in sorted(subjects, key=_name_key):
+            self.subjects_by_year.setdefault(row[2], []).append(row)
+            self.subjects_by_branch_year.setdefault((row[3], row[2]), []).append(row)
+
+    def teaches_year(self, faculty_id, year_level):
+        """Primary year level or any faculty_year_level assignment matches."""
+        fac = self.faculty.get(faculty_id)
+        return bool(fac) and (fac[3] == year_level or year_level in self.extra_years_by_faculty.get(faculty_id, ()))
+
+    def faculty_year_levels(self, faculty_id):
+        return sorted(self.extra_years_by_faculty.get(faculty_id, ()))
+
+    def faculties_where(self, branch=None, year_level=None, faculty_ids=None):
+        """Faculty rows (sorted by name) filtered by department, taught year and/or id set."""
+        rows = self.faculty_sorted if faculty_ids is None else sorted(
+            (self.faculty[f] for f in faculty_ids if f in self.faculty), key=_name_key)
+        return [row for row in rows
+                if (branch is None or row[2] == branch)
+                and (year_level is None or self.teaches_year(row[0], year_level))]
+
+    def faculties_for_subject(self, subject_id, branch=None, year_level=None):
+        return self.faculties_where(branch, year_level, self.faculty_ids_by_subject.get(subject_id, ()))
+
+    def subjects_for(self, branch, year_level):
+        return list(self.subjects_by_branch_year.get((branch, year_level), ()))
+
+    def subjects_for_faculty(self, faculty_id):
+        """(id, name, year_level) rows ordered by year level then name."""
+        rows = [self.subjects[sid] for sid in self.subject_ids_by_faculty.get(faculty_id, ()) if sid in self.subjects]
+        rows.sort(key=lambda r: (r[2] or '', r[1] or ''))
+        return [(r[0], r[1], r[2]) for r in rows]
+
+    def subject_name(self, subject_id, default=None):
+        row = self.subjects.get(subject_id)
+        return row[1] if row else default
+
+
+# Tables mirrored by ReferenceSnapshot; writes to them must call invalidate_tables()
+REFERENCE_TABLES = ('subjects', 'faculty', 'faculty_year_level', 'faculty_subject')
+
+
+@st.cache_resource(max_entries=2, ttl=300)
+def _build_reference_snapshot(tag_versions):
+    conn = db_connect()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('SELECT id, name, year_level, department, code FROM subjects')
+        subjects = cursor.fetchall()
+        cursor.execute('SELECT id, name, department, year_level FROM faculty')
+        faculty = cursor.fetchall()
+        cursor.execute('SELECT faculty_id, year_level FROM faculty_year_level')
+        faculty_year_levels = cursor.fetchall()
+        cursor.execute('SELECT faculty_id, subject_id FROM faculty_subject')
+        faculty_subjects = cursor.fetchall()
+    finally:
+        conn.close()
+    return ReferenceSnapshot(subjects, faculty, faculty_year_levels, faculty_subjects)
+
+
+def get_reference_snapshot():
+    """Process-wide ReferenceSnapshot, rebuilt after a write here bumps one of REFERENCE_TABLES.
+
+    Writes from other processes or scripts (e.g. migrate_dbatu_subjects.py) don't bump the
+    tags, so the snapshot also expires after 300 s like the other cached lookups.
+    """
+    return _build_reference_snapshot(cache_tag_versions(*REFERENCE_TABLES))
+
+
+def get_faculty_list():
+    """Get all faculty members."""
+    @st.cache_data(ttl=300)
+    def _cached(tag_versions):
+        conn = db_connect()
+        cursor = conn.cursor()
+        cursor.execute('SELECT id, name, department, year_level FROM faculty ORDER BY name')
+        faculties = cursor.fetchall()
+        conn.close()
+        return faculties
+
+    return _cached(cache_tag_versions('faculty'))
+
+
+def get_branches():
+    """Return distinct engineering branches (department values)."""
+    return list(get_reference_snapshot().branches)
+
+
+def get_year_levels():
+    """Return distinct year levels."""
+    return ['FY', 'SY', 'TY', 'Final Year']
+
+
+def get_faculties_by_branch(branch):
+    """Get faculties filtered by branch/department."""
+    return get_reference_snapshot().faculties_where(branch=branch)
+
+
+def get_faculties_by_year(year_level):
+    """Get faculties filtered by year level."""
+    return [row for row in get_reference_snapshot().faculty_sorted if row[3] == year_level]
+
+
+def get_faculties_by_branch_and_year(branch, year_level):
+    """Get faculties filtered by both branch and year level."""
+    # Primary year level or a faculty_year_level assignment
+    return get_reference_snapshot().faculties_where(branch=branch, year_level=year_level)
+
+
+def get_subjects_by_year(year_level):
+    return list(get_reference_snapshot().subjects_by_year.get(year_level, ()))
+
+
+def get_faculties_by_subject(subject_id, branch=None, year_level=None):
+    if not branch or branch == 'All':
+        branch = None
+    return get_reference_snapshot().faculties_for_subject(subject_id, branch=branch, year_level=year_level or None)
+
+
+def refresh_faculty_teaching(cursor, faculty_ids=None):
+    """Rebuild faculty_teaching rows for `faculty_ids` (all faculty when None).
+
+    Runs in the caller's transaction; call it from every write that changes
+    faculty_subject, faculty_year_level or a faculty's name/department/year level,
+    then invalidate_tables('faculty_teaching') after committing.
+    """
+    where, params = '', ()
+    if faculty_ids is not None:
+        faculty_ids = [f for f in faculty_ids if f is not None]
+        if not faculty_ids:
+            return
+        marks = ', '.join('?' * len(faculty_ids))
+        where, params = f' WHERE f.id IN ({marks})', tuple(faculty_ids)
+        cursor.execute(f'DELETE FROM faculty_teaching WHERE faculty_id IN ({marks})', params)
+    else:
+        cursor.execute('DELETE FROM faculty_teaching')
+    # Year levels taught: the primary faculty.year_level plus faculty_year_level assignments
+    years = '''(SELECT id AS faculty_id, year_level FROM faculty WHERE year_level IS NOT NULL
+                UNION SELECT faculty_id, year_level FROM faculty_year_level) y'''
+    cursor.execute(f'''INSERT INTO faculty_teaching (faculty_id, subject_id, branch, year_level, faculty_name)
+                       SELECT f.id, NULL, f.department, y.year_level, f.name
+                       FROM faculty f JOIN {years} ON y.faculty_id = f.id{where}''', params)
+    cursor.execute(f'''INSERT INTO faculty_teaching (faculty_id, subject_id, branch, year_level, faculty_name)
+                       SELECT f.id, fs.subject_id, f.department, y.year_level, f.name
+                       FROM faculty f JOIN {years} ON y.faculty_id = f.id
+                       JOIN faculty_subject fs ON fs.faculty_id = f.id{where}''', params)
+
+
+def get_feedback_faculty_options(branch, year_level, subject_id=None):
+    """Faculty a student of `branch`/`year_level` can rate, optionally for one subject.
+
+    One indexed lookup on faculty_teaching (cached until the table is refreshed).
+    Returns (faculty_id, name, branch, year_level) rows ordered by name.
+    """
+    @st.cache_data(ttl=300)
+    def _cached(branch, year_level, subject_id, tag_versions):
+        conn = db_connect()
+        cursor = conn.cursor()
+        if subject_id is None:
+            cursor.execute('''SELECT faculty_id, faculty_name, branch, year_level FROM faculty_teaching
+                              WHERE branch = ? AND year_level = ? AND subject_id IS NULL
+                              ORDER BY faculty_name''', (branch, year_level))
+        else:
+            cursor.execute('''SELECT faculty_id, faculty_name, branch, year_level FROM faculty_teaching
+                              WHERE branch = ? AND year_level = ? AND subject_id = ?
+                              ORDER BY faculty_name''', (branch, year_level, subject_id))
+        rows = cursor.fetchall()
+        conn.close()
+        return rows
+
+    return _cached(branch, year_level, subject_id, cache_tag_versions('faculty_teaching'))
+
+def update_faculty_year_level(faculty_id, new_year_level):
+    """Update faculty's primary year level."""
+    conn = db_connect()
+    cursor = conn.cursor()
+    cursor.execute('UPDATE faculty SET year_level = ? WHERE id = ?', (new_year_level, faculty_id))
+    refresh_faculty_teaching(cursor, [faculty_id])
+    conn.commit()
+    conn.close()
+    invalidate_tables('faculty', 'faculty_teaching')
+
+def add_faculty_year_level(faculty_id, year_level):
+    """Add a year level assignment to faculty."""
+    conn = db_connect()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('INSERT INTO faculty_year_level (faculty_id, year_level) VALUES (?, ?)', 
+                      (faculty_id, year_level))
+        refresh_faculty_teaching(cursor, [faculty_id])
+        conn.commit()
+    except sqlite3.IntegrityError:
+        pass  # Already exists
+    conn.close()
+    invalidate_tables('faculty_year_level', 'faculty_teaching')
+
+def get_faculty_year_levels(faculty_id):
+    """Get all year levels a faculty teaches."""
+    return get_reference_snapshot().faculty_year_levels(faculty_id)
+
+def remove_faculty_year_level(faculty_id, year_level):
+    """Remove a year level assignment from faculty."""
+    conn = db_connect()
+    cursor = conn.cursor()
+    cursor.execute('DELETE FROM faculty_year_level WHERE faculty_id = ? AND year_level = ?', 
+                  (faculty_id, year_level))
+    refresh_faculty_teaching(cursor, [faculty_id])
+    conn.commit()
+    conn.close()
+    invalidate_tables('faculty_year_level', 'faculty_teaching')
+
+def get_all_faculty():
+    """Get all faculty with their details."""
+    return list(get_reference_snapshot().faculty_sorted)
+
+def calculate_credit_progress(completed, semester, required):
+    """Calculate total credits after this semester and percentage progress.
+
+    Returns a tuple (total_after_semester, percent_complete).
+    """
+    try:
+        completed = float(completed)
+        semester = float(semester)
+        required = float(required)
+    except Exception:
+        return (0, 0.0)
+
+    total_after = completed + semester
+    percent = (total_after / required) * 100 if required else 0.0
+    return (int(total_after), float(percent))
+
+# Stored files are shared between processes, so the database decides their lifetime:
+# an upload commits its row before making sure the file is in place, and a delete moves
+# the file aside after committing and only removes it if no row references it by then.
+
+
+def resource_store_path(digest):
+    return os.path.join(RESOURCE_STORE_DIR, digest[:2], digest)
+
+
+def spool_resource_content(source, chunk_size=RESOURCE_CHUNK_SIZE):
+    """Stream a binary file object to a temporary file beside the store, hashing it on the way.
+
+    Returns (sha256, size, spool path); hand the spool to `place_resource_content`.
+    """
+    os.makedirs(RESOURCE_STORE_DIR, exist_ok=True)
+    sha = hashlib.sha256()
+    size = 0
+    spool = tempfile.NamedTemporaryFile(dir=RESOURCE_STORE_DIR, prefix='.upload_', delete=False)
+    try:
+        with spool:
+            while True:
+                chunk = source.read(chunk_size)
+                if not chunk:
+                    break
+                sha.update(chunk)
+                size += len(chunk)
+                spool.write(chunk)
+    except Exception:
+        discard_resource_spool(spool.name)
+        raise
+    return sha.hexdigest(), size, spool.name
+
+
+def place_resource_content(digest, spool_path):
+    """Rename a spool into the store as `digest`, or discard it if that content is already stored."""
+    path = resource_store_path(digest)
+    if os.path.exists(path):
+        discard_resource_spool(spool_path)
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(spool_path, path)
+    return path
+
+
+def discard_resource_spool(spool_path):
+    try:
+        os.remove(spool_path)
+    except OSError:
+        pass
+
+
+def store_resource_content(source, chunk_size=RESOURCE_CHUNK_SIZE):
+    """Stream a binary file object into the content store; returns (sha256, size, path)."""
+    digest, size, spool_path = spool_resource_content(source, chunk_size)
+    return digest, size, place_resource_content(digest, spool_path)
+
+
+def add_faculty_resource(faculty_id, subject_id, resource_type, filename, content, deadline=None):
+    """Insert a new assignment or notes resource; `content` is a readable binary file object.
+
+    Returns the new resource id. Storage and database errors propagate to the caller.
+    The row is committed before the content is placed in the store, so a concurrent
+    delete of the last other row with this content (in any process) either sees the new
+    row and keeps the file, or has already moved it aside and this upload puts it back.
+    """
+    digest, size, spool_path = spool_resource_content(content)
+    conn = db_connect()
+    cursor = conn.cursor()
+    try:
+        rid = insert_returning_id(cursor, '''
+            INSERT INTO faculty_resources (faculty_id, subject_id, resource_type, filename, file_path, deadline, content_hash, size_bytes)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (faculty_id, subject_id, resource_type, filename, resource_store_path(digest), deadline, digest, size))
+        conn.commit()
+    except Exception:
+        discard_resource_spool(spool_path)
+        raise
+    finally:
+        conn.close()
+    place_resource_content(digest, spool_path)
+    invalidate_tables('faculty_resources')
+    return rid
+
+
+def _count_resource_references(cursor, digest, file_path):
+    if digest:
+        cursor.execute('SELECT COUNT(*) FROM faculty_resources WHERE content_hash = ?', (digest,))
+    else:
+        cursor.execute('SELECT COUNT(*) FROM faculty_resources WHERE file_path = ?', (file_path,))
+    return cursor.fetchone()[0]
+
+
+def delete_faculty_resource(resource_id):
+    """Delete a resource row; its stored file is removed once no other resource shares the content.
+
+    After the delete commits, an unreferenced file is renamed aside and the references are
+    counted again: an upload that committed a row for the same content in the meantime
+    gets the file back, otherwise the moved file is removed (see add_faculty_resource).
+    """
+    conn = db_connect()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('SELECT content_hash, file_path FROM faculty_resources WHERE id = ?', (resource_id,))
+        row = cursor.fetchone()
+        if not row:
+            conn.close()
+            return False
+        digest, file_path = row
+        cursor.execute('DELETE FROM assignment_submissions WHERE assignment_id = ?', (resource_id,))
+        cursor.execute('DELETE FROM faculty_resources WHERE id = ?', (resource_id,))
+        remaining = _count_resource_references(cursor, digest, file_path)
+        conn.commit()
+        if not remaining and file_path:
+            doomed = f'{file_path}.deleting-{uuid.uuid4().hex}'
+            try:
+                os.replace(file_path, doomed)
+            except OSError:
+                doomed = None
+            if doomed:
+                if _count_resource_references(cursor, digest, file_path):
+                    if os.path.exists(file_path):
+                        os.remove(doomed)
+                    else:
+                        os.replace(doomed, file_path)
+                else:
+                    os.remove(doomed)
+        conn.close()
+        invalidate_tables('faculty_resources')
+        return True
+    except Exception:
+        conn.close()
+        return False
+
+def get_faculty_resources(faculty_id, subject_id=None, resource_type=None):
+    """Get resources uploaded by a faculty member."""
+    conn = db_connect()
+    cursor = conn.cursor()
+    query = 'SELECT id, subject_id, resource_type, filename, uploaded_at, deadline FROM faculty_resources WHERE faculty_id = ?'
+    params = [faculty_id]
+    if subject_id:
+        query += ' AND subject_id = ?'
+        params.append(subject_id)
+    if resource_type:
+        query += ' AND resource_type = ?'
+        params.append(resource_type)
+    query += ' ORDER BY uploaded_at DESC'
+    cursor.execute(query, tuple(params))
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+def get_subject_resources_for_student(year_level, department, resource_type=None):
+    """Get resources (assignments/notes) for a student's year level and department."""
+    conn = db_connect()
+    cursor = conn.cursor()
+    query = '''
+        SELECT fr.id, fr.filename, fr.resource_type, s.name, f.name, fr.uploaded_at, fr.deadline
+        FROM faculty_resources fr
+        JOIN subjects s ON fr.subject_id = s.id
+        JOIN faculty f ON fr.faculty_id = f.id
+        WHERE s.year_level = ? AND s.department = ?
+    '''
+    params = [year_level, department]
+    if resource_type:
+        query += ' AND fr.resource_type = ?'
+        params.append(resource_type)
+    query += ' ORDER BY fr.uploaded_at DESC'
+    cursor.execute(query, tuple(params))
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+def get_resource_catalog(year_level, department):
+    """Subjects, resources and teaching faculty for one (year level, branch) audience.
+
+    One UNION ALL query tagged by row kind, cached until faculty_resources or a
+    reference table changes. Returns a dict with
+      subjects:  [(subject_id, name)] ordered by name,
+      resources: {subject_id: [(resource_id, filename, resource_type, faculty_name, uploaded_at, deadline)]},
+      faculty:   [(faculty_id, name, department, [subject names taught], resource count)] ordered by name.
+    """
+    @st.cache_data(ttl=300)
+    def _cached(tag_versions, year_level, department):
+        conn = db_connect()
+        cursor = conn.cursor()
+        audience = "s.year_level = ? AND (s.department = ? OR s.department IS NULL OR s.department = '')"
+        cursor.execute(f'''
+            SELECT 's' AS kind, s.id, s.name, NULL, NULL, NULL, NULL, NULL, NULL, NULL, NULL
+            FROM subjects s WHERE {audience}
+            UNION ALL
+            SELECT 'r', s.id, s.name, fr.id, fr.filename, fr.resource_type, f.id, f.name, f.department, fr.uploaded_at, fr.deadline
+            FROM faculty_resources fr
+            JOIN subjects s ON fr.subject_id = s.id
+            JOIN faculty f ON fr.faculty_id = f.id
+            WHERE {audience}
+            UNION ALL
+            SELECT 't', s.id, s.name, NULL, NULL, NULL, f.id, f.name, f.department, NULL, NULL
+            FROM faculty_subject fs
+            JOIN subjects s ON fs.subject_id = s.id
+            JOIN faculty f ON fs.faculty_id = f.id
+            WHERE {audience}
+        ''', (year_level, department) * 3)
+        rows = cursor.fetchall()
+        conn.close()
+
+        subjects, resources, faculty = {}, {}, {}
+        for kind, sid, sname, rid, filename, rtype, fid, fname, fdept, uploaded_at, deadline in rows:
+            if kind == 's':
+                subjects[sid] = sname
+                continue
+            entry = faculty.setdefault(fid, [fid, fname, fdept, set(), 0])
+            if kind == 'r':
+                resources.setdefault(sid, []).append((rid, filename, rtype, fname, uploaded_at, deadline))
+                entry[4] += 1
+            else:
+                entry[3].add(sname)
+        for items in resources.values():
+            items.sort(key=lambda r: str(r[4] or ''), reverse=True)
+        return {
+            'subjects': sorted(subjects.items(), key=lambda item: item[1]),
+            'resources': resources,
+            'faculty': [(fid, name, dept, sorted(taught), count)
+                        for fid, name, dept, taught, count in sorted(faculty.values(), key=lambda f: f[1] or '')
+                        if taught],
+        }
+
+    return _cached(cache_tag_versions('faculty_resources', *REFERENCE_TABLES), year_level, department)
+
+def get_resource_file(resource_id):
+    """(filename, file_path) for one faculty resource, or None."""
+    conn = db_connect()
+    cursor = conn.cursor()
+    cursor.execute('SELECT filename, file_path FROM faculty_resources WHERE id = ?', (resource_id,))
+    row = cursor.fetchone()
+    conn.close()
+    return row
+
+def resource_download_button(container, resource_id, key_prefix='resource'):
+    """Download control for a faculty resource that only touches the file once asked for.
+
+    The first click marks the resource as requested; the rerun renders st.download_button
+    for it once and clears the request, so later reruns go back to the plain button. Where
+    Streamlit supports deferred data the file is only read when 💾 is clicked; otherwise it
+    is read for that one rerun. Other resources on the page render as plain buttons, so
+    page cost does not depend on how large the uploaded files are.
+    """
+    if st.session_state.get('requested_resource') != resource_id:
+        if container.button("⬇️", key=f"{key_prefix}_request_{resource_id}", help="Prepare download"):
+            st.session_state['requested_resource'] = resource_id
+            safe_rerun()
+        return
+    st.session_state.pop('requested_resource', None)
+    resource = get_resource_file(resource_id)
+    if not resource or not os.path.isfile(resource[1]):
+        container.caption("File missing")
+        return
+    filename, file_path = resource
+    container.download_button("💾", data=file_download_data(file_path), file_name=filename, key=f"{key_prefix}_download_{resource_id}")
+
+def delete_subject(subject_id):
+    """Delete a subject and its faculty_subject mappings."""
+    conn = db_connect()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('DELETE FROM faculty_subject WHERE subject_id = ?', (subject_id,))
+        cursor.execute('DELETE FROM faculty_teaching WHERE subject_id = ?', (subject_id,))
+        cursor.execute('DELETE FROM subjects WHERE id = ?', (subject_id,))
+        conn.commit()
+        conn.close()
+        invalidate_tables('subjects', 'faculty_subject', 'faculty_teaching')
+        return True
+    except Exception:
+        conn.close()
+        return False
+
+# Rating columns summed into feedback_aggregates, in storage order
+FEEDBACK_SCORE_COLUMNS = ('q1', 'q2', 'q3', 'q4', 'q5', 'q6', 'q7', 'q8', 'q9', 'q10', 'overall_rating')
+FEEDBACK_QUESTION_LABELS = {
+    'q1': 'Q1: Fundamental Concepts & Subject Knowledge', 'q2': 'Q2: Preparation for Subject',
+    'q3': 'Q3: Knowledge of current trends/development', 'q4': 'Q4: Proficient in English & communication',
+    'q5': 'Q5: Teaching makes class interesting & interactive', 'q6': 'Q6: Punctuality of faculty',
+    'q7': 'Q7: Coverage of syllabus as prescribed', 'q8': 'Q8: Fulfillment of your learning expectations',
+    'q9': 'Q9: Behavior with students appropriate/rational', 'q10': 'Q10: Motivates students for study & career',
+    'overall_rating': 'Overall Rating',
+}
+# responses, then per-column sums and non-NULL counts, then an overall_rating histogram (1..10)
+FEEDBACK_AGGREGATE_COLUMNS = (
+    ('responses',)
+    + tuple(f'sum_{col}' for col in FEEDBACK_SCORE_COLUMNS)
+    + tuple(f'n_{col}' for col in FEEDBACK_SCORE_COLUMNS)
+    + tuple(f'overall_{r}' for r in range(1, 11))
+)
+
+
+def feedback_academic_year(created_at=None):
+    """Academic year label ("YYYY-YYYY") a feedback row counts towards."""
+    return get_academic_year_range_for_date(parse_iso_to_kolkata(created_at))[2]
+
+
+def apply_feedback_aggregates(cursor, groups):
+    """Add submissions to feedback_aggregates on the caller's cursor (no commit).
+
+    `groups` is an iterable of (faculty_id, subject_id, academic_year, score_rows) where
+    each score row holds the FEEDBACK_SCORE_COLUMNS values of one submission.
+    """
+    params = []
+    for faculty_id, subject_id, academic_year, score_rows in groups:
+        sums = [0] * len(FEEDBACK_SCORE_COLUMNS)
+        counts = [0] * len(FEEDBACK_SCORE_COLUMNS)
+        overall_hist = [0] * 10
+        for scores in score_rows:
+            for i, value in enumerate(scores):
+                if value is not None:
+                    sums[i] += int(value)
+                    counts[i] += 1
+            overall = scores[-1]
+            if overall is not None and 1 <= int(overall) <= 10:
+                overall_hist[int(overall) - 1] += 1
+        params.append((faculty_id, subject_id or 0, academic_year, len(score_rows), *sums, *counts, *overall_hist))
+    if not params:
+        return
+    cols = ', '.join(FEEDBACK_AGGREGATE_COLUMNS)
+    marks = ', '.join('?' for _ in FEEDBACK_AGGREGATE_COLUMNS)
+    deltas = ', '.join(f'{col} = feedback_aggregates.{col} + excluded.{col}' for col in FEEDBACK_AGGREGATE_COLUMNS)
+    cursor.executemany(f'''
+        INSERT INTO feedback_aggregates (faculty_id, subject_id, academic_year, {cols})
+        VALUES (?, ?, ?, {marks})
+        ON CONFLICT (faculty_id, subject_id, academic_year)
+        DO UPDATE SET {deltas}, updated_at = CURRENT_TIMESTAMP
+    ''', params)
+
+
+def _feedback_entry(student_name, faculty_id, subject_id, year_level, q1, q2, q3, q4, q5, q6, q7, q8, q9, q10, overall, comments):
+    """A feedback submission as a JSON-serialisable dict (the unit of the write-behind journal)."""
+    return {
+        'id': uuid.uuid4().hex,
+        'created_at': datetime.now(ZoneInfo('UTC')).strftime('%Y-%m-%d %H:%M:%S'),
+        'academic_year': feedback_academic_year(),
+        'row': [student_name or 'Anonymous', faculty_id, subject_id, year_level,
+                q1, q2, q3, q4, q5, q6, q7, q8, q9, q10, overall, comments],
+    }
+
+
+def _stored_submission_ids(cursor, table, ids):
+    """The subset of `ids` already present in `table`.submission_id."""
+    stored = set()
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        cursor.execute(f"SELECT submission_id FROM {table} WHERE submission_id IN ({', '.join('?' for _ in chunk)})", tuple(chunk))
+        stored.update(r[0] for r in cursor.fetchall())
+    return stored
+
+
+def _validate_feedback_entry(entry):
+    """Raise ValueError unless the entry can be stored (a faculty and 1-10 integer ratings)."""
+    row = entry['row']
+    if row[1] is None:
+        raise ValueError("Feedback needs a faculty")
+    int(row[1])
+    for value in row[4:15]:
+        if value is not None and not 1 <= int(value) <= 10:
+            raise ValueError(f"Rating {value} is outside 1-10")
+
+
+def _write_feedback_entries(cursor, entries):
+    """Insert feedback entries and fold them into feedback_aggregates (caller commits).
+
+    Entries whose submission id is already stored are skipped, so a batch that was
+    committed but not yet removed from the journal can be replayed safely.
+    Returns the number of rows inserted.
+    """
+    stored = _stored_submission_ids(cursor, 'feedback', [e['id'] for e in entries])
+    fresh = [e for e in entries if e['id'] not in stored]
+    if not fresh:
+        return 0
+    cursor.executemany('''
+        INSERT INTO feedback (submission_id, created_at, student_name, faculty_id, subject_id, year_level,
+                              q1, q2, q3, q4, q5, q6, q7, q8, q9, q10, overall_rating, comments)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', [(e['id'], e['created_at'], *e['row']) for e in fresh])
+    groups = {}
+    for e in fresh:
+        row = e['row']
+        groups.setdefault((row[1], row[2], e['academic_year']), []).append(row[4:15])
+    apply_feedback_aggregates(cursor, [(fid, sid, ay, scores) for (fid, sid, ay), scores in groups.items()])
+    return len(fresh)
+
+
+def submit_feedback(student_name, faculty_id, subject_id, year_level, q1, q2, q3, q4, q5, q6, q7, q8, q9, q10, overall, comments):
+    """Submit feedback to database with subject tracking (stores up to 10 question ratings)."""
+    entry = _feedback_entry(student_name, faculty_id, subject_id, year_level, q1, q2, q3, q4, q5, q6, q7, q8, q9, q10, overall, comments)
+    _validate_feedback_entry(entry)
+    conn = db_connect()
+    cursor = conn.cursor()
+    _write_feedback_entries(cursor, [entry])
+    conn.commit()
+    conn.close()
+    invalidate_tables('feedback', 'feedback_aggregates')
+    return True
+
+
+def _entry_error_types():
+    """Exceptions that can mean an entry itself cannot be written: decode/validation errors, and
+    constraint or data errors from the database other than unique violations (see `_is_unique_violation`)."""
+    errors = [ValueError, TypeError, KeyError, sqlite3.IntegrityError, sqlite3.DataError]
+    try:
+        import psycopg2
+        errors += [psycopg2.IntegrityError, psycopg2.DataError]
+    except ImportError:
+        pass
+    return tuple(errors)
+
+
+def _is_unique_violation(error):
+    """True for a primary-key/unique violation, e.g. an id sequence left behind MAX(id) by an import.
+
+    These say nothing about the entry, so the write is retried (after re-syncing sequences)."""
+    if getattr(error, 'pgcode', None) == '23505':
+        return True
+    return isinstance(error, sqlite3.IntegrityError) and 'UNIQUE constraint failed' in str(error)
+
+
+class WriteBehindQueue:
+    """Journaled write-behind queue shared by the whole process.
+
+    `_enqueue()` appends an entry to an fsync'd journal file and returns; a background
+    thread writes queued entries with `_write_entries()` in one transaction per batch of
+    up to `max_batch`, at most `max_delay_ms` after the oldest was queued. Flushed entries
+    are dropped from the journal, and whatever is left in it is replayed on the next start.
+    When a batch fails its entries are retried one at a time; an entry that still fails
+    with a decode, validation or constraint error (see `_entry_error_types`) is appended
+    to the `<journal>.dead` dead-letter file instead of blocking the queue. A unique
+    violation keeps the batch queued: the id sequences of `sequence_tables` are re-synced
+    (ensure_postgres_sequence) and the batch is retried, as after any other failure such
+    as the database being unreachable, with backoff. With `max_pending` set, `_enqueue()`
+    waits for room and gives up (returns False) after its timeout. Subclasses supply
+    `_write_entries(cursor, entries)` and `_after_commit()`, and should validate entries
+    before queueing them.
+    """
+
+    thread_name = 'write-behind-queue'
+    sequence_tables = ()
+
+    def __init__(self, journal_path, max_batch=200, max_delay_ms=500.0, max_pending=0):
+        self.journal_path = journal_path
+        self.max_batch = max(1, max_batch)
+        self.max_delay = max(0.0, max_delay_ms) / 1000.0
+        self.max_pending = max(0, max_pending)
+        self.dead_letter_path = journal_path + '.dead'
+        self._entry_errors = _entry_error_types()
+        self._cond = threading.Condition()
+        self._pending = []  # (entry, queued_at monotonic), oldest first
+        self._latencies = deque(maxlen=2000)  # queue-to-commit ms of recently flushed entries
+        self._flush_log = deque()  # (monotonic, rows) of batches in the last minute
+        self._metrics = {'enqueued': 0, 'replayed': 0, 'flushed': 0, 'duplicates': 0, 'batches': 0,
+                         'last_batch_size': 0, 'last_flush_ms': 0.0, 'max_flush_ms': 0.0,
+                         'last_latency_ms': 0.0, 'max_latency_ms': 0.0, 'max_depth': 0,
+                         'full_waits': 0, 'max_submit_wait_ms': 0.0, 'rejected': 0,
+                         'dead_lettered': 0, 'errors': 0, 'last_error': None}
+        self._replay_journal()
+        # Rewrite before appending so a torn tail line cannot swallow the next entry
+        self._journal = open(self.journal_path, 'a', encoding='utf-8')
+        self._rewrite_journal()
+        self._thread = threading.Thread(target=self._run, name=self.thread_name, daemon=True)
+        self._thread.start()
+
+    def _write_entries(self, cursor, entries):
+        """Insert `entries` (caller commits); returns how many were new."""
+        raise NotImplementedError
+
+    def _after_commit(self):
+        pass
+
+    def _replay_journal(self):
+        if not os.path.exists(self.journal_path):
+            return
+        now = time.monotonic()
+        with open(self.journal_path, 'r', encoding='utf-8') as jf:
+            for line in jf:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A torn last line from a crash mid-append was never acknowledged
+                    continue
+                self._pending.append((entry, now))
+        self._metrics['replayed'] = len(self._pending)
+
+    def _append_journal(self, entry):
+        self._journal.write(json.dumps(entry) + '\n')
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    def _append_dead_letters(self, failed):
+        """Append (entry, error) pairs to the dead-letter file (caller holds the lock)."""
+        failed_at = datetime.now(ZoneInfo('UTC')).strftime('%Y-%m-%d %H:%M:%S')
+        with open(self.dead_letter_path, 'a', encoding='utf-8') as df:
+            for entry, error in failed:
+                df.write(json.dumps({'failed_at': failed_at, 'error': error, 'entry': entry}) + '\n')
+            df.flush()
+            os.fsync(df.fileno())
+
+    def _rewrite_journal(self):
+        """Replace the journal with the still-pending entries (caller holds the lock)."""
+        self._journal.close()
+        tmp_path = self.journal_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as jf:
+            for entry, _ in self._pending:
+                jf.write(json.dumps(entry) + '\n')
+            jf.flush()
+            os.fsync(jf.fileno())
+        os.replace(tmp_path, self.journal_path)
+        self._journal = open(self.journal_path, 'a', encoding='utf-8')
+
+    def _enqueue(self, entry, timeout=None):
+        """Durably queue one entry; False if the queue stayed full for `timeout` seconds."""
+        with self._cond:
+            if self.max_pending and len(self._pending) >= self.max_pending:
+                self._metrics['full_waits'] += 1
+                waited_from = time.monotonic()
+                deadline = None if timeout is None else waited_from + timeout
+                while len(self._pending) >= self.max_pending:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        self._metrics['rejected'] += 1
+                        return False
+                    self._cond.wait(remaining)
+                waited_ms = (time.monotonic() - waited_from) * 1000.0
+                self._metrics['max_submit_wait_ms'] = max(self._metrics['max_submit_wait_ms'], waited_ms)
+            self._append_journal(entry)
+            self._pending.append((entry, time.monotonic()))
+            self._metrics['enqueued'] += 1
+            self._metrics['max_depth'] = max(self._metrics['max_depth'], len(self._pending))
+            self._cond.notify_all()
+        return True
+
+    def _next_batch(self):
+        """Block until a batch is due: full, or its oldest entry has waited max_delay."""
+        with self._cond:
+            while True:
+                if len(self._pending) >= self.max_batch:
+                    break
+                if self._pending:
+                    remaining = self._pending[0][1] + self.max_delay - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                else:
+                    self._cond.wait()
+            return self._pending[:self.max_batch]
+
+    def _write_batch(self, entries):
+        """Write `entries` in one transaction; returns how many were new."""
+        conn = db_connect()
+        try:
+            inserted = self._write_entries(conn.cursor(), entries)
+            conn.commit()
+            return inserted
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def _write_each(self, entries):
+        """Retry a failed batch entry by entry; returns (inserted, [(entry, error)] that cannot be written).
+
+        Unique violations and errors other than `_entry_error_types()` propagate, leaving
+        the whole batch queued.
+        """
+        inserted = 0
+        failed = []
+        for entry in entries:
+            try:
+                inserted += self._write_batch([entry])
+            except self._entry_errors as e:
+                if _is_unique_violation(e):
+                    raise
+                failed.append((entry, f'{type(e).__name__}: {e}'))
+        return inserted, failed
+
+    def _repair_sequences(self):
+        """Re-sync the id sequences of `sequence_tables` after a unique violation (no-op on SQLite)."""
+        for table in self.sequence_tables:
+            try:
+                ensure_postgres_sequence(table)
+            except Exception as e:
+                self._record_error(e)
+
+    def _record_error(self, e):
+        with self._cond:
+            self._metrics['errors'] += 1
+            self._metrics['last_error'] = f'{type(e).__name__}: {e}'
+
+    def _run(self):
+        backoff = 0.5
+        while True:
+            batch = self._next_batch()
+            started = time.perf_counter()
+            entries = [entry for entry, _ in batch]
+            failed = []
+            try:
+                inserted = self._write_batch(entries)
+            except Exception as e:
+                self._record_error(e)
+                try:
+                    if _is_unique_violation(e):
+                        raise
+                    inserted, failed = self._write_each(entries)
+                except Exception as retry_error:
+                    if retry_error is not e:
+                        self._record_error(retry_error)
+                    if _is_unique_violation(retry_error):
+                        self._repair_sequences()
+                    time.sleep(backoff)
+                    backoff = min(backoff * 2, 30.0)
+                    continue
+            backoff = 0.5
+            self._after_commit()
+
+            now = time.monotonic()
+            flush_ms = (time.perf_counter() - started) * 1000.0
+            latency_ms = (now - batch[0][1]) * 1000.0
+            with self._cond:
+                # Only this thread removes entries, so the batch is still the queue's head
+                if failed:
+                    self._append_dead_letters(failed)
+                del self._pending[:len(batch)]
+                self._rewrite_journal()
+                self._latencies.extend((now - queued_at) * 1000.0 for _, queued_at in batch)
+                self._flush_log.append((now, len(batch)))
+                m = self._metrics
+                m['flushed'] += inserted
+                m['dead_lettered'] += len(failed)
+                m['duplicates'] += len(batch) - inserted - len(failed)
+                m['batches'] += 1
+                m['last_batch_size'] = len(batch)
+                m['last_flush_ms'] = flush_ms
+                m['max_flush_ms'] = max(m['max_flush_ms'], flush_ms)
+                m['last_latency_ms'] = latency_ms
+                m['max_latency_ms'] = max(m['max_latency_ms'], latency_ms)
+                self._cond.notify_all()
+
+    def flush(self, timeout=10.0):
+        """Wait until everything queued so far is committed; returns False on timeout."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._cond.notify_all()
+            while self._pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def stats(self):
+        """Counters plus queue depth, rows/s over the last minute and p50/p95 queue-to-commit latency."""
+        with self._cond:
+            now = time.monotonic()
+            while self._flush_log and now - self._flush_log[0][0] > 60.0:
+                self._flush_log.popleft()
+            recent_rows = sum(n for _, n in self._flush_log)
+            window = now - self._flush_log[0][0] if len(self._flush_log) > 1 else 0.0
+            latencies = np.array(self._latencies) if self._latencies else None
+            oldest = (now - self._pending[0][1]) * 1000.0 if self._pending else 0.0
+            return dict(self._metrics, depth=len(self._pending), oldest_ms=oldest,
+                        rows_per_s=recent_rows / window if window > 0 else 0.0,
+                        p50_latency_ms=float(np.percentile(latencies, 50)) if latencies is not None else 0.0,
+                        p95_latency_ms=float(np.percentile(latencies, 95)) if latencies is not None else 0.0,
+                        max_batch=self.max_batch, max_delay_ms=self.max_delay * 1000.0, max_pending=self.max_pending)
+
+
+class FeedbackWriteQueue(WriteBehindQueue):
+    """Write-behind queue for feedback submissions (see WriteBehindQueue)."""
+
+    thread_name = 'feedback-write-queue'
+    sequence_tables = ('feedback',)
+
+    def submit(self, student_name, faculty_id, subject_id, year_level, q1, q2, q3, q4, q5, q6, q7, q8, q9, q10, overall, comments):
+        """Durably queue one submission (same arguments as submit_feedback); raises ValueError for an invalid one."""
+        entry = _feedback_entry(student_name, faculty_id, subject_id, year_level,
+                                q1, q2, q3, q4, q5, q6, q7, q8, q9, q10, overall, comments)
+        _validate_feedback_entry(entry)
+        return self._enqueue(entry)
+
+    def _write_entries(self, cursor, entries):
+        return _write_feedback_entries(cursor, entries)
+
+    def _after_commit(self):
+        invalidate_tables('feedback', 'feedback_aggregates')
+
+
+@st.cache_resource
+def get_feedback_queue():
+    """Process-wide feedback write queue; creating it replays any journal left by a restart."""
+    return FeedbackWriteQueue(FEEDBACK_QUEUE_JOURNAL, FEEDBACK_QUEUE_MAX_BATCH, FEEDBACK_QUEUE_MAX_DELAY_MS)
+
+
+def get_all_feedback(limit=None):
+    """Get all feedback (newest first, at most `limit` rows) with faculty names and the subject."""
+    @st.cache_data(ttl=300)
+    def _cached(tag_versions, limit):
+        conn = db_connect()
+        cursor = conn.cursor()
+        query = '''
+             SELECT f.id, f.created_at, fac.name, fac.department, fac.year_level, f.student_name,
+                 f.q1, f.q2, f.q3, f.q4, f.q5, f.q6, f.q7, f.q8, f.q9, f.q10, f.overall_rating, f.comments,
+                 COALESCE(s.name, 'Not Specified') as subject
+            FROM feedback f
+            JOIN faculty fac ON f.faculty_id = fac.id
+            LEFT JOIN subjects s ON f.subject_id = s.id
+            ORDER BY f.created_at DESC
+        '''
+        if limit:
+            query += f' LIMIT {int(limit)}'
+        cursor.execute(query)
+        feedbacks = cursor.fetchall()
+        conn.close()
+        return feedbacks
+
+    return _cached(cache_tag_versions('feedback', 'faculty', 'subjects'), limit)
+
+def get_faculty_stats(academic_year=None):
+    """Get statistics by faculty from feedback_aggregates (optionally for one academic year)."""
+    conn = db_connect()
+    cursor = conn.cursor()
+    query = '''
+        SELECT fac.name, fac.department, fac.year_level, SUM(a.responses) as count,
+               1.0 * SUM(a.sum_overall_rating) / NULLIF(SUM(a.n_overall_rating), 0) as avg_rating
+        FROM feedback_aggregates a
+        JOIN faculty fac ON a.faculty_id = fac.id
+    '''
+    params = []
+    if academic_year:
+        query += ' WHERE a.academic_year = ?'
+        params.append(academic_year)
+    query += '''
+        GROUP BY a.faculty_id, fac.name, fac.department, fac.year_level
+        HAVING SUM(a.responses) > 0
+        ORDER BY fac.name
+    '''
+    cursor.execute(query, tuple(params))
+    stats = cursor.fetchall()
+    conn.close()
+    return stats
+
+
+def get_feedback_overview(academic_year=None):
+    """Institution-wide feedback totals from feedback_aggregates.
+
+    Returns a dict with 'responses', 'faculty_count', 'averages' (FEEDBACK_SCORE_COLUMNS ->
+    mean or None) and 'overall_counts' (number of overall ratings 1..10).
+    """
+    conn = db_connect()
+    cursor = conn.cursor()
+    totals = ', '.join(f'COALESCE(SUM({col}), 0)' for col in FEEDBACK_AGGREGATE_COLUMNS)
+    query = f'SELECT {totals}, COUNT(DISTINCT faculty_id) FROM feedback_aggregates WHERE responses > 0'
+    params = []
+    if academic_year:
+        query += ' AND academic_year = ?'
+        params.append(academic_year)
+    cursor.execute(query, tuple(params))
+    row = cursor.fetchone()
+    conn.close()
+
+    totals = dict(zip(FEEDBACK_AGGREGATE_COLUMNS, (int(v or 0) for v in row[:-1])))
+    return {
+        'responses': totals['responses'],
+        'faculty_count': int(row[-1] or 0),
+        'averages': {col: (totals[f'sum_{col}'] / totals[f'n_{col}'] if totals[f'n_{col}'] else None)
+                     for col in FEEDBACK_SCORE_COLUMNS},
+        'overall_counts': [totals[f'overall_{r}'] for r in range(1, 11)],
+    }
+
+
+def _fts5_match_expression(text):
+    """Quote each search term for FTS5 (a trailing * keeps prefix matching); terms are ANDed."""
+    terms = []
+    for term in text.split():
+        prefix = term.endswith('*')
+        term = term.rstrip('*').replace('"', '""')
+        if term:
+            terms.append(f'"{term}"' + ('*' if prefix else ''))
+    return ' '.join(terms)
+
+
+def search_feedback_comments(text, page=1, page_size=20):
+    """Ranked full-text search over feedback comments.
+
+    Returns (rows, total) where rows are (id, created_at, faculty, department, subject,
+    overall_rating, snippet) for the requested 1-based page, best match first. Matched
+    terms are wrapped in ** in the snippet.
+    """
+    @st.cache_data(ttl=300)
+    def _cached(tag_versions, text, page, page_size):
+        conn = db_connect()
+        cursor = conn.cursor()
+        offset = (page - 1) * page_size
+        joins = '''
+            JOIN faculty fac ON f.faculty_id = fac.id
+            LEFT JOIN subjects s ON f.subject_id = s.id
+        '''
+        columns = "f.id, f.created_at, fac.name, fac.department, COALESCE(s.name, 'Not Specified'), f.overall_rating"
+        try:
+            if DATABASE_URL and 'comments_tsv' in get_table_columns('feedback', cursor):
+                cursor.execute(f'''
+                    SELECT {columns},
+                           ts_headline('english', f.comments, q, 'StartSel=**, StopSel=**, MaxWords=30, MinWords=12')
+                    FROM feedback f CROSS JOIN websearch_to_tsquery('english', ?) AS q {joins}
+                    WHERE f.comments_tsv @@ q
+                    ORDER BY ts_rank(f.comments_tsv, q) DESC, f.id DESC
+                    LIMIT ? OFFSET ?
+                ''', (text, page_size, offset))
+                rows = cursor.fetchall()
+                cursor.execute('''SELECT COUNT(*) FROM feedback
+                                  WHERE comments_tsv @@ websearch_to_tsquery('english', ?)''', (text,))
+            elif not DATABASE_URL and get_table_columns('feedback_fts', cursor):
+                match = _fts5_match_expression(text)
+                if not match:
+                    return [], 0
+                cursor.execute(f'''
+                    SELECT {columns}, snippet(feedback_fts, 0, '**', '**', '…', 16)
+                    FROM feedback_fts JOIN feedback f ON f.id = feedback_fts.rowid {joins}
+                    WHERE feedback_fts MATCH ?
+                    ORDER BY bm25(feedback_fts), f.id DESC
+                    LIMIT ? OFFSET ?
+                ''', (match, page_size, offset))
+                rows = cursor.fetchall()
+                cursor.execute('SELECT COUNT(*) FROM feedback_fts WHERE feedback_fts MATCH ?', (match,))
+            else:
+                # No full-text index available: substring match, newest first
+                escaped = text.strip().lower().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+                pattern = f"%{escaped}%"
+                cursor.execute(f'''
+                    SELECT {columns}, f.comments
+                    FROM feedback f {joins}
+                    WHERE LOWER(f.comments) LIKE ? ESCAPE '\\'
+                    ORDER BY f.id DESC
+                    LIMIT ? OFFSET ?
+                ''', (pattern, page_size, offset))
+                rows = cursor.fetchall()
+                cursor.execute("SELECT COUNT(*) FROM feedback f WHERE LOWER(f.comments) LIKE ? ESCAPE '\\'", (pattern,))
+            total = cursor.fetchone()[0]
+        finally:
+            conn.close()
+        return rows, total
+
+    if not text or not text.strip():
+        return [], 0
+    return _cached(cache_tag_versions('feedback', 'faculty', 'subjects'), text.strip(), max(1, int(page)), int(page_size))
+
+
+# Dimensions the feedback cube can be drilled by, coarsest first
+FEEDBACK_CUBE_DIMENSIONS = ('department', 'year_level', 'subject', 'faculty', 'academic_year')
+# Rows committed late (e.g. through the write queue) can carry a created_at older than
+# the cube's watermark, so every refresh re-reads this window and skips ids it has seen.
+FEEDBACK_CUBE_OVERLAP_SECONDS = 900
+
+
+class FeedbackCube:
+    """Precomputed feedback cube shared by the whole process (see `get_feedback_cube`).
+
+    Cells are keyed by (faculty_id, subject_id, year_level, academic_year) and hold, for
+    every rating column, the response count, sum, sum of squares and a 1..10 histogram.
+    refresh() reads only rows created since the created_at watermark and adds their cells
+    in, so drill-downs group cells instead of feedback rows. Department, faculty and
+    subject names are attached from the reference snapshot at query time.
+    Filters are (dimension, value) pairs; a tuple value matches any of its items.
+    """
+
+    KEYS = ['faculty_id', 'subject_id', 'year_level', 'academic_year']
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._token = uuid.uuid4().hex[:8]
+        self._refreshes = 0
+        self.cells = None
+        self.watermark = None
+        self._recent = {}  # feedback id -> created_at, for rows inside the overlap window
+        self._checked = None  # (feedback tag versions, monotonic time) of the last refresh
+
+    @property
+    def version(self):
+        return f'{self._token}:{self._refreshes}'
+
+    def refresh_if_stale(self, max_age=300.0):
+        """Pull new feedback if it was written since the last refresh (or max_age has passed)."""
+        tags = cache_tag_versions('feedback')
+        with self._lock:
+            if not (self._checked and self._checked[0] == tags and time.monotonic() - self._checked[1] < max_age):
+                self._refresh()
+                self._checked = (tags, time.monotonic())
+            return self.version
+
+    def _refresh(self):
+        cols = ', '.join(FEEDBACK_SCORE_COLUMNS)
+        query = f'''SELECT id, created_at, faculty_id, subject_id, year_level, {cols}
+                    FROM feedback WHERE faculty_id IS NOT NULL AND created_at IS NOT NULL'''
+        params = ()
+        if self.watermark is not None:
+            since = self.watermark.replace(tzinfo=None) - timedelta(seconds=FEEDBACK_CUBE_OVERLAP_SECONDS)
+            query += ' AND created_at >= ?'
+            params = (since.strftime('%Y-%m-%d %H:%M:%S'),)
+        conn = db_connect()
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        rows = [r for r in cursor.fetchall() if r[0] not in self._recent]
+        conn.close()
+        if not rows:
+            return
+
+        facts = pd.DataFrame(rows, columns=['id', 'created_at', 'faculty_id', 'subject_id', 'year_level', *FEEDBACK_SCORE_COLUMNS])
+        created = facts['created_at'].map(parse_iso_to_kolkata)
+        academic_years = {dt: get_academic_year_range_for_date(dt)[2] for dt in created.dropna().unique()}
+        facts['academic_year'] = created.map(lambda dt: academic_years.get(dt) or feedback_academic_year())
+        facts['subject_id'] = facts['subject_id'].fillna(0).astype(int)
+        facts['year_level'] = facts['year_level'].fillna('')
+
+        measures = {'responses': np.ones(len(facts), dtype=np.int64)}
+        for col in FEEDBACK_SCORE_COLUMNS:
+            values = pd.to_numeric(facts[col], errors='coerce')
+            filled = values.fillna(0).to_numpy(dtype=np.float64)
+            measures[f'n_{col}'] = values.notna().to_numpy(dtype=np.int64)
+            measures[f'sum_{col}'] = filled
+            measures[f'sumsq_{col}'] = filled * filled
+            for rating in range(1, 11):
+                measures[f'{col}_{rating}'] = (values == rating).to_numpy(dtype=np.int64)
+        new_cells = pd.concat([facts[self.KEYS], pd.DataFrame(measures, index=facts.index)], axis=1).groupby(self.KEYS).sum()
+        self.cells = new_cells if self.cells is None else self.cells.add(new_cells, fill_value=0)
+
+        parsed = created.dropna()
+        if not parsed.empty:
+            newest = parsed.max()
+            self.watermark = newest if self.watermark is None else max(self.watermark, newest)
+        self._recent.update(zip(facts['id'], created))
+        if self.watermark is not None:
+            cutoff = self.watermark - timedelta(seconds=FEEDBACK_CUBE_OVERLAP_SECONDS)
+            # Rows with an unparseable created_at stay remembered so they are never counted twice
+            self._recent = {i: dt for i, dt in self._recent.items() if pd.isna(dt) or dt >= cutoff}
+        self._refreshes += 1
+
+    def _grouped(self, dims, filters):
+        """Measures summed over cells grouped by `dims` (a single total row when dims is empty)."""
+        cells = self.cells
+        if cells is None or cells.empty:
+            return None
+        ref = get_reference_snapshot()
+        cells = cells.reset_index()
+        fac = cells['faculty_id'].map(ref.faculty.get)
+        cells['faculty'] = [row[1] if row else f'#{fid}' for row, fid in zip(fac, cells['faculty_id'])]
+        cells['department'] = [(row[2] if row else None) or 'Unknown' for row in fac]
+        cells['subject'] = cells['subject_id'].map(lambda sid: ref.subject_name(sid, 'Not Specified'))
+        for dim, value in filters:
+            cells = cells[cells[dim].isin(value) if isinstance(value, tuple) else cells[dim] == value]
+        if cells.empty:
+            return None
+        measures = list(self.cells.columns)
+        if not dims:
+            return cells[measures].sum().to_frame().T
+        return cells.groupby(list(dims))[measures].sum()
+
+    def rollup(self, dims=(), filters=()):
+        """Responses and mean of every rating column per group."""
+        g = self._grouped(dims, filters)
+        if g is None:
+            return pd.DataFrame(columns=[*dims, 'responses', *FEEDBACK_SCORE_COLUMNS])
+        out = pd.DataFrame({'responses': g['responses'].astype(int)}, index=g.index)
+        for col in FEEDBACK_SCORE_COLUMNS:
+            out[col] = g[f'sum_{col}'] / g[f'n_{col}'].replace(0, np.nan)
+        return out.reset_index() if dims else out.reset_index(drop=True)
+
+    def distribution(self, question, dims=(), filters=()):
+        """Count of each rating 1..10 given to `question` per group."""
+        g = self._grouped(dims, filters)
+        labels = [str(r) for r in range(1, 11)]
+        if g is None:
+            return pd.DataFrame(columns=[*dims, *labels])
+        out = g[[f'{question}_{r}' for r in range(1, 11)]].astype(int)
+        out.columns = labels
+        return out.reset_index() if dims else out.reset_index(drop=True)
+
+    def zscores(self, question, dims, filters=()):
+        """Mean of `question` per group as a z-score within its department.
+
+        z = (group mean - department mean) / department standard deviation of responses.
+        Department-level groups are compared with all departments; when academic_year is
+        one of `dims` the comparison stays within the same academic year.
+        """
+        dims = list(dims)
+        g = self._grouped(dims, filters)
+        if g is None:
+            return pd.DataFrame(columns=[*dims, 'responses', 'mean', 'z'])
+        ref_dims = [d for d in dims if d == 'academic_year']
+        if 'department' in dims and set(dims) - {'department', 'academic_year'}:
+            ref_dims.insert(0, 'department')
+
+        def stats(frame):
+            n = frame[f'n_{question}'].replace(0, np.nan)
+            mean = frame[f'sum_{question}'] / n
+            std = np.sqrt((frame[f'sumsq_{question}'] / n - mean * mean).clip(lower=0))
+            return n, mean, std
+
+        n, mean, _ = stats(g)
+        out = pd.DataFrame({'responses': n.fillna(0).astype(int), 'mean': mean}).reset_index()
+        ref = self._grouped(ref_dims, filters)
+        _, ref_mean, ref_std = stats(ref)
+        ref_stats = pd.DataFrame({'ref_mean': ref_mean, 'ref_std': ref_std})
+        if ref_dims:
+            out = out.merge(ref_stats.reset_index(), on=ref_dims, how='left')
+        else:
+            out['ref_mean'] = ref_stats['ref_mean'].iloc[0]
+            out['ref_std'] = ref_stats['ref_std'].iloc[0]
+        out['z'] = (out['mean'] - out['ref_mean']) / out['ref_std'].replace(0, np.nan)
+        return out.drop(columns=['ref_mean', 'ref_std'])
+
+
+@st.cache_resource
+def get_feedback_cube():
+    """Process-wide feedback cube; built on first use and refreshed incrementally."""
+    return FeedbackCube()
+
+
+def feedback_cube_view(kind, dims=(), filters=(), question='overall_rating'):
+    """Cached cube query: kind is 'rollup', 'distribution' or 'zscores' (see FeedbackCube)."""
+    @st.cache_data(ttl=300, max_entries=256)
+    def _cached(cube_version, tag_versions, kind, dims, filters, question):
+        cube = get_feedback_cube()
+        if kind == 'rollup':
+            return cube.rollup(dims, filters)
+        if kind == 'distribution':
+            return cube.distribution(question, dims, filters)
+        return cube.zscores(question, dims, filters)
+
+    version = get_feedback_cube().refresh_if_stale()
+    return _cached(version, cache_tag_versions(*REFERENCE_TABLES), kind, tuple(dims), tuple(filters), question)
+
+
+def get_user_by_username(username):
+    conn = db_connect()
+    cursor = conn.cursor()
+    cursor.execute('SELECT id, username, role, attendance, has_access FROM users WHERE username = ?', (username,))
+    user = cursor.fetchone()
+    conn.close()
+    return user
+
+
+def get_db_connection():
+    """Compatibility helper for code that expects this function name."""
+    return db_connect()
+
+def get_all_students():
+    @st.cache_data(ttl=300)
+    def _cached(tag_versions):
+        conn = db_connect()
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, username, attendance, has_access FROM users WHERE role = 'student' ORDER BY username")
+        rows = cursor.fetchall()
+        conn.close()
+        return rows
+
+    return _cached(cache_tag_versions('users'))
+
+
+def set_student_access(user_id, value):
+    conn = db_connect()
+    cursor = conn.cursor()
+    cursor.execute('UPDATE users SET has_access = ? WHERE id = ?', (1 if value else 0, user_id))
+    conn.commit()
+    conn.close()
+    invalidate_tables('users')
+
+
+def update_student_attendance(user_id, attendance):
+    conn = db_connect()
+    cursor = conn.cursor()
+    cursor.execute('UPDATE users SET attendance = ? WHERE id = ?', (int(attendance), user_id))
+    conn.commit()
+    conn.close()
+    invalidate_tables('users')
+
+def get_faculty_by_user(faculty_user_id):
+    """Get faculty record linked to a faculty user account."""
+    conn = db_connect()
+    cursor = conn.cursor()
+    cursor.execute('SELECT faculty_id FROM users WHERE id = ? AND role = ?', (faculty_user_id, 'faculty'))
+    result = cursor.fetchone()
+    conn.close()
+    return result[0] if result else None
+
+def get_faculty_details(faculty_user_id):
+    """Get complete faculty details including department/branch."""
+    conn = db_connect()
+    cursor = conn.cursor()
+    cursor.execute('SELECT u.faculty_id, f.name, f.department FROM users u JOIN faculty f ON u.faculty_id = f.id WHERE u.id = ? AND u.role = ?', (faculty_user_id, 'faculty'))
+    result = cursor.fetchone()
+    conn.close()
+    return result  # Returns (faculty_id, name, department) or None
+
+def get_faculty_subjects(faculty_id):
+    """Get subjects taught by a faculty member."""
+    return get_reference_snapshot().subjects_for_faculty(faculty_id)
+
+def get_students_by_year_and_branch(year_level=None, branch=None):
+    """Get all students (can filter by year/branch if stored in users table)."""
+    conn = db_connect()
+    cursor = conn.cursor()
+    cursor.execute("SELECT id, username FROM users WHERE role = 'student' ORDER BY username")
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+def get_students_by_branch_and_class(branch=None, class_level=None):
+    """Get students filtered by branch and class/year level, including roll_number."""
+    conn = db_connect()
+    cursor = conn.cursor()
+    query = "SELECT id, username, name, roll_number, branch, class FROM users WHERE role = 'student'"
+    params = []
+    
+    if branch and branch != "All":
+        query += " AND branch = ?"
+        params.append(branch)
+    if class_level and class_level != "All":
+        query += " AND class = ?"
+        params.append(class_level)
+    
+    query += " ORDER BY name"
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+def save_attendance(student_id, faculty_id, subject_id, month, year, classes_attended, total_classes):
+    """Save or update student attendance record."""
+    conn = db_connect()
+    cursor = conn.cursor()
+    # Compute academic year string from calendar month/year. Academic year runs from July 1 -> June 30.
+    try:
+        m = int(month)
+        y = int(year)
+    except Exception:
+        m = int(month) if month else 1
+        y = int(year) if year else datetime.now(ZoneInfo("Asia/Kolkata")).year
+
+    # Determine academic year start
+    if m >= 7:
+        ay_start = y
+        ay_end = y + 1
+    else:
+        ay_start = y - 1
+        ay_end = y
+    academic_year = f"{ay_start}-{ay_end}"
+
+    # Upsert (not INSERT OR REPLACE) so the attendance_summary triggers see an UPDATE delta
+    cursor.execute('''INSERT INTO attendance
+                      (student_id, faculty_id, subject_id, month, year, academic_year, classes_attended, total_classes, updated_at)
+                      VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                      ON CONFLICT (student_id, faculty_id, subject_id, month, academic_year)
+                      DO UPDATE SET year = excluded.year, classes_attended = excluded.classes_attended,
+                                    total_classes = excluded.total_classes, updated_at = CURRENT_TIMESTAMP''',
+                   (student_id, faculty_id, subject_id, month, year, academic_year, classes_attended, total_classes))
+    conn.commit()
+    conn.close()
+
+def get_attendance_for_month(faculty_id, subject_id, month, year):
+    """Get all attendance records for a faculty's subject for a specific month."""
+    conn = db_connect()
+    cursor = conn.cursor()
+    # Use academic_year mapping so that month/year are interpreted within the academic year (Jul-Jun)
+    try:
+        m = int(month)
+        y = int(year)
+    except Exception:
+        m = int(month) if month else 1
+        y = int(year) if year else datetime.now(ZoneInfo("Asia/Kolkata")).year
+
+    if m >= 7:
+        ay_start = y
+        ay_end = y + 1
+    else:
+        ay_start = y - 1
+        ay_end = y
+    academic_year = f"{ay_start}-{ay_end}"
+
+    cursor.execute('''SELECT student_id, classes_attended, total_classes FROM attendance
+                      WHERE faculty_id = ? AND subject_id = ? AND month = ? AND academic_year = ?
+                      ORDER BY student_id''',
+                   (faculty_id, subject_id, month, academic_year))
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+def get_student_attendance_percentage(student_id):
+    """Return a student's overall attendance percentage from attendance_summary."""
+    conn = db_connect()
+    cursor = conn.cursor()
+    cursor.execute('SELECT pct FROM attendance_summary WHERE student_id = ?', (student_id,))
+    result = cursor.fetchone()
+    conn.close()
+    if result and result[0]:
+        return round(float(result[0]), 2)
+    return 0
+
+def _attendance_by_year_and_branch_query(year_level=None, branch=None):
+    query = '''SELECT u.id, u.username, a.classes_attended, a.total_classes, s.name, f.name as faculty_name, f.department
+               FROM attendance a
+               JOIN users u ON a.student_id = u.id
+               JOIN subjects s ON a.subject_id = s.id
+               JOIN faculty f ON a.faculty_id = f.id
+               WHERE 1=1'''
+    params = []
+    if year_level:
+        query += ' AND s.year_level = ?'
+        params.append(year_level)
+    if branch:
+        query += ' AND f.department = ?'
+        params.append(branch)
+    query += ' ORDER BY f.department, s.year_level, u.username'
+    return query, tuple(params)
+
+
+def get_attendance_by_year_and_branch(year_level=None, branch=None):
+    """Get all attendance records with student info, grouped by year/branch."""
+    conn = db_connect()
+    cursor = conn.cursor()
+    cursor.execute(*_attendance_by_year_and_branch_query(year_level, branch))
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+
+def get_month_date_range(year, month):
+    """Return the half-open range [start, end) of ISO dates covering a calendar month.
+
+    Filtering `date >= start AND date < end` can use the (faculty_id, subject_id, date)
+    index, unlike `date LIKE 'YYYY-MM-%'`.
+    """
+    year, month = int(year), int(month)
+    next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return f"{year:04d}-{month:02d}-01", f"{next_year:04d}-{next_month:02d}-01"
+
+
+def get_monthly_attendance_rollup(faculty_id, subject_id, month, year):
+    """Compute a monthly attendance rollup from daily_attendance table for given faculty, subject, month/year.
+
+    Returns (student_id, classes_attended, total_classes) rows; total_classes is the
+    number of lecture sessions held that month.
+    """
+    start, end = get_month_date_range(year, month)
+    conn = db_connect()
+    cursor = conn.cursor()
+    cursor.execute('''SELECT student_id, SUM(present) as classes_attended,
+                             (SELECT COUNT(*) FROM lecture_sessions
+                              WHERE faculty_id = ? AND subject_id = ? AND date >= ? AND date < ?) as total_classes
+                      FROM daily_attendance
+                      WHERE faculty_id = ? AND subject_id = ? AND date >= ? AND date < ?
+                      GROUP BY student_id
+                      ORDER BY student_id''', (faculty_id, subject_id, start, end, faculty_id, subject_id, start, end))
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+
+def _upsert_monthly_rollup(cursor, year, month, faculty_id=None, subject_id=None):
+    """Rebuild monthly `attendance` rows from daily_attendance and lecture_sessions.
+
+    Limited to one faculty/subject when both are given, otherwise covers every class
+    with attendance in the month. Runs in the caller's transaction; returns rows written.
+    """
+    start, end = get_month_date_range(year, month)
+    academic_year = get_academic_year_range_for_date(datetime(int(year), int(month), 1))[2]
+    query = '''INSERT INTO attendance (student_id, faculty_id, subject_id, month, year, academic_year,
+                                      classes_attended, total_classes, updated_at)
+               SELECT da.student_id, da.faculty_id, da.subject_id, ?, ?, ?, SUM(da.present),
+                      (SELECT COUNT(*) FROM lecture_sessions ls
+                       WHERE ls.faculty_id = da.faculty_id AND ls.subject_id = da.subject_id
+                         AND ls.date >= ? AND ls.date < ?),
+                      CURRENT_TIMESTAMP
+               FROM daily_attendance da
+               WHERE da.date >= ? AND da.date < ?'''
+    params = [int(month), int(year), academic_year, start, end, start, end]
+    if faculty_id is not None and subject_id is not None:
+        query += ' AND da.faculty_id = ? AND da.subject_id = ?'
+        params += [faculty_id, subject_id]
+    query += '''
+               GROUP BY da.student_id, da.faculty_id, da.subject_id
+               ON CONFLICT (student_id, faculty_id, subject_id, month, academic_year)
+               DO UPDATE SET year = excluded.year, classes_attended = excluded.classes_attended,
+                             total_classes = excluded.total_classes, updated_at = CURRENT_TIMESTAMP'''
+    cursor.execute(query, tuple(params))
+    return cursor.rowcount
+
+
+def _refresh_users_attendance(cursor, where, params):
+    """Set users.attendance (truncated percent) from attendance_summary for users matching `where`."""
+    cursor.execute(f'''UPDATE users SET attendance = COALESCE((
+                              SELECT (100 * s.attended) / NULLIF(s.total, 0)
+                              FROM attendance_summary s WHERE s.student_id = users.id), 0)
+                       WHERE {where}''', params)
+
+
+def recompute_monthly_rollups(year, month):
+    """Admin job: rebuild every class's monthly rollup for a month and refresh users.attendance.
+
+    Returns a dict with the number of rollup rows written and the elapsed time in ms.
+    """
+    start, end = get_month_date_range(year, month)
+    t0 = time.perf_counter()
+    conn = db_connect()
+    cursor = conn.cursor()
+    try:
+        rows = _upsert_monthly_rollup(cursor, year, month)
+        _refresh_users_attendance(cursor, 'id IN (SELECT student_id FROM daily_attendance WHERE date >= ? AND date < ?)', (start, end))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    invalidate_tables('users')
+    return {'rollup_rows': rows, 'elapsed_ms': (time.perf_counter() - t0) * 1000}
+
+
+def get_present_student_ids_for_date(faculty_id, subject_id, date_str):
+    """Return set of student_ids marked present for a given faculty/subject/date."""
+    conn = db_connect()
+    cursor = conn.cursor()
+    cursor.execute('''SELECT student_id FROM daily_attendance WHERE faculty_id = ? AND subject_id = ? AND date = ? AND present = 1''', (faculty_id, subject_id, date_str))
+    rows = cursor.fetchall()
+    conn.close()
+    return set(r[0] for r in rows)
+
+
+def save_daily_ler(faculty_id, subject_id, date_str, time_str, topic, lecture_number, percent_syllabus, total_present, absent_roll_numbers, sign, remark):
+    """Save a Daily LER entry to the database."""
+    conn = db_connect()
+    cursor = conn.cursor()
+    lid = insert_returning_id(cursor, '''INSERT INTO daily_ler (faculty_id, subject_id, date, time, topic, lecture_number, percent_syllabus, total_present, absent_roll_numbers, sign, remark)
+                      VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', (faculty_id, subject_id, date_str, time_str, topic, str(lecture_number), percent_syllabus, total_present, absent_roll_numbers, sign, remark))
+    conn.commit()
+    conn.close()
+    return lid
+
+
+def get_daily_ler_for_faculty(faculty_id, date_from=None, date_to=None):
+    conn = db_connect()
+    cursor = conn.cursor()
+    if date_from and date_to:
+        cursor.execute('''SELECT dl.id, dl.faculty_id, dl.subject_id, dl.date, dl.time, dl.topic, dl.lecture_number, dl.percent_syllabus, dl.total_present, dl.absent_roll_numbers, dl.sign, dl.remark, dl.created_at, f.name, s.name
+                          FROM daily_ler dl
+                          JOIN faculty f ON dl.faculty_id = f.id
+                          JOIN subjects s ON dl.subject_id = s.id
+                          WHERE dl.faculty_id = ? AND dl.date BETWEEN ? AND ? ORDER BY dl.date DESC''', (faculty_id, date_from, date_to))
+    else:
+        cursor.execute('''SELECT dl.id, dl.faculty_id, dl.subject_id, dl.date, dl.time, dl.topic, dl.lecture_number, dl.percent_syllabus, dl.total_present, dl.absent_roll_numbers, dl.sign, dl.remark, dl.created_at, f.name, s.name
+                          FROM daily_ler dl
+                          JOIN faculty f ON dl.faculty_id = f.id
+                          JOIN subjects s ON dl.subject_id = s.id
+                          WHERE dl.faculty_id = ? ORDER BY dl.date DESC''', (faculty_id,))
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+
+def _daily_ler_query(date_from=None, date_to=None, faculty_id=None):
+    query = '''SELECT dl.id, dl.faculty_id, f.name as faculty_name, dl.subject_id, s.name as subject_name, dl.date, dl.time, dl.topic, dl.lecture_number, dl.percent_syllabus, dl.total_present, dl.absent_roll_numbers, dl.sign, dl.remark, dl.created_at
+               FROM daily_ler dl
+               JOIN faculty f ON dl.faculty_id = f.id
+               JOIN subjects s ON dl.subject_id = s.id
+               WHERE 1=1'''
+    params = []
+    if faculty_id:
+        query += ' AND dl.faculty_id = ?'
+        params.append(faculty_id)
+    if date_from and date_to:
+        query += ' AND dl.date BETWEEN ? AND ?'
+        params.append(date_from)
+        params.append(date_to)
+    query += ' ORDER BY dl.date DESC'
+    return query, tuple(params)
+
+
+def get_all_daily_ler(date_from=None, date_to=None, faculty_id=None):
+    conn = db_connect()
+    cursor = conn.cursor()
+    cursor.execute(*_daily_ler_query(date_from, date_to, faculty_id))
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+def get_all_faculty_with_users():
+    """Get all faculty members with their user info."""
+    conn = db_connect()
+    cursor = conn.cursor()
+    cursor.execute('''SELECT f.id, f.name, f.department, u.username 
+                      FROM faculty f
+                      LEFT JOIN users u ON f.id = u.faculty_id AND u.role = 'faculty'
+                      ORDER BY f.name''')
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+
+### New helper functions: feedback scheduling, daily attendance and tests ###
+def schedule_feedback(start_ts, end_ts):
+    """Admin: schedule feedback availability."""
+    conn = db_connect()
+    cursor = conn.cursor()
+    # Store ISO-8601 timezone-aware strings; start_ts/end_ts should be isoformat strings
+    cursor.execute('INSERT INTO feedback_schedule (start_ts, end_ts) VALUES (?, ?)', (start_ts, end_ts))
+    conn.commit()
+    conn.close()
+    invalidate_tables('feedback_schedule')
+
+def get_current_feedback_schedule():
+    """Return the latest feedback schedule (start_ts, end_ts) or None."""
+    conn = db_connect()
+    cursor = conn.cursor()
+    cursor.execute('SELECT start_ts, end_ts FROM feedback_schedule ORDER BY id DESC LIMIT 1')
+    row = cursor.fetchone()
+    conn.close()
+    return row
+
+def is_feedback_open(now_ts=None):
+    """Return True if there is an active feedback schedule covering now_ts (or current time)."""
+    if now_ts is None:
+        now_ts = datetime.now(ZoneInfo("Asia/Kolkata"))
+    sched = get_current_feedback_schedule()
+    if not sched:
+        return False
+    start_ts, end_ts = sched
+    try:
+        start = parse_iso_to_kolkata(start_ts) if isinstance(start_ts, str) or start_ts else None
+        end = parse_iso_to_kolkata(end_ts) if isinstance(end_ts, str) or end_ts else None
+    except Exception:
+        return False
+    return start <= now_ts <= end
+
+def save_daily_attendance(student_id, faculty_id, subject_id, date_str, present):
+    """Save or update daily attendance for a student on a date (YYYY-MM-DD)."""
+    conn = db_connect()
+    cursor = conn.cursor()
+    # Try to update first
+    cursor.execute('''UPDATE daily_attendance SET present = ?, created_at = CURRENT_TIMESTAMP
+                      WHERE student_id = ? AND faculty_id = ? AND subject_id = ? AND date = ?''',
+                   (1 if present else 0, student_id, faculty_id, subject_id, date_str))
+    if cursor.rowcount == 0:
+        # No row updated, insert new
+        cursor.execute('''INSERT INTO daily_attendance (student_id, faculty_id, subject_id, date, present, created_at)
+                          VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)''',
+                       (student_id, faculty_id, subject_id, date_str, 1 if present else 0))
+    cursor.execute('INSERT INTO lecture_sessions (faculty_id, subject_id, date) VALUES (?, ?, ?) ON CONFLICT DO NOTHING',
+                   (faculty_id, subject_id, date_str))
+    conn.commit()
+    conn.close()
+
+def save_daily_attendance_bulk(faculty_id, subject_id, date_str, student_ids, present_ids):
+    """Save a whole class's daily attendance and refresh derived figures in one transaction.
+
+    Upserts one daily_attendance row per student, rebuilds the monthly `attendance`
+    rollup for this faculty/subject/month and recomputes users.attendance for the
+    students just marked, all with set-based statements on a single connection.
+    Returns a dict of row counts and per-step timings in milliseconds.
+    """
+    present_ids = set(present_ids)
+    att_date = datetime.fromisoformat(date_str).date()
+    timings = {}
+
+    conn = db_connect()
+    cursor = conn.cursor()
+    try:
+        t0 = time.perf_counter()
+        rows = [(sid, faculty_id, subject_id, date_str, 1 if sid in present_ids else 0) for sid in student_ids]
+        cursor.executemany('''INSERT INTO daily_attendance (student_id, faculty_id, subject_id, date, present, created_at)
+                              VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                              ON CONFLICT (student_id, faculty_id, subject_id, date)
+                              DO UPDATE SET present = excluded.present, created_at = CURRENT_TIMESTAMP''', rows)
+        cursor.execute('INSERT INTO lecture_sessions (faculty_id, subject_id, date) VALUES (?, ?, ?) ON CONFLICT DO NOTHING',
+                       (faculty_id, subject_id, date_str))
+        t1 = time.perf_counter()
+        timings['daily_ms'] = (t1 - t0) * 1000
+
+        rollup_rows = _upsert_monthly_rollup(cursor, att_date.year, att_date.month, faculty_id, subject_id)
+        t2 = time.perf_counter()
+        timings['rollup_ms'] = (t2 - t1) * 1000
+
+        # Overall percentage for the students just marked; attendance_summary was
+        # already brought up to date by its triggers on the rollup above
+        _refresh_users_attendance(cursor, '''id IN (SELECT student_id FROM daily_attendance
+                                                   WHERE faculty_id = ? AND subject_id = ? AND date = ?)''',
+                                  (faculty_id, subject_id, date_str))
+        t3 = time.perf_counter()
+        timings['users_ms'] = (t3 - t2) * 1000
+
+        conn.commit()
+        timings['total_ms'] = (time.perf_counter() - t0) * 1000
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    invalidate_tables('users')
+    return {'students': len(rows), 'present': sum(r[4] for r in rows), 'rollup_rows': rollup_rows, 'timings': timings}
+
+def get_daily_attendance_for_student(student_id, date_str=None):
+    """Return daily attendance records for a student; optionally filter by date (YYYY-MM-DD)."""
+    conn = db_connect()
+    cursor = conn.cursor()
+    if date_str:
+        cursor.execute('SELECT faculty_id, subject_id, date, present FROM daily_attendance WHERE student_id = ? AND date = ? ORDER BY date DESC', (student_id, date_str))
+    else:
+        cursor.execute('SELECT faculty_id, subject_id, date, present FROM daily_attendance WHERE student_id = ? ORDER BY date DESC LIMIT 30', (student_id,))
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+def create_test(faculty_id, subject_id, title, description, start_ts=None, end_ts=None, proctored=False):
+    conn = db_connect()
+    cursor = conn.cursor()
+    # Ensure start_ts and end_ts, when provided, are stored as timezone-aware ISO strings (Asia/Kolkata)
+    try:
+        if start_ts:
+            dt = start_ts if isinstance(start_ts, datetime) else datetime.fromisoformat(start_ts)
+            if dt.tzinfo is None:
+                dt = dt.replace(tzinfo=ZoneInfo("Asia/Kolkata"))
+            start_ts_to_store = dt.isoformat()
+        else:
+            start_ts_to_store = None
+    except Exception:
+        start_ts_to_store = start_ts
+    try:
+        if end_ts:
+            dt2 = end_ts if isinstance(end_ts, datetime) else datetime.fromisoformat(end_ts)
+            if dt2.tzinfo is None:
+                dt2 = dt2.replace(tzinfo=ZoneInfo("Asia/Kolkata"))
+            end_ts_to_store = dt2.isoformat()
+        else:
+            end_ts_to_store = None
+    except Exception:
+        end_ts_to_store = end_ts
+
+    tid = insert_returning_id(cursor, '''INSERT INTO tests (faculty_id, subject_id, title, description, start_ts, end_ts, proctored)
+                      VALUES (?, ?, ?, ?, ?, ?, ?)''', (faculty_id, subject_id, title, description, start_ts_to_store, end_ts_to_store, 1 if proctored else 0))
+    conn.commit()
+    conn.close()
+    return tid
+
+def add_test_question(test_id, question_text, choices_list, correct_index, marks=1):
+    conn = db_connect()
+    cursor = conn.cursor()
+    choices_json = json.dumps(choices_list)
+    qid = insert_returning_id(cursor, '''INSERT INTO test_questions (test_id, question_text, choices, correct_choice, marks)
+                      VALUES (?, ?, ?, ?, ?)''', (test_id, question_text, choices_json, int(correct_index), marks))
+    conn.commit()
+    conn.close()
+    invalidate_tables('test_questions')
+    return qid
+
+def get_tests_for_student(student_id):
+    """Return tests relevant for a student by matching subject.year_level and department to student's class/branch.
+    Only returns tests whose start_ts/end_ts exist (not filtering by time here)."""
+    conn = db_connect()
+    cursor = conn.cursor()
+    cursor.execute('SELECT branch, class FROM users WHERE id = ?', (student_id,))
+    row = cursor.fetchone()
+    if not row:
+        conn.close()
+        return []
+    branch, class_level = row
+    # expose student_branch variable name for compatibility with other code
+    student_branch = branch
+    # Normalize class_level to FY/SY/TY/Final Year
+    if class_level:
+        cls = str(class_level).strip()
+        if len(cls) == 1 and cls.isdigit():
+            class_level = 'FY' if cls == '1' else 'SY' if cls == '2' else 'TY' if cls == '3' else class_level
+        else:
+            # If class strings like 'FY', 'SY', 'TY' remain as-is
+            class_level = cls
+    # Filter tests by the student's branch/department and class/year level (mapped)
+    # student's class could be 'FY', 'SY', 'TY', 'Final Year'
+    year_map = {'FY': 'FY', 'SY': 'SY', 'TY': 'TY', 'Final Year': 'Final Year'}
+    student_year = year_map.get(class_level, None)
+    if student_branch and student_year:
+        cursor.execute('''SELECT t.id, t.title, t.description, t.start_ts, t.end_ts, t.proctored, s.name, s.year_level, s.department
+                          FROM tests t JOIN subjects s ON t.subject_id = s.id
+                          WHERE (s.department = ? OR s.department IS NULL OR s.department = '') AND (s.year_level = ? OR s.year_level IS NULL OR s.year_level = '')
+                          ORDER BY t.start_ts''', (student_branch, student_year))
+    else:
+        cursor.execute('''SELECT t.id, t.title, t.description, t.start_ts, t.end_ts, t.proctored, s.name, s.year_level, s.department
+                          FROM tests t JOIN subjects s ON t.subject_id = s.id
+                          ORDER BY t.start_ts''')
+    tests = cursor.fetchall()
+    conn.close()
+    return tests
+
+def _choice_index(value, missing=-1):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return missing
+
+
+class CompiledTest:
+    """A test's questions parsed once, with the answer key and marks as NumPy vectors.
+
+    `questions` holds the dicts returned by get_test_questions(); `answer_key[i]` and
+    `marks[i]` belong to `question_ids[i]`. An unreadable correct_choice is stored as -2
+    so it never matches an answer (unanswered questions are -1).
+    """
+
+    def __init__(self, rows):
+        self.questions = []
+        for qid, text, choices_json, correct, marks in rows:
+            try:
+                choices = json.loads(choices_json)
+            except Exception:
+                choices = []
+            self.questions.append({'id': qid, 'text': text, 'choices': choices, 'correct': correct, 'marks': marks})
+        self.question_ids = np.array([r[0] for r in rows], dtype=np.int64)
+        self.answer_key = np.array([_choice_index(r[3], -2) for r in rows], dtype=np.int64)
+        self.marks = np.array([r[4] if r[4] is not None else 0 for r in rows], dtype=np.float64)
+        self.total_marks = float(self.marks.sum())
+
+    def answer_vector(self, answers_dict):
+        """Chosen index per question from {question_id: index}; keys may be str or int."""
+        return np.fromiter((_choice_index(answers_dict.get(str(qid), answers_dict.get(qid)))
+                            for qid in self.question_ids.tolist()),
+                           dtype=np.int64, count=len(self.question_ids))
+
+    def grade(self, answers_dict):
+        return float(self.marks[self.answer_vector(answers_dict) == self.answer_key].sum())
+
+    def answer_matrix(self, answer_dicts):
+        """attempts × questions matrix of chosen indexes (-1 where unanswered)."""
+        column = {str(qid): i for i, qid in enumerate(self.question_ids.tolist())}
+        matrix = np.full((len(answer_dicts), len(column)), -1, dtype=np.int64)
+        for row, answers in enumerate(answer_dicts):
+            for qid, chosen in answers.items():
+                col = column.get(str(qid))
+                if col is not None:
+                    matrix[row, col] = _choice_index(chosen)
+        return matrix
+
+    def grade_matrix(self, matrix):
+        """Score per attempt row of `answer_matrix()`."""
+        return (matrix == self.answer_key).astype(np.float64) @ self.marks
+
+
+def get_compiled_test(test_id):
+    """CompiledTest for `test_id`, shared across reruns while its answer key is unchanged.
+
+    The cache key is read from the database (see `_test_key_stamp`), so a key changed by
+    another process or by hand is picked up on the next call; the TTL refreshes the
+    question text and choices, which the stamp does not cover.
+    """
+    return _compile_test(test_id, _test_key_stamp(test_id))
+
+
+def _test_key_stamp(test_id):
+    """(id, correct_choice, marks) of each question of a test: everything grading depends on."""
+    conn = db_connect()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('SELECT id, correct_choice, marks FROM test_questions WHERE test_id = ? ORDER BY id', (test_id,))
+        return tuple(tuple(row) for row in cursor.fetchall())
+    finally:
+        conn.close()
+
+
+def _fetch_test_question_rows(test_id, cursor=None, lock=None):
+    """CompiledTest rows for a test; pass `cursor` to read inside an open transaction.
+
+    `lock` ('share' or 'update') adds FOR SHARE / FOR UPDATE on Postgres, taken in id
+    order; SQLite needs no row locks because a writer holds the whole database.
+    """
+    conn = None
+    if cursor is None:
+        conn = db_connect()
+        cursor = conn.cursor()
+    query = 'SELECT id, question_text, choices, correct_choice, marks FROM test_questions WHERE test_id = ? ORDER BY id'
+    if lock and DATABASE_URL:
+        query += f' FOR {lock.upper()}'
+    cursor.execute(query, (test_id,))
+    rows = cursor.fetchall()
+    if conn is not None:
+        conn.close()
+    return rows
+
+
+@st.cache_resource(max_entries=256, ttl=300)
+def _compile_test(test_id, key_stamp):
+    return CompiledTest(_fetch_test_question_rows(test_id))
+
+
+def get_test_questions(test_id):
+    return list(get_compiled_test(test_id).questions)
+
+def _attempt_answer_rows(compiled, attempt_id, answers_dict):
+    """attempt_answers rows (attempt_id, question_id, chosen, correct) for the answered questions."""
+    chosen = compiled.answer_vector(answers_dict)
+    correct = chosen == compiled.answer_key
+    return [(attempt_id, qid, c, int(ok))
+            for qid, c, ok in zip(compiled.question_ids.tolist(), chosen.tolist(), correct.tolist()) if c >= 0]
+
+
+def _insert_attempt_answers(cursor, rows):
+    if rows:
+        cursor.executemany('''INSERT INTO attempt_answers (attempt_id, question_id, chosen, correct) VALUES (?, ?, ?, ?)
+                              ON CONFLICT (attempt_id, question_id) DO NOTHING''', rows)
+
+
+def backfill_attempt_answers(cursor, batch_size=1000):
+    """Write attempt_answers rows for attempts that have none yet (caller commits).
+
+    Walks test_attempts in id order, `batch_size` attempts at a time, parsing each
+    answers blob against its test's questions read through the same cursor.
+    Returns the number of attempts processed.
+    """
+    compiled = {}
+    last_id = 0
+    processed = 0
+    while True:
+        cursor.execute('''SELECT ta.id, ta.test_id, ta.answers FROM test_attempts ta
+                          WHERE ta.id > ? AND NOT EXISTS (SELECT 1 FROM attempt_answers aa WHERE aa.attempt_id = ta.id)
+                          ORDER BY ta.id LIMIT ?''', (last_id, batch_size))
+        attempts = cursor.fetchall()
+        if not attempts:
+            return processed
+        rows = []
+        for attempt_id, test_id, answers_json in attempts:
+            if test_id not in compiled:
+                cursor.execute('SELECT id, question_text, choices, correct_choice, marks FROM test_questions WHERE test_id = ? ORDER BY id', (test_id,))
+                compiled[test_id] = CompiledTest(cursor.fetchall())
+            try:
+                answers = json.loads(answers_json) if answers_json else {}
+            except ValueError:
+                answers = {}
+            if isinstance(answers, dict):
+                rows.extend(_attempt_answer_rows(compiled[test_id], attempt_id, answers))
+        _insert_attempt_answers(cursor, rows)
+        last_id = attempts[-1][0]
+        processed += len(attempts)
+
+
+def _test_attempt_entry(test_id, student_id, answers_dict, started_at=None, submitted_at=None):
+    """A graded test submission as a JSON-serialisable dict (the unit of the attempt queue journal).
+
+    The score is graded against the current key so it can be shown at once; the stored
+    score is recomputed when the entry is written (see `_write_test_attempt_entries`).
+    Raises ValueError when the attempt has no test or student, or its answers are not a dict.
+    """
+    if test_id is None or student_id is None:
+        raise ValueError("A test attempt needs a test and a student")
+    if not isinstance(answers_dict, dict):
+        raise ValueError("Test answers must be a {question_id: choice} mapping")
+    test_id, student_id = int(test_id), int(student_id)
+    return {
+        'id': uuid.uuid4().hex,
+        'row': [test_id, student_id, json.dumps(answers_dict), get_compiled_test(test_id).grade(answers_dict),
+                started_at, submitted_at],
+    }
+
+
+def _write_test_attempt_entries(cursor, entries):
+    """Insert queued test attempts, skipping submission ids already stored (caller commits).
+
+    Each attempt is re-graded against the answer key read inside this write transaction -
+    after the INSERT on SQLite (which then holds the write lock), under FOR SHARE on
+    Postgres - so an attempt queued before a regrade_test() commits, or graded by a
+    process with an older key, is stored with the score of the committed key.
+    """
+    stored = _stored_submission_ids(cursor, 'test_attempts', [e['id'] for e in entries])
+    fresh = [e for e in entries if e['id'] not in stored]
+    if not fresh:
+        return 0
+    cursor.executemany('''INSERT INTO test_attempts (submission_id, test_id, student_id, answers, score, started_at, submitted_at)
+                          VALUES (?, ?, ?, ?, ?, ?, ?)''', [(e['id'], *e['row']) for e in fresh])
+    attempt_ids = {}
+    for i in range(0, len(fresh), 500):
+        chunk = [e['id'] for e in fresh[i:i + 500]]
+        cursor.execute(f"SELECT submission_id, id FROM test_attempts WHERE submission_id IN ({', '.join('?' for _ in chunk)})", tuple(chunk))
+        attempt_ids.update(cursor.fetchall())
+    compiled = {test_id: CompiledTest(_fetch_test_question_rows(test_id, cursor, lock='share'))
+                for test_id in sorted({e['row'][0] for e in fresh})}
+    rescored = []
+    rows = []
+    for e in fresh:
+        test_id, _, answers_json, score = e['row'][:4]
+        answers = json.loads(answers_json)
+        attempt_id = attempt_ids[e['id']]
+        graded = compiled[test_id].grade(answers)
+        if graded != score:
+            rescored.append((graded, attempt_id))
+        rows.extend(_attempt_answer_rows(compiled[test_id], attempt_id, answers))
+    if rescored:
+        cursor.executemany('UPDATE test_attempts SET score = ? WHERE id = ?', rescored)
+    _insert_attempt_answers(cursor, rows)
+    return len(fresh)
+
+
+def submit_test_attempt(test_id, student_id, answers_dict, started_at=None, submitted_at=None):
+    """answers_dict: {question_id: chosen_index}"""
+    entry = _test_attempt_entry(test_id, student_id, answers_dict, started_at, submitted_at)
+    conn = db_connect()
+    cursor = conn.cursor()
+    answers_json = entry['row'][2]
+    # Write a log entry before attempting insert (helps debug missing inserts)
+    try:
+        with open('attempts.log', 'a', encoding='utf-8') as lf:
+            lf.write(f"{datetime.now(ZoneInfo('Asia/Kolkata')).isoformat()} - SUBMIT START - test_id={test_id} student_id={student_id} answers={answers_json}\n")
+    except Exception:
+        pass
+
+    try:
+        _write_test_attempt_entries(cursor, [entry])
+        cursor.execute('SELECT id, score FROM test_attempts WHERE submission_id = ?', (entry['id'],))
+        aid, total_score = cursor.fetchone()
+        conn.commit()
+        invalidate_tables('test_attempts')
+        try:
+            with open('attempts.log', 'a', encoding='utf-8') as lf:
+                lf.write(f"{datetime.now(ZoneInfo('Asia/Kolkata')).isoformat()} - SUBMIT SUCCESS - attempt_id={aid} score={total_score}\n")
+        except Exception:
+            pass
+        return {'attempt_id': aid, 'score': total_score}
+    except Exception as e:
+        try:
+            with open('attempts.log', 'a', encoding='utf-8') as lf:
+                lf.write(f"{datetime.now(ZoneInfo('Asia/Kolkata')).isoformat()} - SUBMIT ERROR - test_id={test_id} student_id={student_id} error={str(e)}\n")
+        except Exception:
+            pass
+        raise
+    finally:
+        conn.close()
+
+class TestAttemptQueue(WriteBehindQueue):
+    """Write-behind queue for test submissions, sized for a class submitting at test close.
+
+    Attempts are graded in memory from the compiled test when submitted, so the student
+    sees the score at once; rows are persisted in batches (see WriteBehindQueue) and
+    re-graded against the key current at write time. When
+    the bounded queue stays full for `submit_timeout` seconds the attempt is written
+    directly instead.
+    """
+
+    thread_name = 'test-attempt-queue'
+    sequence_tables = ('test_attempts',)
+
+    def __init__(self, journal_path, max_batch=200, max_delay_ms=250.0, max_pending=2000, submit_timeout=5.0):
+        self.submit_timeout = submit_timeout
+        super().__init__(journal_path, max_batch, max_delay_ms, max_pending)
+
+    def submit(self, test_id, student_id, answers_dict, started_at=None, submitted_at=None):
+        """Grade and queue one attempt; returns {'submission_id', 'score', 'queued'}.
+
+        Raises ValueError for an attempt that could not be stored.
+        """
+        entry = _test_attempt_entry(test_id, student_id, answers_dict, started_at, submitted_at)
+        queued = self._enqueue(entry, self.submit_timeout)
+        if not queued:
+            conn = db_connect()
+            cursor = conn.cursor()
+            try:
+                _write_test_attempt_entries(cursor, [entry])
+                conn.commit()
+            finally:
+                conn.close()
+            self._after_commit()
+        return {'submission_id': entry['id'], 'score': entry['row'][3], 'queued': queued}
+
+    def _write_entries(self, cursor, entries):
+        return _write_test_attempt_entries(cursor, entries)
+
+    def _after_commit(self):
+        invalidate_tables('test_attempts')
+
+
+@st.cache_resource
+def get_test_attempt_queue():
+    """Process-wide test attempt queue; creating it replays any journal left by a restart."""
+    return TestAttemptQueue(TEST_ATTEMPT_QUEUE_JOURNAL, TEST_ATTEMPT_QUEUE_MAX_BATCH, TEST_ATTEMPT_QUEUE_MAX_DELAY_MS,
+                            TEST_ATTEMPT_QUEUE_MAX_PENDING, TEST_ATTEMPT_QUEUE_SUBMIT_TIMEOUT_S)
+
+
+def regrade_test(test_id, answer_key=None):
+    """Recompute every stored score of a test, optionally after changing its answer key.
+
+    `answer_key` maps question id -> new correct choice index; every id must belong to
+    the test (ValueError otherwise). All attempts are loaded into an attempts × questions
+    matrix of chosen indexes and scored in one vectorized comparison against the new key;
+    changed scores are written back with a single executemany UPDATE. The key change and
+    the new scores are committed together, and caches are invalidated after the commit.
+    Attempts written concurrently are graded inside their own write transaction, which
+    serialises with this one, so they are stored with whichever key committed first.
+    Returns {'attempts', 'changed', 'questions_updated', 'timings'}.
+    """
+    timings = {}
+    t0 = time.perf_counter()
+    answer_key = {int(qid): int(choice) for qid, choice in (answer_key or {}).items()}
+    get_test_attempt_queue().flush()
+    conn = db_connect()
+    cursor = conn.cursor()
+    try:
+        # FOR UPDATE (Postgres) waits out attempt writes holding the old key and blocks new ones until commit
+        question_rows = _fetch_test_question_rows(test_id, cursor, lock='update' if answer_key else None)
+        unknown = set(answer_key) - {row[0] for row in question_rows}
+        if unknown:
+            raise ValueError(f"Questions {sorted(unknown)} do not belong to test {test_id}")
+        questions_updated = len(answer_key)
+        if answer_key:
+            cursor.executemany('UPDATE test_questions SET correct_choice = ? WHERE id = ? AND test_id = ?',
+                               [(choice, qid, test_id) for qid, choice in answer_key.items()])
+            cursor.executemany('UPDATE attempt_answers SET correct = CASE WHEN chosen = ? THEN 1 ELSE 0 END '
+                               'WHERE question_id = ? AND question_id IN (SELECT id FROM test_questions WHERE test_id = ?)',
+                               [(choice, qid, test_id) for qid, choice in answer_key.items()])
+            question_rows = _fetch_test_question_rows(test_id, cursor)
+        compiled = CompiledTest(question_rows)
+
+        t1 = time.perf_counter()
+        cursor.execute('SELECT id, answers, score FROM test_attempts WHERE test_id = ?', (test_id,))
+        rows = cursor.fetchall()
+        answer_dicts = []
+        for _, answers_json, _ in rows:
+            try:
+                answers = json.loads(answers_json) if answers_json else {}
+            except ValueError:
+                answers = {}
+            answer_dicts.append(answers if isinstance(answers, dict) else {})
+        timings['load_ms'] = (time.perf_counter() - t1) * 1000
+
+        t2 = time.perf_counter()
+        scores = compiled.grade_matrix(compiled.answer_matrix(answer_dicts))
+        old_scores = np.array([r[2] if r[2] is not None else np.nan for r in rows], dtype=np.float64)
+        changed = np.flatnonzero(~np.isclose(scores, old_scores))
+        timings['grade_ms'] = (time.perf_counter() - t2) * 1000
+
+        t3 = time.perf_counter()
+        if len(changed):
+            cursor.executemany('UPDATE test_attempts SET score = ? WHERE id = ?',
+                               [(float(scores[i]), rows[i][0]) for i in changed.tolist()])
+        conn.commit()
+        timings['write_ms'] = (time.perf_counter() - t3) * 1000
+    finally:
+        conn.close()
+    if answer_key:
+        invalidate_tables('test_questions')
+    if len(changed):
+        invalidate_tables('test_attempts')
+    timings['total_ms'] = (time.perf_counter() - t0) * 1000
+    return {'attempts': len(rows), 'changed': int(len(changed)), 'questions_updated': questions_updated, 'timings': timings}
+
+
+def get_question_answer_stats(test_id):
+    """Per-question answer counts for a test: (question_id, chosen, responses, correct) rows.
+
+    A single GROUP BY over attempt_answers, served by its (question_id, chosen) index.
+    """
+    conn = db_connect()
+    cursor = conn.cursor()
+    cursor.execute('''SELECT aa.question_id, aa.chosen, COUNT(*), SUM(aa.correct)
+                      FROM test_questions q
+                      JOIN attempt_answers aa ON aa.question_id = q.id
+                      WHERE q.test_id = ?
+                      GROUP BY aa.question_id, aa.chosen
+                      ORDER BY aa.question_id, aa.chosen''', (test_id,))
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+
+def get_test_attempts_for_student(student_id, test_id=None):
+    conn = db_connect()
+    cursor = conn.cursor()
+    if test_id:
+        cursor.execute('SELECT id, test_id, score, started_at, submitted_at FROM test_attempts WHERE student_id = ? AND test_id = ? ORDER BY submitted_at DESC', (student_id, test_id))
+    else:
+        cursor.execute('SELECT id, test_id, score, started_at, submitted_at FROM test_attempts WHERE student_id = ? ORDER BY submitted_at DESC', (student_id,))
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+
+def get_test_attempts_for_test(test_id):
+    """Return all attempts for a given test id, joined with student username/name."""
+    conn = db_connect()
+    cursor = conn.cursor()
+    cursor.execute('''SELECT ta.id, ta.test_id, ta.student_id, ta.answers, ta.score, ta.started_at, ta.submitted_at, u.username, u.name
+                      FROM test_attempts ta
+                      LEFT JOIN users u ON ta.student_id = u.id
+                      WHERE ta.test_id = ?
+                      ORDER BY ta.submitted_at DESC''', (test_id,))
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+
+def create_notice(title, content, target_branch=None, target_class=None, created_by_role='admin', created_by_id=None):
+    conn = db_connect()
+    cursor = conn.cursor()
+    nid = insert_returning_id(cursor, '''INSERT INTO notices (title, content, target_branch, target_class, created_by_role, created_by_id)
+                      VALUES (?, ?, ?, ?, ?, ?)''', (title, content, target_branch, target_class, created_by_role, created_by_id))
+    conn.commit()
+    conn.close()
+    return nid
+
+
+def get_notices(target_branch=None, target_class=None, limit=10):
+    conn = db_connect()
+    cursor = conn.cursor()
+    if target_branch and target_class:
+        cursor.execute('''SELECT id, title, content, target_branch, target_class, created_by_role, created_by_id, created_at
+                          FROM notices WHERE (target_branch IS NULL OR target_branch = ?) AND (target_class IS NULL OR target_class = ?)
+                          ORDER BY created_at DESC LIMIT ?''', (target_branch, target_class, limit))
+    elif target_branch:
+        cursor.execute('''SELECT id, title, content, target_branch, target_class, created_by_role, created_by_id, created_at
+                          FROM notices WHERE target_branch IS NULL OR target_branch = ? ORDER BY created_at DESC LIMIT ?''', (target_branch, limit))
+    else:
+        cursor.execute('''SELECT id, title, content, target_branch, target_class, created_by_role, created_by_id, created_at
+                          FROM notices ORDER BY created_at DESC LIMIT ?''', (limit,))
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+
+def submit_faculty_leave(faculty_id, leave_type, start_date, end_date, is_half_day=False, days_count=1, alt_faculty=None):
+    conn = db_connect()
+    cursor = conn.cursor()
+    lid = insert_returning_id(cursor, '''INSERT INTO faculty_leaves (faculty_id, leave_type, start_date, end_date, is_half_day, days_count, alt_faculty)
+                      VALUES (?, ?, ?, ?, ?, ?, ?)''', (faculty_id, leave_type, start_date, end_date, 1 if is_half_day else 0, days_count, alt_faculty))
+    conn.commit()
+    conn.close()
+    return lid
+
+
+def get_faculty_leaves(faculty_id=None):
+    conn = db_connect()
+    cursor = conn.cursor()
+    if faculty_id:
+        cursor.execute('''SELECT id, faculty_id, leave_type, start_date, end_date, is_half_day, days_count, alt_faculty, created_at
+                          FROM faculty_leaves WHERE faculty_id = ? ORDER BY created_at DESC''', (faculty_id,))
+    else:
+        cursor.execute('''SELECT id, faculty_id, leave_type, start_date, end_date, is_half_day, days_count, alt_faculty, created_at
+                          FROM faculty_leaves ORDER BY created_at DESC''')
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+
+def get_faculty_leave_usage(faculty_id):
+    conn = db_connect()
+    cursor = conn.cursor()
+    # Compute current academic year range and only count leaves within it so balances reset each academic year
+    start_iso, end_iso, _ = get_academic_year_range_for_date()
+    cursor.execute('''SELECT leave_type, COALESCE(SUM(days_count), 0) as used_days
+                      FROM faculty_leaves
+                      WHERE faculty_id = ? AND created_at BETWEEN ? AND ?
+                      GROUP BY leave_type''', (faculty_id, start_iso, end_iso))
+    rows = cursor.fetchall()
+    conn.close()
+    usage = {r[0]: r[1] for r in rows}
+    return usage
+
+
+def get_all_subjects():
+    """Get all available subjects."""
+    # Cached read-heavy helper
+    @st.cache_data(ttl=300)
+    def _cached(tag_versions):
+        conn = db_connect()
+        cursor = conn.cursor()
+        cursor.execute('SELECT id, name, year_level, department, code FROM subjects ORDER BY year_level, name')
+        rows = cursor.fetchall()
+        conn.close()
+        return rows
+
+    return _cached(cache_tag_versions('subjects'))
+
+
+def get_academic_year_range_for_date(dt=None):
+    """Return (start_date_iso, end_date_iso, academic_year_str) for the academic year containing dt.
+    Academic year runs from July 1 to June 30 next year."""
+    if dt is None:
+        dt = datetime.now(ZoneInfo("Asia/Kolkata"))
+    # Ensure dt is date/datetime
+    if isinstance(dt, datetime):
+        cur_date = dt.date()
+    else:
+        cur_date = dt
+
+    year = cur_date.year
+    # If month >= July, academic year starts this year
+    if cur_date.month >= 7:
+        start_year = year
+        end_year = year + 1
+    else:
+        start_year = year - 1
+        end_year = year
+
+    start_date = datetime(start_year, 7, 1, tzinfo=ZoneInfo("Asia/Kolkata")).isoformat()
+    # End of academic year: June 30 at 23:59:59
+    end_date = datetime(end_year, 6, 30, 23, 59, 59, tzinfo=ZoneInfo("Asia/Kolkata")).isoformat()
+    academic_year = f"{start_year}-{end_year}"
+    return start_date, end_date, academic_year
+
+def get_faculty_subjects_with_ids(faculty_id):
+    """Get subject IDs assigned to a faculty."""
+    return list(get_reference_snapshot().subject_ids_by_faculty.get(faculty_id, ()))
+
+def assign_subject_to_faculty(faculty_id, subject_id):
+    """Assign a subject to a faculty member."""
+    conn = db_connect()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('INSERT INTO faculty_subject (faculty_id, subject_id) VALUES (?, ?)', (faculty_id, subject_id))
+        refresh_faculty_teaching(cursor, [faculty_id])
+        conn.commit()
+        conn.close()
+        invalidate_tables('faculty_subject', 'faculty_teaching')
+        return True
+    except Exception:
+        conn.close()
+        return False
+
+def add_subject(name, year_level, department=None, code=None):
+    """Insert a new subject into the subjects table."""
+    conn = db_connect()
+    cursor = conn.cursor()
+    try:
+        sid = insert_returning_id(cursor, 'INSERT INTO subjects (name, year_level, department, code) VALUES (?, ?, ?, ?)', (name, year_level, department, code))
+        conn.commit()
+        conn.close()
+        # Only subject lists need refreshing; other cached queries stay warm
+        invalidate_tables('subjects')
+        return sid
+    except sqlite3.IntegrityError:
+        # Known duplicate/constraint failure: return None so caller can show friendly message
+        conn.close()
+        return None
+    except Exception:
+        # Re-raise unexpected exceptions so callers (UI) can show the real error
+        conn.close()
+        raise
+
+def remove_subject_from_faculty(faculty_id, subject_id):
+    """Remove a subject assignment from a faculty member."""
+    conn = db_connect()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('DELETE FROM faculty_subject WHERE faculty_id = ? AND subject_id = ?',
+                      (faculty_id, subject_id))
+        refresh_faculty_teaching(cursor, [faculty_id])
+        conn.commit()
+        conn.close()
+        invalidate_tables('faculty_subject', 'faculty_teaching')
+        return True
+    except Exception:
+        conn.close()
+        return False
+
+def explain_query(cursor, query, params=None):
+    """Return the backend's plan for `query` as text lines (EXPLAIN QUERY PLAN / EXPLAIN)."""
+    if DATABASE_URL:
+        cursor.execute('EXPLAIN ' + query, params)
+        return [r[0] for r in cursor.fetchall()]
+    cursor.execute('EXPLAIN QUERY PLAN ' + query, params or ())
+    return [r[3] for r in cursor.fetchall()]
+
+
+def plan_full_scans(plan_lines):
+    """Return the plan lines that read a whole table instead of seeking an index."""
+    if DATABASE_URL:
+        return [line.strip() for line in plan_lines if 'Seq Scan' in line]
+    return [line for line in plan_lines
+            if line.startswith('SCAN ') and 'INDEX' not in line and 'CONSTANT ROW' not in line
+            and not line.startswith('SCAN (')]
+
+
+def _index_advisor_samples(cursor):
+    """Pick real ids/values from the database to call the read helpers with."""
+    def first(query):
+        cursor.execute(query)
+        return cursor.fetchone()
+
+    student = first("SELECT id, username, branch, class FROM users WHERE role = 'student' ORDER BY id LIMIT 1") or (1, 'student', None, None)
+    faculty_user = first("SELECT id, faculty_id FROM users WHERE role = 'faculty' AND faculty_id IS NOT NULL ORDER BY id LIMIT 1") or (1, 1)
+    subject = first('SELECT id, year_level, department FROM subjects ORDER BY id LIMIT 1') or (1, 'FY', None)
+    test = first('SELECT id FROM tests ORDER BY id LIMIT 1') or (1,)
+    now = datetime.now(ZoneInfo("Asia/Kolkata"))
+    return {
+        'student_id': student[0], 'username': student[1],
+        'branch': student[2] or subject[2] or 'Computer', 'year': student[3] or subject[1] or 'FY',
+        'faculty_user_id': faculty_user[0], 'faculty_id': faculty_user[1],
+        'subject_id': subject[0], 'test_id': test[0],
+        'month': now.month, 'cal_year': now.year, 'date': now.date().isoformat(),
+        'date_from': get_month_date_range(now.year, now.month)[0], 'date_to': now.date().isoformat(),
+    }
+
+
+def run_index_advisor():
+    """EXPLAIN every statement the read helpers issue and flag full table scans.
+
+    Each helper is called with sample values taken from the connected database while
+    `capture_queries()` records its SQL. Helpers wrapped in st.cache_data are left
+    out because a warm cache issues no SQL. Note that Postgres favours sequential
+    scans on small tables, so run it against realistically seeded data there.
+    Returns one dict per statement: helper, query, plan and full_scans.
+    """
+    conn = db_connect()
+    cursor = conn.cursor()
+    try:
+        x = _index_advisor_samples(cursor)
+    finally:
+        conn.close()
+
+    probes = [
+        ('get_branches', get_branches, ()),
+        ('get_faculties_by_branch', get_faculties_by_branch, (x['branch'],)),
+        ('get_faculties_by_year', get_faculties_by_year, (x['year'],)),
+        ('get_faculties_by_branch_and_year', get_faculties_by_branch_and_year, (x['branch'], x['year'])),
+        ('get_subjects_by_year', get_subjects_by_year, (x['year'],)),
+        ('get_faculties_by_subject', get_faculties_by_subject, (x['subject_id'], x['branch'], x['year'])),
+        ('get_faculty_year_levels', get_faculty_year_levels, (x['faculty_id'],)),
+        ('get_faculty_resources', get_faculty_resources, (x['faculty_id'], x['subject_id'], 'assignment')),
+        ('get_subject_resources_for_student', get_subject_resources_for_student, (x['year'], x['branch'])),
+        ('get_faculty_stats', get_faculty_stats, ()),
+        ('get_feedback_overview', get_feedback_overview, ()),
+        ('get_user_by_username', get_user_by_username, (x['username'],)),
+        ('get_faculty_details', get_faculty_details, (x['faculty_user_id'],)),
+        ('get_faculty_subjects', get_faculty_subjects, (x['faculty_id'],)),
+        ('get_faculty_subjects_with_ids', get_faculty_subjects_with_ids, (x['faculty_id'],)),
+        ('get_students_by_branch_and_class', get_students_by_branch_and_class, (x['branch'], x['year'])),
+        ('get_attendance_for_month', get_attendance_for_month, (x['faculty_id'], x['subject_id'], x['month'], x['cal_year'])),
+        ('get_student_attendance_percentage', get_student_attendance_percentage, (x['student_id'],)),
+        ('get_attendance_by_year_and_branch', get_attendance_by_year_and_branch, (x['year'], x['branch'])),
+        ('get_monthly_attendance_rollup', get_monthly_attendance_rollup, (x['faculty_id'], x['subject_id'], x['month'], x['cal_year'])),
+        ('get_present_student_ids_for_date', get_present_student_ids_for_date, (x['faculty_id'], x['subject_id'], x['date'])),
+        ('get_daily_ler_for_faculty', get_daily_ler_for_faculty, (x['faculty_id'], x['date_from'], x['date_to'])),
+        ('get_all_daily_ler', get_all_daily_ler, (x['date_from'], x['date_to'], x['faculty_id'])),
+        ('get_all_faculty_with_users', get_all_faculty_with_users, ()),
+        ('get_current_feedback_schedule', get_current_feedback_schedule, ()),
+        ('get_daily_attendance_for_student', get_daily_attendance_for_student, (x['student_id'],)),
+        ('get_tests_for_student', get_tests_for_student, (x['student_id'],)),
+        ('_fetch_test_question_rows', _fetch_test_question_rows, (x['test_id'],)),
+        ('get_test_attempts_for_student', get_test_attempts_for_student, (x['student_id'], x['test_id'])),
+        ('get_test_attempts_for_test', get_test_attempts_for_test, (x['test_id'],)),
+        ('get_question_answer_stats', get_question_answer_stats, (x['test_id'],)),
+        ('get_notices', get_notices, (x['branch'], x['year'])),
+        ('get_faculty_leaves', get_faculty_leaves, (x['faculty_id'],)),
+        ('get_faculty_leave_usage', get_faculty_leave_usage, (x['faculty_id'],)),
+    ]
+
+    report = []
+    conn = db_connect()
+    cursor = conn.cursor()
+    try:
+        for name, helper, args in probes:
+            with capture_queries() as statements:
+                try:
+                    helper(*args)
+                except Exception:
+                    pass
+            for query, params in statements:
+                try:
+                    plan = explain_query(cursor, query, params)
+                except Exception as e:
+                    conn.rollback()
+                    plan = [f'EXPLAIN failed: {e}']
+                report.append({'helper': name, 'query': ' '.join(query.split()),
+                               'plan': plan, 'full_scans': plan_full_scans(plan)})
+    finally:
+        conn.close()
+    return report
+
+
+# Streaming exports: rows are pulled EXPORT_FETCH_SIZE at a time (through a
+# server-side cursor on Postgres) and written out as they arrive.
+EXPORT_FETCH_SIZE = 2000
+# Rows buffered per Parquet row group / Arrow record batch
+EXPORT_ROW_GROUP_SIZE = 65536
+# Download formats: label -> (format key, file extension, MIME type)
+EXPORT_FORMATS = {
+    'CSV': ('csv', 'csv', 'text/csv'),
+    'Parquet': ('parquet', 'parquet', 'application/vnd.apache.parquet'),
+    'Arrow IPC': ('arrow', 'arrow', 'application/vnd.apache.arrow.file'),
+}
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except Exception:
+        raise RuntimeError(
+            "pyarrow is required for Parquet and Arrow exports. "
+            "Add pyarrow to requirements.txt"
+        )
+    return pyarrow, pyarrow.parquet
+
+
+def available_export_formats():
+    """Labels from EXPORT_FORMATS usable here (Parquet/Arrow need pyarrow)."""
+    try:
+        _require_pyarrow()
+    except RuntimeError:
+        return ['CSV']
+    return list(EXPORT_FORMATS)
+
+
+def _export_batches(query, params=(), fetch_size=EXPORT_FETCH_SIZE, progress=None):
+    """Yield (column names, rows) for each fetchmany() batch of a query.
+
+    `progress(n)` is called with the size of every fetched batch.
+    """
+    conn = db_connect()
+    cursor = conn.cursor(name=f'export_{uuid.uuid4().hex[:12]}')
+    try:
+        cursor.execute(query, tuple(params))
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if progress is not None and rows:
+                progress(len(rows))
+            # Server-side cursors only describe their columns after the first fetch
+            yield [d[0] for d in cursor.description or ()], rows
+            if not rows:
+                break
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def stream_csv(query, params=(), header=None, transform=None, fetch_size=EXPORT_FETCH_SIZE, progress=None):
+    """Yield a query's result as UTF-8 CSV chunks, one chunk per fetched batch.
+
+    `header` defaults to the result's column names. `transform(row)` may reshape a
+    row or return None to leave it out. Memory use is bounded by `fetch_size`.
+    """
+    buf = StringIO()
+    writer = csv.writer(buf)
+    for names, rows in _export_batches(query, params, fetch_size, progress):
+        if header is not False:
+            writer.writerow(header if header is not None else names)
+            header = False
+        if transform is not None:
+            rows = (out for out in map(transform, rows) if out is not None)
+        writer.writerows(rows)
+        if buf.tell():
+            yield buf.getvalue().encode('utf-8')
+            buf.seek(0)
+            buf.truncate(0)
+
+
+def _export_value(kind):
+    """Converter from a DB value to the Python value stored in an Arrow column of `kind`."""
+    def to_timestamp(value):
+        # Stored wall-clock time; aware values are expressed in Asia/Kolkata
+        if value is None or value == '':
+            return None
+        if isinstance(value, str):
+            try:
+                value = datetime.fromisoformat(value)
+            except ValueError:
+                return None
+        if getattr(value, 'tzinfo', None) is not None:
+            value = value.astimezone(ZoneInfo('Asia/Kolkata')).replace(tzinfo=None)
+        return value
+
+    def to_date(value):
+        if value is None or value == '':
+            return None
+        if isinstance(value, str):
+            try:
+                return datetime.fromisoformat(value[:10]).date()
+            except ValueError:
+                return None
+        return value.date() if isinstance(value, datetime) else value
+
+    def to_number(cast):
+        def convert(value):
+            if value is None or value == '':
+                return None
+            try:
+                return cast(value)
+            except (TypeError, ValueError):
+                return None
+        return convert
+
+    return {
+        'int': to_number(int),
+        'float': to_number(float),
+        'timestamp': to_timestamp,
+        'date': to_date,
+    }.get(kind, lambda value: None if value is None else str(value))
+
+
+def write_columnar_export(spec, fmt, out, progress=None):
+    """Write an export spec to `out` as Parquet or Arrow IPC, one row group per EXPORT_ROW_GROUP_SIZE rows.
+
+    Columns are typed from the spec, and its `dictionary` columns are dictionary-encoded
+    in Parquet (they load back into pandas as categoricals).
+    """
+    pa, pq = _require_pyarrow()
+    arrow_types = {'int': pa.int64(), 'float': pa.float64(), 'timestamp': pa.timestamp('us'),
+                   'date': pa.date32(), 'str': pa.string()}
+    dictionary = set(spec.get('dictionary', ())) if fmt == 'parquet' else set()
+    fields = []
+    for name, kind in spec['columns']:
+        typ = arrow_types[kind]
+        fields.append(pa.field(name, pa.dictionary(pa.int32(), typ) if name in dictionary else typ))
+    schema = pa.schema(fields)
+    converters = [_export_value(kind) for _, kind in spec['columns']]
+    transform = spec.get('transform')
+
+    if fmt == 'parquet':
+        writer = pq.ParquetWriter(out, schema, compression='zstd', use_dictionary=sorted(dictionary) or False)
+        write = writer.write_table
+    else:
+        writer = pa.ipc.new_file(out, schema, options=pa.ipc.IpcWriteOptions(compression='zstd'))
+        write = writer.write_table
+
+    def flush(buffered):
+        columns = list(zip(*buffered))
+        arrays = []
+        for field, convert, values in zip(schema, converters, columns):
+            values = [convert(v) for v in values]
+            if pa.types.is_dictionary(field.type):
+                arrays.append(pa.array(values, type=field.type.value_type).dictionary_encode())
+            else:
+                arrays.append(pa.array(values, type=field.type))
+        write(pa.Table.from_arrays(arrays, schema=schema))
+
+    try:
+        buffered = []
+        for _, rows in _export_batches(spec['query'], spec.get('params', ()), progress=progress):
+            if transform is not None:
+                rows = [out_row for out_row in map(transform, rows) if out_row is not None]
+            buffered.extend(rows)
+            if len(buffered) >= EXPORT_ROW_GROUP_SIZE:
+                flush(buffered)
+                buffered = []
+        if buffered:
+            flush(buffered)
+    finally:
+        writer.close()
+
+
+def write_export(spec, fmt, out, progress=None):
+    """Write an export spec to the binary file object `out` in format 'csv', 'parquet' or 'arrow'."""
+    if fmt == 'csv':
+        header = [name for name, _ in spec['columns']]
+        for chunk in stream_csv(spec['query'], spec.get('params', ()), header=header,
+                                transform=spec.get('transform'), progress=progress):
+            out.write(chunk)
+    else:
+        write_columnar_export(spec, fmt, out, progress)
+
+
+def _download_button_defers_data():
+    """True when st.download_button accepts a callable `data` (Streamlit 1.52+), run only on click."""
+    try:
+        return tuple(int(part) for part in st.__version__.split('.')[:2]) >= (1, 52)
+    except (AttributeError, ValueError):
+        return False
+
+
+DOWNLOAD_BUTTON_DEFERS_DATA = _download_button_defers_data()
+
+
+def file_download_data(file_path):
+    """`data` for st.download_button from a file on disk: a callable read on click where
+    Streamlit supports it (see DOWNLOAD_BUTTON_DEFERS_DATA), otherwise the file's bytes."""
+    def data():
+        with open(file_path, 'rb') as payload:
+            return payload.read()
+    return data if DOWNLOAD_BUTTON_DEFERS_DATA else data()
+
+
+def _export_payload(spec, fmt, ext):
+    """The bytes of an export, written through a temporary file so rows are never held twice."""
+    spool = tempfile.NamedTemporaryFile(prefix='export_', suffix=f'.{ext}', delete=False)
+    try:
+        with spool:
+            write_export(spec, fmt, spool)
+        with open(spool.name, 'rb') as payload:
+            return payload.read()
+    finally:
+        try:
+            os.remove(spool.name)
+        except OSError:
+            pass
+
+
+def export_download_button(label, spec, file_stem, format_label='CSV', **kwargs):
+    """st.download_button for an export spec in one of EXPORT_FORMATS.
+
+    Where Streamlit supports it the export is only run when the button is clicked;
+    older versions need the payload up front, so call this behind a "Generate" button.
+    Either way Streamlit holds the finished file in memory while serving it - for
+    exports too large for that, use the background exports on 📋 Export Data.
+    """
+    fmt, ext, mime = EXPORT_FORMATS[format_label]
+    def data():
+        return _export_payload(spec, fmt, ext)
+    if not DOWNLOAD_BUTTON_DEFERS_DATA:
+        data = data()
+    return st.download_button(label, data=data, file_name=f'{file_stem}.{ext}', mime=mime, **kwargs)
+
+
+# Export specs: query + params, typed output columns, optional per-row transform
+# (returning None drops the row) and columns to dictionary-encode in Parquet.
+def feedback_export_spec():
+    """All feedback, newest first, with the 📋 Export Data column headings."""
+    query = '''
+        SELECT f.created_at, fac.name, fac.department, fac.year_level, f.student_name,
+               f.q1, f.q2, f.q3, f.q4, f.q5, f.q6, f.q7, f.q8, f.q9, f.q10, f.overall_rating, f.comments,
+               COALESCE(s.name, 'Not Specified')
+        FROM feedback f
+        JOIN faculty fac ON f.faculty_id = fac.id
+        LEFT JOIN subjects s ON f.subject_id = s.id
+        ORDER BY f.created_at DESC
+    '''
+    columns = ([('Date', 'timestamp'), ('Faculty', 'str'), ('Department', 'str'), ('Year Level', 'str'), ('Student', 'str')]
+               + [(FEEDBACK_QUESTION_LABELS[col], 'int') for col in FEEDBACK_SCORE_COLUMNS]
+               + [('Comments', 'str'), ('Subject', 'str')])
+    return {'query': query, 'params': (), 'columns': columns,
+            'dictionary': ('Faculty', 'Department', 'Year Level', 'Subject')}
+
+
+def daily_ler_export_spec(date_from=None, date_to=None, faculty_id=None):
+    query, params = _daily_ler_query(date_from, date_to, faculty_id)
+    columns = [('id', 'int'), ('faculty_id', 'int'), ('faculty_name', 'str'), ('subject_id', 'int'), ('subject_name', 'str'),
+               ('date', 'date'), ('time', 'str'), ('topic', 'str'), ('lecture_number', 'str'), ('percent_syllabus', 'float'),
+               ('total_present', 'int'), ('absent_roll_numbers', 'str'), ('sign', 'str'), ('remark', 'str'), ('created_at', 'timestamp')]
+    return {'query': query, 'params': params, 'columns': columns, 'dictionary': ('faculty_name', 'subject_name')}
+
+
+def attendance_export_spec(year_level=None, branch=None, min_pct=None, max_pct=None):
+    """Student attendance rows with percentage; min_pct is inclusive, max_pct exclusive."""
+    query, params = _attendance_by_year_and_branch_query(year_level, branch)
+
+    def transform(record):
+        sid, student_name, attended, total, subject, faculty, department = record
+        percentage = round((attended / total) * 100, 2) if total and total > 0 else 0
+        if (min_pct is not None and percentage < min_pct) or (max_pct is not None and percentage >= max_pct):
+            return None
+        return (sid, student_name, subject, faculty, department, attended, total, percentage)
+
+    columns = [('Student ID', 'int'), ('Student Name', 'str'), ('Subject', 'str'), ('Faculty', 'str'), ('Branch', 'str'),
+               ('Classes Attended', 'int'), ('Total Classes', 'int'), ('Attendance %', 'float')]
+    return {'query': query, 'params': params, 'columns': columns, 'transform': transform,
+            'dictionary': ('Subject', 'Faculty', 'Branch')}
+
+
+def test_attempts_export_spec(search_field=None, search_term=None):
+    """Every test attempt (newest first), optionally filtered by a case-insensitive substring."""
+    query = '''
+        SELECT ta.id, ta.test_id, t.title, ta.student_id, u.username, u.name, u.roll_number, ta.score,
+               ta.submitted_at, ta.answers
+        FROM test_attempts ta
+        LEFT JOIN users u ON ta.student_id = u.id
+        LEFT JOIN tests t ON ta.test_id = t.id
+    '''
+    params = ()
+    column = {'Test Title': 't.title', 'Username': 'u.username', 'Roll Number': 'u.roll_number'}.get(search_field)
+    if column and search_term:
+        query += f' WHERE LOWER({column}) LIKE ?'
+        params = (f'%{search_term.lower()}%',)
+    query += ' ORDER BY ta.submitted_at DESC'
+
+    def transform(row):
+        attempt_id, test_id, title, student_id, username, name, roll_number, score, submitted_at, answers = row
+        return (attempt_id, test_id, title or 'N/A', student_id, username or 'Unknown', name or 'Unknown',
+                roll_number or 'N/A', score or 0, format_ts_for_display(submitted_at), answers or '')
+
+    columns = [('attempt_id', 'int'), ('test_id', 'int'), ('test_title', 'str'), ('student_id', 'int'), ('username', 'str'),
+               ('name', 'str'), ('roll_number', 'str'), ('score', 'float'), ('submitted_at', 'str'), ('answers_json', 'str')]
+    return {'query': query, 'params': params, 'columns': columns, 'transform': transform, 'dictionary': ('test_title',)}
+
+
+def faculty_leaves_export_spec(faculty_id=None):
+    query = '''
+        SELECT fl.id, fl.faculty_id, f.name, fl.leave_type, fl.start_date, fl.end_date, fl.is_half_day,
+               fl.days_count, fl.alt_faculty, fl.created_at
+        FROM faculty_leaves fl
+        LEFT JOIN faculty f ON fl.faculty_id = f.id
+    '''
+    params = ()
+    if faculty_id:
+        query += ' WHERE fl.faculty_id = ?'
+        params = (faculty_id,)
+    query += ' ORDER BY fl.created_at DESC'
+    columns = [('id', 'int'), ('faculty_id', 'int'), ('faculty_name', 'str'), ('leave_type', 'str'), ('start_date', 'date'),
+               ('end_date', 'date'), ('is_half_day', 'int'), ('days_count', 'float'), ('alt_faculty', 'str'), ('created_at', 'timestamp')]
+    return {'query': query, 'params': params, 'columns': columns, 'dictionary': ('faculty_name', 'leave_type')}
+
+
+# Background export kinds: key -> (label, spec builder, tables whose contents it reads)
+EXPORT_KINDS = {
+    'feedback': ('Feedback', feedback_export_spec, ('feedback', 'faculty', 'subjects')),
+    'attendance': ('Student Attendance', attendance_export_spec, ('attendance', 'users', 'subjects', 'faculty')),
+    'daily_ler': ('Daily LER', daily_ler_export_spec, ('daily_ler', 'faculty', 'subjects')),
+    'test_attempts': ('Test Attempts', test_attempts_export_spec, ('test_attempts', 'users', 'tests')),
+    'faculty_leaves': ('Faculty Leaves', faculty_leaves_export_spec, ('faculty_leaves', 'faculty')),
+}
+
+
+class ExportJobRunner:
+    """Runs export jobs on a small thread pool and keeps finished files on disk.
+
+    A job's file is named after its kind, a hash of its filters and format, and a
+    data-version stamp, so asking again for an export whose tables have not changed
+    returns the finished file without re-running it. The stamp combines this
+    process's token, the cache tag versions of the kind's tables (bumped by
+    invalidate_tables) and each table's COUNT(*)/MAX(id), which also catches inserts
+    made without a tag bump. Job records (status, rows done/total, file) live in memory.
+
+    Files are written to `<root>/runner-<token>/`, so a runner only ever deletes its own
+    files. The directory's mtime is refreshed whenever the job list is read; at start-up,
+    other runners' directories idle for longer than `retention_s` are treated as left by
+    a process that has exited and removed (only files in the runner naming scheme, then
+    the directory if empty). Nothing else under `root` is touched.
+    """
+
+    def __init__(self, root, workers=2, retention_s=24 * 3600):
+        self.root = root
+        self._token = uuid.uuid4().hex
+        self.directory = os.path.join(root, f'runner-{self._token}')
+        os.makedirs(self.directory, exist_ok=True)
+        self._remove_abandoned_runners(retention_s)
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='export-job')
+        self._lock = threading.Lock()
+        self._jobs = {}
+
+    def _file_pattern(self):
+        """Names of job files: <kind>-<filters>-<stamp>.<ext>, plus <...>.<job id>.part while being written."""
+        kinds = '|'.join(re.escape(kind) for kind in EXPORT_KINDS)
+        exts = '|'.join(re.escape(ext) for _, ext, _ in EXPORT_FORMATS.values())
+        return re.compile(rf'^({kinds})-[0-9a-f]{{16}}-[0-9a-f]{{16}}\.({exts})(\.[0-9a-f]{{12}}\.part)?$')
+
+    def _remove_abandoned_runners(self, retention_s):
+        """Delete the files of other runners' directories that have been idle for `retention_s`."""
+        file_pattern = self._file_pattern()
+        runner_pattern = re.compile(r'^runner-[0-9a-f]{32}$')
+        cutoff = time.time() - retention_s
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            try:
+                if not runner_pattern.match(name) or path == self.directory or os.path.getmtime(path) >= cutoff:
+                    continue
+                for file_name in os.listdir(path):
+                    if file_pattern.match(file_name):
+                        os.remove(os.path.join(path, file_name))
+                os.rmdir(path)
+            except OSError:
+                pass
+
+    def _touch(self):
+        """Mark this runner's directory as in use (see _remove_abandoned_runners)."""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            os.utime(self.directory)
+        except OSError:
+            pass
+
+    def data_stamp(self, tables):
+        conn = db_connect()
+        cursor = conn.cursor()
+        try:
+            parts = [self._token, cache_tag_versions(*tables)]
+            for table in tables:
+                cursor.execute(f'SELECT COUNT(*), MAX(id) FROM {table}')
+                parts.append(tuple(cursor.fetchone()))
+        finally:
+            conn.close()
+        return hashlib.sha1(json.dumps(parts, default=str).encode('utf-8')).hexdigest()[:16]
+
+    def submit(self, kind, params, format_label='CSV'):
+        """Queue an export of EXPORT_KINDS[kind] built with `params`; returns the job id."""
+        label, build_spec, tables = EXPORT_KINDS[kind]
+        fmt, ext, mime = EXPORT_FORMATS[format_label]
+        params = dict(sorted(params.items()))
+        filters_key = hashlib.sha1(json.dumps([kind, params, fmt], default=str).encode('utf-8')).hexdigest()[:16]
+        path = os.path.join(self.directory, f'{kind}-{filters_key}-{self.data_stamp(tables)}.{ext}')
+        job = {'id': uuid.uuid4().hex[:12], 'kind': kind, 'label': label, 'params': params, 'format': format_label,
+               'fmt': fmt, 'mime': mime, 'file_name': f'{kind}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{ext}',
+               'path': path, 'filters_key': filters_key, 'status': 'queued', 'cached': False,
+               'rows': 0, 'total': None, 'size': None, 'error': None,
+               'created_at': time.time(), 'started_at': None, 'finished_at': None}
+        with self._lock:
+            for other in self._jobs.values():
+                if other['path'] == path and other['status'] in ('queued', 'running'):
+                    return other['id']
+            if os.path.exists(path):
+                job.update(status='done', cached=True, size=os.path.getsize(path), finished_at=time.time())
+            self._jobs[job['id']] = job
+        if not job['cached']:
+            self._pool.submit(self._run, job, build_spec)
+        return job['id']
+
+    def _update(self, job, **fields):
+        with self._lock:
+            job.update(fields)
+
+    def _run(self, job, build_spec):
+        self._update(job, status='running', started_at=time.time())
+        part = f"{job['path']}.{job['id']}.part"
+        try:
+            spec = build_spec(**job['params'])
+            conn = db_connect()
+            cursor = conn.cursor()
+            try:
+                cursor.execute(f"SELECT COUNT(*) FROM ({spec['query']}) export_rows", tuple(spec.get('params', ())))
+                self._update(job, total=cursor.fetchone()[0])
+            finally:
+                conn.close()
+
+            def progress(n):
+                with self._lock:
+                    job['rows'] += n
+
+            self._touch()
+            with open(part, 'wb') as out:
+                write_export(spec, job['fmt'], out, progress)
+            os.replace(part, job['path'])
+            # Older files for the same filters were built from superseded data
+            prefix = f"{job['kind']}-{job['filters_key']}-"
+            for name in os.listdir(self.directory):
+                path = os.path.join(self.directory, name)
+                if name.startswith(prefix) and path != job['path'] and not name.endswith('.part'):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+            self._update(job, status='done', size=os.path.getsize(job['path']), finished_at=time.time())
+        except Exception as e:
+            try:
+                os.remove(part)
+            except OSError:
+                pass
+            self._update(job, status='failed', error=f'{type(e).__name__}: {e}', finished_at=time.time())
+
+    def jobs(self):
+        """Snapshot of all jobs, newest first."""
+        self._touch()
+        with self._lock:
+            jobs = [dict(job) for job in self._jobs.values()]
+        jobs.sort(key=lambda j: j['created_at'], reverse=True)
+        return jobs
+
+    def forget(self, job_id):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def forget_finished(self):
+        """Drop done and failed jobs from the list; finished files stay on disk for repeat requests."""
+        with self._lock:
+            for job_id in [job_id for job_id, job in self._jobs.items() if job['status'] in ('done', 'failed')]:
+                del self._jobs[job_id]
+
+
+@st.cache_resource
+def get_export_runner():
+    """Process-wide export job runner (files under EXPORT_JOB_DIR)."""
+    return ExportJobRunner(EXPORT_JOB_DIR, EXPORT_JOB_WORKERS, EXPORT_JOB_RETENTION_S)
+
+
+# Initialize database
+init_database()
+# Start the write-behind queues (each replays journaled submissions left by a restart)
+get_feedback_queue()
+get_test_attempt_queue()
+
+# Session state management
+if 'logged_in' not in st.session_state:
+    st.session_state.logged_in = False
+    st.session_state.username = None
+    st.session_state.role = None
+    st.session_state.user_id = None
+
+# Sidebar navigation
+with st.sidebar:
+    # Sidebar title kept concise now (main header moved to main page)
+    st.title("🎓 VVPIET Student LMS")
+    # Persistence warning for Streamlit Community Cloud deployments
+    if not DATABASE_URL:
+        st.warning(
+            "Using local SQLite database (`feedback_streamlit.db`).\n"
+            "On Streamlit Community Cloud this storage is ephemeral: registered users and uploads may disappear after app restarts or redeploys.\n"
+            "To persist data across restarts, configure an external database (e.g., Postgres) and set the `DATABASE_URL` environment variable in your app settings."
+        )
+    
+    if st.session_state.logged_in:
+        st.success(f"Logged in as: **{st.session_state.username}** ({st.session_state.role})")
+        
+        if st.button("🚪 Logout", use_container_width=True):
+            st.session_state.logged_in = False
+            st.session_state.username = None
+            st.session_state.role = None
+            safe_rerun()
+        
+        st.divider()
+        
+        # Navigation based on role
+        if st.session_state.role == 'student':
+            feedback_open = is_feedback_open()
+            # Student navigation: always show all tabs, but the feedback form itself is gated by feedback window
+            student_tabs = ["🏠 Dashboard", "📝 Submit Feedback", "📥 Download Resources", "📊 My Attendance", "💰 Credit Calculator", "🧪 Tests", "ℹ️ About"]
+            page = st.radio("Navigation", student_tabs)
+        elif st.session_state.role == 'faculty':
+            page = st.radio("Navigation", ["📅 Mark Attendance", "🧾 Daily Attendance", "📒 Daily LER", "📚 Upload Resources", "🧪 Create Test", "📄 Faculty Leaves", "ℹ️ About"])
+        else:  # admin
+            page = st.radio("Navigation", ["📊 Dashboard", "👥 Student Attendance", "📚 Manage Subjects", "👨‍🏫 Manage Faculty", "📈 Analytics", "📋 Export Data", "🗂️ Faculty Leaves", "🐛 Debug: Test Attempts", "ℹ️ About"])
+    else:
+        page = st.radio("Navigation", ["🔐 Login", "📝 Register"])
+
+# If a UI flow set `nav_to_page` (button click), honor it and navigate there
+if 'nav_to_page' in st.session_state:
+    page = st.session_state.pop('nav_to_page')
+
+# Attribute the queries issued from here on to the page being rendered
+begin_page_render(page)
+
+# Main content area
+# Main page header (logo + college name), centered
+with st.container():
+    left_col, mid_col, right_col = st.columns([1, 6, 1])
+    with left_col:
+        st.image("college_logo.jpg", width=84)
+    with mid_col:
+        st.markdown('<div style="text-align:center; font-weight:bold; color:#8B3A3A; font-size:20px;">VVP institute of engineering and technology, Solapur, Maharashtra, India</div>', unsafe_allow_html=True)
+    st.markdown("---")
+
+if not st.session_state.logged_in:
+    if page == "🔐 Login":
+        st.title("🔐 Login")
+        
+        with st.form("login_form"):
+            username = st.text_input("Username")
+            password = st.text_input("Password", type="password")
+            submit = st.form_submit_button("Login", use_container_width=True)
+        
+        if submit:
+            result = verify_login(username, password)
+            if result:
+                st.session_state.logged_in = True
+                st.session_state.username = username
+                st.session_state.user_id = result[0]
+                st.session_state.role = result[1]
+                st.success("Login successful! 🎉")
+                safe_rerun()
+            else:
+                st.error("Invalid username or password ❌")
+        
+        # Demo credentials removed from the public main page for security.
+        # Administrators can provide credentials to users directly.
+        st.info("Contact your administrator to obtain login credentials.")
+
+        with st.expander("Forgot Password?"):
+            st.write("Reset your password by verifying your roll number.")
+            with st.form("forgot_password_form"):
+                fp_username = st.text_input("Username")
+                fp_roll = st.text_input("Roll Number / PRN")
+                fp_new = st.text_input("New Password", type="password")
+                fp_confirm = st.text_input("Confirm New Password", type="password")
+                fp_submit = st.form_submit_button("Reset Password")
+
+            if fp_submit:
+                if not fp_username or not fp_roll or not fp_new:
+                    st.error("Please provide username, roll number/PRN, and the new password.")
+                elif fp_new != fp_confirm:
+                    st.error("Passwords do not match.")
+                else:
+                    ok = reset_user_password_with_roll(fp_username.strip(), fp_roll.strip(), fp_new)
+                    if ok:
+                        st.success("Password reset successful. Please login with your new password.")
+                    else:
+                        st.error("Password reset failed. Ensure username and roll number/PRN match our records, or contact admin.")
+    
+    elif page == "📝 Register":
+        st.title("📝 Register")
+        
+        reg_type = st.radio("Select Registration Type:", ["Student", "Faculty"], horizontal=True)
+        
+        if reg_type == "Student":
+            st.subheader("Student Registration")
+            with st.form("student_register_form"):
+                name = st.text_input("Full Name *")
+                roll_number = st.text_input("Roll Number *")
+                new_username = st.text_input("Choose Username *")
+                new_password = st.text_input("Choose Password *", type="password")
+                confirm_password = st.text_input("Confirm Password *", type="password")
+                
+                branches = get_branches()
+                if not branches:
+                    branches = ["General"]
+                selected_branch = st.selectbox("Branch *", options=branches)
+                
+                class_options = ["FY", "SY", "TY", "Final Year"]
+                selected_class = st.selectbox("Class/Year Level *", options=class_options)
+                
+                submit = st.form_submit_button("Register as Student", use_container_width=True)
+            
+            if submit:
+                if not name or not roll_number or not new_username or not new_password:
+                    st.error("Please fill all required fields")
+                elif new_password != confirm_password:
+                    st.error("Passwords don't match!")
+                elif len(new_password) < 6:
+                    st.error("Password must be at least 6 characters")
+                else:
+                    conn = db_connect()
+                    cursor = conn.cursor()
+                    try:
+                        cursor.execute('INSERT INTO users (username, password, role, name, roll_number, branch, class) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                      (new_username, hash_password(new_password), 'student', name, roll_number, selected_branch, selected_class))
+                        conn.commit()
+                        invalidate_tables('users')
+                        st.success("✓ Student registration successful! Please login.")
+                    except sqlite3.IntegrityError:
+                        st.error("Username already exists!")
+                    conn.close()
+        
+        else:  # Faculty registration
+            st.subheader("Faculty Registration")
+            
+            with st.form("faculty_register_form"):
+                name = st.text_input("Full Name *")
+                new_username = st.text_input("Choose Username *")
+                new_password = st.text_input("Choose Password *", type="password")
+                confirm_password = st.text_input("Confirm Password *", type="password")
+                
+                branches = get_branches()
+                if not branches:
+                    branches = ["General"]
+                selected_branch = st.selectbox("Department/Branch *", options=branches)
+                
+                # Add year level selection for faculty (allow multiple selections)
+                year_levels = get_year_levels()
+                if not year_levels:
+                    year_levels = ['FY', 'SY', 'TY', 'Final Year']
+                selected_year_levels = st.multiselect("Year Levels Teaching * (Select one or more)", options=year_levels)
+                
+                submit = st.form_submit_button("Register as Faculty", use_container_width=True)
+            
+            if submit:
+                if not name or not new_username or not new_password:
+                    st.error("Please fill all required fields")
+                elif new_password != confirm_password:
+                    st.error("Passwords don't match!")
+                elif len(new_password) < 6:
+                    st.error("Password must be at least 6 characters")
+                elif not selected_year_levels:
+                    st.error("Please select at least one year level")
+                else:
+                    conn = db_connect()
+                    cursor = conn.cursor()
+                    try:
+                        # Check if username already exists
+                        cursor.execute('SELECT id FROM users WHERE username = ?', (new_username,))
+                        if cursor.fetchone():
+                            st.error("Username already exists! Please choose a different username.")
+                            conn.close()
+                        else:
+                            # Create a new faculty record with the first selected year level as default
+                            faculty_record_name = f"{name}"
+                            try:
+                                fac_id = insert_returning_id(cursor, 'INSERT INTO faculty (name, department, year_level) VALUES (?, ?, ?)',
+                                                             (faculty_record_name, selected_branch, selected_year_levels[0]))
+                                conn.commit()
+                            except Exception as e:
+                                # If a duplicate key error happens (commonly from Postgres sequences being behind),
+                                # try to sync sequence and retry once
+                                msg = str(e).lower()
+                                if 'duplicate key value violates unique constraint' in msg or 'duplicate key value' in msg or 'unique constraint' in msg:
+                                    conn.rollback()
+                                    ensure_postgres_sequence('faculty', cursor)
+                                    try:
+                                        fac_id = insert_returning_id(cursor, 'INSERT INTO faculty (name, department, year_level) VALUES (?, ?, ?)',
+                                                                     (faculty_record_name, selected_branch, selected_year_levels[0]))
+                                        conn.commit()
+                                    except Exception:
+                                        # If still failing, re-raise to be caught by outer handler
+                                        raise
+                                else:
+                                    raise
+                            
+                            # Add all selected year levels to faculty_year_level table
+                            for year_level in selected_year_levels:
+                                cursor.execute('INSERT INTO faculty_year_level (faculty_id, year_level) VALUES (?, ?)',
+                                             (fac_id, year_level))
+                            refresh_faculty_teaching(cursor, [fac_id])
+                            conn.commit()
+                            
+                            # Create the user account linked to faculty
+                            try:
+                                cursor.execute('INSERT INTO users (username, password, role, faculty_id, name, branch) VALUES (?, ?, ?, ?, ?, ?)',
+                                              (new_username, hash_password(new_password), 'faculty', fac_id, name, selected_branch))
+                                conn.commit()
+                            except Exception as e:
+                                msg = str(e).lower()
+                                if 'duplicate key value violates unique constraint' in msg or 'duplicate key value' in msg or 'unique constraint' in msg:
+                                    # Sync users sequence and retry once
+                                    conn.rollback()
+                                    ensure_postgres_sequence('users', cursor)
+                                    try:
+                                        cursor.execute('INSERT INTO users (username, password, role, faculty_id, name, branch) VALUES (?, ?, ?, ?, ?, ?)',
+                                                      (new_username, hash_password(new_password), 'faculty', fac_id, name, selected_branch))
+                                        conn.commit()
+                                    except Exception:
+                                        raise
+                                else:
+                                    raise
+                            invalidate_tables('faculty', 'faculty_year_level', 'faculty_teaching', 'users')
+                            st.success("✓ Faculty registration successful! Please login.")
+                            conn.close()
+                    except sqlite3.IntegrityError as e:
+                        if 'UNIQUE constraint failed: faculty.name' in str(e):
+                            st.error("A faculty with this name already exists. Please use a different name or contact admin.")
+                        else:
+                            st.error(f"Registration error: {str(e)}")
+                        conn.close()
+                    except Exception as e:
+                        st.error(f"Error during registration: {str(e)}")
+                        conn.close()
+
+else:
+    # Student pages
+    if st.session_state.role == 'student':
+        if page == "🏠 Dashboard":
+            st.title("Student Dashboard")
+            # student's branch and class info
+            user = get_user_by_username(st.session_state.username) if st.session_state.username else None
+            user_id = user[0] if user else None
+            conn = db_connect()
+            cursor = conn.cursor()
+            cursor.execute('SELECT id, username, name, branch, class FROM users WHERE id = ? AND role = ?', (user_id, 'student'))
+            student_info = cursor.fetchone()
+            conn.close()
+            if not student_info:
+                st.error("Student information not found")
+            else:
+                student_id, student_username, student_name, student_branch, student_class = student_info
+                st.info(f"**Your Branch:** {student_branch} | **Your Class:** {student_class}")
+
+                # Notices board - expander
+                notices = get_notices(target_branch=student_branch, target_class=student_class)
+                if notices:
+                    with st.expander("📢 Notices"):
+                        for n in notices[:5]:
+                            nid, title, content, tbranch, tclass, cb_role, cb_id, created_at = n
+                            created_disp = format_ts_for_display(created_at, short=True)
+                            st.markdown(f"**{title}** — *{created_disp}*")
+                            st.write(content)
+                            st.markdown("---")
+                else:
+                    st.info("No notices available at the moment.")
+
+                # Recent Test Attempts - show immediately after submission
+                st.markdown("---")
+                st.subheader("🧪 My Recent Test Attempts")
+                recent_attempts = get_test_attempts_for_student(student_id)
+                if recent_attempts:
+                    st.success(f"✓ You have {len(recent_attempts)} attempt(s) recorded")
+                    attempt_rows = []
+                    # Batch fetch test titles for all attempt test_ids to avoid N queries in a loop
+                    ttid_set = {att[1] for att in recent_attempts}
+                    if ttid_set:
+                        placeholders = ','.join('?' for _ in ttid_set)
+                        conn = db_connect()
+                        cur = conn.cursor()
+                        cur.execute(f'SELECT id, title FROM tests WHERE id IN ({placeholders})', tuple(ttid_set))
+                        title_rows = cur.fetchall()
+                        conn.close()
+                        title_map = {r[0]: r[1] for r in title_rows}
+                    else:
+                        title_map = {}
+
+                    for att in recent_attempts:
+                        aid, ttid, score, started_at, submitted_at = att
+                        test_title = title_map.get(ttid, 'Unknown Test')
+                        attempt_rows.append({
+                            'attempt_id': aid,
+                            'test': test_title,
+                            'score': score,
+                            'submitted_at': format_ts_for_display(submitted_at, short=True)
+                        })
+                    df_attempts = pd.DataFrame(attempt_rows)
+                    st.dataframe(df_attempts, use_container_width=True, hide_index=True)
+                else:
+                    st.info("No test attempts recorded yet. Take a test to see your results here!")
+
+                # Assignments & Notes placeholder
+                st.markdown("---")
+                st.subheader("📚 Assignments & Notes")
+                student_year_level = 'SY' if student_class and student_class[0] == '2' else 'FY' if student_class and student_class[0] == '1' else 'TY' if student_class and student_class[0] == '3' else 'Final Year'
+                if get_resource_catalog(student_year_level, student_branch)['resources']:
+                    st.info(f"Resources available for {student_year_level} — click to open the 'Download Resources' page.")
+                    if st.button("Open Assignments & Notes"):
+                        st.session_state['nav_to_page'] = "📥 Download Resources"
+                        safe_rerun()
+                else:
+                    st.info("No assignments/notes available at the moment.")
+
+                # Attendance placeholder
+                st.markdown("---")
+                st.subheader("📊 Attendance")
+                user_attendance_pct = get_student_attendance_percentage(user_id) if user_id else 0
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.metric("Overall Attendance (%)", f"{user_attendance_pct:.1f}%")
+                with col2:
+                    if user_attendance_pct >= 60:
+                        st.success("Eligible for feedback submission")
+                    else:
+                        st.info("Not eligible for feedback submission yet")
+                if st.button("Open Attendance Details"):
+                    st.session_state['nav_to_page'] = "📊 My Attendance"
+                    safe_rerun()
+                # Active tests quick access
+                st.markdown("---")
+                st.subheader("🧪 Active Tests")
+                active_tests = get_tests_for_student(student_id)
+                active = []
+                for t in active_tests:
+                    tid, title, desc, start_ts, end_ts, proctored, subj_name, year_level, dept = t
+                    now = datetime.now(ZoneInfo("Asia/Kolkata"))
+                    try:
+                        start = parse_iso_to_kolkata(start_ts) if start_ts else None
+                        end = parse_iso_to_kolkata(end_ts) if end_ts else None
+                    except Exception:
+                        start = None
+                        end = None
+                    if (not start or now >= start) and (not end or now <= end):
+                        active.append((tid, title, subj_name))
+                if active:
+                    for tid, title, subj_name in active:
+                        col1, col2 = st.columns([6, 1])
+                        with col1:
+                            st.write(f"**{title}** — {subj_name}")
+                        with col2:
+                            if st.button(f"Take", key=f"ctake_{tid}"):
+                                st.session_state['active_test_id'] = tid
+                                st.session_state['nav_to_page'] = "🧪 Take Test"
+                                safe_rerun()
+                else:
+                    st.info("No active tests at the moment.")
+
+        elif page == "📝 Submit Feedback":
+            st.title("Student Dashboard")
+            
+            # Get student's branch from users table
+            user = get_user_by_username(st.session_state.username) if st.session_state.username else None
+            user_id = user[0] if user else None
+            
+            # Get complete student info including branch and class
+            conn = db_connect()
+            cursor = conn.cursor()
+            cursor.execute('SELECT id, username, name, branch, class FROM users WHERE id = ? AND role = ?', (user_id, 'student'))
+            student_info = cursor.fetchone()
+            conn.close()
+            
+            if not student_info:
+                st.error("Student information not found")
+            else:
+                student_id, student_username, student_name, student_branch, student_class = student_info
+                
+                # Display student's branch and class
+                st.info(f"**Your Branch:** {student_branch} | **Your Class:** {student_class}")
+
+
+                # Credit Calculator quick-access placeholder
+                st.markdown("---")
+                st.subheader("💰 Credit Calculator (Quick Access)")
+                colc1, colc2 = st.columns([3,1])
+                with colc1:
+                    st.write("Open the Credit Calculator to calculate semester/degree progress based on your category and class.")
+                with colc2:
+                    if st.button("Open Calculator"):
+                        st.session_state['nav_to_page'] = "💰 Credit Calculator"
+                        safe_rerun()
+
+
+                # Show feedback schedule status
+                # (Tab is now hidden if not open, but keep info for safety)
+                if not is_feedback_open():
+                    sched = get_current_feedback_schedule()
+                    if sched:
+                        st.warning(f"Feedback will be open from {sched[0]} to {sched[1]}. You can submit feedback during that window.")
+                    else:
+                        st.info("Feedback is not scheduled currently. Contact admin for when feedback will be open.")
+
+                # Submit Feedback Page
+                st.subheader("Submit Faculty Feedback")
+
+                # Compute student year level from student_class
+                # student_class contains values like "FY", "SY", "TY", "Final Year", or numeric "1", "2", "3", "4"
+                student_year_level = 'FY'  # Default
+                if student_class:
+                    class_str = str(student_class).strip().upper()
+                    # Check for string values first
+                    if class_str == 'FY' or class_str == 'FIRST YEAR':
+                        student_year_level = 'FY'
+                    elif class_str == 'SY' or class_str == 'SECOND YEAR':
+                        student_year_level = 'SY'
+                    elif class_str == 'TY' or class_str == 'THIRD YEAR':
+                        student_year_level = 'TY'
+                    elif class_str == 'FINAL YEAR' or class_str == 'FYR' or class_str == 'FOURTH YEAR':
+                        student_year_level = 'Final Year'
+                    # Check for numeric values
+                    elif class_str == '1':
+                        student_year_level = 'FY'
+                    elif class_str == '2':
+                        student_year_level = 'SY'
+                    elif class_str == '3':
+                        student_year_level = 'TY'
+                    elif class_str == '4':
+                        student_year_level = 'Final Year'
+                    # Check first character if numeric
+                    elif class_str and class_str[0].isdigit():
+                        first_digit = class_str[0]
+                        if first_digit == '1':
+                            student_year_level = 'FY'
+                        elif first_digit == '2':
+                            student_year_level = 'SY'
+                        elif first_digit == '3':
+                            student_year_level = 'TY'
+                        elif first_digit == '4':
+                            student_year_level = 'Final Year'
+
+                # Check if feedback is open - if closed, show message only
+                if not is_feedback_open():
+                    sched = get_current_feedback_schedule()
+                    if sched:
+                        st.error(f"❌ Feedback submission is currently **CLOSED**")
+                        st.warning(f"Feedback was open from:\n**{sched[0]}** to **{sched[1]}**\n\nThis window has now ended. You can only submit feedback during the scheduled window.")
+                    else:
+                        st.error("❌ Feedback submission is currently **CLOSED**")
+                        st.info("Feedback is not scheduled currently. Contact admin for when feedback will be open.")
+                else:
+                    # Feedback window is OPEN - show the form
+                    st.success(f"✅ Feedback window is **OPEN**! Showing subjects and faculty for: **{student_year_level}**")
+                    
+                    # Get student's attendance percentage
+                    user_attendance_pct = get_student_attendance_percentage(user_id) if user_id else 0
+                    user_has_access = user_attendance_pct >= 60 if user_id else False
+
+                    # Get subjects for this year level AND filter by student's branch
+                    subjects = get_subjects_by_year(student_year_level)
+                    # Filter subjects to only those matching the student's branch
+                    filtered_subjects = [s for s in subjects if s[3] == student_branch] if subjects else []
+                    subject_options = [s[1] for s in filtered_subjects]
+                    subject_options = ["All"] + subject_options
+                    selected_subject = st.selectbox("Select Subject (optional)", options=subject_options, key="fb_subject")
+
+                    if selected_subject and selected_subject != "All":
+                        subj = next((s for s in filtered_subjects if s[1] == selected_subject), None)
+                        if subj:
+                            # Get faculties by subject, filtered by student's branch and year level
+                            faculties = get_feedback_faculty_options(student_branch, student_year_level, subj[0])
+                        else:
+                            faculties = []
+                    else:
+                        # Get all faculties from student's branch and year level (one row per faculty)
+                        faculties = get_feedback_faculty_options(student_branch, student_year_level)
+
+                        # Create faculty dictionary
+                        faculty_dict = {f'{f[1]} ({f[2]}) [ID: {f[0]}]': f[0] for f in faculties}
+
+                        # Feedback form or access message
+                        if not user_has_access:
+                            st.warning(f"❌ Access Denied: You need >= 60% attendance to submit feedback.\n\n**Your Current Attendance:** {user_attendance_pct:.1f}%\n\nPlease contact your faculty/admin for attendance information.")
+                        else:
+                            st.success(f"✅ Your attendance: {user_attendance_pct:.1f}% - You have access to submit feedback")
+                            
+                            if not faculty_dict:
+                                st.warning(f"No faculty found in {student_branch} for year level {student_year_level}")
+                            else:
+                                with st.form("feedback_form"):
+                                    feedback_student_name = st.text_input("Your Name (optional)", value=student_name or "")
+                                    
+                                    # Select subject first
+                                    selected_subject = st.selectbox(
+                                        "Select Subject *",
+                                        options=subject_options,
+                                        key="fb_subject_form"
+                                    )
+                                    
+                                    # Get faculties for the selected subject
+                                    if selected_subject and selected_subject != "All":
+                                        subj = next((s for s in filtered_subjects if s[1] == selected_subject), None)
+                                        if subj:
+                                            subject_id = subj[0]
+                                            faculties_for_subject = get_feedback_faculty_options(student_branch, student_year_level, subject_id)
+                                            faculty_dict_filtered = {f'{f[1]} ({f[2]}) [ID: {f[0]}]': f[0] for f in faculties_for_subject}
+                                        else:
+                                            faculty_dict_filtered = {}
+                                            subject_id = None
+                                    else:
+                                        faculty_dict_filtered = faculty_dict
+                                        subject_id = None
+                                    
+                                    selected_faculty = st.selectbox(
+                                        "Select Faculty *",
+                                        options=faculty_dict_filtered.keys() if faculty_dict_filtered else [],
+                                        key="fb_faculty_form"
+                                    )
+
+                                    st.markdown("### Rate the following aspects (1-10)")
+                                    st.markdown("Please answer the following questions by rating from 1 (Strongly Disagree) to 10 (Strongly Agree):")
+                                    st.divider()
+                                    
+                                    # Display questions sequentially with styling
+                                    st.markdown("<span style='color:#1f4788; font-size:16px'><b>1. Has fundamental concepts & subject knowledge</b></span>", unsafe_allow_html=True)
+                                    q1 = st.number_input("Rating", min_value=1, max_value=10, value=5, step=1, key="q1")
+                                    st.write("")
+                                    
+                                    st.markdown("<span style='color:#1f4788; font-size:16px'><b>2. Preparation for Subject is sufficient while coming to class</b></span>", unsafe_allow_html=True)
+                                    q2 = st.number_input("Rating", min_value=1, max_value=10, value=5, step=1, key="q2")
+                                    st.write("")
+                                    
+                                    st.markdown("<span style='color:#1f4788; font-size:16px'><b>3. Sufficient knowledge about current trends/development of subject</b></span>", unsafe_allow_html=True)
+                                    q3 = st.number_input("Rating", min_value=1, max_value=10, value=5, step=1, key="q3")
+                                    st.write("")
+                                    
+                                    st.markdown("<span style='color:#1f4788; font-size:16px'><b>4. Proficient in English & communication skills</b></span>", unsafe_allow_html=True)
+                                    q4 = st.number_input("Rating", min_value=1, max_value=10, value=5, step=1, key="q4")
+                                    st.write("")
+                                    
+                                    st.markdown("<span style='color:#1f4788; font-size:16px'><b>5. Teaching makes class interesting & interactive through student participation</b></span>", unsafe_allow_html=True)
+                                    q5 = st.number_input("Rating", min_value=1, max_value=10, value=5, step=1, key="q5")
+                                    st.write("")
+                                    
+                                    st.markdown("<span style='color:#1f4788; font-size:16px'><b>6. Faculty is punctual in starting and ending classes on time</b></span>", unsafe_allow_html=True)
+                                    q6 = st.number_input("Rating", min_value=1, max_value=10, value=5, step=1, key="q6")
+                                    st.write("")
+                                    
+                                    st.markdown("<span style='color:#1f4788; font-size:16px'><b>7. Has covered the entire syllabus as prescribed by university</b></span>", unsafe_allow_html=True)
+                                    q7 = st.number_input("Rating", min_value=1, max_value=10, value=5, step=1, key="q7")
+                                    st.write("")
+                                    
+                                    st.markdown("<span style='color:#1f4788; font-size:16px'><b>8. Extent of fulfillment of your learning expectations</b></span>", unsafe_allow_html=True)
+                                    q8 = st.number_input("Rating", min_value=1, max_value=10, value=5, step=1, key="q8")
+                                    st.write("")
+                                    
+                                    st.markdown("<span style='color:#1f4788; font-size:16px'><b>9. Behavior with students is appropriate and rational</b></span>", unsafe_allow_html=True)
+                                    q9 = st.number_input("Rating", min_value=1, max_value=10, value=5, step=1, key="q9")
+                                    st.write("")
+                                    
+                                    st.markdown("<span style='color:#1f4788; font-size:16px'><b>10. Motivates students for their study and better career</b></span>", unsafe_allow_html=True)
+                                    q10 = st.number_input("Rating", min_value=1, max_value=10, value=5, step=1, key="q10")
+                                    st.divider()
+                                    
+                                    st.markdown("<span style='color:#d9534f; font-size:16px'><b>Overall Rating for this Faculty</b></span>", unsafe_allow_html=True)
+                                    overall = st.number_input("Overall Rating", min_value=1, max_value=10, value=5, step=1)
+                                    comments = st.text_area("Additional Comments (optional)", height=100)
+                                    submitted = st.form_submit_button("Submit Feedback", use_container_width=True)
+
+                                if submitted:
+                                    faculty_id = faculty_dict_filtered.get(selected_faculty, faculty_dict.get(selected_faculty))
+                                    if not subject_id and selected_subject and selected_subject != "All":
+                                        subj = next((s for s in subjects if s[1] == selected_subject and s[3] == student_branch), None)
+                                        subject_id = subj[0] if subj else None
+                                    
+                                    try:
+                                        queued = get_feedback_queue().submit(feedback_student_name, faculty_id, subject_id, student_year_level,
+                                                                             int(q1), int(q2), int(q3), int(q4), int(q5), int(q6), int(q7), int(q8), int(q9), int(q10),
+                                                                             int(overall), comments)
+                                    except ValueError as e:
+                                        queued = False
+                                        st.error(f"Feedback not submitted: {e}. Please select a faculty and try again.")
+                                    else:
+                                        if queued:
+                                            st.success("✓ Feedback submitted successfully!")
+                                            st.balloons()
+                                        else:
+                                            st.error("Error submitting feedback")
+                
+        elif page == "📥 Download Resources":
+            st.title("📥 Download Resources")
+            # Get student's info
+            user = get_user_by_username(st.session_state.username) if st.session_state.username else None
+            user_id = user[0] if user else None
+            conn = db_connect()
+            cursor = conn.cursor()
+            cursor.execute('SELECT id, username, name, branch, class FROM users WHERE id = ? AND role = ?', (user_id, 'student'))
+            student_info = cursor.fetchone()
+            conn.close()
+            if not student_info:
+                st.error("Student information not found")
+            else:
+                student_id, student_username, student_name, student_branch, student_class = student_info
+                
+                # Map student class to year level and semesters
+                class_to_year = {
+                    'FY': ('FY', ['Semester 1', 'Semester 2']),
+                    'SY': ('SY', ['Semester 3', 'Semester 4']),
+                    'TY': ('TY', ['Semester 5', 'Semester 6']),
+                    'Final Year': ('Final Year', ['Semester 7', 'Semester 8'])
+                }
+                
+                student_year_level, semesters = class_to_year.get(student_class, (student_class, []))
+                
+                st.info(f"**Student:** {student_name} | **Class:** {student_year_level} | **Branch:** {student_branch}")
+                st.markdown("---")
+                
+                catalog = get_resource_catalog(student_year_level, student_branch)
+                subjects = catalog['subjects']
+                
+                if not subjects:
+                    st.info(f"No subjects found for {student_year_level} in {student_branch}")
+                else:
+                    # Display semester-wise organization
+                    st.subheader("📚 Subjects by Semester")
+                    st.write(f"Available semesters for {student_year_level}: {', '.join(semesters)}")
+                    st.markdown("---")
+                    
+                    # Display all subjects
+                    subject_tabs = st.tabs([f"All Subjects ({len(subjects)})"] + [s for s in semesters])
+                    
+                    with subject_tabs[0]:  # All Subjects tab
+                        st.subheader("All Subjects")
+                        for subject_id, subject_name in subjects:
+                            with st.expander(f"📖 {subject_name}"):
+                                subject_resources = catalog['resources'].get(subject_id, [])
+                                
+                                if subject_resources:
+                                    st.write(f"**Resources ({len(subject_resources)}):**")
+                                    
+                                    # Group by faculty
+                                    by_faculty = {}
+                                    for res_id, filename, res_type, faculty_name, uploaded_at, deadline in subject_resources:
+                                        by_faculty.setdefault(faculty_name, []).append((res_id, filename, res_type, uploaded_at, deadline))
+                                    
+                                    for faculty_name, items in by_faculty.items():
+                                        with st.expander(f"👨‍🏫 {faculty_name} ({len(items)})"):
+                                            for res_id, filename, res_type, uploaded_at, deadline in items:
+                                                col1, col2 = st.columns([4, 1])
+                                                col1.write(f"📄 {filename}")
+                                                col1.caption(f"Type: {res_type.capitalize()} | Uploaded: {uploaded_at}")
+                                                if deadline and res_type == "assignment":
+                                                    col1.caption(f"⏰ Deadline: {deadline}")
+                                                resource_download_button(col2, res_id)
+                                else:
+                                    st.info(f"No resources available yet for {subject_name}")
+                    
+                    # Semester tabs (for future use - placeholder)
+                    for sem_idx, semester in enumerate(semesters, start=1):
+                        with subject_tabs[sem_idx]:
+                            st.subheader(f"{semester} - Subjects & Resources")
+                            st.info(f"Resources will be organized by {semester} once more data is added.")
+                    
+                    st.markdown("---")
+                    st.subheader("👨‍🏫 Faculty List")
+                    st.write(f"The following faculties have uploaded resources for your {student_year_level}:")
+                    
+                    if catalog['faculty']:
+                        for fac_id, fac_name, fac_dept, fac_subjects, fac_resource_count in catalog['faculty']:
+                            with st.expander(f"👨‍🏫 {fac_name} ({fac_dept}) — {fac_resource_count} resource(s)"):
+                                if fac_subjects:
+                                    st.write(f"**Teaches:** {', '.join(fac_subjects)}")
+                                st.write(f"**Department:** {fac_dept}")
+                    else:
+                        st.info(f"No faculties assigned to {student_year_level} in {student_branch} yet.")
+
+        elif page == "📊 My Attendance":
+            st.title("📊 My Attendance")
+            user = get_user_by_username(st.session_state.username) if st.session_state.username else None
+            user_id = user[0] if user else None
+            if not user_id:
+                st.error("User information not found")
+            else:
+                user_attendance_pct = get_student_attendance_percentage(user_id) if user_id else 0
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.metric("Overall Attendance", f"{user_attendance_pct:.1f}%")
+                with col2:
+                    if user_attendance_pct >= 60:
+                        st.success("✅ Eligible for feedback submission")
+                    else:
+                        st.error(f"❌ Need {60 - user_attendance_pct:.1f}% more attendance")
+                # Get attendance details
+                conn = db_connect()
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT a.month, a.year, a.classes_attended, a.total_classes, s.name, f.name
+                    FROM attendance a
+                    JOIN subjects s ON a.subject_id = s.id
+                    JOIN faculty f ON a.faculty_id = f.id
+                    WHERE a.student_id = ?
+                    ORDER BY a.year DESC, a.month DESC
+                ''', (user_id,))
+                attendance_records = cursor.fetchall()
+                conn.close()
+                if attendance_records:
+                    st.subheader("Attendance Details")
+                    attendance_data = []
+                    for month, year, attended, total, subject, faculty in attendance_records:
+                        pct = (attended / total * 100) if total > 0 else 0
+                        attendance_data.append({
+                            'Month': month,
+                            'Year': year,
+                            'Subject': subject,
+                            'Faculty': faculty,
+                            'Attended': attended,
+                            'Total': total,
+                            'Percentage': f"{pct:.1f}%"
+                        })
+                    df = pd.DataFrame(attendance_data)
+                    st.dataframe(df, use_container_width=True, hide_index=True)
+                else:
+                    st.info("No attendance records found")
+        
+        elif page == "🧪 Tests":
+            st.title("🧪 Available Tests")
+            user = get_user_by_username(st.session_state.username) if st.session_state.username else None
+            user_id = user[0] if user else None
+            if not user_id:
+                st.error("User information not found")
+            else:
+                tests = get_tests_for_student(user_id)
+                if not tests:
+                    st.info("No tests available for your class/branch at this time.")
+                else:
+                    for t in tests:
+                        tid, title, desc, start_ts, end_ts, proctored, subj_name, year_level, dept = t
+                        st.subheader(f"{title} — {subj_name}")
+                        st.write(desc or "No description")
+                        st.write(f"Start: {start_ts} | End: {end_ts} | Proctored: {'Yes' if proctored else 'No'}")
+                        # Check if test is active
+                        now = datetime.now(ZoneInfo("Asia/Kolkata"))
+                        try:
+                            start = parse_iso_to_kolkata(start_ts) if start_ts else None
+                            end = parse_iso_to_kolkata(end_ts) if end_ts else None
+                        except Exception:
+                            start = None
+                            end = None
+
+                        can_take = True
+                        if start and now < start:
+                            can_take = False
+                        if end and now > end:
+                            can_take = False
+
+                        if can_take:
+                            if not start:
+                                st.info("This test has no start time set — contact faculty or admin.")
+                            elif not end and now >= start:
+                                # If no end time, allow taking after start
+                                pass
+                            # Navigation-based start. Clicking Start Test opens the test page.
+                            if st.button(f"Start Test: {title}", key=f"start_test_{tid}"):
+                                st.session_state['active_test_id'] = tid
+                                st.session_state['nav_to_page'] = "🧪 Take Test"
+                                safe_rerun()
+                        else:
+                            st.info("This test is not currently available (check schedule)")
+        elif page == "🧪 Take Test":
+            st.title("🧪 Take Test")
+            test_id = st.session_state.get('active_test_id')
+            if not test_id:
+                st.info("No test selected. Go to 'Tests' to choose a test.")
+            else:
+                # Load test details
+                conn = db_connect()
+                cursor = conn.cursor()
+                cursor.execute('''SELECT t.id, t.title, t.description, t.start_ts, t.end_ts, t.proctored, s.name, s.year_level, s.department
+                                  FROM tests t JOIN subjects s ON t.subject_id = s.id
+                                  WHERE t.id = ?''', (test_id,))
+                trow = cursor.fetchone()
+                conn.close()
+                if not trow:
+                    st.error("Test not found")
+                else:
+                    tid, title, desc, start_ts, end_ts, proctored, subj_name, year_level, dept = trow
+                    st.subheader(f"{title} — {subj_name}")
+                    st.write(desc or "No description")
+                    now = datetime.now(ZoneInfo("Asia/Kolkata"))
+                    try:
+                        start = parse_iso_to_kolkata(start_ts) if start_ts else None
+                        end = parse_iso_to_kolkata(end_ts) if end_ts else None
+                    except Exception:
+                        start = None
+                        end = None
+
+                    # Availability checks
+                    if start and now < start:
+                        st.warning(f"This test will be available from {start.isoformat()}")
+                    elif end and now > end:
+                        st.warning("This test window has closed.")
+                    else:
+                        # Already attempted?
+                        attempts = get_test_attempts_for_student(st.session_state.user_id, tid)
+                        if attempts:
+                            st.info("You have already attempted this test. Your recent score:")
+                            for att in attempts:
+                                aid, ttid, score, started_at, submitted_at = att
+                                st.write(f"Attempt {aid}: Score {score} — Submitted: {submitted_at}")
+                            # Optional: Allow retake if needed
+                            if st.button("Retake Test", key=f"retake_{tid}"):
+                                # Let student retake by continuing to show questions
+                                pass
+                        # Render questions
+                        questions = get_test_questions(tid)
+                        if not questions:
+                            st.info("No questions have been added to this test yet. Contact the faculty to add questions.")
+                        else:
+                            answers = {}
+                            with st.form(f"attempt_form_{tid}"):
+                                st.write(f"Test: {title}")
+                                for q in questions:
+                                    opts = q['choices'] or []
+                                    sel = st.radio(q['text'], options=list(range(len(opts))), format_func=lambda i, opts=opts: opts[i] if i < len(opts) else "", key=f"q_{q['id']}_{tid}")
+                                    answers[str(q['id'])] = sel
+                                submitted = st.form_submit_button("Submit Test")
+                            if submitted:
+                                submitted_at_iso = datetime.now(ZoneInfo("Asia/Kolkata")).isoformat()
+                                started_at_iso = submitted_at_iso
+                                res = get_test_attempt_queue().submit(tid, st.session_state.user_id, answers, started_at=started_at_iso, submitted_at=submitted_at_iso)
+                                st.success(f"Test submitted. Score: {res['score']}")
+                                st.info(f"Submission reference: {res['submission_id'][:12]} | Submitted: {submitted_at_iso}")
+
+                                # CSV summary built from the submission itself, so the student can download it immediately
+                                attempt_row = {
+                                    'submission_id': res['submission_id'],
+                                    'test_id': tid,
+                                    'student_id': st.session_state.user_id,
+                                    'student_username': st.session_state.username,
+                                    'score': res['score'],
+                                    'started_at': started_at_iso,
+                                    'submitted_at': submitted_at_iso,
+                                    'answers': json.dumps(answers)
+                                }
+                                df_attempt = pd.DataFrame([attempt_row])
+                                csv_bytes = df_attempt.to_csv(index=False).encode('utf-8')
+                                st.download_button("Download Your Attempt (CSV)", data=csv_bytes, file_name=f"test_{tid}_attempt_{res['submission_id'][:12]}.csv", mime='text/csv')
+
+        elif page == "💰 Credit Calculator":
+            st.title("💰 Credit Calculator")
+            
+            # Get student's info
+            user = get_user_by_username(st.session_state.username) if st.session_state.username else None
+            user_id = user[0] if user else None
+            
+            conn = db_connect()
+            cursor = conn.cursor()
+            cursor.execute('SELECT id, username, name, branch, class FROM users WHERE id = ? AND role = ?', (user_id, 'student'))
+            student_info = cursor.fetchone()
+            conn.close()
+            
+            if not student_info:
+                st.error("Student information not found")
+            else:
+                student_id, student_username, student_name, student_branch, student_class = student_info
+                st.info(f"**{student_name}** ({student_branch} - {student_class})")
+                
+                st.markdown("---")
+                st.subheader("Calculate Your Credit Progress")
+                
+                # Step 1: Select Category and Class
+                col1, col2 = st.columns(2)
+                with col1:
+                    category = st.selectbox("Select Category", ["From First Year", "From Direct Second Year"], key="credit_category")
+                with col2:
+                    class_select = st.selectbox("Select Class", ["FY", "SY", "TY", "B.Tech"], key="credit_class")
+                
+                st.markdown("---")
+                
+                # Credit calculation by category & class
+                def _clean_key(s: str) -> str:
+                    return s.replace(" ", "_").replace(".", "_")
+
+                sems = None
+                factor = 0.0
+                label = ""
+                # TY - Direct Second Year -> sem 3 & 4 with 60% threshold
+                if class_select == "TY" and category == "From Direct Second Year":
+                    sems = [3, 4]
+                    factor = 0.60
+                    label = "Semester 3 & 4"
+                # TY - From First Year -> sem 1,2,3,4 with 80% threshold
+                elif class_select == "TY" and category == "From First Year":
+                    sems = [1, 2, 3, 4]
+                    factor = 0.80
+                    label = "Semester 1 - 4"
+                # B.Tech - Direct Second Year -> sem 3,4,5,6 with 80% threshold
+                elif class_select == "B.Tech" and category == "From Direct Second Year":
+                    sems = [3, 4, 5, 6]
+                    factor = 0.80
+                    label = "Semester 3 - 6"
+                # B.Tech - From First Year -> sem 1-6 with 86% threshold
+                elif class_select == "B.Tech" and category == "From First Year":
+                    sems = [1, 2, 3, 4, 5, 6]
+                    factor = 0.86
+                    label = "Semester 1 - 6"
+                # SY - From First Year -> sem 1 & 2 with 60% threshold
+                elif class_select == "SY" and category == "From First Year":
+                    sems = [1, 2]
+                    factor = 0.60
+                    label = "Semester 1 & 2"
+                # FY - From First Year -> sem 1 & 2 (assuming same thresholds as SY)
+                elif class_select == "FY" and category == "From First Year":
+                    sems = [1, 2]
+                    factor = 0.60
+                    label = "Semester 1 & 2"
+                else:
+                    sems = None
+
+                if sems:
+                    st.subheader(label + " Credits")
+                    totals = {}
+                    earned = {}
+
+                    # Render sem inputs in pairs per row for clarity
+                    for i in range(0, len(sems), 2):
+                        cols = st.columns(2)
+                        for j in range(2):
+                            if i + j < len(sems):
+                                sem = sems[i + j]
+                                with cols[j]:
+                                    st.write(f"**Semester {sem}**")
+                                    t_key_raw = f"sem{sem}_total_{class_select}_{category}"
+                                    e_key_raw = f"sem{sem}_earned_{class_select}_{category}"
+                                    t_key = _clean_key(t_key_raw)
+                                    e_key = _clean_key(e_key_raw)
+                                    totals[sem] = st.number_input(f"Sem {sem} - Total Credits (as per syllabus)", min_value=0, value=0, step=1, key=t_key)
+                                    earned[sem] = st.number_input(f"Sem {sem} - Credits Earned", min_value=0, value=0, step=1, key=e_key)
+
+                    if st.button("Calculate Credits", use_container_width=True, type="primary"):
+                        total_sem_credits = sum(totals.values())
+                        total_earned = sum(earned.values())
+                        threshold = total_sem_credits * factor
+                        percentage = (total_earned / total_sem_credits * 100) if total_sem_credits > 0 else 0
+                        promoted = total_earned >= threshold
+
+                        st.divider()
+                        col1, col2, col3 = st.columns(3)
+                        with col1:
+                            st.metric("Total Credits (Selected Semesters)", f"{total_sem_credits}")
+                        with col2:
+                            st.metric("Credits Earned", f"{total_earned}")
+                        with col3:
+                            st.metric("Progress", f"{percentage:.1f}%")
+
+                        st.progress(min(percentage / 100, 1.0))
+                        st.info(f"Promotion threshold: {factor * 100:.0f}% ({threshold:.1f} credits)")
+                        if promoted:
+                            st.success("🎉 Promoted - You have reached the required credits.")
+                        else:
+                            remaining = max(threshold - total_earned, 0)
+                            st.warning(f"⚠️ Not promoted - You need {remaining:.1f} more credits to reach {factor * 100:.0f}%")
+                else:
+                    st.info("Please select a valid combination of category and class to view credit details.")
+
+# Faculty pages
+    elif st.session_state.role == 'faculty':
+        if page == "ℹ️ About":
+            st.title("About This System")
+            st.markdown("""
+            ### VVPIET Student Learning Management System
+            
+            This system allows students to provide structured feedback to faculty members.
+            
+            **Features:**
+            - Rate faculty on multiple dimensions (1-10 scale)
+            - 5 specific evaluation criteria
+            - Overall rating
+            - Anonymous feedback option
+            
+            **Questions:**
+            1. Teaching Quality and Delivery
+            2. Course Content Clarity and Organization
+            3. Communication and Interaction Skills
+            4. Quality of Feedback and Evaluation
+            5. Subject Knowledge and Expertise
+            """)
+
+        elif page == "📅 Mark Attendance":
+            st.title("📅 Mark Student Attendance — Monthly (Deprecated)")
+            st.markdown("The monthly attendance entry was replaced by a daily attendance workflow.")
+            st.warning("Please use the '🧾 Daily Attendance' page to mark students present/absent. Monthly rollups and downloads are available there.")
+            if st.button("Go to Daily Attendance", use_container_width=True):
+                st.session_state['nav_to_page'] = "🧾 Daily Attendance"
+                safe_rerun()
+        
+        elif page == "🧾 Daily Attendance":
+            st.title("🧾 Daily Attendance - Faculty")
+            faculty_info = get_faculty_details(st.session_state.user_id)
+            if not faculty_info:
+                st.error("Faculty information not found")
+            else:
+                faculty_id, faculty_name, faculty_branch = faculty_info
+                st.info(f"**You are:** {faculty_name} ({faculty_branch})")
+                subjects = get_faculty_subjects(faculty_id)
+                if not subjects:
+                    st.info("No subjects assigned. Please ask admin to assign subjects.")
+                else:
+                    subj_map = {f"{s[1]} ({s[2]})": s for s in subjects}
+                    subj_choice = st.selectbox("Select Subject", options=list(subj_map.keys()))
+                    selected_subj = subj_map[subj_choice]
+                    selected_subj_id = selected_subj[0]
+                    selected_year = selected_subj[2]
+                    att_date = st.date_input("Attendance Date")
+                    students = get_students_by_branch_and_class(branch=faculty_branch, class_level=selected_year)
+                    if not students:
+                        st.info("No students found for this subject/branch.")
+                    else:
+                        st.markdown("**Daily Attendance Sheet — Mark present for each student:**")
+                        # Render a simple tabular view: Roll Number, Name, Present checkbox
+                        with st.form("daily_attendance_form"):
+                            cols = st.columns([2, 2, 4, 2])
+                            cols[0].write("**Roll Number**")
+                            cols[1].write("**Username**")
+                            cols[2].write("**Student Name**")
+                            cols[3].write("**Present**")
+                            present_ids = []
+                            # Use a predictable key per student to preserve checkbox state during reruns
+                            for s in students:
+                                sid = s[0]
+                                username = s[1] or ''
+                                name = s[2] or ''
+                                roll = s[3] or 'N/A'
+                                c1, c2, c3, c4 = st.columns([2, 2, 4, 2])
+                                c1.write(f"{roll}")
+                                c2.write(f"{username}")
+                                c3.write(f"{name}")
+                                checked = c4.checkbox("", key=f"att_{selected_subj_id}_{att_date.isoformat()}_{sid}")
+                                if checked:
+                                    present_ids.append(sid)
+
+                            submit_att = st.form_submit_button("Save Daily Attendance")
+                            if submit_att:
+                                date_str = att_date.isoformat()
+                                # Daily records, monthly rollup and users.attendance in one transaction
+                                try:
+                                    result = save_daily_attendance_bulk(faculty_id, selected_subj_id, date_str,
+                                                                        [s[0] for s in students], present_ids)
+                                    st.success(f"Daily attendance saved for {result['students']} students "
+                                               f"({result['present']} present) and monthly rollup updated.")
+                                    t = result['timings']
+                                    st.caption(f"Saved in {t['total_ms']:.0f} ms (daily {t['daily_ms']:.0f} ms, "
+                                               f"rollup {t['rollup_ms']:.0f} ms, overall % {t['users_ms']:.0f} ms)")
+                                except Exception as e:
+                                    st.error(f"Failed to save daily attendance: {e}")
+                        # Monthly download portal
+                        st.divider()
+                        st.subheader("📥 Monthly Attendance Report")
+                        colm1, colm2 = st.columns(2)
+                        with colm1:
+                            dl_month = st.number_input("Report Month", min_value=1, max_value=12, value=att_date.month)
+                        with colm2:
+                            dl_year = st.number_input("Report Year", min_value=2020, max_value=2030, value=att_date.year)
+                        if st.button("Generate Monthly CSV", use_container_width=True):
+                            rows = get_monthly_attendance_rollup(faculty_id, selected_subj_id, dl_month, dl_year)
+                            if not rows:
+                                st.info("No attendance records found for this month.")
+                            else:
+                                # Build CSV with roll_number
+                                csv_data = []
+                                import io
+                                for student_id, classes_attended, total_classes in rows:
+                                    conn = db_connect()
+                                    cur = conn.cursor()
+                                    cur.execute('SELECT username, name, roll_number FROM users WHERE id = ?', (student_id,))
+                                    u = cur.fetchone()
+                                    conn.close()
+                                    username = u[0] if u else 'unknown'
+                                    name = u[1] if u else 'unknown'
+                                    roll = u[2] if u and len(u) > 2 else 'N/A'
+                                    pct = (classes_attended / total_classes * 100) if total_classes > 0 else 0
+                                    csv_data.append({'roll_number': roll, 'username': username, 'name': name, 'classes_attended': classes_attended, 'total_classes': total_classes, 'percentage': f"{pct:.1f}%"})
+                                df = pd.DataFrame(csv_data)
+                                csv_bytes = df.to_csv(index=False).encode('utf-8')
+                                st.download_button("Download CSV", data=csv_bytes, file_name=f"attendance_{selected_subj[1]}_{dl_year}_{dl_month}.csv")
+        
+        elif page == "📒 Daily LER":
+            st.title("📒 Daily LER (Lecture Entry Register)")
+            faculty_info = get_faculty_details(st.session_state.user_id)
+            if not faculty_info:
+                st.error("Faculty information not found")
+            else:
+                faculty_id, faculty_name, faculty_branch = faculty_info
+                st.info(f"**You are:** {faculty_name} ({faculty_branch})")
+                subjects = get_faculty_subjects(faculty_id)
+                if not subjects:
+                    st.info("No subjects assigned. Please ask admin to assign subjects.")
+                else:
+                    subj_map = {f"{s[1]} ({s[2]})": s for s in subjects}
+                    subj_choice = st.selectbox("Select Subject", options=list(subj_map.keys()))
+                    selected_subj = subj_map[subj_choice]
+                    selected_subj_id = selected_subj[0]
+                    selected_year = selected_subj[2]
+
+                    ler_date = st.date_input("Lecture Date")
+                    # Manual time entry: do NOT auto-fill system time. Faculty should enter time themselves.
+                    ler_time_str = st.text_input("Lecture Time (optional) — enter as HH:MM (24-hour)", value="", placeholder="e.g., 10:30")
+
+                    # Determine students for this subject/branch
+                    students = get_students_by_branch_and_class(branch=faculty_branch, class_level=selected_year)
+                    date_str = ler_date.isoformat()
+
+                    # Compute present ids from daily_attendance table and absent roll numbers
+                    present_ids = get_present_student_ids_for_date(faculty_id, selected_subj_id, date_str)
+                    total_present = len(present_ids)
+                    absent_rolls = []
+                    if students:
+                        for s in students:
+                            sid = s[0]
+                            roll = s[3] or ''
+                            if sid not in present_ids:
+                                absent_rolls.append(str(roll))
+                    absent_rolls_str = ", ".join([r for r in absent_rolls if r])
+
+                    st.markdown("**Auto-filled attendance summary (from Daily Attendance):**")
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        st.metric("Total Present", f"{total_present}")
+                    with col2:
+                        st.write("**Absent Roll Numbers**")
+                        st.text_area("Absent Roll Numbers (auto)", value=absent_rolls_str, height=80, key=f"ler_absent_{selected_subj_id}_{date_str}")
+
+                    st.markdown("---")
+                    with st.form("daily_ler_form"):
+                        topic = st.text_input("Subject Topic Covered")
+                        lecture_number = st.text_input("Lecture Number (e.g., Lecture 5)")
+                        percent_syllabus = st.number_input("% of Syllabus Covered", min_value=0.0, max_value=100.0, value=0.0, step=0.5)
+                        sign = st.text_input("Sign (Faculty Name / Initials)", value=faculty_name)
+                        remark = st.text_area("Remark (optional)")
+                        submit_ler = st.form_submit_button("Save Daily LER Entry")
+
+                    if submit_ler:
+                        # Use manually entered time string (if provided) rather than system time
+                        time_str = ler_time_str.strip() if ler_time_str else ''
+                        lid = save_daily_ler(faculty_id, selected_subj_id, date_str, time_str, topic, lecture_number, float(percent_syllabus), int(total_present), absent_rolls_str, sign, remark)
+                        if lid:
+                            st.success(f"Daily LER entry saved (ID: {lid})")
+                        else:
+                            st.error("Failed to save Daily LER entry")
+        elif page == "📚 Upload Resources":
+            st.title("📚 Upload Assignments & Notes")
+            # Get faculty info
+            faculty_info = get_faculty_details(st.session_state.user_id)
+            if not faculty_info:
+                st.error("Faculty information not found")
+            else:
+                faculty_id, faculty_name, faculty_branch = faculty_info
+                # Get subjects taught by this faculty
+                ref = get_reference_snapshot()
+                faculty_subjects = [s for y in ref.faculty_year_levels(faculty_id) for s in ref.subjects_for(faculty_branch, y)]
+                if not faculty_subjects:
+                    st.warning(f"You have no subjects assigned yet. Contact admin to assign subjects.")
+                else:
+                    st.subheader("Upload Assignment or Notes")
+                    # Faculty: Create Notice feature
+                    with st.expander("📢 Create Notice (Faculty)"):
+                        n_title = st.text_input("Notice Title (Faculty)", key="fac_notice_title")
+                        n_content = st.text_area("Notice Content (Faculty)", key="fac_notice_content")
+                        branches = get_branches() or ["All"]
+                        target_branch = st.selectbox("Target Branch (All to show to all)", options=["All"] + branches, key="fac_notice_branch")
+                        target_class = st.selectbox("Target Class (All to show to all)", options=["All", "FY", "SY", "TY", "Final Year"], key="fac_notice_class")
+                        if st.button("Publish Notice (Faculty)", use_container_width=True):
+                            tb = None if target_branch == "All" else target_branch
+                            tc = None if target_class == "All" else target_class
+                            nid = create_notice(n_title, n_content, target_branch=tb, target_class=tc, created_by_role='faculty', created_by_id=faculty_id)
+                            if nid:
+                                st.success("Notice published successfully")
+                            else:
+                                st.error("Failed to publish notice")
+                    # Select subject
+                    subject_options = {f"{s[1]} ({s[2]})": s[0] for s in faculty_subjects}
+                    selected_subject_name = st.selectbox("Select Subject *", options=list(subject_options.keys()))
+                    selected_subject_id = subject_options[selected_subject_name]
+                    # Select resource type
+                    resource_type = st.radio("Resource Type *", options=["Assignment", "Notes"], horizontal=True)
+                    # Upload file
+                    uploaded_file = st.file_uploader(f"Upload {resource_type} File", type=['pdf', 'docx', 'doc', 'txt', 'pptx', 'zip'])
+                    # For assignments, add deadline
+                    deadline = None
+                    if resource_type == "Assignment":
+                        st.subheader("Assignment Deadline (Optional)")
+                        deadline_date = st.date_input("Deadline Date")
+                        deadline_time = st.time_input("Deadline Time")
+                        if deadline_date and deadline_time:
+                            from datetime import datetime
+                            deadline = datetime.combine(deadline_date, deadline_time).isoformat()
+                    if st.button("Upload", use_container_width=True):
+                        if not uploaded_file:
+                            st.error("Please select a file to upload")
+                        else:
+                            try:
+                                uploaded_file.seek(0)
+                                rid = add_faculty_resource(
+                                    faculty_id, 
+                                    selected_subject_id,
+                                    resource_type.lower(),
+                                    uploaded_file.name,
+                                    uploaded_file,
+                                    deadline
+                                )
+                                if rid:
+                                    st.success(f"✓ {resource_type} uploaded successfully!")
+                                else:
+                                    st.error("Error saving to database")
+                            except Exception as e:
+                                st.error(f"Error uploading file: {str(e)}")
+                    # Show uploaded resources
+                    st.divider()
+                    st.subheader("Your Uploaded Resources")
+                    resources = get_faculty_resources(faculty_id)
+                    if resources:
+                        for res in resources:
+                            res_id, subj_id, res_type, filename, uploaded_at, deadline = res
+                            subj_name = ref.subject_name(subj_id, "Unknown")
+                            col1, col2 = st.columns([4, 1])
+                            col1.write(f"📄 {filename} ({res_type.capitalize()}) — {subj_name}")
+                            if deadline:
+                                col1.caption(f"Deadline: {deadline}")
+                            col1.caption(f"Uploaded: {uploaded_at}")
+                            if col2.button("🗑️", key=f"delete_resource_{res_id}", help="Delete resource"):
+                                if delete_faculty_resource(res_id):
+                                    st.success(f"Deleted {filename}")
+                                    safe_rerun()
+                                else:
+                                    st.error("Error deleting resource")
+                    else:
+                        st.info("No resources uploaded yet")
+        
+        elif page == "🧪 Create Test":
+            st.title("🧪 Create Test - Faculty")
+            faculty_info = get_faculty_details(st.session_state.user_id)
+            if not faculty_info:
+                st.error("Faculty information not found")
+            else:
+                faculty_id, faculty_name, faculty_branch = faculty_info
+                st.info(f"**You are:** {faculty_name} ({faculty_branch})")
+                subjects = get_faculty_subjects(faculty_id)
+                if not subjects:
+                    st.info("No subjects assigned. Please ask admin to assign subjects.")
+                else:
+                    subj_map = {f"{s[1]} ({s[2]})": s for s in subjects}
+                    subj_choice = st.selectbox("Select Subject for Test", options=list(subj_map.keys()))
+                    selected_subj = subj_map[subj_choice]
+                    selected_subj_id = selected_subj[0]
+                    with st.form("create_test_form"):
+                        title = st.text_input("Test Title")
+                        description = st.text_area("Description (optional)")
+                        col1, col2 = st.columns(2)
+                        with col1:
+                            start_date = st.date_input("Start date")
+                            start_time = st.time_input("Start time")
+                        with col2:
+                            end_date = st.date_input("End date")
+                            end_time = st.time_input("End time")
+                        proctored = st.checkbox("Proctored?", value=False)
+                        create_btn = st.form_submit_button("Create Test")
+                    if create_btn:
+                        start_dt = datetime.combine(start_date, start_time).replace(tzinfo=ZoneInfo("Asia/Kolkata"))
+                        end_dt = datetime.combine(end_date, end_time).replace(tzinfo=ZoneInfo("Asia/Kolkata"))
+                        start_ts = start_dt.isoformat()
+                        end_ts = end_dt.isoformat()
+                        if end_dt <= start_dt:
+                            st.error("End date/time must be after start date/time")
+                        else:
+                            test_id = create_test(faculty_id, selected_subj_id, title, description, start_ts, end_ts, proctored)
+                            if test_id:
+                                st.success(f"Test created (ID: {test_id}). You can now add questions.")
+                            else:
+                                st.error("Failed to create test.")
+                    st.markdown("---")
+                    st.subheader("Add Questions to a Test")
+                    conn = db_connect()
+                    cursor = conn.cursor()
+                    cursor.execute('SELECT id, title FROM tests WHERE faculty_id = ? ORDER BY created_at DESC', (faculty_id,))
+                    faculty_tests = cursor.fetchall()
+                    conn.close()
+                    if faculty_tests:
+                        test_options = {f"{t[1]} [ID: {t[0]}]": t[0] for t in faculty_tests}
+                        sel_display = st.selectbox("Select Test to add questions", options=list(test_options.keys()))
+                        sel_test_id = test_options[sel_display]
+                        with st.form("add_question_form"):
+                            q_text = st.text_area("Question Text")
+                            c1 = st.text_input("Choice 1")
+                            c2 = st.text_input("Choice 2")
+                            c3 = st.text_input("Choice 3")
+                            c4 = st.text_input("Choice 4")
+                            correct = st.selectbox("Correct Choice", options=[0,1,2,3], format_func=lambda i: f"Choice {i+1}")
+                            marks = st.number_input("Marks", min_value=1, value=1)
+                            add_q = st.form_submit_button("Add Question")
+                        if add_q:
+                            choices = [c1, c2, c3, c4]
+                            add_test_question(sel_test_id, q_text, choices, correct, marks)
+                            st.success("Question added to test.")
+                        st.markdown("---")
+                        st.subheader("Fix Answer Key & Regrade")
+                        st.caption("Correct a question's answer and recompute the scores of every attempt already submitted.")
+                        regrade_display = st.selectbox("Select Test to regrade", options=list(test_options.keys()), key="regrade_test_select")
+                        regrade_test_id = test_options[regrade_display]
+                        regrade_questions = get_test_questions(regrade_test_id)
+                        if not regrade_questions:
+                            st.info("This test has no questions yet.")
+                        else:
+                            with st.form(f"regrade_form_{regrade_test_id}"):
+                                new_key = {}
+                                for i, q in enumerate(regrade_questions, start=1):
+                                    opts = q['choices'] or []
+                                    current = _choice_index(q['correct'], 0)
+                                    new_key[q['id']] = st.selectbox(
+                                        f"Q{i}. {q['text']}", options=list(range(len(opts))),
+                                        index=current if 0 <= current < len(opts) else 0,
+                                        format_func=lambda i, opts=opts: f"Choice {i+1}: {opts[i]}",
+                                        key=f"regrade_q_{q['id']}")
+                                regrade_btn = st.form_submit_button("Save Key & Regrade")
+                            if regrade_btn:
+                                current_key = {q['id']: _choice_index(q['correct'], -2) for q in regrade_questions}
+                                changed_key = {qid: choice for qid, choice in new_key.items() if choice != current_key[qid]}
+                                try:
+                                    result = regrade_test(regrade_test_id, changed_key)
+                                except ValueError as e:
+                                    st.error(f"Regrade failed: {e}")
+                                else:
+                                    st.success(f"Regraded {result['attempts']} attempt(s): {result['changed']} score(s) changed, "
+                                               f"{result['questions_updated']} answer(s) corrected in {result['timings']['total_ms']:.0f} ms.")
+                        st.markdown("---")
+                        st.subheader("View Attempts for a Test")
+                        # Allow faculty to select one of their tests and view/download attempts
+                        attempts_test_display = st.selectbox("Select Test to view attempts", options=list(test_options.keys()), key="attempts_test_select")
+                        attempts_test_id = test_options[attempts_test_display]
+                        
+                        # Debug: Show which test is selected
+                        st.caption(f"Selected Test ID: {attempts_test_id}")
+                        
+                        attempts = get_test_attempts_for_test(attempts_test_id)
+                        if not attempts:
+                            st.info("ℹ️ No attempts submitted for this test yet. Students who have taken this test will appear here.")
+                            st.info("**Note:** Make sure the test is active (within start/end time) for students to take it.")
+                        else:
+                            st.success(f"✓ {len(attempts)} attempt(s) found")
+                            # Build DataFrame for display and download
+                            rows = []
+                            for a in attempts:
+                                aid, ttid, sid, answers_json, score, started_at, submitted_at, username, name = a
+                                rows.append({
+                                    'attempt_id': aid,
+                                    'test_id': ttid,
+                                    'student_id': sid,
+                                    'username': username,
+                                    'name': name,
+                                    'score': score,
+                                    'started_at': started_at,
+                                    'submitted_at': submitted_at,
+                                    'answers': answers_json
+                                })
+                            df_attempts = pd.DataFrame(rows)
+                            st.dataframe(df_attempts, use_container_width=True, hide_index=True)
+                            csv_bytes = df_attempts.to_csv(index=False).encode('utf-8')
+                            st.download_button("Download Attempts CSV", data=csv_bytes, file_name=f"test_{attempts_test_id}_attempts.csv", mime='text/csv')
+
+                            st.markdown("**Per-question breakdown**")
+                            answer_stats = get_question_answer_stats(attempts_test_id)
+                            if answer_stats:
+                                stats_questions = get_test_questions(attempts_test_id)
+                                choices_by_q = {q['id']: (i, q['choices'] or []) for i, q in enumerate(stats_questions, start=1)}
+                                breakdown = {}
+                                for qid, chosen, responses, correct in answer_stats:
+                                    number, opts = choices_by_q.get(qid, (None, []))
+                                    row = breakdown.setdefault(qid, {'question': f"Q{number}" if number else f"#{qid}", 'answered': 0, 'correct': 0})
+                                    row[f"Choice {chosen + 1}" + (f": {opts[chosen]}" if 0 <= chosen < len(opts) else "")] = responses
+                                    row['answered'] += responses
+                                    row['correct'] += correct or 0
+                                df_breakdown = pd.DataFrame(list(breakdown.values())).fillna(0)
+                                df_breakdown['% correct'] = (100 * df_breakdown['correct'] / df_breakdown['answered']).round(1)
+                                st.dataframe(df_breakdown, use_container_width=True, hide_index=True)
+                            else:
+                                st.caption("No per-question answers recorded for this test.")
+                    else:
+                        st.info("No tests created yet. Create a test above.")
+
+        elif page == "📄 Faculty Leaves":
+            st.title("📄 Faculty Leave Records")
+            faculty_info = get_faculty_details(st.session_state.user_id)
+            if not faculty_info:
+                st.error("Faculty information not found")
+            else:
+                faculty_id, faculty_name, faculty_branch = faculty_info
+                st.info(f"**You are:** {faculty_name} ({faculty_branch})")
+
+                # Show current usage / balances (CL=12, SL=6; DL/CO are not limited by default)
+                usage = get_faculty_leave_usage(faculty_id)
+                CL_used = usage.get('CL', 0)
+                SL_used = usage.get('SL', 0)
+                CL_total = 12
+                SL_total = 6
+                st.subheader("Leave Balances")
+                col1, col2 = st.columns(2)
+                col1.metric("CL", f"{CL_total - CL_used} remaining (used: {CL_used})")
+                col2.metric("SL", f"{SL_total - SL_used} remaining (used: {SL_used})")
+
+                # Leave request form
+                st.subheader("Request Leave")
+                with st.form("request_leave_form"):
+                    leave_type = st.selectbox("Leave Type", options=["CL", "SL", "CO", "DL"])
+                    duration_type = st.selectbox("Duration", options=["Half Day", "Full Day", "2 Days", "3 Days"])
+                    start_date = st.date_input("Start Date")
+                    end_date = st.date_input("End Date", value=start_date)
+                    is_half = True if duration_type == "Half Day" else False
+                    days_count = 0.5 if duration_type == "Half Day" else 1 if duration_type == "Full Day" else 2 if duration_type == "2 Days" else 3
+                    alt_faculty = st.text_input("Alternative Faculty (Name) - Optional")
+                    submit_leave = st.form_submit_button("Submit Leave")
+
+                if submit_leave:
+                    # Convert to strings for database
+                    # Use the faculty table id (faculty_id) — not the users table id
+                    res = submit_faculty_leave(faculty_id, leave_type, start_date.isoformat(), end_date.isoformat(), is_half_day=is_half, days_count=days_count, alt_faculty=alt_faculty)
+                    if res:
+                        st.success("Leave request submitted")
+                    else:
+                        st.error("Failed to submit leave request")
+
+                # Show leave history
+                leaves = get_faculty_leaves(faculty_id)
+                if leaves:
+                    st.subheader("Leave Requests History")
+                    for l in leaves:
+                        lid, fid, ltype, sdate, edate, is_half_day, dcount, alt, created_at = l
+                        st.write(f"{ltype} — {sdate} to {edate} — {dcount} days — Alt: {alt or 'N/A'} — Requested at {created_at}")
+                else:
+                    st.info("No leave requests found.")
+
+        elif page == "ℹ️ About":
+            st.title("About This System - Faculty View")
+            faculty_info = get_faculty_details(st.session_state.user_id)
+            if faculty_info:
+                faculty_id, faculty_name, faculty_branch = faculty_info
+                st.info(f"**Faculty Name:** {faculty_name}\n**Branch:** {faculty_branch}")
+                subjects = get_faculty_subjects(faculty_id)
+                if subjects:
+                    st.subheader("📚 Your Assigned Subjects")
+                    for subj in subjects:
+                        st.write(f"- {subj[1]} ({subj[2]})")
+                else:
+                    st.warning("No subjects assigned to you yet. Contact admin.")
+            st.markdown("""
+            ### VVPIET Student LMS - Faculty Features
+            **Your Responsibilities:**
+            - Mark student attendance for your subjects monthly
+            - View feedback received from students
+            - Track student performance through attendance data
+            **How to use:**
+            1. Go to "Mark Attendance" tab
+            2. Select your subject and class
+            3. Enter attendance data for each student in your branch
+            4. Save the records
+            Students with 60%+ attendance can submit feedback.
+            """)
+    
+    # Admin pages
+    elif st.session_state.role == 'admin':
+        if page == "📊 Dashboard":
+            st.title("📊 Admin Dashboard")
+            
+            overview = get_feedback_overview()
+            stats = get_faculty_stats()
+            feedbacks = get_all_feedback(limit=10)
+            
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Total Feedbacks", overview['responses'])
+            with col2:
+                avg_overall = overview['averages']['overall_rating'] or 0
+                st.metric("Average Rating", f"{avg_overall:.2f}/10")
+            with col3:
+                st.metric("Faculty Count", overview['faculty_count'])
+            
+            st.divider()
+            # Admin: Feedback scheduling UI
+            st.divider()
+            st.subheader("🗓️ Feedback Scheduling")
+            current_sched = get_current_feedback_schedule()
+            if current_sched:
+                st.info(f"Current feedback window: {current_sched[0]} to {current_sched[1]}")
+            else:
+                st.info("No feedback scheduled currently.")
+
+            with st.expander("Schedule new feedback window"):
+                col_s1, col_s2 = st.columns(2)
+                with col_s1:
+                    start_date = st.date_input("Start date")
+                    start_time = st.time_input("Start time")
+                with col_s2:
+                    end_date = st.date_input("End date", value=start_date)
+                    end_time = st.time_input("End time", value=start_time)
+
+                if st.button("Schedule Feedback", use_container_width=True):
+                    tz = ZoneInfo("Asia/Kolkata")
+                    start_dt = datetime.combine(start_date, start_time).replace(tzinfo=tz).isoformat()
+                    end_dt = datetime.combine(end_date, end_time).replace(tzinfo=tz).isoformat()
+                    schedule_feedback(start_dt, end_dt)
+                    st.success("Feedback scheduled successfully.")
+                    safe_rerun()
+
+            st.subheader("📈 Faculty Statistics")
+            
+            if stats:
+                df_stats = pd.DataFrame(stats, columns=['Faculty', 'Department', 'Year Level', 'Responses', 'Avg Rating'])
+                st.dataframe(df_stats, use_container_width=True, hide_index=True)
+            else:
+                st.info("No feedback data available yet")
+            
+            st.divider()
+            st.subheader("🔎 Search Comments")
+            search_text = st.text_input("Search feedback comments", key="fb_search_text",
+                                        placeholder="e.g. syllabus, lab*, punctual")
+            if search_text.strip():
+                page_size = 20
+                search_page = st.number_input("Results page", min_value=1, value=1, step=1, key="fb_search_page")
+                results, total = search_feedback_comments(search_text, search_page, page_size)
+                pages = max(1, -(-total // page_size))
+                st.caption(f"{total} matching comment(s) — page {min(search_page, pages)} of {pages}")
+                for fb_id, created_at, fac_name, department, subject, overall_rating, snippet in results:
+                    st.markdown(f"**{fac_name}** ({department}) · {subject} · Overall {overall_rating}/10 · "
+                                f"{format_ts_for_display(created_at, short=True)}")
+                    st.markdown(f"> {snippet}")
+
+            st.divider()
+            st.subheader("📋 Recent Submissions")
+
+            if feedbacks:
+                for fb in feedbacks:  # Show last 10
+                    # fb indices: 0:id,1:created_at,2:fac_name,3:department,4:year_level,5:student_name,
+                    # 6:q1,7:q2,8:q3,9:q4,10:q5,11:q6,12:q7,13:q8,14:q9,15:q10,16:overall,17:comments,18:subject
+                    created_disp = format_ts_for_display(fb[1], short=True)
+                    with st.expander(f"{fb[2]} ({fb[4]}) - {created_disp} (Overall: {fb[16]}/10)"):
+                        col1, col2 = st.columns(2)
+                        with col1:
+                            st.write(f"**Faculty:** {fb[2]}")
+                            st.write(f"**Department:** {fb[3]}")
+                            st.write(f"**Year Level:** {fb[4]}")
+                            st.write(f"**Subject:** {fb[18]}")
+                            st.write(f"**Student:** {fb[5]}")
+                            st.write(f"**Date:** {format_ts_for_display(fb[1])}")
+                        with col2:
+                            st.write(f"**Ratings:**")
+                            st.write(f"1. Fundamental Concepts & Subject Knowledge: {fb[6]}/10")
+                            st.write(f"2. Preparation for Subject: {fb[7]}/10")
+                            st.write(f"3. Knowledge of current trends/development: {fb[8]}/10")
+                            st.write(f"4. Proficient in English & communication: {fb[9]}/10")
+                            st.write(f"5. Teaching makes class interesting & interactive: {fb[10]}/10")
+                            st.write(f"6. Punctuality of faculty: {fb[11]}/10")
+                            st.write(f"7. Coverage of syllabus as prescribed: {fb[12]}/10")
+                            st.write(f"8. Fulfillment of your learning expectations: {fb[13]}/10")
+                            st.write(f"9. Behavior with students appropriate/rational: {fb[14]}/10")
+                            st.write(f"10. Motivates students for study & career: {fb[15]}/10")
+                        st.write(f"**Overall Rating:** {fb[16]}/10")
+                        st.write(f"**Comments:** {fb[17] or 'None'}")
+            else:
+                st.info("No feedback submitted yet")
+
+            # Student Access Control
+            st.divider()
+            st.subheader("🔒 Student Access Control")
+            st.caption("Grant submission access to students who meet attendance threshold")
+            students = get_all_students()
+            if students:
+                if st.button("Grant access to eligible students (attendance >= 60%)"):
+                    count = 0
+                    for s in students:
+                        if s[2] is not None and s[2] >= 60:
+                            set_student_access(s[0], True)
+                            count += 1
+                    st.success(f"Granted access to {count} student(s)")
+                    students = get_all_students()
+
+                # Show table and per-student controls
+                for s in students:
+                    sid, sname, satt, shas = s
+                    cols = st.columns([3,2,2])
+                    cols[0].write(f"**{sname}**")
+                    cols[1].write(f"Attendance: {satt}%")
+                    # checkbox to toggle access
+                    new_access = cols[2].checkbox("Has Access", value=bool(shas), key=f"access_{sid}")
+                    if new_access != bool(shas):
+                        set_student_access(sid, new_access)
+                        safe_rerun()
+            else:
+                st.info("No student accounts found")
+            
+            # Attendance by Faculty (admin view)
+            st.divider()
+            st.subheader("📚 Attendance by Faculty")
+            faculties_all = get_faculty_list()
+            fac_options = [f"{f[1]} ({f[2]})" for f in faculties_all] if faculties_all else []
+            fac_select = st.selectbox("Select Faculty to view students", options=["All"] + fac_options)
+
+            if fac_select and fac_select != "All":
+                fid = next((f[0] for f in faculties_all if f"{f[1]} ({f[2]})" == fac_select), None)
+                if fid:
+                    conn = get_db_connection()
+                    cur = conn.cursor()
+                    cur.execute("SELECT DISTINCT student_name FROM feedback WHERE faculty_id = ?", (fid,))
+                    rows = cur.fetchall()
+                    conn.close()
+            
+            # Admin: Daily LER export
+            st.divider()
+            st.subheader("📒 Daily LER Records")
+            all_fac = get_all_faculty()
+            fac_options = [f"{f[1]} ({f[2]}) [ID:{f[0]}]" for f in all_fac] if all_fac else []
+            sel_fac = st.selectbox("Filter by Faculty", options=["All"] + fac_options)
+            colf1, colf2 = st.columns(2)
+            with colf1:
+                date_from = st.date_input("From Date", value=None)
+            with colf2:
+                date_to = st.date_input("To Date", value=None)
+
+            ler_format = st.radio("Format", options=available_export_formats(), horizontal=True, key="ler_export_format")
+            if st.button("Generate Daily LER Export"):
+                fid_filter = None
+                if sel_fac and sel_fac != "All":
+                    # parse id from selection
+                    try:
+                        fid_filter = int(sel_fac.split("ID:")[-1].rstrip(']'))
+                    except Exception:
+                        fid_filter = None
+
+                dfrom = date_from.isoformat() if date_from else None
+                dto = date_to.isoformat() if date_to else None
+                export_download_button(f"📥 Download Daily LER ({ler_format})", daily_ler_export_spec(date_from=dfrom, date_to=dto, faculty_id=fid_filter),
+                                       f"daily_ler_{datetime.now().strftime('%Y%m%d_%H%M%S')}", ler_format)
+            
+        elif page == "🗂️ Faculty Leaves":
+            st.title("🗂️ Faculty Leave Management")
+            faculties_all = get_faculty_list()
+            if faculties_all:
+                fac_options = [f"{f[1]} ({f[2]})" for f in faculties_all]
+                sel = st.selectbox("Select Faculty", options=["All"] + fac_options)
+                if sel and sel != "All":
+                    fid = next((f[0] for f in faculties_all if f"{f[1]} ({f[2]})" == sel), None)
+                    if fid:
+                        leaves = get_faculty_leaves(fid)
+                        if not leaves:
+                            st.info("No leave records for this faculty.")
+                        else:
+                            st.subheader("Leave Records")
+                            for l in leaves:
+                                lid, fid, ltype, sdate, edate, is_half_day, days_count, alt, created_at = l
+                                st.write(f"{ltype} — {sdate} to {edate} — {days_count} days — Alt: {alt or 'N/A'} — Requested at: {created_at}")
+                            # Download CSV
+                            df = pd.DataFrame(leaves, columns=['id', 'faculty_id', 'leave_type', 'start_date', 'end_date', 'is_half_day', 'days_count', 'alt_faculty', 'created_at'])
+                            csv_bytes = df.to_csv(index=False).encode('utf-8')
+                            st.download_button("Download Leaves CSV", data=csv_bytes, file_name=f"faculty_{fid}_leaves.csv")
+                else:
+                    # Show all leaves across all faculty with download option
+                    all_leaves = get_faculty_leaves()
+                    if not all_leaves:
+                        st.info("No leave records found")
+                    else:
+                        df_all = pd.DataFrame(all_leaves, columns=['id', 'faculty_id', 'leave_type', 'start_date', 'end_date', 'is_half_day', 'days_count', 'alt_faculty', 'created_at'])
+                        # Join faculty names for readability
+                        fac_map = {f[0]: f[1] for f in faculties_all}
+                        df_all['faculty_name'] = df_all['faculty_id'].map(fac_map)
+                        st.dataframe(df_all[['faculty_name','leave_type','start_date','end_date','days_count','alt_faculty','created_at']], use_container_width=True, hide_index=True)
+                        csv_bytes = df_all.to_csv(index=False).encode('utf-8')
+                        st.download_button("Download All Faculty Leaves CSV", data=csv_bytes, file_name=f"faculty_leaves_all.csv", mime='text/csv')
+            else:
+                st.info("No faculty records found")
+
+            # Admin: Notices creation
+            st.divider()
+            st.subheader("📢 Notices")
+            with st.expander("Create new notice"):
+                n_title = st.text_input("Notice Title")
+                n_content = st.text_area("Notice Content")
+                branches = get_branches() or ["All"]
+                target_branch = st.selectbox("Target Branch (All to show to all)", options=["All"] + branches)
+                target_class = st.selectbox("Target Class (All to show to all)", options=["All", "FY", "SY", "TY", "Final Year"])
+                if st.button("Publish Notice", use_container_width=True):
+                    tb = None if target_branch == "All" else target_branch
+                    tc = None if target_class == "All" else target_class
+                    nid = create_notice(n_title, n_content, target_branch=tb, target_class=tc, created_by_role='admin', created_by_id=st.session_state.user_id)
+                    if nid:
+                        st.success("Notice published successfully")
+                    else:
+                        st.error("Failed to publish notice")
+
+                    if not rows:
+                        st.info("No feedback entries for this faculty yet.")
+                    else:
+                        total_att = 0
+                        count_att = 0
+                        st.markdown("Students who submitted feedback for this faculty:")
+                        for r in rows:
+                            sname = r[0]
+                            user = get_user_by_username(sname)
+                            if user:
+                                uid = user[0]
+                                attendance = user[3] if len(user) > 3 and user[3] is not None else 0
+                                cols = st.columns([3,2,2])
+                                cols[0].write(f"**{sname}**")
+                                new_att = cols[1].number_input("Attendance (%)", min_value=0, max_value=100, value=int(attendance), key=f"att_{uid}")
+                                if cols[2].button("Save", key=f"save_att_{uid}"):
+                                    update_student_attendance(uid, int(new_att))
+                                    st.success("Attendance updated")
+                                    safe_rerun()
+                                total_att += int(attendance)
+                                count_att += 1
+                            else:
+                                st.write(f"- {sname} (not registered)")
+
+                        if count_att:
+                            avg_att = total_att / count_att
+                            st.metric("Average Attendance (these students)", f"{avg_att:.1f}%")
+        
+        elif page == "👥 Student Attendance":
+            st.title("👥 Student Attendance Records")
+            st.markdown("View student attendance by year level and branch")
+            
+            # Admin: upload student roster (Excel)
+            st.subheader("Upload Student Roster (Excel)")
+            branches = get_branches() or []
+            if branches:
+                upload_branch = st.selectbox("Select Branch for these students", options=branches)
+            else:
+                upload_branch = st.text_input("Branch (enter department)")
+
+            uploaded_file = st.file_uploader("Upload Excel (.xls/.xlsx) with columns: sr. no., roll no., PRN number, name, class", type=['xls', 'xlsx', 'csv'])
+            if uploaded_file is not None:
+                try:
+                    # use pandas to read; allow csv as fallback
+                    if str(uploaded_file.name).lower().endswith('.csv'):
+                        df = pd.read_csv(uploaded_file)
+                    else:
+                        df = pd.read_excel(uploaded_file)
+
+                    # Normalize column names
+                    cols = {c.lower().strip(): c for c in df.columns}
+                    # Identify required columns
+                    col_name = None
+                    col_roll = None
+                    col_prn = None
+                    col_class = None
+                    for lc, orig in cols.items():
+                        if 'name' in lc and not col_name:
+                            col_name = orig
+                        if 'roll' in lc and not col_roll:
+                            col_roll = orig
+                        if 'prn' in lc and not col_prn:
+                            col_prn = orig
+                        if 'class' in lc and not col_class:
+                            col_class = orig
+
+                    if not col_name or not col_class:
+                        st.error('Uploaded file must contain at least student name and class columns.')
+                    else:
+                        # If branch was selected, apply to all rows
+                        df['branch'] = upload_branch
+                        # Use roll/prn where available
+                        if col_roll:
+                            df['roll_number'] = df[col_roll].astype(str)
+                        else:
+                            df['roll_number'] = df[col_prn].astype(str) if col_prn else ''
+                        df['prn'] = df[col_prn].astype(str) if col_prn else ''
+                        df['student_name'] = df[col_name].astype(str)
+                        df['class'] = df[col_class].astype(str)
+
+                        # Sort by class
+                        df_sorted = df.sort_values(by=['class', 'student_name'])
+
+                        st.info(f"Preview: {len(df_sorted)} rows — will be assigned to branch: {upload_branch}")
+                        st.dataframe(df_sorted.head(50))
+
+                        if st.button('Import Students from Excel'):
+                            inserted = 0
+                            updated = 0
+                            for _, row in df_sorted.iterrows():
+                                name = str(row.get('student_name') or '').strip()
+                                roll = str(row.get('roll_number') or '').strip()
+                                prn = str(row.get('prn') or '').strip()
+                                cls = str(row.get('class') or '').strip()
+                                branch_val = str(row.get('branch') or upload_branch or '').strip()
+
+                                if not name:
+                                    continue
+
+                                # Determine username: prefer PRN, then roll, then generated
+                                username_candidate = prn or roll or None
+                                conn = db_connect()
+                                cur = conn.cursor()
+                                user_id = None
+                                if roll:
+                                    cur.execute('SELECT id FROM users WHERE roll_number = ? AND role = ?', (roll, 'student'))
+                                    r = cur.fetchone()
+                                    if r:
+                                        user_id = r[0]
+                                if not user_id and username_candidate:
+                                    cur.execute('SELECT id FROM users WHERE username = ? AND role = ?', (username_candidate, 'student'))
+                                    r = cur.fetchone()
+                                    if r:
+                                        user_id = r[0]
+
+                                if user_id:
+                                    # Update existing
+                                    try:
+                                        cur.execute('''UPDATE users SET name = ?, branch = ?, class = ?, roll_number = ? WHERE id = ?''', (name, branch_val, cls, roll, user_id))
+                                        conn.commit()
+                                        updated += 1
+                                    except Exception:
+                                        pass
+                                else:
+                                    # Create a new student user. Ensure unique username
+                                    base_username = username_candidate or (roll or name.replace(' ', '_')).lower()
+                                    username = base_username
+                                    i = 1
+                                    while True:
+                                        try:
+                                            pw = hash_password('student123')
+                                            cur.execute('INSERT INTO users (username, password, role, name, roll_number, branch, class) VALUES (?, ?, ?, ?, ?, ?, ?)', (username, pw, 'student', name, roll, branch_val, cls))
+                                            conn.commit()
+                                            inserted += 1
+                                            break
+                                        except sqlite3.IntegrityError:
+                                            # username exists, try suffix
+                                            username = f"{base_username}_{i}"
+                                            i += 1
+                                        except Exception:
+                                            break
+                                conn.close()
+
+                            invalidate_tables('users')
+                            st.success(f"Import finished — inserted: {inserted}, updated: {updated}")
+                except Exception as e:
+                    st.error(f"Failed to read uploaded file: {str(e)}")
+
+            # Admin: rebuild monthly rollups from daily attendance (e.g. after data fixes)
+            with st.expander("🔁 Recompute Monthly Rollups"):
+                now_local = datetime.now(ZoneInfo("Asia/Kolkata"))
+                rc1, rc2 = st.columns(2)
+                with rc1:
+                    rc_month = st.number_input("Month", min_value=1, max_value=12, value=now_local.month, key="rollup_month")
+                with rc2:
+                    rc_year = st.number_input("Year", min_value=2020, max_value=2030, value=now_local.year, key="rollup_year")
+                if st.button("Recompute Rollups for Month", use_container_width=True):
+                    try:
+                        result = recompute_monthly_rollups(int(rc_year), int(rc_month))
+                        st.success(f"Recomputed {result['rollup_rows']} monthly attendance rows in {result['elapsed_ms']:.0f} ms")
+                    except Exception as e:
+                        st.error(f"Failed to recompute rollups: {e}")
+
+            col1, col2 = st.columns(2)
+            year_levels = ['All', 'FY', 'SY', 'TY', 'Final Year']
+            branches = ['All'] + get_branches()
+            
+            with col1:
+                selected_year_filter = st.selectbox("Filter by Year Level", options=year_levels)
+            with col2:
+                selected_branch_filter = st.selectbox("Filter by Branch", options=branches)
+            
+            year_param = selected_year_filter if selected_year_filter != 'All' else None
+            branch_param = selected_branch_filter if selected_branch_filter != 'All' else None
+            
+            attendance_records = get_attendance_by_year_and_branch(year_level=year_param, branch=branch_param)
+            
+            if attendance_records:
+                # Group and display
+                st.subheader(f"Attendance Records - {selected_year_filter} | {selected_branch_filter}")
+                
+                # Create display DataFrame
+                display_data = []
+                for record in attendance_records:
+                    sid, student_name, attended, total, subject, faculty, branch = record
+                    if total > 0:
+                        percentage = round((attended / total) * 100, 2)
+                    else:
+                        percentage = 0
+                    
+                    display_data.append({
+                        'Student ID': sid,
+                        'Student Name': student_name,
+                        'Subject': subject,
+                        'Faculty': faculty,
+                        'Branch': branch,
+                        'Classes Attended': attended,
+                        'Total Classes': total,
+                        'Attendance %': percentage
+                    })
+                
+                if display_data:
+                    df = pd.DataFrame(display_data)
+                    
+                    # Display as table
+                    st.dataframe(df, use_container_width=True, hide_index=True)
+                    
+                    # Summary statistics
+                    st.divider()
+                    st.subheader("Summary Statistics")
+                    col1, col2, col3 = st.columns(3)
+                    
+                    avg_attendance = df['Attendance %'].mean() if len(df) > 0 else 0
+                    eligible_count = len(df[df['Attendance %'] >= 60])
+                    total_count = len(df)
+                    
+                    with col1:
+                        st.metric("Average Attendance", f"{avg_attendance:.1f}%")
+                    with col2:
+                        st.metric("Eligible for Feedback (>=60%)", f"{eligible_count}/{total_count}")
+                    with col3:
+                        st.metric("Ineligible (<60%)", f"{total_count - eligible_count}/{total_count}")
+                    
+                    # Filter by attendance status
+                    st.divider()
+                    st.subheader("Filtered View")
+                    status_filter = st.radio("Show Students with:", options=["All", ">=60% Attendance (Eligible)", "<60% Attendance (Ineligible)"], horizontal=True)
+                    
+                    if status_filter == ">=60% Attendance (Eligible)":
+                        filtered_df = df[df['Attendance %'] >= 60]
+                    elif status_filter == "<60% Attendance (Ineligible)":
+                        filtered_df = df[df['Attendance %'] < 60]
+                    else:
+                        filtered_df = df
+                    
+                    st.dataframe(filtered_df, use_container_width=True, hide_index=True)
+                    
+                    # Download option
+                    pct_bounds = {">=60% Attendance (Eligible)": (60, None), "<60% Attendance (Ineligible)": (None, 60)}.get(status_filter, (None, None))
+                    attendance_format = st.radio("Format", options=available_export_formats(), horizontal=True, key="attendance_export_format")
+                    if st.button("Generate Attendance Export", key="generate_attendance_export"):
+                        export_download_button(f"📥 Download as {attendance_format}", attendance_export_spec(year_param, branch_param, *pct_bounds),
+                                               f"attendance_{datetime.now().strftime('%Y%m%d_%H%M%S')}", attendance_format)
+                else:
+                    st.info("No attendance records found")
+            else:
+                st.info("No attendance data available. Faculty members need to mark attendance first.")
+        
+        elif page == "📚 Manage Subjects":
+            st.title("📚 Assign Subjects to Faculty")
+            st.markdown("Manage which subjects each faculty member teaches")
+            
+            faculties = get_all_faculty_with_users()
+            subjects = get_all_subjects()
+
+            # Add Subject to DB form (always available to admin)
+            st.subheader("Add Subject to Database")
+            st.caption("Create a new subject record. Subjects are not pre-populated by default.")
+
+            branches = get_branches()
+            if branches:
+                add_branch = st.selectbox("Department/Branch *", options=branches)
+            else:
+                add_branch = st.text_input("Department/Branch *")
+
+            add_year_levels = get_year_levels()
+            if not add_year_levels:
+                add_year_levels = ['FY', 'SY', 'TY', 'Final Year']
+            add_year = st.selectbox("Class/Year Level *", options=add_year_levels)
+
+            add_subject_name = st.text_input("Subject Name *")
+            add_subject_code = st.text_input("Subject Code (optional)")
+
+            if st.button("Add Subject to DB", use_container_width=True):
+                if not add_subject_name or not add_branch or not add_year:
+                    st.error("Please provide Subject Name, Department and Class/Year Level")
+                else:
+                    try:
+                        sid = add_subject(add_subject_name.strip(), add_year, add_branch.strip(), add_subject_code.strip() if add_subject_code else None)
+                        if sid:
+                            st.success(f"✓ Subject '{add_subject_name}' added (ID: {sid})")
+                            subjects = get_all_subjects()
+                        else:
+                            st.error("Error adding subject. It may already exist or violate a constraint.")
+                    except Exception as e:
+                        st.error(f"Error adding subject: {str(e)}")
+
+            st.divider()
+
+            # Remove Subject from DB
+            st.subheader("Remove Subject from Database")
+            st.caption("Delete a subject record and all its faculty assignments")
+            
+            if subjects:
+                subject_options = {f"{s[1]} ({s[2]}) [Code: {s[4] or 'N/A'}]": s[0] for s in subjects}
+                remove_subject_display = st.selectbox("Select subject to delete *", options=list(subject_options.keys()), key="remove_subj")
+                
+                if st.button("Delete Subject", use_container_width=True, key="btn_delete_subj"):
+                    remove_subj_id = subject_options[remove_subject_display]
+                    if delete_subject(remove_subj_id):
+                        st.success(f"✓ Subject deleted successfully")
+                        subjects = get_all_subjects()
+                        st.rerun()
+                    else:
+                        st.error("Error deleting subject")
+            else:
+                st.info("No subjects in database to remove")
+
+            st.divider()
+
+            st.subheader("Assign Subjects to Faculty")
+            st.caption("Link subjects to each faculty member for feedback collection")
+            
+            if not faculties:
+                st.warning("No faculty members found in the system")
+            else:
+                # Create two columns: faculty selection and subject management
+                col1, col2 = st.columns([2, 3])
+
+                with col1:
+                    st.subheader("Select Faculty")
+                    faculty_names = [f"{f[1]} ({f[2]})" for f in faculties]
+                    selected_faculty_display = st.selectbox("Choose a faculty member:", options=faculty_names)
+                    selected_faculty_id = next((f[0] for f in faculties if f"{f[1]} ({f[2]})" == selected_faculty_display), None)
+
+                if selected_faculty_id:
+                    with col2:
+                        st.subheader("Assigned Subjects")
+                        assigned_subject_ids = get_faculty_subjects_with_ids(selected_faculty_id)
+
+                        # Display assigned subjects
+                        assigned_subjects = [s for s in subjects if s[0] in assigned_subject_ids] if subjects else []
+                        if assigned_subjects:
+                            for subj in assigned_subjects:
+                                col1_sub, col2_sub = st.columns([4, 1])
+                                # subj: (id, name, year_level, department, code)
+                                subj_display = f"{subj[1]} ({subj[2]})"
+                                if subj[3]:
+                                    subj_display += f" — {subj[3]}"
+                                if subj[4]:
+                                    subj_display += f" [{subj[4]}]"
+                                col1_sub.write(f"✓ {subj_display}")
+                                if col2_sub.button("Remove", key=f"remove_{subj[0]}"):
+                                    remove_subject_from_faculty(selected_faculty_id, subj[0])
+                                    st.success(f"Removed '{subj[1]}' from {selected_faculty_display}")
+                                    st.rerun()
+                        else:
+                            st.info("No subjects assigned yet")
+
+                    # Add new subject section
+                    st.divider()
+                    st.subheader("Assign Existing Subject to Faculty")
+
+                    available_subjects = [s for s in subjects if s[0] not in assigned_subject_ids] if subjects else []
+                    if available_subjects:
+                        subject_options = {f"{s[1]} ({s[2]})": s[0] for s in available_subjects}
+                        selected_subject_display = st.selectbox("Select subject to add:", options=list(subject_options.keys()))
+
+                        if st.button("Assign Subject", use_container_width=True):
+                            selected_subject_id = subject_options[selected_subject_display]
+                            if assign_subject_to_faculty(selected_faculty_id, selected_subject_id):
+                                st.success(f"✓ '{selected_subject_display}' assigned to {selected_faculty_display}")
+                                st.rerun()
+                    else:
+                        st.info("No subjects available in the database. Use 'Add Subject to Database' above to create subjects.")
+        
+        elif page == "👨‍🏫 Manage Faculty":
+            st.title("👨‍🏫 Manage Faculty Year Levels")
+            
+            all_faculty = get_all_faculty()
+            
+            if all_faculty:
+                st.subheader("Faculty Teaching Schedule")
+                st.caption("Manage which year levels each faculty teaches")
+                
+                # Create a dataframe for better display
+                faculty_df = pd.DataFrame(all_faculty, columns=['ID', 'Name', 'Department', 'Primary Year'])
+                
+                # Display current faculty
+                st.write("**Current Faculty:**")
+                st.dataframe(faculty_df, use_container_width=True, hide_index=True)
+                
+                st.divider()
+                
+                # Manage faculty year levels
+                st.subheader("Add/Remove Year Level Assignments")
+                
+                faculty_options = {f"{f[1]} ({f[2]}) [ID: {f[0]}]": f[0] for f in all_faculty}
+                
+                selected_faculty_display = st.selectbox("Select Faculty *", options=faculty_options.keys())
+                selected_faculty_id = faculty_options[selected_faculty_display]
+                
+                # Show current year level assignments for this faculty
+                current_levels = get_faculty_year_levels(selected_faculty_id)
+                st.info(f"**Currently teaches:** {', '.join(current_levels) if current_levels else 'None assigned'}")
+                
+                year_levels = get_year_levels()
+                if not year_levels:
+                    year_levels = ['FY', 'SY', 'TY', 'Final Year']
+                
+                col1, col2 = st.columns(2)
+                
+                with col1:
+                    st.subheader("Add Year Level")
+                    year_to_add = st.selectbox("Select Year Level to Add *", options=[y for y in year_levels if y not in current_levels])
+                    if st.button("Add Year Level", use_container_width=True):
+                        add_faculty_year_level(selected_faculty_id, year_to_add)
+                        st.success(f"✓ Added {year_to_add} to faculty's teaching schedule")
+                        st.rerun()
+                
+                with col2:
+                    st.subheader("Remove Year Level")
+                    if current_levels:
+                        year_to_remove = st.selectbox("Select Year Level to Remove *", options=current_levels)
+                        if st.button("Remove Year Level", use_container_width=True):
+                            remove_faculty_year_level(selected_faculty_id, year_to_remove)
+                            st.success(f"✓ Removed {year_to_remove} from faculty's teaching schedule")
+                            st.rerun()
+                    else:
+                        st.info("No year levels assigned yet")
+        
+        elif page == "📈 Analytics":
+            st.title("📈 Analytics & Visualizations")
+            
+            overview = get_feedback_overview()
+            stats = get_faculty_stats()
+            
+            if overview['responses']:
+                col1, col2 = st.columns(2)
+                
+                with col1:
+                    st.subheader("Rating Distribution")
+                    fig, ax = plt.subplots(figsize=(8, 5))
+                    ax.bar(range(1, 11), overview['overall_counts'], width=1.0, color='#238636', edgecolor='black')
+                    ax.set_xticks(range(1, 11))
+                    ax.set_xlabel('Overall Rating')
+                    ax.set_ylabel('Count')
+                    ax.set_title('Distribution of Ratings (1-10)')
+                    ax.grid(axis='y', alpha=0.3)
+                    st.pyplot(fig)
+                
+                with col2:
+                    st.subheader("Average Rating by Faculty")
+                    if stats:
+                        faculties = [s[0] for s in stats]
+                        avg_ratings = [s[4] if s[4] else 0 for s in stats]
+                        
+                        fig, ax = plt.subplots(figsize=(8, 5))
+                        colors = plt.cm.RdYlGn(np.linspace(0.3, 0.9, len(faculties)))
+                        ax.barh(faculties, avg_ratings, color=colors, edgecolor='black')
+                        ax.set_xlabel('Average Rating (out of 10)')
+                        ax.set_title('Faculty Performance')
+                        ax.set_xlim(0, 10)
+                        for i, v in enumerate(avg_ratings):
+                            ax.text(v, i, f' {v:.2f}', va='center')
+                        st.pyplot(fig)
+                
+                st.divider()
+                st.subheader("Question-wise Analysis")
+                
+                q_avgs = overview['averages']
+                avg_data = {FEEDBACK_QUESTION_LABELS[col]: q_avgs[col] or 0 for col in FEEDBACK_SCORE_COLUMNS[:10]}
+                
+                fig, ax = plt.subplots(figsize=(10, 6))
+                questions = list(avg_data.keys())
+                averages = list(avg_data.values())
+                ax.barh(questions, averages, color='#1f6feb', edgecolor='black')
+                ax.invert_yaxis()
+                ax.set_xlabel('Average Rating (out of 10)')
+                ax.set_title('Average Ratings by Question')
+                ax.set_xlim(0, 10)
+                for i, v in enumerate(averages):
+                    ax.text(v, i, f' {v:.2f}', va='center')
+                st.pyplot(fig)
+
+                st.divider()
+                st.subheader("🧊 Drill-down")
+                st.caption("Pick a value at each level to drill in; the first level left at \"All\" is what the results are broken down by.")
+
+                years = sorted(feedback_cube_view('rollup', ('academic_year',))['academic_year'].tolist(), reverse=True)
+                selected_years = st.multiselect("Academic years", options=years, default=years[:2], key="cube_years")
+                year_filter = (('academic_year', tuple(selected_years)),) if selected_years else ()
+
+                drill_filters = ()
+                group_dim = 'faculty'
+                drill_cols = st.columns(4)
+                for drill_col, dim, label in zip(drill_cols, FEEDBACK_CUBE_DIMENSIONS[:4], ("Department", "Year", "Subject", "Faculty")):
+                    level_values = feedback_cube_view('rollup', (dim,), drill_filters + year_filter)[dim].tolist()
+                    with drill_col:
+                        choice = st.selectbox(label, options=["All"] + sorted(str(v) for v in level_values), key=f"cube_{dim}")
+                    if choice == "All":
+                        group_dim = dim
+                        break
+                    drill_filters += ((dim, choice),)
+
+                view_filters = drill_filters + year_filter
+                level_df = feedback_cube_view('rollup', (group_dim, 'academic_year'), view_filters)
+                if level_df.empty:
+                    st.info("No feedback matches this selection")
+                else:
+                    question = st.selectbox("Question", options=list(FEEDBACK_SCORE_COLUMNS),
+                                            format_func=FEEDBACK_QUESTION_LABELS.get, key="cube_question")
+
+                    # Cross-year comparison of the selected question
+                    pivot = level_df.pivot(index=group_dim, columns='academic_year', values=question)
+                    fig, ax = plt.subplots(figsize=(10, min(30, max(3, 0.4 * len(pivot) * max(1, len(pivot.columns))))))
+                    pivot.plot.barh(ax=ax, edgecolor='black')
+                    ax.set_xlabel('Average Rating (out of 10)')
+                    ax.set_ylabel('')
+                    ax.set_xlim(0, 10)
+                    ax.set_title(FEEDBACK_QUESTION_LABELS[question])
+                    st.pyplot(fig)
+
+                    col_d1, col_d2 = st.columns(2)
+                    with col_d1:
+                        st.markdown("**Rating distribution**")
+                        dist = feedback_cube_view('distribution', ('academic_year',), view_filters, question)
+                        fig, ax = plt.subplots(figsize=(8, 5))
+                        dist.set_index('academic_year').T.plot.bar(ax=ax, width=0.8, edgecolor='black')
+                        ax.set_xlabel('Rating')
+                        ax.set_ylabel('Count')
+                        ax.grid(axis='y', alpha=0.3)
+                        st.pyplot(fig)
+                    with col_d2:
+                        st.markdown("**Z-scores within department**")
+                        z_dims = tuple(dict.fromkeys(('department', group_dim, 'academic_year')))
+                        z_df = feedback_cube_view('zscores', z_dims, view_filters, question)
+                        st.dataframe(z_df.round({'mean': 2, 'z': 2}), use_container_width=True, hide_index=True)
+
+                    st.markdown("**Means for all questions**")
+                    means_df = level_df.rename(columns=FEEDBACK_QUESTION_LABELS).round(2)
+                    st.dataframe(means_df, use_container_width=True, hide_index=True)
+            else:
+                st.info("No feedback data available for analysis")
+        
+        elif page == "📋 Export Data":
+            st.title("📋 Export Feedback Data")
+            
+            overview = get_feedback_overview()
+            runner = get_export_runner()
+            
+            st.subheader("⏳ Background Exports")
+            st.caption("Exports run in the background; finished files are kept until the data changes, so repeating a request is instant.")
+            kind = st.selectbox("Export", options=list(EXPORT_KINDS), format_func=lambda k: EXPORT_KINDS[k][0], key="export_job_kind")
+            job_params = {}
+            if kind in ('daily_ler', 'faculty_leaves'):
+                faculty_options = {0: "All faculty", **{f[0]: f"{f[1]} ({f[2]})" for f in get_all_faculty()}}
+                fid = st.selectbox("Faculty", options=list(faculty_options), format_func=faculty_options.get, key="export_job_faculty")
+                job_params['faculty_id'] = fid or None
+            if kind == 'daily_ler':
+                c1, c2 = st.columns(2)
+                with c1:
+                    job_from = st.date_input("From", value=None, key="export_job_from")
+                with c2:
+                    job_to = st.date_input("To", value=None, key="export_job_to")
+                job_params['date_from'] = job_from.isoformat() if job_from else None
+                job_params['date_to'] = job_to.isoformat() if job_to else None
+            elif kind == 'attendance':
+                c1, c2 = st.columns(2)
+                with c1:
+                    job_year = st.selectbox("Year Level", options=['All', 'FY', 'SY', 'TY', 'Final Year'], key="export_job_year")
+                with c2:
+                    job_branch = st.selectbox("Branch", options=['All'] + get_branches(), key="export_job_branch")
+                job_params['year_level'] = None if job_year == 'All' else job_year
+                job_params['branch'] = None if job_branch == 'All' else job_branch
+            elif kind == 'test_attempts':
+                c1, c2 = st.columns(2)
+                with c1:
+                    job_field = st.selectbox("Search by", options=["Test Title", "Username", "Roll Number"], key="export_job_field")
+                with c2:
+                    job_term = st.text_input("Contains", value="", key="export_job_term").strip()
+                if job_term:
+                    job_params.update(search_field=job_field, search_term=job_term)
+            job_format = st.radio("Format", options=available_export_formats(), horizontal=True, key="export_job_format")
+            if st.button("➕ Queue Export", use_container_width=True):
+                runner.submit(kind, job_params, job_format)
+            
+            jobs = runner.jobs()
+            if jobs:
+                col_refresh, col_clear = st.columns(2)
+                if col_refresh.button("🔄 Refresh", key="export_jobs_refresh"):
+                    st.rerun()
+                if col_clear.button("🧹 Clear finished", key="export_jobs_clear"):
+                    runner.forget_finished()
+                    st.rerun()
+                for job in jobs:
+                    filters = ', '.join(f"{k}={v}" for k, v in job['params'].items() if v is not None) or 'no filters'
+                    c1, c2, c3, c4 = st.columns([3, 2, 1, 1])
+                    with c1:
+                        st.markdown(f"**{job['label']}** · {job['format']} · {filters}")
+                    with c2:
+                        if job['status'] == 'running':
+                            total = job['total'] or 0
+                            st.progress(min(job['rows'] / total, 1.0) if total else 0.0,
+                                        text=f"{job['rows']:,} / {total:,} rows")
+                        elif job['status'] == 'done':
+                            st.caption(f"✅ {'cached' if job['cached'] else 'done'} · {job['size'] / 1024:,.1f} KB")
+                        elif job['status'] == 'failed':
+                            st.caption(f"❌ {job['error']}")
+                        else:
+                            st.caption("🕒 queued")
+                    with c3:
+                        # Like resource_download_button: without deferred data, read the file only for the rerun after ⬇️
+                        if job['status'] == 'done' and os.path.exists(job['path']):
+                            if DOWNLOAD_BUTTON_DEFERS_DATA or st.session_state.get('requested_export_job') == job['id']:
+                                st.session_state.pop('requested_export_job', None)
+                                st.download_button("📥", data=file_download_data(job['path']), file_name=job['file_name'],
+                                                   mime=job['mime'], key=f"export_job_dl_{job['id']}")
+                            elif st.button("⬇️", key=f"export_job_request_{job['id']}", help="Prepare download"):
+                                st.session_state['requested_export_job'] = job['id']
+                                st.rerun()
+                    with c4:
+                        if job['status'] in ('done', 'failed'):
+                            if st.button("✖", key=f"export_job_forget_{job['id']}", help="Remove from list"):
+                                runner.forget(job['id'])
+                                st.rerun()
+            
+            st.divider()
+            if overview['responses']:
+                preview_limit = 100
+                st.subheader("Preview")
+                st.caption(f"Latest {min(preview_limit, overview['responses'])} of {overview['responses']} submissions")
+                # get_all_feedback returns: id, created_at, fac_name, department, year_level, student_name,
+                # q1, q2, q3, q4, q5, q6, q7, q8, q9, q10, overall_rating, comments, subject (19 columns)
+                df = pd.DataFrame(get_all_feedback(limit=preview_limit), columns=[
+                    'ID', 'Date', 'Faculty', 'Department', 'Year Level', 'Student',
+                    *(FEEDBACK_QUESTION_LABELS[col] for col in FEEDBACK_SCORE_COLUMNS), 'Comments', 'Subject'
+                ])
+                st.dataframe(df.drop(columns=['ID']), use_container_width=True, hide_index=True)
+            else:
+                st.info("No feedback data available to export")
+        
+        elif page == "🐛 Debug: Test Attempts":
+            st.title("🐛 Debug: All Test Attempts")
+            st.caption("Admin-only view: inspect all test attempts in the system")
+
+            with st.expander("🔎 Index Advisor"):
+                st.caption("Runs the read helpers against this database, EXPLAINs every query they issue and flags full table scans.")
+                if st.button("Run Index Advisor", use_container_width=True):
+                    report = run_index_advisor()
+                    flagged = [r for r in report if r['full_scans']]
+                    st.metric("Queries checked", len(report))
+                    st.metric("Queries with full scans", len(flagged))
+                    if flagged:
+                        st.dataframe(pd.DataFrame([{'helper': r['helper'], 'full_scans': '; '.join(r['full_scans']), 'query': r['query']}
+                                                   for r in flagged]), use_container_width=True, hide_index=True)
+                    else:
+                        st.success("Every query uses an index.")
+                    st.markdown("**All plans**")
+                    for r in report:
+                        st.code(r['query'] + '\n-- ' + '\n-- '.join(r['plan']), language='sql')
+            
+            with st.expander("🧮 Per-question answers"):
+                st.caption("Writes attempt_answers rows for any attempt stored without them (e.g. inserted outside the app).")
+                if st.button("Backfill attempt answers", use_container_width=True):
+                    conn = db_connect()
+                    cursor = conn.cursor()
+                    try:
+                        processed = backfill_attempt_answers(cursor)
+                        conn.commit()
+                    finally:
+                        conn.close()
+                    st.success(f"Backfilled {processed} attempt(s)")
+
+            # First, show all tests in the system
+            st.subheader("📋 All Tests in System")
+            conn = db_connect()
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT t.id, t.title, t.faculty_id, f.name, t.start_ts, t.end_ts
+                FROM tests t
+                LEFT JOIN faculty f ON t.faculty_id = f.id
+                ORDER BY t.created_at DESC
+            ''')
+            all_tests = cursor.fetchall()
+            if all_tests:
+                test_rows = []
+                for tid, ttitle, fid, fname, start, end in all_tests:
+                    test_rows.append({
+                        'test_id': tid,
+                        'title': ttitle or 'N/A',
+                        'faculty_id': fid,
+                        'faculty_name': fname or 'Unknown',
+                        'start_ts': start or 'N/A',
+                        'end_ts': end or 'N/A'
+                    })
+                df_tests = pd.DataFrame(test_rows)
+                st.dataframe(df_tests, use_container_width=True, hide_index=True)
+            else:
+                st.info("No tests created yet.")
+            
+            st.divider()
+            
+            # Query all attempts across all tests
+            st.subheader("🧪 All Test Attempts")
+            # Limit number of attempts fetched by default to avoid loading very large datasets into memory/UI
+            limit = 500
+            load_all = st.session_state.get('_load_all_attempts', False)
+            if load_all:
+                cursor.execute('''
+                SELECT ta.id, ta.test_id, ta.student_id, ta.answers, ta.score, ta.started_at, ta.submitted_at, 
+                    u.username, u.name, u.roll_number, t.title
+                FROM test_attempts ta
+                LEFT JOIN users u ON ta.student_id = u.id
+                LEFT JOIN tests t ON ta.test_id = t.id
+                ORDER BY ta.submitted_at DESC
+                ''')
+            else:
+                cursor.execute(f'''
+                SELECT ta.id, ta.test_id, ta.student_id, ta.answers, ta.score, ta.started_at, ta.submitted_at, 
+                    u.username, u.name, u.roll_number, t.title
+                FROM test_attempts ta
+                LEFT JOIN users u ON ta.student_id = u.id
+                LEFT JOIN tests t ON ta.test_id = t.id
+                ORDER BY ta.submitted_at DESC
+                LIMIT {limit}
+                ''')
+            all_attempts = cursor.fetchall()
+            conn.close()
+            
+            if not all_attempts:
+                st.info("ℹ️ No test attempts found in the system. Students need to take tests for attempts to appear here.")
+            # Admin helper: allow seeding a demo attempt for a selected test and student
+            st.divider()
+            st.subheader("🔧 Admin: Seed Demo Attempt")
+            try:
+                conn2 = db_connect()
+                cur2 = conn2.cursor()
+                cur2.execute("SELECT id, username, name FROM users WHERE role = 'student' ORDER BY id")
+                student_rows = cur2.fetchall()
+                cur2.execute('SELECT id, title FROM tests ORDER BY id')
+                test_rows = cur2.fetchall()
+                conn2.close()
+            except Exception:
+                student_rows = []
+                test_rows = []
+
+            if student_rows and test_rows:
+                student_map = {f"{s[1]} ({s[2] or 'NoName'}) [ID:{s[0]}]": s[0] for s in student_rows}
+                test_map = {f"{t[1] or 'NoTitle'} [ID:{t[0]}]": t[0] for t in test_rows}
+                sel_student = st.selectbox("Select student for demo attempt", options=list(student_map.keys()))
+                sel_test = st.selectbox("Select test for demo attempt", options=list(test_map.keys()))
+                if st.button("Seed demo attempt for selected test"):
+                    sid = student_map[sel_student]
+                    tid = test_map[sel_test]
+                    demo_answers = {}
+                    # Build a minimal answers dict based on available questions
+                    qs = get_test_questions(tid)
+                    for q in qs:
+                        # choose first option (index 0) as demo answer
+                        demo_answers[str(q['id'])] = 0
+                    try:
+                        now_iso = datetime.now(ZoneInfo('Asia/Kolkata')).isoformat()
+                        r = submit_test_attempt(tid, sid, demo_answers, started_at=now_iso, submitted_at=now_iso)
+                        st.success(f"Seeded demo attempt — attempt_id: {r.get('attempt_id')} score: {r.get('score')}")
+                        # Refresh view by rerunning (so attempts list updates)
+                        safe_rerun()
+                    except Exception as e:
+                        st.error(f"Failed to seed demo attempt: {str(e)}")
+            else:
+                st.metric("Total Attempts", len(all_attempts))
+                # Option to load all attempts (may be slow for very large datasets)
+                col_l1, col_l2 = st.columns([3,1])
+                with col_l2:
+                    if st.button("Load all attempts (may be slow)"):
+                        st.session_state['_load_all_attempts'] = True
+                        safe_rerun()
+                st.divider()
+                
+                # Build DataFrame for display
+                rows = []
+                for att in all_attempts:
+                    attempt_id, test_id, student_id, answers_json, score, started_at, submitted_at, username, name, roll_number, test_title = att
+                    rows.append({
+                        'attempt_id': attempt_id,
+                        'test_id': test_id,
+                        'test_title': test_title or 'N/A',
+                        'student_id': student_id,
+                        'username': username or 'Unknown',
+                        'name': name or 'Unknown',
+                        'roll_number': roll_number or 'N/A',
+                        'score': score or 0,
+                        'submitted_at': format_ts_for_display(submitted_at),
+                        'answers_json': answers_json or ''
+                    })
+
+                df_attempts = pd.DataFrame(rows)
+                
+                # Display options
+                col1, col2 = st.columns(2)
+                with col1:
+                    search_field = st.selectbox("Search by:", options=['All', 'Test Title', 'Username', 'Roll Number'])
+                with col2:
+                    search_term = st.text_input("Search term")
+                
+                # Filter results
+                if search_term:
+                    if search_field == 'Test Title':
+                        df_filtered = df_attempts[df_attempts['test_title'].str.contains(search_term, case=False, na=False)]
+                    elif search_field == 'Username':
+                        df_filtered = df_attempts[df_attempts['username'].str.contains(search_term, case=False, na=False)]
+                    elif search_field == 'Roll Number':
+                        df_filtered = df_attempts[df_attempts['roll_number'].str.contains(search_term, case=False, na=False)]
+                    else:
+                        df_filtered = df_attempts
+                else:
+                    df_filtered = df_attempts
+                
+                st.subheader(f"Attempts ({len(df_filtered)} of {len(df_attempts)})")
+                
+                # Display table (skip if no rows)
+                if df_filtered.empty:
+                    st.info("No attempts match the current filters.")
+                else:
+                    # Safely select the display columns (ensure they exist)
+                    expected_cols = ['attempt_id', 'test_title', 'username', 'name', 'roll_number', 'score', 'submitted_at']
+                    present_cols = [c for c in expected_cols if c in df_filtered.columns]
+                    if not present_cols:
+                        st.warning("No displayable attempt columns available.")
+                    else:
+                        display_df = df_filtered[present_cols]
+                        st.dataframe(display_df, use_container_width=True, hide_index=True)
+                
+                # Download options
+                st.divider()
+                st.subheader("Export")
+                col1, col2 = st.columns(2)
+                
+                # Exports read every attempt straight from the database, not just the rows loaded above
+                if st.button("Prepare CSV exports", key="prepare_attempt_exports"):
+                    with col1:
+                        export_download_button("📥 Download Filtered (CSV)", test_attempts_export_spec(search_field, search_term),
+                                               f"test_attempts_filtered_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+                                               use_container_width=True)
+                    with col2:
+                        export_download_button("📥 Download All (CSV)", test_attempts_export_spec(),
+                                               f"test_attempts_all_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+                                               use_container_width=True)
+                
+                # Detailed view (only if there are filtered attempts)
+                if not df_filtered.empty:
+                    st.divider()
+                    st.subheader("Detailed Attempt View")
+                    selected_attempt_id = st.selectbox("Select attempt to view details:", options=df_filtered['attempt_id'].tolist())
+                    
+                    if selected_attempt_id:
+                        selected_row = df_filtered[df_filtered['attempt_id'] == selected_attempt_id].iloc[0]
+                        st.write(f"**Attempt ID:** {selected_row['attempt_id']}")
+                        st.write(f"**Test:** {selected_row.get('test_title', 'N/A')} (ID: {selected_row.get('test_id', 'N/A')})")
+                        st.write(f"**Student:** {selected_row.get('name', 'N/A')} (Roll: {selected_row.get('roll_number', 'N/A')}, Username: {selected_row.get('username', 'N/A')})")
+                        st.write(f"**Score:** {selected_row.get('score', 'N/A')}")
+                        st.write(f"**Submitted at:** {selected_row.get('submitted_at', 'N/A')}")
+                        
+                        # Show answers in expandable section
+                        with st.expander("View Answers (JSON)"):
+                            st.code(selected_row.get('answers_json', ''), language='json')
+        
+        elif page == "ℹ️ About":
+            st.title("About This System")
+            st.markdown("""
+            ### Faculty Feedback Collection System
+            
+            **Admin Features:**
+            - View all feedback submissions
+            - Generate analytics and charts
+            - Export feedback data as CSV
+            - Monitor faculty performance
+            
+            **System Capabilities:**
+            - Multi-dimensional faculty evaluation
+            - 10-point rating scale
+            - Real-time statistics
+            - Data visualization with charts
+            """)
+            
+            st.divider()
+            st.subheader("📄 Documentation")
+            st.write("Download comprehensive documentation of the application including features, user roles, and technical details.")
+            
+            try:
+                pdf_buffer = generate_application_documentation()
+                st.download_button(
+                    label="📥 Download Application Documentation (PDF)",
+                    data=pdf_buffer,
+                    file_name=f"LMS_Documentation_{datetime.now(ZoneInfo('Asia/Kolkata')).strftime('%Y%m%d_%H%M%S')}.pdf",
+                    mime="application/pdf",
+                    use_container_width=True
+                )
+            except Exception as e:
+                st.error(f"Error generating documentation: {str(e)}")
+
+# Global footer: prepared by line shown on all pages at the bottom
+st.markdown("---")
+st.markdown(
+    "<div style='text-align:center; font-size:12px; color:#fff; background-color:#1f4788; padding:12px; border-radius:5px;'>"
+    "<strong style='color:#fff;'>Prepared by: Prof. Amir M. Usman Wagdarikar</strong><br>"
+    "<span style='color:#e0e0e0;'>Asst. Prof. Electronics and Telecommunication Engineering, VVP Institute of Engineering and technology, Solapur</span>"
+    "</div>",
+    unsafe_allow_html=True
+)
+
+# Close out this render's query accounting. Admins can add `?perf=1` to the URL to
+# open the query statistics panel (not linked from the navigation).
+page_render = end_page_render()
+if st.session_state.get('role') == 'admin' and perf_panel_requested():
+    with st.expander("⏱️ Query Statistics", expanded=True):
+        if page_render:
+            st.caption(f"{page_render[0]}: {page_render[1]} queries, {page_render[2]:.0f} ms")
+        query_stats = _get_query_stats()
+        st.markdown("**Pages (all renders since start)**")
+        pages_df = pd.DataFrame(query_stats.page_summaries())
+        if not pages_df.empty:
+            pages_df['avg_ms'] = pages_df['total_ms'] / pages_df['renders']
+            pages_df['avg_queries'] = pages_df['queries'] / pages_df['renders']
+            st.dataframe(pages_df, use_container_width=True, hide_index=True)
+        order_by = st.selectbox("Top statements by", options=['total_ms', 'max_ms', 'count'], key="perf_order_by")
+        top_df = pd.DataFrame(query_stats.top_statements(limit=25, order_by=order_by))
+        if not top_df.empty:
+            top_df['avg_ms'] = top_df['total_ms'] / top_df['count']
+            st.dataframe(top_df[['helper', 'count', 'total_ms', 'avg_ms', 'max_ms', 'rows', 'query']],
+                         use_container_width=True, hide_index=True)
+        st.caption(f"Slow query log: {DB_SLOW_QUERY_LOG} (threshold {DB_SLOW_QUERY_MS:.0f} ms)")
+        if st.button("Reset query statistics"):
+            query_stats.reset()
+    with st.expander("📨 Feedback Write Queue"):
+        feedback_queue = get_feedback_queue()
+        queue_stats = feedback_queue.stats()
+        col_q1, col_q2, col_q3, col_q4 = st.columns(4)
+        col_q1.metric("Queue depth", queue_stats['depth'])
+        col_q2.metric("Flushed", queue_stats['flushed'])
+        col_q3.metric("Batches", queue_stats['batches'])
+        col_q4.metric("Errors", queue_stats['errors'])
+        st.dataframe(pd.DataFrame([queue_stats]), use_container_width=True, hide_index=True)
+        st.caption(f"Journal: {FEEDBACK_QUEUE_JOURNAL} (batch {FEEDBACK_QUEUE_MAX_BATCH}, max delay {FEEDBACK_QUEUE_MAX_DELAY_MS:.0f} ms); "
+                   f"entries that cannot be stored go to {feedback_queue.dead_letter_path} ({queue_stats['dead_lettered']} so far)")
+        if st.button("Flush feedback queue now"):
+            if feedback_queue.flush():
+                st.success("Feedback queue flushed")
+            else:
+                st.warning("Timed out waiting for the feedback queue to flush")
+
+    with st.expander("📝 Test Attempt Queue"):
+        attempt_queue = get_test_attempt_queue()
+        attempt_stats = attempt_queue.stats()
+        col_a1, col_a2, col_a3, col_a4 = st.columns(4)
+        col_a1.metric("Queue depth", attempt_stats['depth'], help=f"Peak {attempt_stats['max_depth']} of {attempt_stats['max_pending']}")
+        col_a2.metric("Rows/s (last minute)", f"{attempt_stats['rows_per_s']:.1f}")
+        col_a3.metric("p95 queue→commit", f"{attempt_stats['p95_latency_ms']:.0f} ms")
+        col_a4.metric("Direct writes (queue full)", attempt_stats['rejected'])
+        st.dataframe(pd.DataFrame([attempt_stats]), use_container_width=True, hide_index=True)
+        st.caption(f"Journal: {TEST_ATTEMPT_QUEUE_JOURNAL} (batch {TEST_ATTEMPT_QUEUE_MAX_BATCH}, max delay {TEST_ATTEMPT_QUEUE_MAX_DELAY_MS:.0f} ms, "
+                   f"capacity {TEST_ATTEMPT_QUEUE_MAX_PENDING}); dead letters: {attempt_queue.dead_letter_path} ({attempt_stats['dead_lettered']} so far)")
+        if st.button("Flush test attempt queue now"):
+            if attempt_queue.flush():
+                st.success("Test attempt queue flushed")
+            else:
+                st.warning("Timed out waiting for the test attempt queue to flush")